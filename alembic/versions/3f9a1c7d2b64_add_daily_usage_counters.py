@@ -0,0 +1,48 @@
+"""add daily_usage_counters table
+
+Revision ID: 3f9a1c7d2b64
+Revises: 622503188e18
+Create Date: 2026-10-17 10:12:41.208513
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a1c7d2b64'
+down_revision: Union[str, Sequence[str], None] = '622503188e18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('daily_usage_counters',
+    sa.Column('usage_date', sa.Date(), nullable=False),
+    sa.Column('request_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('input_tokens', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('output_tokens', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('usage_date')
+    )
+    # 既存の使用統計から日次カウンタを復元（日付はJST）
+    op.execute(
+        """
+        INSERT INTO daily_usage_counters (usage_date, request_count, input_tokens, output_tokens)
+        SELECT (date AT TIME ZONE 'Asia/Tokyo')::date,
+               COUNT(*),
+               COALESCE(SUM(input_tokens), 0),
+               COALESCE(SUM(output_tokens), 0)
+        FROM summary_usage
+        WHERE date IS NOT NULL
+        GROUP BY 1
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('daily_usage_counters')
@@ -0,0 +1,110 @@
+"""add usage rollup tables
+
+Revision ID: 8c2e5b1f4a97
+Revises: 3f9a1c7d2b64
+Create Date: 2026-10-17 11:20:05.734118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c2e5b1f4a97'
+down_revision: Union[str, Sequence[str], None] = '3f9a1c7d2b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 既存の使用統計から集計値を復元する SELECT（バケットの式のみ異なる）
+_BACKFILL_SELECT = """
+    SELECT {bucket},
+           COALESCE(model_detail, ''),
+           COALESCE(document_types, ''),
+           COALESCE(department, ''),
+           COALESCE(doctor, ''),
+           COUNT(*),
+           COALESCE(SUM(input_tokens), 0),
+           COALESCE(SUM(output_tokens), 0),
+           COUNT(processing_time),
+           COALESCE(SUM(processing_time), 0),
+           MIN(processing_time),
+           MAX(processing_time),
+           COUNT(*) FILTER (WHERE processing_time <= 10),
+           COUNT(*) FILTER (WHERE processing_time <= 20),
+           COUNT(*) FILTER (WHERE processing_time <= 30),
+           COUNT(*) FILTER (WHERE processing_time <= 60),
+           COUNT(*) FILTER (WHERE processing_time <= 120)
+    FROM summary_usage
+    WHERE date IS NOT NULL
+    GROUP BY 1, 2, 3, 4, 5
+"""
+
+_ROLLUP_COLUMNS = (
+    "model, document_type, department, doctor, request_count, input_tokens, output_tokens, "
+    "processing_time_count, processing_time_sum, processing_time_min, processing_time_max, "
+    "processing_time_le_10, processing_time_le_20, processing_time_le_30, "
+    "processing_time_le_60, processing_time_le_120"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('usage_rollups_hourly',
+    sa.Column('bucket_start', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('model', sa.String(length=100), nullable=False),
+    sa.Column('document_type', sa.String(length=100), nullable=False),
+    sa.Column('department', sa.String(length=100), nullable=False),
+    sa.Column('doctor', sa.String(length=100), nullable=False),
+    sa.Column('request_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('input_tokens', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('output_tokens', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('processing_time_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('processing_time_sum', sa.Float(), server_default='0', nullable=False),
+    sa.Column('processing_time_min', sa.Float(), nullable=True),
+    sa.Column('processing_time_max', sa.Float(), nullable=True),
+    sa.Column('processing_time_le_10', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('processing_time_le_20', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('processing_time_le_30', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('processing_time_le_60', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('processing_time_le_120', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('bucket_start', 'model', 'document_type', 'department', 'doctor')
+    )
+    op.create_table('usage_rollups_daily',
+    sa.Column('bucket_date', sa.Date(), nullable=False),
+    sa.Column('model', sa.String(length=100), nullable=False),
+    sa.Column('document_type', sa.String(length=100), nullable=False),
+    sa.Column('department', sa.String(length=100), nullable=False),
+    sa.Column('doctor', sa.String(length=100), nullable=False),
+    sa.Column('request_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('input_tokens', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('output_tokens', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('processing_time_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('processing_time_sum', sa.Float(), server_default='0', nullable=False),
+    sa.Column('processing_time_min', sa.Float(), nullable=True),
+    sa.Column('processing_time_max', sa.Float(), nullable=True),
+    sa.Column('processing_time_le_10', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('processing_time_le_20', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('processing_time_le_30', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('processing_time_le_60', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('processing_time_le_120', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('bucket_date', 'model', 'document_type', 'department', 'doctor')
+    )
+    # 時間・日付の区切りはJST
+    op.execute(
+        f"INSERT INTO usage_rollups_hourly (bucket_start, {_ROLLUP_COLUMNS}) "
+        + _BACKFILL_SELECT.format(
+            bucket="date_trunc('hour', date AT TIME ZONE 'Asia/Tokyo') AT TIME ZONE 'Asia/Tokyo'"
+        )
+    )
+    op.execute(
+        f"INSERT INTO usage_rollups_daily (bucket_date, {_ROLLUP_COLUMNS}) "
+        + _BACKFILL_SELECT.format(bucket="(date AT TIME ZONE 'Asia/Tokyo')::date")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('usage_rollups_daily')
+    op.drop_table('usage_rollups_hourly')
@@ -0,0 +1,27 @@
+"""add summary_usage (date, id) index for keyset pagination
+
+Revision ID: b41d7e9a0c35
+Revises: 8c2e5b1f4a97
+Create Date: 2026-10-17 11:52:17.402981
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41d7e9a0c35'
+down_revision: Union[str, Sequence[str], None] = '8c2e5b1f4a97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_summary_usage_date_id', 'summary_usage', ['date', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_summary_usage_date_id', table_name='summary_usage')
@@ -0,0 +1,43 @@
+"""add prompt cache token columns to summary_usage and usage rollups
+
+Revision ID: d7a3e5c91f28
+Revises: b41d7e9a0c35
+Create Date: 2026-10-17 14:05:41.218630
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a3e5c91f28'
+down_revision: Union[str, Sequence[str], None] = 'b41d7e9a0c35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_CACHE_COLUMNS = ('cache_read_input_tokens', 'cache_creation_input_tokens')
+_ROLLUP_TABLES = ('usage_rollups_hourly', 'usage_rollups_daily')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for column in _CACHE_COLUMNS:
+        op.add_column(
+            'summary_usage',
+            sa.Column(column, sa.Integer(), server_default='0', nullable=False),
+        )
+        for table in _ROLLUP_TABLES:
+            op.add_column(
+                table,
+                sa.Column(column, sa.BigInteger(), server_default='0', nullable=False),
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in reversed(_CACHE_COLUMNS):
+        for table in reversed(_ROLLUP_TABLES):
+            op.drop_column(table, column)
+        op.drop_column('summary_usage', column)
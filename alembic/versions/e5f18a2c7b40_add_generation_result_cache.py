@@ -0,0 +1,36 @@
+"""add generation_result_cache table
+
+Revision ID: e5f18a2c7b40
+Revises: d7a3e5c91f28
+Create Date: 2026-10-17 16:42:18.905214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f18a2c7b40'
+down_revision: Union[str, Sequence[str], None] = 'd7a3e5c91f28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('generation_result_cache',
+    sa.Column('cache_key', sa.String(length=64), nullable=False),
+    sa.Column('payload', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('cache_key')
+    )
+    op.create_index(op.f('ix_generation_result_cache_expires_at'), 'generation_result_cache', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_generation_result_cache_expires_at'), table_name='generation_result_cache')
+    op.drop_table('generation_result_cache')
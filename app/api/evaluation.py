@@ -27,10 +27,10 @@ protected_router = APIRouter(prefix="/evaluation", tags=["evaluation"])
 
 
 @protected_router.post("/evaluate", response_model=EvaluationResponse)
-def evaluate_output(http_request: Request, request: EvaluationRequest):
+async def evaluate_output(http_request: Request, request: EvaluationRequest):
     """出力評価API"""
     user_ip = http_request.client.host if http_request.client else None
-    return evaluation_service.execute_evaluation(
+    return await evaluation_service.execute_evaluation(
         document_type=request.document_type,
         input_text=request.input_text,
         current_prescription=request.current_prescription,
@@ -1,9 +1,17 @@
 from datetime import datetime
-from fastapi import APIRouter, Depends, Query
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
-from app.schemas.statistics import UsageSummary, UsageRecord, AggregatedRecord
+from app.schemas.statistics import (
+    AggregatedRecord,
+    LatencyStatistics,
+    UsageRecord,
+    UsageSummary,
+)
 from app.services import statistics_service
 
 router = APIRouter(prefix="/statistics", tags=["statistics"])
@@ -34,17 +42,74 @@ def get_aggregated(
     )
 
 
+@router.get("/latency", response_model=list[LatencyStatistics])
+def get_latency(
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+    model: str | None = None,
+    document_type: str | None = None,
+    db: Session = Depends(get_db),
+):
+    """モデル・文書タイプ別の処理時間の百分位数とヒストグラムを取得"""
+    return statistics_service.get_latency_statistics(
+        db, start_date, end_date, model, document_type
+    )
+
+
 @router.get("/records", response_model=list[UsageRecord])
 def get_records(
+    response: Response,
     start_date: datetime | None = None,
     end_date: datetime | None = None,
     model: str | None = None,
     document_type: str | None = None,
     limit: int = Query(100, le=500),
     offset: int = 0,
+    cursor: str | None = None,
     db: Session = Depends(get_db),
 ):
-    """使用統計レコードを取得"""
-    return statistics_service.get_usage_records(
-        db, start_date, end_date, model, document_type, limit, offset
+    """使用統計レコードを取得
+
+    続きがある場合は次ページのカーソルを X-Next-Cursor ヘッダーで返す。
+    """
+    try:
+        decoded_cursor = (
+            statistics_service.decode_records_cursor(cursor) if cursor else None
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    records = statistics_service.get_usage_records(
+        db, start_date, end_date, model, document_type, limit, offset, decoded_cursor
+    )
+    if len(records) == limit:
+        response.headers["X-Next-Cursor"] = statistics_service.encode_records_cursor(
+            records[-1]
+        )
+    return records
+
+
+_EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+@router.get("/records/export")
+def export_records(
+    export_format: Literal["csv", "ndjson"] = Query("csv", alias="format"),
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+    model: str | None = None,
+    document_type: str | None = None,
+):
+    """使用統計レコードを CSV / NDJSON でストリーミング出力"""
+    return StreamingResponse(
+        statistics_service.iter_usage_export(
+            export_format, start_date, end_date, model, document_type
+        ),
+        media_type=_EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="usage_records.{export_format}"'
+        },
     )
@@ -19,10 +19,10 @@ settings = get_settings()
 
 
 @protected_router.post("/generate", response_model=SummaryResponse)
-def generate_summary(http_request: Request, request: SummaryRequest):
+async def generate_summary(http_request: Request, request: SummaryRequest):
     """文書生成API"""
     user_ip = http_request.client.host if http_request.client else None
-    return execute_summary_generation(
+    return await execute_summary_generation(
         medical_text=request.medical_text,
         additional_info=request.additional_info,
         referral_purpose=request.referral_purpose,
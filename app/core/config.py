@@ -36,6 +36,8 @@ class Settings(BaseSettings):
     aws_secret_access_key: str | None = None
     aws_region: str = "ap-northeast-1"
     anthropic_model: str | None = None
+    # システムプロンプトの固定部分をプロンプトキャッシュの対象にする（非対応モデルでは false）
+    anthropic_prompt_cache_enabled: bool = True
 
     # Google Vertex AI (Gemini)
     google_credentials_json: str | None = None
@@ -43,6 +45,24 @@ class Settings(BaseSettings):
     google_project_id: str | None = None
     google_location: str = "global"
     gemini_thinking_level: str = "HIGH"
+    # 長いカルテ本文を Vertex AI のコンテキストキャッシュに載せ、生成・評価・再生成で再利用する
+    gemini_context_cache_enabled: bool = True
+    gemini_context_cache_min_chars: int = 30000
+    gemini_context_cache_ttl_seconds: int = 1800
+    gemini_context_cache_max_entries: int = 100
+    # 同じカルテがこの回数送られた時点でキャッシュを作成する（1回しか送られないカルテには作成しない）
+    gemini_context_cache_min_uses: int = 2
+
+    # ローカルの疑似LLM（有効時は Claude/Gemini の代わりに外部APIを呼ばない FakeAPIClient を使う）
+    fake_llm_enabled: bool = False
+    fake_llm_first_token_seconds: float = 0.5
+    fake_llm_tokens_per_second: float = 100.0
+    fake_llm_output_tokens: int = 800
+    fake_llm_chunk_tokens: int = 5
+    fake_llm_error_rate: float = 0.0
+
+    # LLMクライアントプール（認証情報のバックグラウンド更新間隔、0で無効）
+    llm_credential_refresh_seconds: int = 2700
 
     # 出力評価
     evaluation_model: str = ModelType.GEMINI.value
@@ -52,11 +72,48 @@ class Settings(BaseSettings):
     min_input_tokens: int = 100
     max_token_threshold: int = 150000
     prompt_management: bool = True
+    # SSEで生成途中のテキスト差分(deltaイベント)を逐次送信する
+    sse_stream_deltas: bool = True
+    # プロンプトキャッシュが他ワーカーでの変更を確認する間隔（秒、0で参照ごとに確認）
+    prompt_cache_check_seconds: int = 5
+
+    # 同一リクエストの生成結果キャッシュ（プロセス内LRU、DB保存時は暗号化キーが必須）
+    result_cache_enabled: bool = False
+    result_cache_ttl_seconds: int = 3600
+    result_cache_max_entries: int = 200
+    result_cache_db_enabled: bool = False
+    # Fernet 鍵（cryptography.fernet.Fernet.generate_key() で生成）
+    result_cache_encryption_key: str | None = None
+    # 実行中の同一リクエストの文書生成（SSE）に合流し、プロバイダー呼び出しを1回にまとめる
+    single_flight_enabled: bool = False
+    # 終了時に実行中の合流対象の生成の完了を待つ秒数（超えた分は取り消して利用枠の予約を解放）
+    single_flight_shutdown_timeout_seconds: float = 10.0
 
     # 日次利用制限
     daily_request_limit: int = 100
     daily_input_token_limit: int = 5000000
     daily_output_token_limit: int = 100000
+    # 日次カウンタのプロセス内キャッシュ有効期間（秒）
+    daily_quota_cache_ttl_seconds: int = 2
+    # 生成開始時に予約する出力トークン数（完了時に実績で補正）
+    daily_quota_reserved_output_tokens: int = 6000
+
+    # 使用量の非同期書き込み（件数または経過秒数でまとめて保存）
+    usage_write_batch_size: int = 50
+    usage_write_interval_seconds: float = 1.0
+    usage_write_queue_size: int = 1000
+    # DBに書き込めなかった使用量の退避先（JSON Lines）
+    usage_spool_path: str = "usage_spool.jsonl"
+
+    # 監査ログ（キュー経由でバックグラウンド出力、未指定時は標準エラー出力）
+    audit_log_queue_size: int = 10000
+    audit_log_path: str | None = None
+
+    # /metrics（複数ワーカー時は各ワーカーの値をこのディレクトリ経由で合算）
+    metrics_multiprocess_dir: str | None = None
+    metrics_snapshot_interval_seconds: float = 5.0
+    # 設定時は Authorization: Bearer <トークン> のリクエストのみ /metrics を返す（未設定時は /metrics を無効化）
+    metrics_auth_token: str = ""
 
     # CSRF認証（未設定の場合は起動時にエラー）
     csrf_secret_key: str = ""
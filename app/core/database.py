@@ -6,14 +6,48 @@ from typing import Iterator
 import boto3
 import psycopg2
 from sqlalchemy import create_engine, event
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import PoolProxiedConnection, QueuePool
 
 from .config import get_settings
+from .metrics import REGISTRY
 
 settings = get_settings()
 
+DB_POOL_WAIT = REGISTRY.histogram(
+    "db_pool_wait_seconds", "コネクションプールから接続を取得するまでの待ち時間"
+)
+DB_POOL_TIMEOUTS = REGISTRY.counter(
+    "db_pool_timeouts_total", "コネクションプールの取得タイムアウト数"
+)
+DB_POOL_CHECKED_OUT = REGISTRY.gauge("db_pool_checked_out", "使用中の接続数")
+DB_POOL_OVERFLOW = REGISTRY.gauge("db_pool_overflow", "pool_size を超えて作成した接続数")
+DB_POOL_SIZE = REGISTRY.gauge("db_pool_size", "プールに保持する接続数の上限（pool_size）")
+
+
+class _TimedQueuePool(QueuePool):
+    """接続の取得待ち時間と取得タイムアウトを記録する QueuePool
+
+    取得待ちの開始を通知するプールイベントはないため、Engine が接続取得に使う公開APIの
+    connect() を計測する。セッションは従来どおり最初のクエリで接続を取得する。
+    """
+
+    def connect(self) -> PoolProxiedConnection:
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except sa_exc.TimeoutError:
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - started)
+
+
 engine = create_engine(
     settings.get_database_url(),
+    poolclass=_TimedQueuePool,
     pool_size=settings.db_pool_size,
     max_overflow=settings.db_max_overflow,
     pool_timeout=settings.db_pool_timeout,
@@ -21,6 +55,18 @@ engine = create_engine(
     pool_pre_ping=False,
 )
 
+
+def _collect_pool_metrics() -> None:
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return
+    DB_POOL_CHECKED_OUT.set(pool.checkedout())
+    DB_POOL_OVERFLOW.set(max(0, pool.overflow()))
+    DB_POOL_SIZE.set(pool.size())
+
+
+REGISTRY.add_collector(_collect_pool_metrics)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
@@ -91,3 +137,10 @@ def get_db_session() -> Iterator[Session]:
         raise
     finally:
         db.close()
+
+
+def dialect_insert(db: Session, entity):
+    """接続先の方言に応じた ON CONFLICT 対応の INSERT（PostgreSQL / テスト用SQLite）"""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(entity)
+    return sqlite.insert(entity)
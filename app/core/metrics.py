@@ -0,0 +1,473 @@
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections.abc import Callable, Iterable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# 秒単位のレイテンシ用バケット（HTTP・生成API・DBプール待ちで共用）
+LATENCY_BUCKETS = (0.005, 0.025, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+LabelValues = tuple[str, ...]
+
+
+class _Metric:
+    """ラベルの組ごとに値を保持するメトリクスの基底クラス"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: dict[LabelValues, Any] = {}
+
+    def _key(self, labels: dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> list[list]:
+        """[ラベル値のリスト, 値] のリスト（スナップショット用）"""
+        with self._lock:
+            return [[list(key), self._copy(value)] for key, value in self._values.items()]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    @staticmethod
+    def _copy(value: Any) -> Any:
+        return value
+
+
+class Counter(_Metric):
+    """単調増加するカウンタ"""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_total(self, value: float, **labels: str) -> None:
+        """別の場所で数えている累計値をそのまま反映（統計を読み取るコレクタ用）"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Gauge(_Metric):
+    """増減する現在値"""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """固定バケットのヒストグラム（値は [バケットごとの件数, 合計, 件数]）"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            current = self._values.get(key)
+            if current is None:
+                current = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    current[0][i] += 1
+                    break
+            current[1] += value
+            current[2] += 1
+
+    @staticmethod
+    def _copy(value: Any) -> Any:
+        return [list(value[0]), value[1], value[2]]
+
+
+class MetricsRegistry:
+    """プロセス内のメトリクスを保持し、Prometheus テキスト形式で出力する
+
+    multiprocess_dir を指定した場合は各ワーカーのスナップショットを
+    metrics_<pid>.json として書き出し、出力時に全ワーカー分を合算する。
+    ゲージは stale_seconds 以内に更新されたスナップショットのみ合算する（停止したワーカーを除くため）。
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+
+    def _register(self, metric: _Metric) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """スナップショット作成の直前に呼び出す関数（ゲージの現在値の更新用）を登録"""
+        self._collectors.append(collector)
+
+    def reset(self) -> None:
+        """全メトリクスの値を消去（テスト用）"""
+        for metric in self._metrics.values():
+            metric.reset()
+
+    def snapshot(self) -> dict[str, dict]:
+        """JSON に変換できる形式で現在値を返す"""
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception:
+                logger.warning("メトリクスの収集に失敗しました", exc_info=True)
+        return {
+            name: {
+                "kind": metric.kind,
+                "documentation": metric.documentation,
+                "labelnames": list(metric.labelnames),
+                "buckets": list(getattr(metric, "buckets", ())),
+                "samples": metric.samples(),
+            }
+            for name, metric in self._metrics.items()
+        }
+
+    def write_snapshot(self, directory: str) -> None:
+        """このワーカーのスナップショットをファイルに書き出す（一時ファイルから置き換え）"""
+        path = os.path.join(directory, f"metrics_{os.getpid()}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def render(self, multiprocess_dir: str | None = None, stale_seconds: float = 30.0) -> str:
+        """Prometheus テキスト形式で出力"""
+        if not multiprocess_dir:
+            return _render(_merge([(self.snapshot(), True)]))
+
+        self.write_snapshot(multiprocess_dir)
+        now = time.time()
+        snapshots = []
+        for entry in os.scandir(multiprocess_dir):
+            if not (entry.name.startswith("metrics_") and entry.name.endswith(".json")):
+                continue
+            try:
+                with open(entry.path, encoding="utf-8") as f:
+                    data = json.load(f)
+                live = now - entry.stat().st_mtime <= stale_seconds
+            except (OSError, ValueError):
+                continue
+            snapshots.append((data, live))
+        return _render(_merge(snapshots))
+
+
+def _merge(snapshots: list[tuple[dict, bool]]) -> dict[str, dict]:
+    """複数ワーカーのスナップショットをラベルの組ごとに合算"""
+    merged: dict[str, dict] = {}
+    for data, live in snapshots:
+        for name, metric in data.items():
+            if metric["kind"] == "gauge" and not live:
+                continue
+            target = merged.setdefault(name, {**metric, "values": {}})
+            values = target["values"]
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                if metric["kind"] == "histogram":
+                    current = values.setdefault(key, [[0] * len(value[0]), 0.0, 0])
+                    current[0] = [a + b for a, b in zip(current[0], value[0])]
+                    current[1] += value[1]
+                    current[2] += value[2]
+                else:
+                    values[key] = values.get(key, 0.0) + value
+    return merged
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(labelnames, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _render(merged: dict[str, dict]) -> str:
+    lines = []
+    for name, metric in merged.items():
+        lines.append(f"# HELP {name} {metric['documentation']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        labelnames = metric["labelnames"]
+        for key, value in sorted(metric["values"].items()):
+            if metric["kind"] != "histogram":
+                lines.append(f"{name}{_format_labels(labelnames, key)} {_format_value(value)}")
+                continue
+            counts, total, count = value
+            cumulative = 0
+            for bound, bucket_count in zip(metric["buckets"], counts):
+                cumulative += bucket_count
+                labels = _format_labels([*labelnames, "le"], [*key, _format_value(bound)])
+                lines.append(f"{name}_bucket{labels} {cumulative}")
+            labels = _format_labels([*labelnames, "le"], [*key, "+Inf"])
+            lines.append(f"{name}_bucket{labels} {count}")
+            lines.append(f"{name}_sum{_format_labels(labelnames, key)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labelnames, key)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTPリクエスト数", ("method", "path", "status")
+)
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "HTTPリクエストの処理時間（ストリーミングは送信完了まで）",
+    ("method", "path"),
+)
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight", "処理中のHTTPリクエスト数"
+)
+SSE_STREAMS_IN_FLIGHT = REGISTRY.gauge(
+    "sse_streams_in_flight", "送信中のSSEストリーム数", ("path",)
+)
+GENERATION_DURATION = REGISTRY.histogram(
+    "generation_provider_duration_seconds",
+    "生成AI APIの呼び出し時間",
+    ("kind", "model"),
+)
+GENERATION_FIRST_TOKEN = REGISTRY.histogram(
+    "generation_time_to_first_token_seconds",
+    "ストリーミングで最初のテキストを受信するまでの時間",
+    ("kind", "model"),
+)
+GENERATION_TOKENS = REGISTRY.counter(
+    "generation_tokens_total", "生成AI APIの入出力トークン数", ("kind", "model", "direction")
+)
+GENERATION_FAILURES = REGISTRY.counter(
+    "generation_failures_total", "生成AI APIの呼び出し失敗数", ("kind", "model")
+)
+MODEL_SWITCHES = REGISTRY.counter(
+    "generation_model_switches_total",
+    "入力長によるモデルの自動切り替え回数",
+    ("from_model", "to_model"),
+)
+THREADPOOL_BUSY = REGISTRY.gauge(
+    "threadpool_busy_threads", "使用中のワーカースレッド数", ("pool",)
+)
+THREADPOOL_LIMIT = REGISTRY.gauge(
+    "threadpool_max_threads", "ワーカースレッドの上限", ("pool",)
+)
+THREADPOOL_WAITING = REGISTRY.gauge(
+    "threadpool_waiting_tasks", "スレッドの空きを待っているタスク数", ("pool",)
+)
+AUDIT_LOG_QUEUE_DEPTH = REGISTRY.gauge(
+    "audit_log_queue_depth", "監査ログキューに滞留している件数"
+)
+AUDIT_LOG_QUEUE_MAX_DEPTH = REGISTRY.gauge(
+    "audit_log_queue_max_depth", "監査ログキューの滞留件数の最大値"
+)
+AUDIT_LOG_ENQUEUED = REGISTRY.counter(
+    "audit_log_enqueued_total", "監査ログキューへ投入した件数"
+)
+AUDIT_LOG_OVERFLOWED = REGISTRY.counter(
+    "audit_log_overflowed_total", "監査ログキューが満杯のため呼び出し元で出力した件数"
+)
+LLM_CLIENT_POOL_HITS = REGISTRY.counter(
+    "llm_client_pool_hits_total", "LLMクライアントプールで既存のクライアントを再利用した回数"
+)
+LLM_CLIENT_POOL_MISSES = REGISTRY.counter(
+    "llm_client_pool_misses_total", "LLMクライアントプールでクライアントを新規作成した回数"
+)
+LLM_CLIENT_POOL_SIZE = REGISTRY.gauge(
+    "llm_client_pool_size", "LLMクライアントプールが保持するクライアント数"
+)
+
+
+def observe_generation(
+    kind: str,
+    model: str,
+    duration_seconds: float,
+    input_tokens: int,
+    output_tokens: int,
+    first_token_seconds: float | None = None,
+) -> None:
+    """生成AI API呼び出し1回分の時間とトークン数を記録"""
+    GENERATION_DURATION.observe(duration_seconds, kind=kind, model=model)
+    if first_token_seconds is not None:
+        GENERATION_FIRST_TOKEN.observe(first_token_seconds, kind=kind, model=model)
+    GENERATION_TOKENS.inc(input_tokens, kind=kind, model=model, direction="input")
+    GENERATION_TOKENS.inc(output_tokens, kind=kind, model=model, direction="output")
+
+
+_thread_limiter: Any = None
+
+
+def register_threadpool_metrics(limiter: Any) -> None:
+    """anyio のスレッド上限（同期エンドポイントと run_in_threadpool が使う）をゲージの対象にする
+
+    起動時（イベントループ上）に呼び出す。以降はスナップショット作成時に現在値を読み取る。
+    asyncio.to_thread が使う既定の ThreadPoolExecutor は使用状況を公開APIで参照できないため対象外。
+    """
+    global _thread_limiter
+    _thread_limiter = limiter
+
+
+def _collect_threadpool_metrics() -> None:
+    if _thread_limiter is None:
+        return
+    statistics = _thread_limiter.statistics()
+    THREADPOOL_BUSY.set(statistics.borrowed_tokens, pool="anyio")
+    THREADPOOL_LIMIT.set(statistics.total_tokens, pool="anyio")
+    THREADPOOL_WAITING.set(statistics.tasks_waiting, pool="anyio")
+
+
+REGISTRY.add_collector(_collect_threadpool_metrics)
+
+
+def _route_path(scope: dict) -> str:
+    """ルートのテンプレート（/api/prompts/{prompt_id} など）。ルートに一致しない場合は other"""
+    return getattr(scope.get("route"), "path_format", None) or "other"
+
+
+class MetricsMiddleware:
+    """リクエスト数・処理時間・処理中の件数を記録する ASGI ミドルウェア
+
+    パスはルートのテンプレートで集計する。text/event-stream の応答は送信完了まで
+    SSEストリームとして数える。
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        streaming_path: str | None = None
+        started = time.perf_counter()
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+
+        async def send_wrapper(message: dict) -> None:
+            nonlocal status_code, streaming_path
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = dict(message.get("headers", ()))
+                if headers.get(b"content-type", b"").startswith(b"text/event-stream"):
+                    streaming_path = _route_path(scope)
+                    SSE_STREAMS_IN_FLIGHT.inc(path=streaming_path)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            if streaming_path is not None:
+                SSE_STREAMS_IN_FLIGHT.dec(path=streaming_path)
+            path = _route_path(scope)
+            HTTP_REQUESTS.inc(method=scope["method"], path=path, status=str(status_code))
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - started, method=scope["method"], path=path
+            )
+
+
+class _SnapshotWriter:
+    """マルチワーカー構成で定期的にスナップショットを書き出すスレッド"""
+
+    def __init__(self, directory: str, interval_seconds: float) -> None:
+        self._directory = directory
+        self._interval_seconds = interval_seconds
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="metrics-snapshot", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._thread.join()
+        self._write()
+
+    def _write(self) -> None:
+        try:
+            REGISTRY.write_snapshot(self._directory)
+        except Exception:
+            logger.warning("メトリクスのスナップショットの書き出しに失敗しました", exc_info=True)
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self._interval_seconds):
+            self._write()
+
+
+_snapshot_writer: _SnapshotWriter | None = None
+
+
+def start_metrics_exporter(directory: str | None, interval_seconds: float) -> None:
+    """directory 指定時はスナップショットの定期書き出しを開始（開始済み・未指定なら何もしない）"""
+    global _snapshot_writer
+    if not directory or _snapshot_writer is not None:
+        return
+    os.makedirs(directory, exist_ok=True)
+    _snapshot_writer = _SnapshotWriter(directory, interval_seconds)
+    _snapshot_writer.start()
+
+
+def stop_metrics_exporter() -> None:
+    """スナップショットの定期書き出しを停止（最後に1回書き出す）"""
+    global _snapshot_writer
+    if _snapshot_writer is None:
+        return
+    _snapshot_writer.stop()
+    _snapshot_writer = None
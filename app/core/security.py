@@ -3,7 +3,7 @@ import hmac
 import time
 
 from fastapi import Depends, HTTPException, status
-from fastapi.security import APIKeyHeader
+from fastapi.security import APIKeyHeader, HTTPAuthorizationCredentials, HTTPBearer
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import Response
@@ -12,6 +12,7 @@ from app.core.config import Settings, get_settings
 
 
 CSRF_TOKEN_HEADER = APIKeyHeader(name="X-CSRF-Token", auto_error=False)
+METRICS_BEARER = HTTPBearer(auto_error=False)
 
 
 def get_secret_key(settings: Settings) -> bytes:
@@ -77,6 +78,34 @@ async def require_csrf_token(
     return csrf_token
 
 
+async def require_metrics_token(
+    credentials: HTTPAuthorizationCredentials | None = Depends(METRICS_BEARER),
+    settings: Settings = Depends(get_settings),
+) -> None:
+    """
+    /metrics のトークンを検証する依存関数
+
+    METRICS_AUTH_TOKEN 未設定時は /metrics を無効とし、存在しないエンドポイントとして 404 を返す
+    """
+    if not settings.metrics_auth_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="メトリクスの取得にはトークンが必要です",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if not hmac.compare_digest(
+        credentials.credentials.encode(), settings.metrics_auth_token.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="無効なトークンです",
+        )
+
+
 class SecurityHeadersMiddleware(BaseHTTPMiddleware):
     """セキュリティヘッダーをレスポンスに追加"""
 
@@ -2,10 +2,13 @@ import logging
 from enum import Enum
 from typing import Union
 
+from app.core.config import get_settings
 from app.core.constants import DEFAULT_DOCUMENT_TYPE, MESSAGES, get_message
 from app.external.base_api import BaseAPIClient
 from app.external.claude_api import ClaudeAPIClient
+from app.external.fake_api import FakeAPIClient
 from app.external.gemini_api import GeminiAPIClient
+from app.services.generation_context import GenerationContext
 from app.utils.exceptions import APIError
 
 logger = logging.getLogger(__name__)
@@ -14,6 +17,7 @@ logger = logging.getLogger(__name__)
 class APIProvider(Enum):
     CLAUDE = "claude"
     GEMINI = "gemini"
+    FAKE = "fake"
 
 
 def create_client(provider: Union[APIProvider, str]) -> BaseAPIClient:
@@ -32,10 +36,36 @@ def create_client(provider: Union[APIProvider, str]) -> BaseAPIClient:
         logger.info(get_message("LOG", "CLIENT_DIRECT_CLAUDE"))
         return ClaudeAPIClient()
 
+    if provider == APIProvider.FAKE:
+        logger.info(get_message("LOG", "CLIENT_DIRECT_FAKE"))
+        return FakeAPIClient()
+
     logger.error(MESSAGES["ERROR"]["UNSUPPORTED_API_PROVIDER"].format(provider=provider))
     raise APIError(MESSAGES["ERROR"]["UNSUPPORTED_API_PROVIDER"].format(provider=provider))
 
 
+def warm_up_clients() -> None:
+    """設定済みプロバイダーのクライアントを起動時にプールへ登録"""
+    settings = get_settings()
+    if settings.fake_llm_enabled:
+        return
+    providers = []
+    if settings.anthropic_model:
+        providers.append(APIProvider.CLAUDE)
+    if settings.gemini_model and settings.google_project_id:
+        providers.append(APIProvider.GEMINI)
+
+    for provider in providers:
+        try:
+            create_client(provider).initialize()
+        except Exception:
+            # 初回リクエスト時に再試行されるため起動は継続
+            logger.warning(
+                get_message("LOG", "CLIENT_WARMUP_FAILED", provider=provider.value),
+                exc_info=True,
+            )
+
+
 def generate_summary_with_provider(
     provider: Union[APIProvider, str],
     medical_text: str,
@@ -48,6 +78,7 @@ def generate_summary_with_provider(
     referral_purpose: str = "",
     previous_summary: str = "",
     evaluation_feedback: str = "",
+    context: GenerationContext | None = None,
 ):
     """指定されたプロバイダーで文書を生成"""
     client = create_client(provider)
@@ -62,6 +93,7 @@ def generate_summary_with_provider(
         referral_purpose,
         previous_summary,
         evaluation_feedback,
+        context,
     )
 
 
@@ -77,6 +109,7 @@ def generate_summary_stream_with_provider(
     referral_purpose: str = "",
     previous_summary: str = "",
     evaluation_feedback: str = "",
+    context: GenerationContext | None = None,
 ):
     """指定されたプロバイダーでストリーム形式の文書を生成"""
     client = create_client(provider)
@@ -91,4 +124,67 @@ def generate_summary_stream_with_provider(
         referral_purpose,
         previous_summary,
         evaluation_feedback,
+        context,
+    )
+
+
+async def generate_summary_with_provider_async(
+    provider: Union[APIProvider, str],
+    medical_text: str,
+    additional_info: str = "",
+    current_prescription: str = "",
+    department: str = "default",
+    document_type: str = DEFAULT_DOCUMENT_TYPE,
+    doctor: str = "default",
+    model_name: str | None = None,
+    referral_purpose: str = "",
+    previous_summary: str = "",
+    evaluation_feedback: str = "",
+    context: GenerationContext | None = None,
+):
+    """指定されたプロバイダーで文書を非同期に生成"""
+    client = create_client(provider)
+    return await client.generate_summary_async(
+        medical_text,
+        additional_info,
+        current_prescription,
+        department,
+        document_type,
+        doctor,
+        model_name,
+        referral_purpose,
+        previous_summary,
+        evaluation_feedback,
+        context,
+    )
+
+
+def generate_summary_stream_with_provider_async(
+    provider: Union[APIProvider, str],
+    medical_text: str,
+    additional_info: str = "",
+    current_prescription: str = "",
+    department: str = "default",
+    document_type: str = DEFAULT_DOCUMENT_TYPE,
+    doctor: str = "default",
+    model_name: str | None = None,
+    referral_purpose: str = "",
+    previous_summary: str = "",
+    evaluation_feedback: str = "",
+    context: GenerationContext | None = None,
+):
+    """指定されたプロバイダーで非同期ストリーム形式の文書を生成"""
+    client = create_client(provider)
+    return client.generate_summary_stream_async(
+        medical_text,
+        additional_info,
+        current_prescription,
+        department,
+        document_type,
+        doctor,
+        model_name,
+        referral_purpose,
+        previous_summary,
+        evaluation_feedback,
+        context,
     )
@@ -1,6 +1,9 @@
+import asyncio
 import json
+import time
 from abc import ABC, abstractmethod
-from typing import Generator, Optional, Tuple, Union
+from contextlib import AbstractContextManager, nullcontext
+from typing import AsyncGenerator, Generator, Optional, Tuple, Union
 
 from app.core.constants import (
     DEFAULT_DOCUMENT_TYPE,
@@ -11,7 +14,8 @@ from app.core.constants import (
     REFINEMENT_INSTRUCTION,
 )
 from app.core.database import get_db_session
-from app.services.prompt_service import get_prompt, get_selected_model
+from app.services.generation_context import CacheTokenUsage, GenerationContext
+from app.services.prompt_service import get_selected_model, resolve_prompt
 from app.utils.exceptions import APIError
 
 
@@ -27,10 +31,19 @@ def _is_json_text(text: str) -> bool:
         return False
 
 
+def _stage(context: Optional[GenerationContext], name: str) -> AbstractContextManager:
+    """context があればその timer に処理段階の所要時間を記録する"""
+    if context is None:
+        return nullcontext()
+    return context.timer.stage(name)
+
+
 class BaseAPIClient(ABC):
     def __init__(self, api_key: str | None, default_model: str | None):
         self.api_key: str | None = api_key
         self.default_model: str | None = default_model
+        # プロバイダーが返したプロンプトキャッシュのトークン数の記録先（context 指定時はその cache_usage）
+        self.cache_usage = CacheTokenUsage()
 
     @abstractmethod
     def initialize(self) -> bool:
@@ -65,16 +78,21 @@ class BaseAPIClient(ABC):
         referral_purpose: str = "",
         previous_summary: str = "",
         evaluation_feedback: str = "",
+        context: Optional[GenerationContext] = None,
     ) -> Tuple[str, str]:
-        """(システムプロンプト, ユーザープロンプト) を構築"""
-        try:
-            with get_db_session() as db:
-                prompt_data = get_prompt(db, department, document_type, doctor)
-                if prompt_data:
-                    prompt_template = prompt_data.content
-                else:
-                    prompt_template = DEFAULT_SUMMARY_PROMPT
-        except Exception:
+        """(システムプロンプト, ユーザープロンプト) を構築（context 指定時はDBにアクセスしない）"""
+        if context is not None:
+            prompt_data = context.prompt
+        else:
+            try:
+                with get_db_session() as db:
+                    prompt_data = resolve_prompt(db, department, document_type, doctor)
+            except Exception:
+                prompt_data = None
+
+        if prompt_data:
+            prompt_template = prompt_data.content
+        else:
             prompt_template = DEFAULT_SUMMARY_PROMPT
 
         system_parts = [str(prompt_template).strip(), GROUNDING_INSTRUCTION]
@@ -104,9 +122,12 @@ class BaseAPIClient(ABC):
         self,
         department: str,
         document_type: str,
-        doctor: str
+        doctor: str,
+        context: Optional[GenerationContext] = None,
     ) -> str | None:
-        """プロンプトから選択されたモデル名を取得"""
+        """プロンプトから選択されたモデル名を取得（context 指定時はDBにアクセスしない）"""
+        if context is not None:
+            return context.selected_model or self.default_model
         try:
             with get_db_session() as db:
                 selected = get_selected_model(db, department, document_type, doctor)
@@ -116,6 +137,48 @@ class BaseAPIClient(ABC):
             pass
         return self.default_model
 
+    def _prepare_summary_request(
+        self,
+        medical_text: str,
+        additional_info: str,
+        current_prescription: str,
+        department: str,
+        document_type: str,
+        doctor: str,
+        model_name: Optional[str],
+        referral_purpose: str,
+        previous_summary: str,
+        evaluation_feedback: str,
+        context: Optional[GenerationContext] = None,
+    ) -> Tuple[str, str, str]:
+        """初期化とモデル名・プロンプトの解決 (モデル名, システムプロンプト, ユーザープロンプト)"""
+        if context is not None:
+            self.cache_usage = context.cache_usage
+
+        with _stage(context, "client_init"):
+            self.initialize()
+
+        if not model_name:
+            model_name = self.get_model_name(department, document_type, doctor, context)
+
+        if not model_name:
+            raise APIError(MESSAGES["ERROR"]["MODEL_NAME_NOT_SPECIFIED"])
+
+        with _stage(context, "build_prompt"):
+            system_prompt, user_prompt = self.create_summary_prompt(
+                medical_text,
+                additional_info,
+                current_prescription,
+                department,
+                document_type,
+                doctor,
+                referral_purpose,
+                previous_summary,
+                evaluation_feedback,
+                context,
+            )
+        return model_name, system_prompt, user_prompt
+
     def generate_summary(
         self,
         medical_text: str,
@@ -128,26 +191,21 @@ class BaseAPIClient(ABC):
         referral_purpose: str = "",
         previous_summary: str = "",
         evaluation_feedback: str = "",
+        context: Optional[GenerationContext] = None,
     ) -> Tuple[str, int, int]:
         try:
-            self.initialize()
-
-            if not model_name:
-                model_name = self.get_model_name(department, document_type, doctor)
-
-            if not model_name:
-                raise APIError(MESSAGES["ERROR"]["MODEL_NAME_NOT_SPECIFIED"])
-
-            system_prompt, user_prompt = self.create_summary_prompt(
+            model_name, system_prompt, user_prompt = self._prepare_summary_request(
                 medical_text,
                 additional_info,
                 current_prescription,
                 department,
                 document_type,
                 doctor,
+                model_name,
                 referral_purpose,
                 previous_summary,
                 evaluation_feedback,
+                context,
             )
 
             return self._generate_content(user_prompt, model_name, system_prompt)
@@ -181,30 +239,86 @@ class BaseAPIClient(ABC):
         referral_purpose: str = "",
         previous_summary: str = "",
         evaluation_feedback: str = "",
+        context: Optional[GenerationContext] = None,
     ) -> Generator[Union[str, dict], None, None]:
         """ストリーミングで要約を生成"""
         try:
-            self.initialize()
+            model_name, system_prompt, user_prompt = self._prepare_summary_request(
+                medical_text,
+                additional_info,
+                current_prescription,
+                department,
+                document_type,
+                doctor,
+                model_name,
+                referral_purpose,
+                previous_summary,
+                evaluation_feedback,
+                context,
+            )
 
-            if not model_name:
-                model_name = self.get_model_name(department, document_type, doctor)
+            yield from self._generate_content_stream(
+                user_prompt, model_name, system_prompt
+            )
 
-            if not model_name:
-                raise APIError(MESSAGES["ERROR"]["MODEL_NAME_NOT_SPECIFIED"])
+        except APIError:
+            raise
+        except Exception as e:
+            raise APIError(
+                f"{self.__class__.__name__}でエラーが発生しました: {str(e)}"
+            )
 
-            system_prompt, user_prompt = self.create_summary_prompt(
+    async def _generate_content_async(
+        self, prompt: str, model_name: str, system_prompt: str = ""
+    ) -> Tuple[str, int, int]:
+        """非同期版の _generate_content (デフォルトはスレッドで同期版を実行)"""
+        return await asyncio.to_thread(
+            self._generate_content, prompt, model_name, system_prompt
+        )
+
+    async def _generate_content_stream_async(
+        self, prompt: str, model_name: str, system_prompt: str = ""
+    ) -> AsyncGenerator[Union[str, dict], None]:
+        """非同期ストリーミングのデフォルト実装"""
+        text, input_tokens, output_tokens = await self._generate_content_async(
+            prompt, model_name, system_prompt
+        )
+        yield text
+        yield {"input_tokens": input_tokens, "output_tokens": output_tokens}
+
+    async def generate_summary_async(
+        self,
+        medical_text: str,
+        additional_info: str = "",
+        current_prescription: str = "",
+        department: str = "default",
+        document_type: str = DEFAULT_DOCUMENT_TYPE,
+        doctor: str = "default",
+        model_name: Optional[str] = None,
+        referral_purpose: str = "",
+        previous_summary: str = "",
+        evaluation_feedback: str = "",
+        context: Optional[GenerationContext] = None,
+    ) -> Tuple[str, int, int]:
+        """イベントループ上で要約を生成"""
+        try:
+            # context 未指定時はプロンプト取得にDBアクセスを伴うためスレッドで実行
+            model_name, system_prompt, user_prompt = await asyncio.to_thread(
+                self._prepare_summary_request,
                 medical_text,
                 additional_info,
                 current_prescription,
                 department,
                 document_type,
                 doctor,
+                model_name,
                 referral_purpose,
                 previous_summary,
                 evaluation_feedback,
+                context,
             )
 
-            yield from self._generate_content_stream(
+            return await self._generate_content_async(
                 user_prompt, model_name, system_prompt
             )
 
@@ -214,3 +328,53 @@ class BaseAPIClient(ABC):
             raise APIError(
                 f"{self.__class__.__name__}でエラーが発生しました: {str(e)}"
             )
+
+    async def generate_summary_stream_async(
+        self,
+        medical_text: str,
+        additional_info: str = "",
+        current_prescription: str = "",
+        department: str = "default",
+        document_type: str = DEFAULT_DOCUMENT_TYPE,
+        doctor: str = "default",
+        model_name: Optional[str] = None,
+        referral_purpose: str = "",
+        previous_summary: str = "",
+        evaluation_feedback: str = "",
+        context: Optional[GenerationContext] = None,
+    ) -> AsyncGenerator[Union[str, dict], None]:
+        """イベントループ上でストリーミング生成"""
+        try:
+            # context 未指定時はプロンプト取得にDBアクセスを伴うためスレッドで実行
+            model_name, system_prompt, user_prompt = await asyncio.to_thread(
+                self._prepare_summary_request,
+                medical_text,
+                additional_info,
+                current_prescription,
+                department,
+                document_type,
+                doctor,
+                model_name,
+                referral_purpose,
+                previous_summary,
+                evaluation_feedback,
+                context,
+            )
+
+            started = time.perf_counter()
+            first_token_recorded = False
+            async for item in self._generate_content_stream_async(
+                user_prompt, model_name, system_prompt
+            ):
+                if not first_token_recorded and isinstance(item, str) and context is not None:
+                    # 最初のテキストを受信するまでの時間（time to first token）
+                    context.timer.add("first_token", time.perf_counter() - started)
+                    first_token_recorded = True
+                yield item
+
+        except APIError:
+            raise
+        except Exception as e:
+            raise APIError(
+                f"{self.__class__.__name__}でエラーが発生しました: {str(e)}"
+            )
@@ -1,16 +1,45 @@
 import logging
-from typing import Tuple
+from typing import Any, AsyncGenerator, Generator, Tuple, Union
 
-from anthropic import AnthropicBedrock, omit  # type: ignore[attr-defined]
-from anthropic.types import TextBlock
+from anthropic import AnthropicBedrock, AsyncAnthropicBedrock, omit  # type: ignore[attr-defined]
+from anthropic.types import Message, TextBlock
 
 from app.core.config import get_settings
-from app.core.constants import CLAUDE_GENERATION_TEMPERATURE, MESSAGES
+from app.core.constants import (
+    CLAUDE_GENERATION_TEMPERATURE,
+    KARTE_JSON_INSTRUCTION,
+    MESSAGES,
+    REFINEMENT_INSTRUCTION,
+)
 from app.external.base_api import BaseAPIClient
+from app.external.client_pool import get_client_pool
 from app.utils.exceptions import APIError
 
 logger = logging.getLogger(__name__)
 
+# システムプロンプトの末尾に条件付きで追加される指示（追加順）
+_CONDITIONAL_SYSTEM_INSTRUCTIONS = (KARTE_JSON_INSTRUCTION, REFINEMENT_INSTRUCTION)
+
+
+def _system_blocks(system_prompt: str) -> list[dict[str, Any]]:
+    """システムプロンプトをキャッシュ対象の固定部分と条件付きの指示に分けたコンテンツブロック
+
+    プロンプトテンプレートと GROUNDING_INSTRUCTION からなる固定部分の末尾に cache_control を付け、
+    入力形式や再生成の有無で変わる指示はキャッシュ区切りの後ろに置く。
+    """
+    static = system_prompt
+    conditional: list[str] = []
+    for instruction in reversed(_CONDITIONAL_SYSTEM_INSTRUCTIONS):
+        suffix = "\n\n" + instruction
+        if static.endswith(suffix):
+            static = static[: -len(suffix)]
+            conditional.insert(0, instruction)
+    blocks: list[dict[str, Any]] = [
+        {"type": "text", "text": static, "cache_control": {"type": "ephemeral"}}
+    ]
+    blocks.extend({"type": "text", "text": instruction} for instruction in conditional)
+    return blocks
+
 
 class ClaudeAPIClient(BaseAPIClient):
     def __init__(self):
@@ -19,20 +48,86 @@ class ClaudeAPIClient(BaseAPIClient):
         self.aws_secret_access_key = settings.aws_secret_access_key
         self.aws_region = settings.aws_region
         self.anthropic_model = settings.anthropic_model
+        self.prompt_cache_enabled = settings.anthropic_prompt_cache_enabled
 
         super().__init__(None, self.anthropic_model)
         self.client = None
+        self.async_client = None
 
     def initialize(self) -> bool:
         try:
-            self.client = AnthropicBedrock(
-                aws_region=self.aws_region,
+            # リージョンごとにプロセス共有のクライアントを再利用（AWS認証情報はboto3が自動更新）
+            pool = get_client_pool()
+            self.client = pool.get_or_create(
+                ("claude", self.aws_region),
+                lambda: AnthropicBedrock(aws_region=self.aws_region),
+            )
+            self.async_client = pool.get_or_create(
+                ("claude-async", self.aws_region),
+                lambda: AsyncAnthropicBedrock(aws_region=self.aws_region),
             )
             return True
 
         except Exception as e:
             raise APIError(MESSAGES["ERROR"]["BEDROCK_INIT_ERROR"].format(error=str(e)))
 
+    def _request_params(
+        self, prompt: str, model_name: str, system_prompt: str
+    ) -> dict[str, Any]:
+        """Messages API のリクエストパラメータを構築"""
+        system: Any = omit
+        if system_prompt:
+            system = _system_blocks(system_prompt) if self.prompt_cache_enabled else system_prompt
+        return {
+            "model": model_name,
+            "max_tokens": 6000,
+            "temperature": CLAUDE_GENERATION_TEMPERATURE,
+            "system": system,
+            "messages": [{"role": "user", "content": prompt}],
+        }
+
+    def _record_cache_usage(self, response: Message) -> None:
+        """プロンプトキャッシュの読み取り・書き込みトークン数を記録"""
+        self.cache_usage.add(
+            response.usage.cache_read_input_tokens,
+            response.usage.cache_creation_input_tokens,
+        )
+
+    def _parse_response(self, response: Message) -> Tuple[str, int, int]:
+        """レスポンスから (本文, 入力トークン数, 出力トークン数) を取り出す"""
+        self._record_cache_usage(response)
+        summary_text = MESSAGES["ERROR"]["EMPTY_RESPONSE"]
+        if response.content:
+            for content_block in response.content:
+                if isinstance(content_block, TextBlock):
+                    summary_text = content_block.text
+                    break
+
+        # max_tokens到達で途中終了した場合はユーザーに分かるよう警告を付加
+        if response.stop_reason == "max_tokens":
+            summary_text += "\n\n" + MESSAGES["WARNING"]["OUTPUT_TRUNCATED"]
+
+        return summary_text, response.usage.input_tokens, response.usage.output_tokens
+
+    def _stream_tail(self, response: Message) -> list[Union[str, dict]]:
+        """ストリーム終了後に送る補足チャンクと使用量メタデータ"""
+        self._record_cache_usage(response)
+        tail: list[Union[str, dict]] = []
+        if not any(isinstance(block, TextBlock) for block in response.content):
+            tail.append(MESSAGES["ERROR"]["EMPTY_RESPONSE"])
+
+        # max_tokens到達で途中終了した場合はユーザーに分かるよう警告を付加
+        if response.stop_reason == "max_tokens":
+            tail.append("\n\n" + MESSAGES["WARNING"]["OUTPUT_TRUNCATED"])
+
+        tail.append(
+            {
+                "input_tokens": response.usage.input_tokens,
+                "output_tokens": response.usage.output_tokens,
+            }
+        )
+        return tail
+
     def _generate_content(
         self, prompt: str, model_name: str, system_prompt: str = ""
     ) -> Tuple[str, int, int]:
@@ -52,28 +147,68 @@ class ClaudeAPIClient(BaseAPIClient):
                 raise APIError(MESSAGES["ERROR"]["CLAUDE_CLIENT_NOT_INITIALIZED"])
 
             response = self.client.messages.create(
-                model=model_name,
-                max_tokens=6000,
-                temperature=CLAUDE_GENERATION_TEMPERATURE,
-                system=system_prompt or omit,
-                messages=[{"role": "user", "content": prompt}],
+                **self._request_params(prompt, model_name, system_prompt)
+            )
+            return self._parse_response(response)
+
+        except Exception as e:
+            raise APIError(MESSAGES["ERROR"]["BEDROCK_API_ERROR"].format(error=str(e)))
+
+    def _generate_content_stream(
+        self, prompt: str, model_name: str, system_prompt: str = ""
+    ) -> Generator[Union[str, dict], None, None]:
+        """Bedrockのストリーミング応答をテキスト差分ごとに返す"""
+        try:
+            if self.client is None:
+                raise APIError(MESSAGES["ERROR"]["CLAUDE_CLIENT_NOT_INITIALIZED"])
+
+            with self.client.messages.stream(
+                **self._request_params(prompt, model_name, system_prompt)
+            ) as stream:
+                for text in stream.text_stream:
+                    if text:
+                        yield text
+                response = stream.get_final_message()
+
+            yield from self._stream_tail(response)
+
+        except Exception as e:
+            raise APIError(MESSAGES["ERROR"]["BEDROCK_API_ERROR"].format(error=str(e)))
+
+    async def _generate_content_async(
+        self, prompt: str, model_name: str, system_prompt: str = ""
+    ) -> Tuple[str, int, int]:
+        """AsyncAnthropicBedrock でイベントループ上から要約を生成"""
+        try:
+            if self.async_client is None:
+                raise APIError(MESSAGES["ERROR"]["CLAUDE_CLIENT_NOT_INITIALIZED"])
+
+            response = await self.async_client.messages.create(
+                **self._request_params(prompt, model_name, system_prompt)
             )
+            return self._parse_response(response)
 
-            summary_text = MESSAGES["ERROR"]["EMPTY_RESPONSE"]
-            if response.content:
-                for content_block in response.content:
-                    if isinstance(content_block, TextBlock):
-                        summary_text = content_block.text
-                        break
+        except Exception as e:
+            raise APIError(MESSAGES["ERROR"]["BEDROCK_API_ERROR"].format(error=str(e)))
 
-            # max_tokens到達で途中終了した場合はユーザーに分かるよう警告を付加
-            if response.stop_reason == "max_tokens":
-                summary_text += "\n\n" + MESSAGES["WARNING"]["OUTPUT_TRUNCATED"]
+    async def _generate_content_stream_async(
+        self, prompt: str, model_name: str, system_prompt: str = ""
+    ) -> AsyncGenerator[Union[str, dict], None]:
+        """AsyncAnthropicBedrock のストリーミング応答をテキスト差分ごとに返す"""
+        try:
+            if self.async_client is None:
+                raise APIError(MESSAGES["ERROR"]["CLAUDE_CLIENT_NOT_INITIALIZED"])
 
-            input_tokens = response.usage.input_tokens
-            output_tokens = response.usage.output_tokens
+            async with self.async_client.messages.stream(
+                **self._request_params(prompt, model_name, system_prompt)
+            ) as stream:
+                async for text in stream.text_stream:
+                    if text:
+                        yield text
+                response = await stream.get_final_message()
 
-            return summary_text, input_tokens, output_tokens
+            for item in self._stream_tail(response):
+                yield item
 
         except Exception as e:
             raise APIError(MESSAGES["ERROR"]["BEDROCK_API_ERROR"].format(error=str(e)))
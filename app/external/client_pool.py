@@ -0,0 +1,184 @@
+import asyncio
+import inspect
+import logging
+import threading
+from collections.abc import Callable, Hashable
+from functools import lru_cache
+from typing import Any
+
+from app.core.config import get_settings
+from app.core.constants import get_message
+from app.core.metrics import (
+    LLM_CLIENT_POOL_HITS,
+    LLM_CLIENT_POOL_MISSES,
+    LLM_CLIENT_POOL_SIZE,
+    REGISTRY,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ClientPool:
+    """プロバイダーSDKクライアントをプロセス全体で共有するレジストリ
+
+    (プロバイダー, リージョン/プロジェクト) ごとに1つのクライアントを保持し、
+    HTTPコネクションとTLSセッションをリクエスト間で再利用する。
+    AnthropicBedrock / AsyncAnthropicBedrock / genai.Client はいずれも共有できる。
+    """
+
+    def __init__(self, refresh_interval_seconds: int) -> None:
+        self._refresh_interval_seconds = refresh_interval_seconds
+        self._lock = threading.Lock()
+        self._clients: dict[Hashable, Any] = {}
+        self._refreshers: dict[Hashable, Callable[[], None]] = {}
+        # 生成中のキーごとのロック（生成は全体ロックの外で行い、同じキーの生成だけを直列化する）
+        self._creating: dict[Hashable, threading.Lock] = {}
+        self._hits = 0
+        self._misses = 0
+        self._refresh_thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
+
+    def get_or_create(
+        self,
+        key: Hashable,
+        factory: Callable[[], Any],
+        refresher: Callable[[], None] | None = None,
+    ) -> Any:
+        """キーに対応するクライアントを返す。未登録ならfactoryで生成して登録する
+
+        factory は認証情報やリージョンの解決でブロックし得るため全体ロックの外で呼び、
+        同じキーの生成だけをキーごとのロックで1回にまとめる。
+        """
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._hits += 1
+                return client
+            key_lock = self._creating.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is not None:
+                    self._hits += 1
+                    return client
+                self._misses += 1
+
+            client = factory()
+
+            with self._lock:
+                self._clients[key] = client
+                self._creating.pop(key, None)
+                if refresher is not None:
+                    self._refreshers[key] = refresher
+                    self._ensure_refresh_thread()
+        logger.info(get_message("LOG", "CLIENT_POOL_CREATED", pool_key=str(key)))
+        return client
+
+    def stats(self) -> dict[str, int]:
+        """プールのヒット/ミス数と保持クライアント数を返す"""
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "size": len(self._clients),
+            }
+
+    def clear(self) -> None:
+        """認証情報の更新スレッドを停止し、保持しているクライアントを閉じてプールを初期化
+
+        非同期クライアントの close はコルーチンのため呼ばない（aclear を使う）。
+        """
+        clients, refresh_thread = self._drain()
+        if refresh_thread is not None:
+            refresh_thread.join()
+        for client in clients:
+            close = getattr(client, "close", None)
+            if callable(close) and not inspect.iscoroutinefunction(close):
+                try:
+                    close()
+                except Exception:
+                    logger.warning("LLMクライアントのクローズに失敗しました", exc_info=True)
+
+    async def aclear(self) -> None:
+        """認証情報の更新スレッドを停止し、同期・非同期いずれのクライアントも閉じてプールを初期化"""
+        clients, refresh_thread = self._drain()
+        if refresh_thread is not None:
+            await asyncio.to_thread(refresh_thread.join)
+        for client in clients:
+            close = getattr(client, "close", None)
+            if callable(close):
+                try:
+                    result = close()
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception:
+                    logger.warning("LLMクライアントのクローズに失敗しました", exc_info=True)
+
+    def _drain(self) -> tuple[list[Any], threading.Thread | None]:
+        """登録済みクライアントを取り出して統計をリセットし、更新スレッドに停止を指示する
+
+        更新スレッドは refresh_credentials でロックを取得するため、join はロックの外で行う。
+        """
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._refreshers.clear()
+            self._creating.clear()
+            self._hits = 0
+            self._misses = 0
+            refresh_thread = self._refresh_thread
+            self._refresh_thread = None
+            self._stop_event.set()
+        return clients, refresh_thread
+
+    def refresh_credentials(self) -> None:
+        """登録済みの認証情報をリクエスト経路外で更新"""
+        with self._lock:
+            refreshers = list(self._refreshers.items())
+
+        for key, refresher in refreshers:
+            try:
+                refresher()
+            except Exception:
+                # 失敗時はSDKがリクエスト時に自前で更新するため処理は継続
+                logger.warning(
+                    get_message("LOG", "CLIENT_POOL_REFRESH_FAILED", pool_key=str(key)),
+                    exc_info=True,
+                )
+
+    def _ensure_refresh_thread(self) -> None:
+        """認証情報更新用のデーモンスレッドを必要に応じて起動（ロック保持下で呼ぶ）"""
+        if self._refresh_interval_seconds <= 0:
+            return
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        # clear 後に再び登録された場合に備え、停止フラグはスレッドごとに作り直す
+        self._stop_event = threading.Event()
+        self._refresh_thread = threading.Thread(
+            target=self._refresh_loop,
+            args=(self._stop_event,),
+            name="llm-credential-refresher",
+            daemon=True,
+        )
+        self._refresh_thread.start()
+
+    def _refresh_loop(self, stop_event: threading.Event) -> None:
+        while not stop_event.wait(self._refresh_interval_seconds):
+            self.refresh_credentials()
+
+
+@lru_cache
+def get_client_pool() -> ClientPool:
+    """プロセス共有のクライアントプールを取得"""
+    return ClientPool(get_settings().llm_credential_refresh_seconds)
+
+
+def _collect_client_pool_metrics() -> None:
+    stats = get_client_pool().stats()
+    LLM_CLIENT_POOL_HITS.set_total(stats["hits"])
+    LLM_CLIENT_POOL_MISSES.set_total(stats["misses"])
+    LLM_CLIENT_POOL_SIZE.set(stats["size"])
+
+
+REGISTRY.add_collector(_collect_client_pool_metrics)
@@ -0,0 +1,118 @@
+import asyncio
+import itertools
+import threading
+import time
+from collections.abc import Iterator
+from typing import AsyncGenerator, Generator, Tuple, Union
+
+from app.core.config import get_settings
+from app.core.constants import DEFAULT_SECTION_NAMES, MESSAGES
+from app.external.base_api import BaseAPIClient
+from app.utils.exceptions import APIError
+
+# 出力の1トークンとして扱う文字列（日本語1文字≒1トークンの目安に合わせる）
+_FILLER_TOKENS = "本日の所見に大きな変化はなく経過観察を継続します。"
+
+# 何件目のリクエストかを数えるカウンタ（エラー注入を実行順で決定的にするため）
+_request_counter = itertools.count(1)
+_request_counter_lock = threading.Lock()
+
+
+def _next_request_number() -> int:
+    with _request_counter_lock:
+        return next(_request_counter)
+
+
+def should_inject_error(request_number: int, error_rate: float) -> bool:
+    """n件目のリクエストを失敗させるか（乱数を使わず、累計の失敗件数が n × error_rate に一致するように選ぶ）"""
+    if error_rate <= 0:
+        return False
+    return int(request_number * error_rate) > int((request_number - 1) * error_rate)
+
+
+class FakeAPIClient(BaseAPIClient):
+    """外部APIを呼ばずに決定的な出力を返すローカル用クライアント（負荷試験・ベンチマーク用）
+
+    first_token_seconds 待ってから output_tokens 個のトークンを tokens_per_second の速度で返す。
+    error_rate の割合でリクエストを APIError にする。
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        super().__init__(None, "fake")
+        self.first_token_seconds = settings.fake_llm_first_token_seconds
+        self.tokens_per_second = settings.fake_llm_tokens_per_second
+        self.output_tokens = settings.fake_llm_output_tokens
+        self.error_rate = settings.fake_llm_error_rate
+        self.chunk_tokens = max(1, settings.fake_llm_chunk_tokens)
+
+    def initialize(self) -> bool:
+        return True
+
+    def _output_chunks(self) -> list[str]:
+        """セクション見出しと本文からなる出力を chunk_tokens トークンずつに分割"""
+        per_section = max(1, self.output_tokens // len(DEFAULT_SECTION_NAMES))
+        lines = []
+        for name in DEFAULT_SECTION_NAMES:
+            body = (_FILLER_TOKENS * (per_section // len(_FILLER_TOKENS) + 1))[:per_section]
+            lines.append(f"{name}:\n{body}\n")
+        text = "".join(lines)
+        return [text[i : i + self.chunk_tokens] for i in range(0, len(text), self.chunk_tokens)]
+
+    def _schedule(self) -> Iterator[tuple[float, str]]:
+        """(待ち時間, テキスト) の並び。失敗させるリクエストは最初の待ち時間の後に例外"""
+        if should_inject_error(_next_request_number(), self.error_rate):
+            yield self.first_token_seconds, ""
+            raise APIError(MESSAGES["ERROR"]["FAKE_LLM_INJECTED_ERROR"])
+        interval = self.chunk_tokens / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        for i, chunk in enumerate(self._output_chunks()):
+            yield (self.first_token_seconds if i == 0 else interval), chunk
+
+    @staticmethod
+    def _usage(prompt: str, system_prompt: str, output: str) -> dict:
+        # 入力は日次利用枠の見積もりと同じく文字数をトークン数とみなす
+        return {"input_tokens": len(prompt) + len(system_prompt), "output_tokens": len(output)}
+
+    def _generate_content(
+        self, prompt: str, model_name: str, system_prompt: str = ""
+    ) -> Tuple[str, int, int]:
+        chunks = []
+        for delay, chunk in self._schedule():
+            time.sleep(delay)
+            chunks.append(chunk)
+        text = "".join(chunks)
+        usage = self._usage(prompt, system_prompt, text)
+        return text, usage["input_tokens"], usage["output_tokens"]
+
+    def _generate_content_stream(
+        self, prompt: str, model_name: str, system_prompt: str = ""
+    ) -> Generator[Union[str, dict], None, None]:
+        chunks = []
+        for delay, chunk in self._schedule():
+            time.sleep(delay)
+            if chunk:
+                chunks.append(chunk)
+                yield chunk
+        yield self._usage(prompt, system_prompt, "".join(chunks))
+
+    async def _generate_content_async(
+        self, prompt: str, model_name: str, system_prompt: str = ""
+    ) -> Tuple[str, int, int]:
+        chunks = []
+        for delay, chunk in self._schedule():
+            await asyncio.sleep(delay)
+            chunks.append(chunk)
+        text = "".join(chunks)
+        usage = self._usage(prompt, system_prompt, text)
+        return text, usage["input_tokens"], usage["output_tokens"]
+
+    async def _generate_content_stream_async(
+        self, prompt: str, model_name: str, system_prompt: str = ""
+    ) -> AsyncGenerator[Union[str, dict], None]:
+        chunks = []
+        for delay, chunk in self._schedule():
+            await asyncio.sleep(delay)
+            if chunk:
+                chunks.append(chunk)
+                yield chunk
+        yield self._usage(prompt, system_prompt, "".join(chunks))
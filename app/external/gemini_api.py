@@ -1,15 +1,36 @@
+import itertools
 import json
-from typing import Generator, Tuple, Union
+import logging
+import re
+from collections.abc import AsyncIterator, Callable, Iterator
+from typing import Any, AsyncGenerator, Generator, Tuple, Union
 
+import google.auth.transport.requests
 from google import genai
+from google.genai import errors as genai_errors
 from google.genai import types
 from google.oauth2 import service_account
 
 from app.core.config import get_settings
-from app.core.constants import MESSAGES
+from app.core.constants import MESSAGES, get_message
 from app.external.base_api import BaseAPIClient
+from app.external.client_pool import get_client_pool
+from app.external.gemini_context_cache import get_gemini_context_cache
 from app.utils.exceptions import APIError
 
+logger = logging.getLogger(__name__)
+
+# キャッシュ対象のカルテ本文ブロック（base_api / evaluation_service のユーザープロンプトの先頭）
+# 生成・評価で同じキャッシュを使うため、キャッシュには先頭の <カルテ情報> の形で登録する
+_KARTE_BLOCKS = (
+    ("<カルテ情報>\n", "\n</カルテ情報>"),
+    ("<カルテ記載>\n", "\n</カルテ記載>"),
+)
+# 失効・削除済みのキャッシュを参照したときに返るステータス
+_STALE_CACHE_STATUS_CODES = (403, 404)
+# 400 はキャッシュ参照（cached_content）に関するエラーの場合のみ失効とみなす
+_CACHED_CONTENT_ERROR_PATTERN = re.compile(r"cached[_ ]?content", re.IGNORECASE)
+
 
 class GeminiAPIClient(BaseAPIClient):
     """Gemini API クライアント"""
@@ -20,132 +41,364 @@ class GeminiAPIClient(BaseAPIClient):
         super().__init__(None, model)
         self.client = None
         self.settings = settings
+        self._credentials = None
 
     def initialize(self) -> bool:
         try:
             if not self.settings.google_project_id:
                 raise APIError(MESSAGES["CONFIG"]["VERTEX_AI_PROJECT_MISSING"])
 
-            google_credentials_json = self.settings.google_credentials_json
+            # プロジェクト/ロケーションごとにプロセス共有のクライアントを再利用
+            self.client = get_client_pool().get_or_create(
+                ("gemini", self.settings.google_project_id, self.settings.google_location),
+                self._build_client,
+                self._credentials_refresher(),
+            )
+            return True
+        except APIError:
+            raise
+        except Exception as e:
+            raise APIError(MESSAGES["ERROR"]["VERTEX_AI_INIT_ERROR"].format(error=str(e)))
 
-            if google_credentials_json:
-                try:
-                    credentials_dict = json.loads(google_credentials_json)
+    def _build_client(self) -> genai.Client:
+        """genai.Client を生成（認証情報JSONのパースはプール未登録時のみ）"""
+        google_credentials_json = self.settings.google_credentials_json
 
-                    credentials = service_account.Credentials.from_service_account_info(
-                        credentials_dict,
-                        scopes=['https://www.googleapis.com/auth/cloud-platform']
-                    )
+        if not google_credentials_json:
+            return genai.Client(
+                vertexai=True,
+                project=self.settings.google_project_id,
+                location=self.settings.google_location,
+            )
 
-                    self.client = genai.Client(
-                        vertexai=True,
-                        project=self.settings.google_project_id,
-                        location=self.settings.google_location,
-                        credentials=credentials
-                    )
+        try:
+            credentials_dict = json.loads(google_credentials_json)
 
-                except json.JSONDecodeError as e:
-                    raise APIError(MESSAGES["ERROR"]["VERTEX_AI_CREDENTIALS_JSON_PARSE_ERROR"].format(error=str(e)))
-                except KeyError as e:
-                    raise APIError(MESSAGES["ERROR"]["VERTEX_AI_CREDENTIALS_FIELD_MISSING"].format(error=str(e)))
-                except Exception as e:
-                    raise APIError(MESSAGES["ERROR"]["VERTEX_AI_CREDENTIALS_ERROR"].format(error=str(e)))
+            credentials = service_account.Credentials.from_service_account_info(
+                credentials_dict,
+                scopes=['https://www.googleapis.com/auth/cloud-platform']
+            )
+            self._credentials = credentials
+
+            return genai.Client(
+                vertexai=True,
+                project=self.settings.google_project_id,
+                location=self.settings.google_location,
+                credentials=credentials
+            )
+
+        except json.JSONDecodeError as e:
+            raise APIError(MESSAGES["ERROR"]["VERTEX_AI_CREDENTIALS_JSON_PARSE_ERROR"].format(error=str(e)))
+        except KeyError as e:
+            raise APIError(MESSAGES["ERROR"]["VERTEX_AI_CREDENTIALS_FIELD_MISSING"].format(error=str(e)))
+        except Exception as e:
+            raise APIError(MESSAGES["ERROR"]["VERTEX_AI_CREDENTIALS_ERROR"].format(error=str(e)))
+
+    def _credentials_refresher(self) -> Callable[[], None] | None:
+        """サービスアカウント認証情報をリクエスト経路外で更新する関数を返す"""
+        if not self.settings.google_credentials_json:
+            return None
+
+        def _refresh() -> None:
+            if self._credentials is not None:
+                self._credentials.refresh(google.auth.transport.requests.Request())
+
+        return _refresh
+
+    def _generation_config(
+        self, system_prompt: str, cached_content: str | None = None
+    ) -> types.GenerateContentConfig:
+        """生成リクエストの設定を構築"""
+        thinking_level = (
+            types.ThinkingLevel.LOW
+            if self.settings.gemini_thinking_level == "LOW"
+            else types.ThinkingLevel.HIGH
+        )
+        return types.GenerateContentConfig(
+            system_instruction=system_prompt or None,
+            cached_content=cached_content,
+            thinking_config=types.ThinkingConfig(
+                thinking_level=thinking_level
+            )
+        )
+
+    def _split_karte(self, prompt: str) -> Tuple[str, str] | None:
+        """プロンプトを (キャッシュに登録するカルテ本文ブロック, 残り) に分割。キャッシュ対象外なら None"""
+        if not self.settings.gemini_context_cache_enabled:
+            return None
+        for karte_open, karte_close in _KARTE_BLOCKS:
+            if not prompt.startswith(karte_open):
+                continue
+            end = prompt.find(karte_close)
+            if end < 0:
+                return None
+            body = prompt[len(karte_open):end]
+            rest = prompt[end + len(karte_close):].lstrip("\n")
+            if end + len(karte_close) < self.settings.gemini_context_cache_min_chars or not rest:
+                return None
+            cache_open, cache_close = _KARTE_BLOCKS[0]
+            return f"{cache_open}{body}{cache_close}", rest
+        return None
+
+    def _cached_request(
+        self, cache_name: str, rest: str, system_prompt: str
+    ) -> Tuple[str, types.GenerateContentConfig]:
+        """キャッシュ済みのカルテ本文に続けて送る (contents, config) を構築
+
+        cached_content と system_instruction は同時に指定できないため、生成・評価・再生成で
+        異なるシステムプロンプトは <指示> としてカルテ本文の後に続ける。カルテ内の記述より
+        <指示> を優先させる共通の制約は、キャッシュ側の system_instruction に登録している。
+        """
+        parts = [f"<指示>\n{system_prompt}\n</指示>"] if system_prompt else []
+        parts.append(rest)
+        return "\n\n".join(parts), self._generation_config("", cached_content=cache_name)
+
+    def _require_client(self) -> genai.Client:
+        if self.client is None:
+            raise APIError(MESSAGES["ERROR"]["GEMINI_CLIENT_NOT_INITIALIZED"])
+        return self.client
+
+    @staticmethod
+    def _is_stale_cache_error(error: Exception) -> bool:
+        if not isinstance(error, genai_errors.ClientError):
+            return False
+        if error.code in _STALE_CACHE_STATUS_CODES:
+            return True
+        return error.code == 400 and bool(_CACHED_CONTENT_ERROR_PATTERN.search(str(error)))
+
+    def _discard_stale_cache(self, model_name: str, karte: str) -> None:
+        logger.warning(get_message("LOG", "GEMINI_CONTEXT_CACHE_REQUEST_FAILED"), exc_info=True)
+        get_gemini_context_cache().invalidate(model_name, karte)
+
+    def _parse_response(self, response: Any) -> Tuple[str, int, int]:
+        """レスポンスから (本文, 入力トークン数, 出力トークン数) を取り出す
+
+        入力トークン数はキャッシュ読み取り分を除いた値で、読み取り分は cache_usage に記録する。
+        """
+        result_text = ""
+        if hasattr(response, 'text') and response.text is not None:
+            result_text = str(response.text)
+        else:
+            result_text = str(response)
+
+        input_tokens = 0
+        output_tokens = 0
+
+        if hasattr(response, 'usage_metadata') and response.usage_metadata is not None:
+            metadata = response.usage_metadata
+            if hasattr(metadata, 'prompt_token_count') and metadata.prompt_token_count is not None:
+                cached_tokens = self._cached_token_count(metadata)
+                input_tokens = int(metadata.prompt_token_count) - cached_tokens
+                self.cache_usage.add(cached_tokens, 0)
+            if hasattr(metadata, 'candidates_token_count') and metadata.candidates_token_count is not None:
+                output_tokens = int(metadata.candidates_token_count)
+
+        return result_text, input_tokens, output_tokens
+
+    @staticmethod
+    def _cached_token_count(metadata: Any) -> int:
+        cached = getattr(metadata, 'cached_content_token_count', None)
+        return int(cached) if isinstance(cached, int) else 0
+
+    @classmethod
+    def _update_stream_usage(cls, chunk: Any, usage: dict[str, int]) -> None:
+        """ストリームのチャンクに含まれる使用量で usage を更新"""
+        if hasattr(chunk, 'usage_metadata') and chunk.usage_metadata:
+            metadata = chunk.usage_metadata
+            if hasattr(metadata, 'prompt_token_count') and metadata.prompt_token_count:
+                cached_tokens = cls._cached_token_count(metadata)
+                usage["input_tokens"] = int(metadata.prompt_token_count) - cached_tokens
+                usage["cached_tokens"] = cached_tokens
+            if hasattr(metadata, 'candidates_token_count') and metadata.candidates_token_count:
+                usage["output_tokens"] = int(metadata.candidates_token_count)
+
+    def _finish_stream_usage(self, usage: dict[str, int]) -> dict[str, int]:
+        """キャッシュ読み取り分を cache_usage に移し、呼び出し元へ返す使用量にする"""
+        self.cache_usage.add(usage.pop("cached_tokens", 0), 0)
+        return usage
+
+    def _karte_cache(
+        self, client: genai.Client, prompt: str, model_name: str
+    ) -> Tuple[str, str, str] | None:
+        """カルテ本文のキャッシュを取得（未作成なら作成）し (キャッシュ名, カルテ本文, 残り) を返す"""
+        split = self._split_karte(prompt)
+        if split is None:
+            return None
+        karte, rest = split
+        cache_name = get_gemini_context_cache().get_or_create(
+            client, model_name, karte, self.cache_usage
+        )
+        return (cache_name, karte, rest) if cache_name is not None else None
+
+    async def _karte_cache_async(
+        self, client: genai.Client, prompt: str, model_name: str
+    ) -> Tuple[str, str, str] | None:
+        """_karte_cache の非同期版"""
+        split = self._split_karte(prompt)
+        if split is None:
+            return None
+        karte, rest = split
+        cache_name = await get_gemini_context_cache().get_or_create_async(
+            client, model_name, karte, self.cache_usage
+        )
+        return (cache_name, karte, rest) if cache_name is not None else None
+
+    def _open_stream(
+        self, client: genai.Client, prompt: str, model_name: str, system_prompt: str
+    ) -> Iterator[Any]:
+        """ストリームを開く。キャッシュ参照に失敗した場合はキャッシュなしで開き直す"""
+        cached = self._karte_cache(client, prompt, model_name)
+        if cached is not None:
+            cache_name, karte, rest = cached
+            contents, config = self._cached_request(cache_name, rest, system_prompt)
+            response_stream = iter(client.models.generate_content_stream(
+                model=model_name, contents=contents, config=config
+            ))
+            # キャッシュ参照の失敗は最初のチャンクの取得時に返るため、その時点でのみ再送する
+            try:
+                first = next(response_stream, None)
+            except Exception as e:
+                if not self._is_stale_cache_error(e):
+                    raise
+                self._discard_stale_cache(model_name, karte)
             else:
-                self.client = genai.Client(
-                    vertexai=True,
-                    project=self.settings.google_project_id,
-                    location=self.settings.google_location,
+                return itertools.chain([first] if first is not None else [], response_stream)
+
+        return iter(client.models.generate_content_stream(
+            model=model_name,
+            contents=prompt,
+            config=self._generation_config(system_prompt),
+        ))
+
+    async def _open_stream_async(
+        self, client: genai.Client, prompt: str, model_name: str, system_prompt: str
+    ) -> AsyncIterator[Any]:
+        """_open_stream の非同期版"""
+        cached = await self._karte_cache_async(client, prompt, model_name)
+        if cached is not None:
+            cache_name, karte, rest = cached
+            contents, config = self._cached_request(cache_name, rest, system_prompt)
+            try:
+                response_stream = await client.aio.models.generate_content_stream(
+                    model=model_name, contents=contents, config=config
                 )
+                first = await anext(response_stream, None)
+            except Exception as e:
+                if not self._is_stale_cache_error(e):
+                    raise
+                self._discard_stale_cache(model_name, karte)
+            else:
+                return _prepend(first, response_stream)
 
-            return True
-        except APIError:
-            raise
-        except Exception as e:
-            raise APIError(MESSAGES["ERROR"]["VERTEX_AI_INIT_ERROR"].format(error=str(e)))
+        return await client.aio.models.generate_content_stream(
+            model=model_name,
+            contents=prompt,
+            config=self._generation_config(system_prompt),
+        )
 
     def _generate_content(
         self, prompt: str, model_name: str, system_prompt: str = ""
     ) -> Tuple[str, int, int]:
         try:
-            if self.client is None:
-                raise APIError(MESSAGES["ERROR"]["GEMINI_CLIENT_NOT_INITIALIZED"])
+            client = self._require_client()
 
-            thinking_level = (
-                types.ThinkingLevel.LOW
-                if self.settings.gemini_thinking_level == "LOW"
-                else types.ThinkingLevel.HIGH
-            )
-            response = self.client.models.generate_content(
+            cached = self._karte_cache(client, prompt, model_name)
+            if cached is not None:
+                cache_name, karte, rest = cached
+                contents, config = self._cached_request(cache_name, rest, system_prompt)
+                try:
+                    response = client.models.generate_content(
+                        model=model_name, contents=contents, config=config
+                    )
+                    return self._parse_response(response)
+                except Exception as e:
+                    if not self._is_stale_cache_error(e):
+                        raise
+                    self._discard_stale_cache(model_name, karte)
+
+            response = client.models.generate_content(
                 model=model_name,
                 contents=prompt,
-                config=types.GenerateContentConfig(
-                    system_instruction=system_prompt or None,
-                    thinking_config=types.ThinkingConfig(
-                        thinking_level=thinking_level
-                    )
-                )
+                config=self._generation_config(system_prompt),
             )
+            return self._parse_response(response)
+        except Exception as e:
+            raise APIError(MESSAGES["ERROR"]["VERTEX_AI_API_ERROR"].format(error=str(e)))
 
-            result_text = ""
-            if hasattr(response, 'text') and response.text is not None:
-                result_text = str(response.text)
-            else:
-                result_text = str(response)
+    def _generate_content_stream(
+        self, prompt: str, model_name: str, system_prompt: str = ""
+    ) -> Generator[Union[str, dict], None, None]:
+        """ストリーミングでコンテンツを生成"""
+        try:
+            client = self._require_client()
+
+            response_stream = self._open_stream(client, prompt, model_name, system_prompt)
 
-            input_tokens = 0
-            output_tokens = 0
+            usage = {"input_tokens": 0, "output_tokens": 0}
+            for chunk in response_stream:
+                if hasattr(chunk, 'text') and chunk.text:
+                    yield chunk.text
+                self._update_stream_usage(chunk, usage)
 
-            if hasattr(response, 'usage_metadata') and response.usage_metadata is not None:
-                metadata = response.usage_metadata
-                if hasattr(metadata, 'prompt_token_count') and metadata.prompt_token_count is not None:
-                    input_tokens = int(metadata.prompt_token_count)
-                if hasattr(metadata, 'candidates_token_count') and metadata.candidates_token_count is not None:
-                    output_tokens = int(metadata.candidates_token_count)
+            yield self._finish_stream_usage(usage)
 
-            return result_text, input_tokens, output_tokens
         except Exception as e:
             raise APIError(MESSAGES["ERROR"]["VERTEX_AI_API_ERROR"].format(error=str(e)))
 
-    def _generate_content_stream(
+    async def _generate_content_async(
         self, prompt: str, model_name: str, system_prompt: str = ""
-    ) -> Generator[Union[str, dict], None, None]:
-        """ストリーミングでコンテンツを生成"""
+    ) -> Tuple[str, int, int]:
+        """genai の非同期クライアントでイベントループ上から生成"""
         try:
-            if self.client is None:
-                raise APIError(MESSAGES["ERROR"]["GEMINI_CLIENT_NOT_INITIALIZED"])
+            client = self._require_client()
 
-            thinking_level = (
-                types.ThinkingLevel.LOW
-                if self.settings.gemini_thinking_level == "LOW"
-                else types.ThinkingLevel.HIGH
-            )
+            cached = await self._karte_cache_async(client, prompt, model_name)
+            if cached is not None:
+                cache_name, karte, rest = cached
+                contents, config = self._cached_request(cache_name, rest, system_prompt)
+                try:
+                    response = await client.aio.models.generate_content(
+                        model=model_name, contents=contents, config=config
+                    )
+                    return self._parse_response(response)
+                except Exception as e:
+                    if not self._is_stale_cache_error(e):
+                        raise
+                    self._discard_stale_cache(model_name, karte)
 
-            response_stream = self.client.models.generate_content_stream(
+            response = await client.aio.models.generate_content(
                 model=model_name,
                 contents=prompt,
-                config=types.GenerateContentConfig(
-                    system_instruction=system_prompt or None,
-                    thinking_config=types.ThinkingConfig(
-                        thinking_level=thinking_level
-                    )
-                )
+                config=self._generation_config(system_prompt),
             )
+            return self._parse_response(response)
+        except Exception as e:
+            raise APIError(MESSAGES["ERROR"]["VERTEX_AI_API_ERROR"].format(error=str(e)))
 
-            input_tokens = 0
-            output_tokens = 0
+    async def _generate_content_stream_async(
+        self, prompt: str, model_name: str, system_prompt: str = ""
+    ) -> AsyncGenerator[Union[str, dict], None]:
+        """genai の非同期クライアントでストリーミング生成"""
+        try:
+            client = self._require_client()
 
-            for chunk in response_stream:
+            response_stream = await self._open_stream_async(client, prompt, model_name, system_prompt)
+
+            usage = {"input_tokens": 0, "output_tokens": 0}
+            async for chunk in response_stream:
                 if hasattr(chunk, 'text') and chunk.text:
                     yield chunk.text
+                self._update_stream_usage(chunk, usage)
 
-                if hasattr(chunk, 'usage_metadata') and chunk.usage_metadata:
-                    metadata = chunk.usage_metadata
-                    if hasattr(metadata, 'prompt_token_count') and metadata.prompt_token_count:
-                        input_tokens = int(metadata.prompt_token_count)
-                    if hasattr(metadata, 'candidates_token_count') and metadata.candidates_token_count:
-                        output_tokens = int(metadata.candidates_token_count)
-
-            yield {"input_tokens": input_tokens, "output_tokens": output_tokens}
+            yield self._finish_stream_usage(usage)
 
         except Exception as e:
             raise APIError(MESSAGES["ERROR"]["VERTEX_AI_API_ERROR"].format(error=str(e)))
+
+
+async def _prepend(first: Any, stream: AsyncIterator[Any]) -> AsyncIterator[Any]:
+    """先読みした最初のチャンクをストリームの先頭に戻す"""
+    if first is not None:
+        yield first
+    async for chunk in stream:
+        yield chunk
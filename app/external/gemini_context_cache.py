@@ -0,0 +1,239 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+from google.genai import types
+
+from app.core.config import get_settings
+from app.core.constants import CACHED_KARTE_SYSTEM_INSTRUCTION, get_message
+from app.services.generation_context import CacheTokenUsage
+
+logger = logging.getLogger(__name__)
+
+# Vertex 側の有効期限より前に手元のエントリを失効させる余裕（秒）
+_EXPIRY_MARGIN_SECONDS = 60
+# 作成に失敗した本文の再作成を控える秒数（トークン数不足などで毎回失敗する往復を避ける）
+_FAILURE_RETRY_SECONDS = 60
+
+
+@dataclass
+class _CacheEntry:
+    """name が None のエントリは作成に失敗したもの（_FAILURE_RETRY_SECONDS の間は再作成しない）"""
+
+    name: str | None
+    client: Any
+    expires_at: float
+
+
+class GeminiContextCache:
+    """カルテ本文の Vertex AI キャッシュ（cached content）をプロセス内で管理するレジストリ
+
+    キーは (モデル, カルテ本文) の SHA-256。システムプロンプトはキャッシュに含めないため、
+    同じカルテを送る生成・評価・再生成で同じエントリを参照する。
+    作成は同じキーが min_uses 回送られた時点で行い（1回しか送られないカルテに作成の往復と保存料金をかけない）、
+    同じキーの作成は1回にまとめて作成中に来た呼び出しはその結果を待つ。
+    エントリは TTL で失効し、max_entries を超えた分と evict / clear したものは Vertex 側からも削除する。
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int, min_uses: int = 1) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.min_uses = max(1, min_uses)
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self._creating: dict[str, Future[str | None]] = {}
+        # 未作成のキーごとの (送られた回数, 計数の有効期限)
+        self._seen: OrderedDict[str, tuple[int, float]] = OrderedDict()
+
+    @staticmethod
+    def key(model_name: str, text: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(model_name.encode())
+        digest.update(b"\0")
+        digest.update(text.encode())
+        return digest.hexdigest()
+
+    def _claim(
+        self, key: str
+    ) -> tuple[_CacheEntry | None, Future[str | None] | None, bool]:
+        """(有効なエントリ, 作成結果の Future, 自分が作成するか) を返す
+
+        エントリも作成中の Future もなく、まだ作成しない場合は (None, None, False)。
+        """
+        with self._lock:
+            now = time.monotonic()
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires_at > now:
+                    self._entries.move_to_end(key)
+                    return entry, None, False
+                # Vertex 側も TTL で失効するため削除は不要
+                del self._entries[key]
+            pending = self._creating.get(key)
+            if pending is not None:
+                return None, pending, False
+            if not self._count_use(key, now):
+                return None, None, False
+            pending = Future()
+            self._creating[key] = pending
+            return None, pending, True
+
+    def _count_use(self, key: str, now: float) -> bool:
+        """送られた回数を数え、作成する回数に達したら True（ロック保持下で呼ぶ）"""
+        count, expires_at = self._seen.pop(key, (0, 0.0))
+        count = count + 1 if expires_at > now else 1
+        if count >= self.min_uses:
+            return True
+        self._seen[key] = (count, now + self.ttl_seconds)
+        while len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+        return False
+
+    def _store(self, key: str, entry: _CacheEntry) -> list[_CacheEntry]:
+        """エントリを登録して作成待ちを解放し、上限を超えて押し出したエントリを返す
+
+        同じキーの既存エントリは置き換えるだけで削除しない（参照中のリクエストがあり得るため、
+        Vertex 側の TTL に任せる）。
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                _, oldest = self._entries.popitem(last=False)
+                evicted.append(oldest)
+            pending = self._creating.pop(key, None)
+        if pending is not None:
+            pending.set_result(entry.name)
+        return evicted
+
+    def _abandon(self, key: str) -> None:
+        """作成せずに終わった場合（キャンセル等）に作成待ちを解放する"""
+        with self._lock:
+            pending = self._creating.pop(key, None)
+        if pending is not None and not pending.done():
+            pending.set_result(None)
+
+    def _create_config(self, key: str, text: str) -> types.CreateCachedContentConfig:
+        return types.CreateCachedContentConfig(
+            contents=[types.Content(role="user", parts=[types.Part(text=text)])],
+            system_instruction=CACHED_KARTE_SYSTEM_INSTRUCTION,
+            ttl=f"{self.ttl_seconds}s",
+            display_name=f"karte-{key[:16]}",
+        )
+
+    def _new_entry(
+        self, client: Any, cached: types.CachedContent | None, usage: CacheTokenUsage
+    ) -> _CacheEntry:
+        now = time.monotonic()
+        if cached is None:
+            return _CacheEntry(None, client, now + _FAILURE_RETRY_SECONDS)
+        if cached.usage_metadata is not None:
+            usage.add(0, cached.usage_metadata.total_token_count)
+        expires_at = now + max(0, self.ttl_seconds - _EXPIRY_MARGIN_SECONDS)
+        return _CacheEntry(cached.name, client, expires_at)
+
+    def get_or_create(
+        self, client: Any, model_name: str, text: str, usage: CacheTokenUsage
+    ) -> str | None:
+        """text のキャッシュ名を返す（作成する回数に達していれば作成する）。キャッシュを使わない場合は None"""
+        key = self.key(model_name, text)
+        entry, pending, owner = self._claim(key)
+        if entry is not None:
+            return entry.name
+        if pending is None:
+            return None
+        if not owner:
+            return pending.result()
+        try:
+            try:
+                cached = client.caches.create(
+                    model=model_name, config=self._create_config(key, text)
+                )
+            except Exception:
+                logger.warning(get_message("LOG", "GEMINI_CONTEXT_CACHE_CREATE_FAILED"), exc_info=True)
+                cached = None
+            entry = self._new_entry(client, cached, usage)
+            self._delete(self._store(key, entry))
+        finally:
+            self._abandon(key)
+        return entry.name
+
+    async def get_or_create_async(
+        self, client: Any, model_name: str, text: str, usage: CacheTokenUsage
+    ) -> str | None:
+        """get_or_create の非同期版（genai の非同期クライアントで作成する）"""
+        key = self.key(model_name, text)
+        entry, pending, owner = self._claim(key)
+        if entry is not None:
+            return entry.name
+        if pending is None:
+            return None
+        if not owner:
+            return await asyncio.wrap_future(pending)
+        try:
+            try:
+                cached = await client.aio.caches.create(
+                    model=model_name, config=self._create_config(key, text)
+                )
+            except Exception:
+                logger.warning(get_message("LOG", "GEMINI_CONTEXT_CACHE_CREATE_FAILED"), exc_info=True)
+                cached = None
+            entry = self._new_entry(client, cached, usage)
+            evicted = self._store(key, entry)
+        finally:
+            self._abandon(key)
+        if evicted:
+            await asyncio.to_thread(self._delete, evicted)
+        return entry.name
+
+    def invalidate(self, model_name: str, text: str) -> None:
+        """手元のエントリだけを破棄（Vertex 側で失効・削除済みのエントリを参照しないように）"""
+        with self._lock:
+            self._entries.pop(self.key(model_name, text), None)
+
+    def evict(self, model_name: str, text: str) -> None:
+        """エントリを破棄し、Vertex 側のキャッシュも削除"""
+        with self._lock:
+            entry = self._entries.pop(self.key(model_name, text), None)
+        self._delete([entry] if entry is not None else [])
+
+    def clear(self) -> None:
+        """すべてのエントリを破棄し、Vertex 側のキャッシュも削除（終了時に呼ぶ）"""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            self._seen.clear()
+        self._delete(entries)
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    @staticmethod
+    def _delete(entries: list[_CacheEntry]) -> None:
+        for entry in entries:
+            if entry.name is None:
+                continue
+            try:
+                entry.client.caches.delete(name=entry.name)
+            except Exception:
+                logger.warning(get_message("LOG", "GEMINI_CONTEXT_CACHE_DELETE_FAILED"), exc_info=True)
+
+
+@lru_cache
+def get_gemini_context_cache() -> GeminiContextCache:
+    """プロセス共有のカルテ本文キャッシュのレジストリを取得"""
+    s = get_settings()
+    return GeminiContextCache(
+        s.gemini_context_cache_ttl_seconds,
+        s.gemini_context_cache_max_entries,
+        s.gemini_context_cache_min_uses,
+    )
@@ -1,9 +1,13 @@
+import asyncio
 import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request
+import anyio.to_thread
+from fastapi import Depends, FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
@@ -17,7 +21,24 @@ from app.core.constants import (
     FRONTEND_MESSAGES,
     ModelType,
 )
-from app.core.security import SecurityHeadersMiddleware, generate_csrf_token
+from app.core.metrics import (
+    REGISTRY,
+    MetricsMiddleware,
+    register_threadpool_metrics,
+    start_metrics_exporter,
+    stop_metrics_exporter,
+)
+from app.core.security import (
+    SecurityHeadersMiddleware,
+    generate_csrf_token,
+    require_metrics_token,
+)
+from app.external.api_factory import warm_up_clients
+from app.external.client_pool import get_client_pool
+from app.external.gemini_context_cache import get_gemini_context_cache
+from app.services.single_flight import get_single_flight
+from app.services.usage_service import get_usage_writer
+from app.utils.audit_logger import start_audit_listener, stop_audit_listener
 from app.utils.error_handlers import api_exception_handler, validation_exception_handler
 
 logging.basicConfig(
@@ -27,11 +48,35 @@ logging.basicConfig(
 
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """起動時にLLMクライアントの事前初期化と使用量ライタ・監査ログ・メトリクスの開始、終了時に実行中の生成の終了待ち・書き込みとコンテキストキャッシュの削除・プールのクローズを行う"""
+    start_audit_listener(settings.audit_log_queue_size, settings.audit_log_path)
+    register_threadpool_metrics(anyio.to_thread.current_default_thread_limiter())
+    start_metrics_exporter(
+        settings.metrics_multiprocess_dir, settings.metrics_snapshot_interval_seconds
+    )
+    warm_up_clients()
+    usage_writer = get_usage_writer()
+    usage_writer.start()
+    yield
+    # 合流対象の生成は接続から独立したタスクのため、利用枠の確定・取り消しを済ませてから書き込みを停止する
+    await get_single_flight().drain(settings.single_flight_shutdown_timeout_seconds)
+    await asyncio.to_thread(usage_writer.stop)
+    # コンテキストキャッシュの削除はプールのクライアントで行うため、プールのクローズより先に実行する
+    await asyncio.to_thread(get_gemini_context_cache().clear)
+    await get_client_pool().aclear()
+    await asyncio.to_thread(stop_metrics_exporter)
+    await asyncio.to_thread(stop_audit_listener)
+
+
 app = FastAPI(
     title="MediDocsLM API",
     version="1.0.0",
     docs_url=None,  # 開発段階では "/api/docs"
     redoc_url=None,
+    lifespan=lifespan,
 )
 
 # 明示的なCORS設定
@@ -45,6 +90,8 @@ app.add_middleware(
 
 app.add_middleware(SecurityHeadersMiddleware)
 
+app.add_middleware(MetricsMiddleware)
+
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
 app.add_exception_handler(Exception, api_exception_handler)
 
@@ -154,3 +201,19 @@ async def evaluation_prompts_edit_page(request: Request, document_type: str):
 async def health_check():
     """ヘルスチェックエンドポイント"""
     return {"status": "healthy"}
+
+
+@app.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    dependencies=[Depends(require_metrics_token)],
+)
+def metrics():
+    """Prometheus 形式のメトリクス（METRICS_AUTH_TOKEN 設定時は Bearer トークンが必要）"""
+    return PlainTextResponse(
+        REGISTRY.render(
+            settings.metrics_multiprocess_dir,
+            stale_seconds=settings.metrics_snapshot_interval_seconds * 3,
+        ),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
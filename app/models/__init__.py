@@ -1,6 +1,16 @@
 from .base import Base
 from .evaluation_prompt import EvaluationPrompt
+from .generation_result import GenerationResultCacheEntry
 from .prompt import Prompt
-from .usage import SummaryUsage
+from .usage import DailyUsageCounter, DailyUsageRollup, HourlyUsageRollup, SummaryUsage
 
-__all__ = ["Base", "EvaluationPrompt", "Prompt", "SummaryUsage"]
+__all__ = [
+    "Base",
+    "DailyUsageCounter",
+    "DailyUsageRollup",
+    "EvaluationPrompt",
+    "GenerationResultCacheEntry",
+    "HourlyUsageRollup",
+    "Prompt",
+    "SummaryUsage",
+]
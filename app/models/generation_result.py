@@ -0,0 +1,17 @@
+from typing import Any
+
+from sqlalchemy import Column, DateTime, LargeBinary, String
+from sqlalchemy.sql import func
+
+from .base import Base
+
+
+class GenerationResultCacheEntry(Base):
+    """文書生成結果のキャッシュ（生成結果は暗号化して保存）"""
+
+    __tablename__ = "generation_result_cache"
+
+    cache_key: Any = Column(String(64), primary_key=True)
+    payload: Any = Column(LargeBinary, nullable=False)
+    created_at: Any = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at: Any = Column(DateTime(timezone=True), nullable=False, index=True)
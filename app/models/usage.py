@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, Float, Index, Integer, String
+from sqlalchemy import BigInteger, Column, Date, DateTime, Float, Index, Integer, String
 from sqlalchemy.sql import func
 
 from .base import Base
@@ -16,9 +16,74 @@ class SummaryUsage(Base):
     doctor = Column(String(100))
     input_tokens = Column(Integer)
     output_tokens = Column(Integer)
+    # プロンプトキャッシュから読み取った／キャッシュに書き込んだ入力トークン数（input_tokens とは別計上）
+    cache_read_input_tokens = Column(Integer, nullable=False, default=0, server_default="0")
+    cache_creation_input_tokens = Column(Integer, nullable=False, default=0, server_default="0")
     processing_time = Column(Float)
 
     __table_args__ = (
         Index("ix_summary_usage_aggregation", "document_types", "department", "doctor"),
         Index("ix_summary_usage_date_document_type", "date", "document_types"),
+        Index("ix_summary_usage_date_id", "date", "id"),
     )
+
+
+class DailyUsageCounter(Base):
+    """日次利用制限の判定用カウンタ（日付ごとに1行、JST）"""
+
+    __tablename__ = "daily_usage_counters"
+
+    usage_date = Column(Date, primary_key=True)
+    request_count = Column(Integer, nullable=False, default=0, server_default="0")
+    input_tokens = Column(BigInteger, nullable=False, default=0, server_default="0")
+    output_tokens = Column(BigInteger, nullable=False, default=0, server_default="0")
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
+# 処理時間ヒストグラムの上限値（秒、累積カウント）
+PROCESSING_TIME_BUCKETS = (10, 20, 30, 60, 120)
+
+
+class UsageRollupMixin:
+    """使用統計の集計値（モデル・文書タイプ・診療科・医師ごと）
+
+    NULL のディメンションは空文字で保持する。
+    processing_time_le_N は処理時間がN秒以下の件数（累積）。
+    """
+
+    model = Column(String(100), primary_key=True)
+    document_type = Column(String(100), primary_key=True)
+    department = Column(String(100), primary_key=True)
+    doctor = Column(String(100), primary_key=True)
+    request_count = Column(Integer, nullable=False, default=0, server_default="0")
+    input_tokens = Column(BigInteger, nullable=False, default=0, server_default="0")
+    output_tokens = Column(BigInteger, nullable=False, default=0, server_default="0")
+    cache_read_input_tokens = Column(BigInteger, nullable=False, default=0, server_default="0")
+    cache_creation_input_tokens = Column(BigInteger, nullable=False, default=0, server_default="0")
+    processing_time_count = Column(Integer, nullable=False, default=0, server_default="0")
+    processing_time_sum = Column(Float, nullable=False, default=0, server_default="0")
+    processing_time_min = Column(Float)
+    processing_time_max = Column(Float)
+    processing_time_le_10 = Column(Integer, nullable=False, default=0, server_default="0")
+    processing_time_le_20 = Column(Integer, nullable=False, default=0, server_default="0")
+    processing_time_le_30 = Column(Integer, nullable=False, default=0, server_default="0")
+    processing_time_le_60 = Column(Integer, nullable=False, default=0, server_default="0")
+    processing_time_le_120 = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+class HourlyUsageRollup(UsageRollupMixin, Base):
+    """1時間単位の使用統計（bucket_start は時間の開始時刻）"""
+
+    __tablename__ = "usage_rollups_hourly"
+
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+
+
+class DailyUsageRollup(UsageRollupMixin, Base):
+    """日単位の使用統計（日付はJST）"""
+
+    __tablename__ = "usage_rollups_daily"
+
+    bucket_date = Column(Date, primary_key=True)
@@ -6,6 +6,8 @@ class UsageSummary(BaseModel):
     total_count: int
     total_input_tokens: int
     total_output_tokens: int
+    total_cache_read_input_tokens: int = 0
+    total_cache_creation_input_tokens: int = 0
     average_processing_time: float
 
 
@@ -19,6 +21,8 @@ class UsageRecord(BaseModel):
     doctor: str | None
     input_tokens: int | None
     output_tokens: int | None
+    cache_read_input_tokens: int = 0
+    cache_creation_input_tokens: int = 0
     processing_time: float | None
 
     model_config = ConfigDict(from_attributes=True)
@@ -31,5 +35,25 @@ class AggregatedRecord(BaseModel):
     count: int
     input_tokens: int
     output_tokens: int
+    cache_read_input_tokens: int = 0
+    cache_creation_input_tokens: int = 0
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class LatencyBucket(BaseModel):
+    le: float | None
+    count: int
+
+
+class LatencyStatistics(BaseModel):
+    model: str
+    document_type: str
+    count: int
+    average: float
+    min: float
+    max: float
+    p50: float
+    p90: float
+    p99: float
+    histogram: list[LatencyBucket]
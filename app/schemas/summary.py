@@ -28,3 +28,7 @@ class SummaryResponse(BaseModel):
     model_used: str
     model_switched: bool
     error_message: str | None = None
+    # 処理段階ごとの所要時間（ミリ秒）
+    timings: dict[str, float] | None = None
+    # 同一リクエストの生成結果キャッシュから返した場合 True（LLMは呼び出していない）
+    cached: bool = False
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import time
 from typing import AsyncGenerator, cast
@@ -10,12 +11,14 @@ from app.core.constants import (
     get_message,
 )
 from app.core.database import get_db_session
+from app.core.metrics import GENERATION_FAILURES, observe_generation
 from app.external.api_factory import APIProvider, create_client
 from app.schemas.evaluation import EvaluationResponse
 from app.services.evaluation_prompt_service import get_evaluation_prompt
 from app.services.sse_helpers import sse_event, stream_with_heartbeat
 from app.services.usage_service import check_daily_limit
 from app.utils.audit_logger import log_audit_event
+from app.utils.exceptions import APIError
 from app.utils.input_sanitizer import sanitize_medical_text, validate_medical_input
 
 settings = get_settings()
@@ -27,6 +30,8 @@ def _resolve_evaluation_provider_and_model() -> tuple[
     str | None, str | None, str | None
 ]:
     """評価用のプロバイダーとモデルを解決 (provider, model, error_msg)"""
+    if settings.fake_llm_enabled:
+        return APIProvider.FAKE.value, "fake-evaluation", None
     if settings.evaluation_model == ModelType.CLAUDE:
         if not settings.anthropic_model:
             return None, None, MESSAGES["CONFIG"]["ANTHROPIC_MODEL_MISSING"]
@@ -91,6 +96,32 @@ def _validate_and_get_prompt(
         return cast(str, prompt_data.content), None
 
 
+def _sanitize_and_validate(
+    document_type: str,
+    input_text: str,
+    current_prescription: str,
+    additional_info: str,
+    output_summary: str,
+) -> tuple[tuple[str, str, str, str], str | None, str | None]:
+    """サニタイズ後の (入力, 処方, 追加情報, 出力) とプロンプトまたはエラーを返す
+
+    長い入力の検証とDB参照を含むため、asyncio.to_thread で呼び出す。
+    """
+    input_text = sanitize_medical_text(input_text)
+    current_prescription = sanitize_medical_text(current_prescription or "")
+    additional_info = sanitize_medical_text(additional_info or "")
+    output_summary = sanitize_medical_text(output_summary)
+
+    prompt_template, error_msg = _validate_and_get_prompt(
+        output_summary, document_type, input_text
+    )
+    return (
+        (input_text, current_prescription, additional_info, output_summary),
+        prompt_template,
+        error_msg,
+    )
+
+
 def build_evaluation_prompt(
     prompt_template: str,
     input_text: str,
@@ -118,7 +149,7 @@ def build_evaluation_prompt(
     return system_prompt, user_prompt
 
 
-def execute_evaluation(
+async def execute_evaluation(
     document_type: str,
     input_text: str,
     current_prescription: str,
@@ -135,19 +166,20 @@ def execute_evaluation(
     )
 
     # 日次利用制限チェック
-    limit_error = check_daily_limit()
+    limit_error = await asyncio.to_thread(check_daily_limit)
     if limit_error:
         return _error_response(limit_error)
 
-    # サニタイゼーション適用
-    input_text = sanitize_medical_text(input_text)
-    current_prescription = sanitize_medical_text(current_prescription or "")
-    additional_info = sanitize_medical_text(additional_info or "")
-    output_summary = sanitize_medical_text(output_summary)
-
-    prompt_template, error_msg = _validate_and_get_prompt(
-        output_summary, document_type, input_text
+    # サニタイゼーションと検証・プロンプト取得
+    texts, prompt_template, error_msg = await asyncio.to_thread(
+        _sanitize_and_validate,
+        document_type,
+        input_text,
+        current_prescription,
+        additional_info,
+        output_summary,
     )
+    input_text, current_prescription, additional_info, output_summary = texts
     if error_msg:
         log_audit_event(
             event_type=get_message("AUDIT", "EVALUATION_FAILURE"),
@@ -159,9 +191,9 @@ def execute_evaluation(
         return _error_response(error_msg)
 
     assert prompt_template is not None
-    provider, model_name, _ = _resolve_evaluation_provider_and_model()
-    assert provider is not None
-    assert model_name is not None
+    provider, model_name, model_error = _resolve_evaluation_provider_and_model()
+    if provider is None or model_name is None:
+        return _error_response(model_error or MESSAGES["ERROR"]["EVALUATION_ERROR"])
 
     system_prompt, user_prompt = build_evaluation_prompt(
         prompt_template,
@@ -174,12 +206,15 @@ def execute_evaluation(
     start_time = time.time()
     try:
         client = create_client(provider)
-        client.initialize()
+        await asyncio.to_thread(client.initialize)
 
-        evaluation_text, input_tokens, output_tokens = client._generate_content(
+        evaluation_text, input_tokens, output_tokens = await client._generate_content_async(
             user_prompt, model_name, system_prompt
         )
         processing_time = time.time() - start_time
+        observe_generation(
+            "evaluation", model_name, processing_time, input_tokens, output_tokens
+        )
 
         log_audit_event(
             event_type=get_message("AUDIT", "EVALUATION_SUCCESS"),
@@ -201,6 +236,7 @@ def execute_evaluation(
     except Exception as e:
         # 例外詳細はサーバーログのみに記録（外部APIの例外文字列に入力断片が含まれる可能性があるため）
         logger.error("評価API呼び出しエラー", exc_info=True)
+        GENERATION_FAILURES.inc(kind="evaluation", model=model_name)
         log_audit_event(
             event_type=get_message("AUDIT", "EVALUATION_FAILURE"),
             user_ip=user_ip,
@@ -213,7 +249,7 @@ def execute_evaluation(
         )
 
 
-def _run_sync_evaluation(
+async def _run_evaluation(
     document_type: str,
     input_text: str,
     current_prescription: str,
@@ -221,7 +257,7 @@ def _run_sync_evaluation(
     output_summary: str,
     prompt_template: str,
 ) -> tuple[str, int, int]:
-    """同期的に評価を実行"""
+    """非同期クライアントで評価を実行"""
     system_prompt, user_prompt = build_evaluation_prompt(
         prompt_template,
         input_text,
@@ -230,13 +266,13 @@ def _run_sync_evaluation(
         output_summary,
     )
 
-    provider, model_name, _ = _resolve_evaluation_provider_and_model()
-    assert provider is not None
-    assert model_name is not None
+    provider, model_name, model_error = _resolve_evaluation_provider_and_model()
+    if provider is None or model_name is None:
+        raise APIError(model_error or MESSAGES["ERROR"]["EVALUATION_ERROR"])
     client = create_client(provider)
-    client.initialize()
+    await asyncio.to_thread(client.initialize)
 
-    evaluation_text, input_tokens, output_tokens = client._generate_content(
+    evaluation_text, input_tokens, output_tokens = await client._generate_content_async(
         user_prompt, model_name, system_prompt
     )
 
@@ -260,20 +296,21 @@ async def execute_evaluation_stream(
     )
 
     # 日次利用制限チェック
-    limit_error = check_daily_limit()
+    limit_error = await asyncio.to_thread(check_daily_limit)
     if limit_error:
         yield sse_event("error", {"success": False, "error_message": limit_error})
         return
 
-    # サニタイゼーション適用
-    input_text = sanitize_medical_text(input_text)
-    current_prescription = sanitize_medical_text(current_prescription or "")
-    additional_info = sanitize_medical_text(additional_info or "")
-    output_summary = sanitize_medical_text(output_summary)
-
-    prompt_template, error_msg = _validate_and_get_prompt(
-        output_summary, document_type, input_text
+    # サニタイゼーションと検証・プロンプト取得
+    texts, prompt_template, error_msg = await asyncio.to_thread(
+        _sanitize_and_validate,
+        document_type,
+        input_text,
+        current_prescription,
+        additional_info,
+        output_summary,
     )
+    input_text, current_prescription, additional_info, output_summary = texts
     if error_msg:
         log_audit_event(
             event_type=get_message("AUDIT", "EVALUATION_FAILURE"),
@@ -285,11 +322,14 @@ async def execute_evaluation_stream(
         yield sse_event("error", {"success": False, "error_message": error_msg})
         return
 
+    # メトリクスのラベルは実際に呼び出すモデル名（疑似LLMの計測を実モデルと混ぜない）
+    _, model_name, _ = _resolve_evaluation_provider_and_model()
+    metric_model = model_name or settings.evaluation_model
     start_time = time.time()
 
     async for item in stream_with_heartbeat(
-        sync_func=_run_sync_evaluation,
-        sync_func_args=(
+        func=_run_evaluation,
+        func_args=(
             document_type,
             input_text,
             current_prescription,
@@ -301,12 +341,16 @@ async def execute_evaluation_stream(
         running_status="evaluating",
         running_message=MESSAGES["STATUS"]["EVALUATING"],
         elapsed_message_template=MESSAGES["STATUS"]["EVALUATING_ELAPSED"],
+        on_error=lambda: GENERATION_FAILURES.inc(kind="evaluation", model=metric_model),
     ):
         if isinstance(item, str):
             yield item
         else:
             evaluation_text, input_tokens, output_tokens = item
             processing_time = time.time() - start_time
+            observe_generation(
+                "evaluation", metric_model, processing_time, input_tokens, output_tokens
+            )
 
             log_audit_event(
                 event_type=get_message("AUDIT", "EVALUATION_SUCCESS"),
@@ -0,0 +1,79 @@
+import logging
+from dataclasses import dataclass, field
+
+from app.core.database import get_db_session
+from app.services.prompt_cache import ResolvedPrompt
+from app.services.prompt_service import resolve_prompt
+from app.services.usage_service import QuotaReservation, reserve_daily_quota
+from app.utils.timing import StageTimer
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheTokenUsage:
+    """プロンプトキャッシュから読み取った／キャッシュに書き込んだ入力トークン数"""
+
+    read_tokens: int = 0
+    creation_tokens: int = 0
+
+    def add(self, read_tokens: int | None, creation_tokens: int | None) -> None:
+        self.read_tokens += read_tokens or 0
+        self.creation_tokens += creation_tokens or 0
+
+
+@dataclass(frozen=True)
+class GenerationContext:
+    """1リクエストの文書生成で参照するDB由来の値
+
+    リクエスト開始時に1回のセッションで解決し、api_factory と BaseAPIClient へ渡す。
+    以降の処理はプロンプト・選択モデル・日次制限のためにDBへアクセスしない。
+    reservation は save_usage で実績に補正するか、失敗時に release_daily_quota で取り消す。
+    timer には BaseAPIClient を含む各処理段階の所要時間を記録する。
+    cache_usage にはプロバイダーが返したプロンプトキャッシュのトークン数を記録する。
+    """
+
+    prompt: ResolvedPrompt | None = None
+    daily_limit_error: str | None = None
+    reservation: QuotaReservation | None = None
+    timer: StageTimer = field(default_factory=StageTimer, compare=False, repr=False)
+    cache_usage: CacheTokenUsage = field(
+        default_factory=CacheTokenUsage, compare=False, repr=False
+    )
+
+    @property
+    def selected_model(self) -> str | None:
+        """プロンプトで選択されたモデル名（未設定ならNone）"""
+        if self.prompt and self.prompt.selected_model:
+            return str(self.prompt.selected_model)
+        return None
+
+
+def load_generation_context(
+    department: str, document_type: str, doctor: str, estimated_input_tokens: int = 0
+) -> GenerationContext:
+    """プロンプトの解決と日次利用枠の予約を1つのDBセッションで行う"""
+    prompt = None
+    reservation = None
+    daily_limit_error = None
+    try:
+        with get_db_session() as db:
+            try:
+                prompt = resolve_prompt(db, department, document_type, doctor)
+            except Exception:
+                # プロンプト取得に失敗してもデフォルトプロンプトで処理を続行
+                logger.warning("プロンプトの解決に失敗しました", exc_info=True)
+                db.rollback()
+
+            reservation, daily_limit_error = reserve_daily_quota(
+                db, estimated_input_tokens
+            )
+    except Exception:
+        # フェイルオープン: 日次制限を確認できない場合も実行を許可
+        logger.error("生成コンテキストの取得に失敗しました", exc_info=True)
+        reservation = None
+        daily_limit_error = None
+
+    return GenerationContext(
+        prompt=prompt, daily_limit_error=daily_limit_error, reservation=reservation
+    )
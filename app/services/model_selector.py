@@ -2,6 +2,7 @@ from app.core.config import get_settings
 from app.core.constants import MESSAGES, ModelType
 from app.core.database import get_db_session
 from app.external.api_factory import APIProvider
+from app.services.generation_context import GenerationContext
 
 settings = get_settings()
 
@@ -13,9 +14,13 @@ def determine_model(
     document_type: str,
     doctor: str,
     model_explicitly_selected: bool = False,
+    context: GenerationContext | None = None,
 ) -> tuple[str, bool]:
-    """モデル自動切替判定"""
-    if not model_explicitly_selected:
+    """モデル自動切替判定（context 指定時はプロンプトの選択モデルをDBから再取得しない）"""
+    if not model_explicitly_selected and context is not None:
+        if context.selected_model is not None:
+            requested_model = context.selected_model
+    elif not model_explicitly_selected:
         try:
             from app.services.prompt_service import get_selected_model
 
@@ -41,7 +46,9 @@ def determine_model(
 
 
 def get_provider_and_model(selected_model: str) -> tuple[str, str]:
-    """モデル名からプロバイダーとモデル名を取得"""
+    """モデル名からプロバイダーとモデル名を取得（疑似LLM有効時は FakeAPIClient に振り替える）"""
+    if settings.fake_llm_enabled and selected_model in (ModelType.CLAUDE, ModelType.GEMINI):
+        return APIProvider.FAKE.value, f"fake-{ModelType(selected_model).value.lower()}"
     if selected_model == ModelType.CLAUDE:
         model = settings.anthropic_model
         if not model:
@@ -0,0 +1,99 @@
+import threading
+import time
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+from functools import lru_cache
+
+from app.core.config import get_settings
+
+
+@dataclass(frozen=True)
+class ResolvedPrompt:
+    """階層的に解決したプロンプトのうち文書生成で参照する値"""
+
+    content: str | None
+    selected_model: str | None
+
+
+_MISSING = object()
+
+
+class PromptCache:
+    """(診療科, 文書タイプ, 医師) ごとの解決済みプロンプトをプロセス内に保持するキャッシュ
+
+    このワーカーでの更新はコミット時の invalidate で即座に破棄する。
+    他ワーカーでの更新は check_interval_seconds ごとに prompts テーブルの
+    バージョン（件数・最大ID・最終作成/更新日時）を確認して検知する。
+    """
+
+    def __init__(self, check_interval_seconds: int) -> None:
+        self._check_interval_seconds = check_interval_seconds
+        self._lock = threading.Lock()
+        self._entries: dict[Hashable, ResolvedPrompt | None] = {}
+        self._version: Hashable | None = None
+        self._checked_at = 0.0
+        # invalidate とバージョン変化のたびに進め、古い世代で読み込んだ値は登録しない
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+
+    def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], ResolvedPrompt | None],
+        version_loader: Callable[[], Hashable],
+    ) -> ResolvedPrompt | None:
+        """キーに対応する値を返す。未登録ならloaderで読み込んで登録する"""
+        now = time.monotonic()
+        with self._lock:
+            generation = self._generation
+            needs_check = (
+                self._version is None
+                or now - self._checked_at >= self._check_interval_seconds
+            )
+
+        if needs_check:
+            version = version_loader()
+            with self._lock:
+                if self._generation == generation:
+                    if version != self._version:
+                        self._entries.clear()
+                        self._version = version
+                        self._generation += 1
+                    self._checked_at = now
+                generation = self._generation
+
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is not _MISSING and self._generation == generation:
+                self._hits += 1
+                return value  # type: ignore[return-value]
+            self._misses += 1
+
+        loaded = loader()
+        with self._lock:
+            if self._generation == generation:
+                self._entries[key] = loaded
+        return loaded
+
+    def invalidate(self) -> None:
+        """保持している値を破棄し、次回参照時にバージョンを再確認させる"""
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+            self._generation += 1
+
+    def stats(self) -> dict[str, int]:
+        """キャッシュのヒット/ミス数と保持件数を返す"""
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "size": len(self._entries),
+            }
+
+
+@lru_cache
+def get_prompt_cache() -> PromptCache:
+    """プロセス共有のプロンプトキャッシュを取得"""
+    return PromptCache(get_settings().prompt_cache_check_seconds)
@@ -1,7 +1,10 @@
-from sqlalchemy import select
+from collections.abc import Hashable
+
+from sqlalchemy import event, func, select
 from sqlalchemy.orm import Session
 
 from app.models.prompt import Prompt
+from app.services.prompt_cache import ResolvedPrompt, get_prompt_cache
 
 
 def get_all_prompts(db: Session) -> list[Prompt]:
@@ -39,6 +42,45 @@ def get_prompt(
     return None
 
 
+def get_prompt_version(db: Session) -> Hashable:
+    """prompts テーブルの変更を検知するためのバージョン（作成・更新・削除で変化する）"""
+    query = select(
+        func.count(Prompt.id),
+        func.max(Prompt.id),
+        func.max(Prompt.created_at),
+        func.max(Prompt.updated_at),
+    )
+    return tuple(db.execute(query).one())
+
+
+def resolve_prompt(
+    db: Session,
+    department: str,
+    document_type: str,
+    doctor: str,
+) -> ResolvedPrompt | None:
+    """プロンプトを階層的に解決し、内容と選択モデルを返す（プロセス内キャッシュを利用）"""
+
+    def load() -> ResolvedPrompt | None:
+        prompt = get_prompt(db, department, document_type, doctor)
+        if prompt is None:
+            return None
+        return ResolvedPrompt(content=prompt.content, selected_model=prompt.selected_model)
+
+    return get_prompt_cache().get_or_load(
+        (department, document_type, doctor),
+        load,
+        lambda: get_prompt_version(db),
+    )
+
+
+def _invalidate_prompt_cache_on_commit(db: Session) -> None:
+    """コミット完了時にプロンプトキャッシュを破棄（他ワーカーはバージョン確認で検知）"""
+    event.listen(
+        db, "after_commit", lambda _session: get_prompt_cache().invalidate(), once=True
+    )
+
+
 def get_prompt_by_id(db: Session, prompt_id: int) -> Prompt | None:
     """IDでプロンプトを取得"""
     return db.query(Prompt).filter(Prompt.id == prompt_id).first()
@@ -51,7 +93,7 @@ def get_selected_model(
     doctor: str
 ) -> str | None:
     """プロンプトから選択されたモデル名を取得"""
-    prompt = get_prompt(db, department, document_type, doctor)
+    prompt = resolve_prompt(db, department, document_type, doctor)
     if prompt and prompt.selected_model:
         return str(prompt.selected_model)
     return None
@@ -75,6 +117,7 @@ def create_or_update_prompt(
         )
         .first()
     )
+    _invalidate_prompt_cache_on_commit(db)
     if existing:
         existing.content = content
         existing.selected_model = selected_model
@@ -96,5 +139,6 @@ def delete_prompt(db: Session, prompt_id: int) -> bool:
     prompt = db.query(Prompt).filter(Prompt.id == prompt_id).first()
     if prompt:
         db.delete(prompt)
+        _invalidate_prompt_cache_on_commit(db)
         return True
     return False
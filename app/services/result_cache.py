@@ -0,0 +1,208 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+from cryptography.fernet import Fernet, InvalidToken
+from sqlalchemy import delete, select
+
+from app.core.config import get_settings
+from app.core.constants import get_message
+from app.core.database import dialect_insert, get_db_session
+from app.models.generation_result import GenerationResultCacheEntry
+from app.services.prompt_cache import ResolvedPrompt
+
+logger = logging.getLogger(__name__)
+
+# キーの算出方法を変えたときに既存のエントリを参照しないよう、キーに含める
+_KEY_VERSION = 1
+
+
+@dataclass(frozen=True)
+class CachedResult:
+    """キャッシュする生成結果（使用モデルや切り替え有無はリクエストごとに判定する）"""
+
+    output_summary: str
+    parsed_summary: dict[str, str]
+
+
+def result_cache_key(
+    document_type: str,
+    model: str,
+    prompt: ResolvedPrompt | None,
+    medical_text: str,
+    additional_info: str,
+    current_prescription: str,
+    referral_purpose: str,
+    previous_summary: str,
+    evaluation_feedback: str,
+) -> str:
+    """サニタイズ済みの入力・解決済みプロンプト・モデル・文書タイプから算出する SHA-256
+
+    プロンプトは本文と選択モデルをキーに含めるため、更新されると別のキーになる。
+    """
+    payload = [
+        _KEY_VERSION,
+        document_type,
+        model,
+        prompt.content if prompt else None,
+        prompt.selected_model if prompt else None,
+        *(
+            (text or "").strip()
+            for text in (
+                medical_text,
+                additional_info,
+                current_prescription,
+                referral_purpose,
+                previous_summary,
+                evaluation_feedback,
+            )
+        ),
+    ]
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode()).hexdigest()
+
+
+class GenerationResultCache:
+    """同一リクエストの生成結果を返すキャッシュ
+
+    プロセス内の LRU（max_entries 件、TTL）に保持し、fernet 指定時は
+    generation_result_cache テーブルにも暗号化して保存してワーカー間・再起動後も参照する。
+    """
+
+    def __init__(
+        self, ttl_seconds: int, max_entries: int, fernet: Fernet | None = None
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._fernet = fernet
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, CachedResult]] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: str) -> CachedResult | None:
+        """キーに対応する生成結果を返す（DB参照を含むためイベントループ外で呼ぶ）"""
+        result = self._get_memory(key)
+        if result is None and self._fernet is not None:
+            loaded = self._load(key)
+            if loaded is not None:
+                result, expires_at = loaded
+                remaining = (expires_at - datetime.now(timezone.utc)).total_seconds()
+                self._put_memory(key, result, time.monotonic() + remaining)
+
+        with self._lock:
+            if result is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return result
+
+    def put(self, key: str, result: CachedResult) -> None:
+        """生成結果を登録する（DB保存を含むためイベントループ外で呼ぶ）"""
+        self._put_memory(key, result, time.monotonic() + self.ttl_seconds)
+        if self._fernet is not None:
+            self._save(key, result)
+
+    def clear(self) -> None:
+        """プロセス内のエントリを破棄"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        """キャッシュのヒット/ミス数と保持件数を返す"""
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "size": len(self._entries),
+            }
+
+    def _get_memory(self, key: str) -> CachedResult | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, result = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return result
+
+    def _put_memory(self, key: str, result: CachedResult, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (expires_at, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _load(self, key: str) -> tuple[CachedResult, datetime] | None:
+        assert self._fernet is not None
+        try:
+            with get_db_session() as db:
+                row = db.execute(
+                    select(
+                        GenerationResultCacheEntry.payload,
+                        GenerationResultCacheEntry.expires_at,
+                    ).where(
+                        GenerationResultCacheEntry.cache_key == key,
+                        GenerationResultCacheEntry.expires_at > datetime.now(timezone.utc),
+                    )
+                ).first()
+            if row is None:
+                return None
+            payload, expires_at = row
+            result = CachedResult(**json.loads(self._fernet.decrypt(payload)))
+        except InvalidToken:
+            # 暗号化キーを変更した後の古いエントリは参照しない
+            return None
+        except Exception:
+            logger.warning(get_message("LOG", "RESULT_CACHE_DB_READ_FAILED"), exc_info=True)
+            return None
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        return result, expires_at
+
+    def _save(self, key: str, result: CachedResult) -> None:
+        assert self._fernet is not None
+        now = datetime.now(timezone.utc)
+        payload = self._fernet.encrypt(json.dumps(asdict(result), ensure_ascii=False).encode())
+        expires_at = now + timedelta(seconds=self.ttl_seconds)
+        try:
+            with get_db_session() as db:
+                insert = dialect_insert(db, GenerationResultCacheEntry)
+                db.execute(
+                    insert.values(cache_key=key, payload=payload, expires_at=expires_at)
+                    .on_conflict_do_update(
+                        index_elements=["cache_key"],
+                        set_={"payload": payload, "expires_at": expires_at},
+                    )
+                )
+                # 期限切れのエントリは保存のついでに削除する
+                db.execute(
+                    delete(GenerationResultCacheEntry).where(
+                        GenerationResultCacheEntry.expires_at <= now
+                    )
+                )
+        except Exception:
+            logger.warning(get_message("LOG", "RESULT_CACHE_DB_WRITE_FAILED"), exc_info=True)
+
+
+@lru_cache
+def get_result_cache() -> GenerationResultCache:
+    """プロセス共有の生成結果キャッシュを取得"""
+    s = get_settings()
+    fernet = None
+    if s.result_cache_db_enabled:
+        if s.result_cache_encryption_key:
+            fernet = Fernet(s.result_cache_encryption_key)
+        else:
+            logger.error(get_message("LOG", "RESULT_CACHE_ENCRYPTION_KEY_MISSING"))
+    return GenerationResultCache(
+        s.result_cache_ttl_seconds, s.result_cache_max_entries, fernet
+    )
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+from collections.abc import AsyncGenerator, AsyncIterator, Callable
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """実行中の1件の生成と、それまでに送信したSSEイベントの記録"""
+
+    def __init__(self) -> None:
+        self.events: list[str] = []
+        self.done = False
+        self._changed = asyncio.Condition()
+
+    async def publish(self, event: str) -> None:
+        async with self._changed:
+            self.events.append(event)
+            self._changed.notify_all()
+
+    async def finish(self) -> None:
+        async with self._changed:
+            self.done = True
+            self._changed.notify_all()
+
+    async def subscribe(self) -> AsyncGenerator[str, None]:
+        """記録済みのイベントを先頭から返し、以降は生成の完了まで到着順に返す"""
+        index = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: index < len(self.events) or self.done)
+                pending = self.events[index:]
+                done = self.done
+            index += len(pending)
+            for event in pending:
+                yield event
+            if done and index == len(self.events):
+                return
+
+
+class SingleFlight:
+    """同じキーの生成を1回にまとめ、後から来た呼び出し元にも同じイベント列を配信する
+
+    最初の呼び出し元の producer はイベントループ上の独立したタスクで実行するため、
+    その接続が切れても生成は完了まで続き、再接続した呼び出し元へ配信される。
+    完了したキーは登録を外す（完了後の同じリクエストは新たに生成する）。
+    終了時は drain() で実行中の producer の完了（または取り消し）を待つ。
+    """
+
+    def __init__(self) -> None:
+        self._flights: dict[str, _Flight] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    def stream(
+        self, key: str, producer: Callable[[], AsyncIterator[str]]
+    ) -> tuple[AsyncGenerator[str, None], bool]:
+        """(イベント列, 実行中の生成に合流したか) を返す。合流しない場合は producer で生成を開始する"""
+        flight = self._flights.get(key)
+        if flight is not None:
+            return flight.subscribe(), True
+
+        flight = _Flight()
+        self._flights[key] = flight
+        task = asyncio.create_task(self._run(key, flight, producer()))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return flight.subscribe(), False
+
+    async def _run(self, key: str, flight: _Flight, events: AsyncIterator[str]) -> None:
+        try:
+            async for event in events:
+                await flight.publish(event)
+        except Exception:
+            logger.error("合流対象の文書生成でエラーが発生しました", exc_info=True)
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            await flight.finish()
+
+    async def drain(self, timeout: float) -> None:
+        """実行中の生成の完了を timeout 秒まで待ち、残りは取り消して終了処理（利用枠の確定・取り消し）を待つ"""
+        tasks = set(self._tasks)
+        if not tasks:
+            return
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        if pending:
+            logger.warning("終了時に完了しなかった合流対象の文書生成を取り消します: %d件", len(pending))
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def in_flight(self) -> int:
+        """実行中の生成の件数"""
+        return len(self._flights)
+
+
+@lru_cache
+def get_single_flight() -> SingleFlight:
+    """プロセス共有の生成の合流レジストリを取得"""
+    return SingleFlight()
@@ -2,7 +2,7 @@ import asyncio
 import json
 import logging
 import time
-from collections.abc import Callable
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
 from typing import Any, AsyncGenerator
 
 from app.core.constants import MESSAGES
@@ -14,15 +14,19 @@ def sse_event(event_type: str, data: dict[str, Any]) -> str:
 
 
 async def stream_with_heartbeat(
-    sync_func: Callable[..., tuple[str, int, int]],
-    sync_func_args: tuple[Any, ...],
+    func: Callable[..., Awaitable[tuple[str, int, int]]],
+    func_args: tuple[Any, ...],
     start_message: str,
     running_status: str,
     running_message: str,
     elapsed_message_template: str,
     heartbeat_interval: int = 5,
+    on_error: Callable[[], None] | None = None,
 ) -> AsyncGenerator[tuple[str, int, int] | str, None]:
-    """ハートビート付きでスレッドプール上の同期処理を実行"""
+    """ハートビート付きで非同期処理を実行
+
+    on_error を指定すると、処理が例外で失敗したときに error イベントの送信前に呼び出す。
+    """
     yield sse_event(
         "progress",
         {
@@ -36,11 +40,13 @@ async def stream_with_heartbeat(
 
     async def _task() -> None:
         try:
-            result = await asyncio.to_thread(sync_func, *sync_func_args)
+            result = await func(*func_args)
             await queue.put(("result", result))
         except Exception as e:
             # 例外詳細はサーバーログのみに記録し、クライアントには定型メッセージを返す
             logging.error(f"Task error: {e}", exc_info=True)
+            if on_error is not None:
+                on_error()
             await queue.put(("error", MESSAGES["ERROR"]["API_ERROR"]))
 
     task = asyncio.create_task(_task())
@@ -94,3 +100,104 @@ async def stream_with_heartbeat(
         yield msg_data
     except asyncio.QueueEmpty:
         pass
+
+
+async def stream_deltas_with_heartbeat(
+    gen_func: Callable[..., AsyncIterator[str | dict[str, Any]]],
+    gen_args: tuple[Any, ...],
+    start_message: str,
+    running_status: str,
+    running_message: str,
+    elapsed_message_template: str,
+    heartbeat_interval: int = 5,
+    on_delta: Callable[[str], Iterable[str]] | None = None,
+    on_error: Callable[[], None] | None = None,
+) -> AsyncGenerator[tuple[str, int, int] | str, None]:
+    """非同期ストリームを差分(delta)イベントとして逐次送信
+
+    非同期ジェネレータは文字列チャンクと、最後に使用量メタデータ(dict)を返す。
+    on_delta を指定すると差分ごとに呼び出し、返されたSSEイベントを delta の直後に送信する。
+    on_error を指定すると、ストリームが例外で失敗したときに error イベントの送信前に呼び出す。
+    全チャンク受信後に (全文, 入力トークン数, 出力トークン数) を yield する。
+    """
+    yield sse_event(
+        "progress",
+        {
+            "status": "starting",
+            "message": start_message,
+        },
+    )
+
+    start_time = time.time()
+    queue: asyncio.Queue[tuple[str, Any]] = asyncio.Queue()
+
+    async def _task() -> None:
+        try:
+            async for item in gen_func(*gen_args):
+                await queue.put(("chunk", item))
+            await queue.put(("done", None))
+        except Exception as e:
+            # 例外詳細はサーバーログのみに記録し、クライアントには定型メッセージを返す
+            logging.error(f"Task error: {e}", exc_info=True)
+            if on_error is not None:
+                on_error()
+            await queue.put(("error", MESSAGES["ERROR"]["API_ERROR"]))
+
+    task = asyncio.create_task(_task())
+
+    yield sse_event(
+        "progress",
+        {
+            "status": running_status,
+            "message": running_message,
+        },
+    )
+
+    chunks: list[str] = []
+    metadata: dict[str, Any] = {}
+    try:
+        while True:
+            try:
+                msg_type, msg_data = await asyncio.wait_for(
+                    queue.get(), timeout=heartbeat_interval
+                )
+            except asyncio.TimeoutError:
+                elapsed = int(time.time() - start_time)
+                yield sse_event(
+                    "progress",
+                    {
+                        "status": running_status,
+                        "message": elapsed_message_template.format(elapsed=elapsed),
+                    },
+                )
+                continue
+
+            if msg_type == "chunk":
+                if isinstance(msg_data, dict):
+                    metadata = msg_data
+                elif msg_data:
+                    chunks.append(msg_data)
+                    yield sse_event("delta", {"text": msg_data})
+                    if on_delta is not None:
+                        for event in on_delta(msg_data):
+                            yield event
+            elif msg_type == "error":
+                yield sse_event(
+                    "error",
+                    {
+                        "success": False,
+                        "error_message": msg_data,
+                    },
+                )
+                return
+            else:
+                yield (
+                    "".join(chunks),
+                    metadata.get("input_tokens", 0),
+                    metadata.get("output_tokens", 0),
+                )
+                return
+    finally:
+        # クライアント切断時はタスクを取り消し、プロバイダーのストリームを閉じる
+        if not task.done():
+            task.cancel()
@@ -1,14 +1,32 @@
-from datetime import datetime, timedelta
+import base64
+import csv
+import io
+import json
+import math
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any
 from zoneinfo import ZoneInfo
 
-from sqlalchemy import desc, func
+from sqlalchemy import and_, case, func, or_
 from sqlalchemy.orm import Session
 
 from app.core.constants import DEFAULT_STATISTICS_PERIOD_DAYS, MESSAGES
-from app.models.usage import SummaryUsage
+from app.core.database import get_db_session
+from app.models.usage import (
+    PROCESSING_TIME_BUCKETS,
+    DailyUsageRollup,
+    HourlyUsageRollup,
+    SummaryUsage,
+)
+from app.services.usage_rollup import HISTOGRAM_COLUMNS, to_jst
 
 JST = ZoneInfo("Asia/Tokyo")
 
+# 集計テーブル, バケットの列, 期間の開始, 期間の終了（時間別は datetime、日別は date）
+_RollupSource = tuple[type[HourlyUsageRollup] | type[DailyUsageRollup], Any, Any, Any]
+
 
 def _apply_default_period(
     start_date: datetime | None,
@@ -23,42 +41,165 @@ def _apply_default_period(
     return start_date, end_date
 
 
+@dataclass(frozen=True)
+class _RollupPlan:
+    """期間を集計テーブルと生データに振り分けた結果
+
+    raw_ranges は (開始, 終了, 終了を含むか)。hourly_ranges は [開始, 終了) の時間範囲。
+    daily_range は [開始日, 終了日) の日付範囲。
+    """
+
+    raw_ranges: list[tuple[datetime, datetime, bool]]
+    hourly_ranges: list[tuple[datetime, datetime]]
+    daily_range: tuple[date, date] | None
+
+
+def _floor_hour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def _ceil_hour(value: datetime) -> datetime:
+    floor = _floor_hour(value)
+    return floor if floor == value else floor + timedelta(hours=1)
+
+
+def _day_start(value: date) -> datetime:
+    return datetime(value.year, value.month, value.day, tzinfo=JST)
+
+
+def _plan_rollup_query(start_date: datetime, end_date: datetime) -> _RollupPlan:
+    """[start_date, end_date] を日別・時間別の集計テーブルで賄える範囲と端数に分割"""
+    start = to_jst(start_date)
+    end = to_jst(end_date)
+    first_hour = _ceil_hour(start)
+    last_hour = _floor_hour(end)
+    if first_hour >= last_hour:
+        return _RollupPlan([(start, end, True)], [], None)
+
+    raw_ranges = [(start, first_hour, False), (last_hour, end, True)]
+    first_day = first_hour.date() if first_hour.hour == 0 else first_hour.date() + timedelta(days=1)
+    last_day = last_hour.date()
+    if first_day >= last_day:
+        return _RollupPlan(raw_ranges, [(first_hour, last_hour)], None)
+
+    hourly_ranges = [
+        (first_hour, _day_start(first_day)),
+        (_day_start(last_day), last_hour),
+    ]
+    return _RollupPlan(
+        raw_ranges,
+        [(lo, hi) for lo, hi in hourly_ranges if lo < hi],
+        (first_day, last_day),
+    )
+
+
+def _collect_usage(
+    db: Session,
+    start_date: datetime,
+    end_date: datetime,
+    model: str | None,
+    document_type: str | None,
+    by_document: bool,
+) -> dict[tuple, list]:
+    """期間内の使用量を集計テーブルと端数の生データから合算
+
+    値は [件数, 入力トークン, 出力トークン, キャッシュ読み取りトークン, キャッシュ書き込みトークン,
+    処理時間の件数, 処理時間の合計]。
+    by_document が True の場合は (文書タイプ, 診療科, 医師) ごと、False の場合は全体を () に集計する。
+    """
+    plan = _plan_rollup_query(start_date, end_date)
+    totals: dict[tuple, list] = {}
+
+    def merge(rows) -> None:
+        for row in rows:
+            key = tuple(value or "" for value in row[:3]) if by_document else ()
+            current = totals.setdefault(key, [0, 0, 0, 0, 0, 0, 0.0])
+            for i, value in enumerate(row[-7:]):
+                current[i] += value or 0
+
+    for lo, hi, inclusive in plan.raw_ranges:
+        dimensions = (
+            [SummaryUsage.document_type, SummaryUsage.department, SummaryUsage.doctor]
+            if by_document
+            else []
+        )
+        query = db.query(
+            *dimensions,
+            func.count(SummaryUsage.id),
+            func.sum(SummaryUsage.input_tokens),
+            func.sum(SummaryUsage.output_tokens),
+            func.sum(SummaryUsage.cache_read_input_tokens),
+            func.sum(SummaryUsage.cache_creation_input_tokens),
+            func.count(SummaryUsage.processing_time),
+            func.sum(SummaryUsage.processing_time),
+        ).filter(
+            SummaryUsage.date >= lo,
+            SummaryUsage.date <= hi if inclusive else SummaryUsage.date < hi,
+        )
+        if model:
+            query = query.filter(SummaryUsage.model == model)
+        if document_type:
+            query = query.filter(SummaryUsage.document_type == document_type)
+        merge(query.group_by(*dimensions).all() if dimensions else query.all())
+
+    sources: list[_RollupSource] = [
+        (HourlyUsageRollup, HourlyUsageRollup.bucket_start, lo, hi)
+        for lo, hi in plan.hourly_ranges
+    ]
+    if plan.daily_range:
+        sources.append((DailyUsageRollup, DailyUsageRollup.bucket_date, *plan.daily_range))
+    for entity, bucket, lo, hi in sources:
+        dimensions = (
+            [entity.document_type, entity.department, entity.doctor] if by_document else []
+        )
+        query = db.query(
+            *dimensions,
+            func.sum(entity.request_count),
+            func.sum(entity.input_tokens),
+            func.sum(entity.output_tokens),
+            func.sum(entity.cache_read_input_tokens),
+            func.sum(entity.cache_creation_input_tokens),
+            func.sum(entity.processing_time_count),
+            func.sum(entity.processing_time_sum),
+        ).filter(bucket >= lo, bucket < hi)
+        if model:
+            query = query.filter(entity.model == model)
+        if document_type:
+            query = query.filter(entity.document_type == document_type)
+        merge(query.group_by(*dimensions).all() if dimensions else query.all())
+
+    return {key: value for key, value in totals.items() if value[0]}
+
+
 def get_usage_summary(
     db: Session,
     start_date: datetime | None = None,
     end_date: datetime | None = None,
     model: str | None = None,
 ) -> dict:
-    """使用統計サマリを取得"""
+    """使用統計サマリを取得（集計テーブルと期間端数の生データから算出）"""
     start_date, end_date = _apply_default_period(start_date, end_date)
 
-    query = db.query(
-        func.count(SummaryUsage.id),
-        func.sum(SummaryUsage.input_tokens),
-        func.sum(SummaryUsage.output_tokens),
-        func.avg(SummaryUsage.processing_time),
-    )
-
-    query = query.filter(SummaryUsage.date >= start_date)
-    query = query.filter(SummaryUsage.date <= end_date)
-    if model:
-        query = query.filter(SummaryUsage.model == model)
-
-    stats = query.first()
-
-    if stats is None:
-        return {
-            "total_count": 0,
-            "total_input_tokens": 0,
-            "total_output_tokens": 0,
-            "average_processing_time": 0.0,
-        }
+    totals = _collect_usage(db, start_date, end_date, model, None, by_document=False)
+    (
+        count,
+        input_tokens,
+        output_tokens,
+        cache_read_tokens,
+        cache_creation_tokens,
+        processing_count,
+        processing_sum,
+    ) = totals.get((), [0, 0, 0, 0, 0, 0, 0.0])
 
     return {
-        "total_count": int(stats[0]) if stats[0] is not None else 0,
-        "total_input_tokens": int(stats[1]) if stats[1] is not None else 0,
-        "total_output_tokens": int(stats[2]) if stats[2] is not None else 0,
-        "average_processing_time": round(float(stats[3]), 2) if stats[3] is not None else 0.0,
+        "total_count": int(count),
+        "total_input_tokens": int(input_tokens),
+        "total_output_tokens": int(output_tokens),
+        "total_cache_read_input_tokens": int(cache_read_tokens),
+        "total_cache_creation_input_tokens": int(cache_creation_tokens),
+        "average_processing_time": (
+            round(float(processing_sum) / processing_count, 2) if processing_count else 0.0
+        ),
     }
 
 
@@ -69,56 +210,200 @@ def get_aggregated_records(
     model: str | None = None,
     document_type: str | None = None,
 ) -> list[dict]:
-    """文書別集計統計データを取得"""
+    """文書別集計統計データを取得（集計テーブルと期間端数の生データから算出）"""
     start_date, end_date = _apply_default_period(start_date, end_date)
 
-    query = db.query(
-        SummaryUsage.document_type,
-        SummaryUsage.department,
-        SummaryUsage.doctor,
-        func.count(SummaryUsage.id).label("count"),
-        func.sum(SummaryUsage.input_tokens).label("input_tokens"),
-        func.sum(SummaryUsage.output_tokens).label("output_tokens"),
-    )
-
-    query = query.filter(SummaryUsage.date >= start_date)
-    query = query.filter(SummaryUsage.date <= end_date)
-    if model:
-        query = query.filter(SummaryUsage.model == model)
-    if document_type:
-        query = query.filter(SummaryUsage.document_type == document_type)
-
-    results = (
-        query.group_by(
-            SummaryUsage.document_type, SummaryUsage.department, SummaryUsage.doctor
-        )
-        .order_by(desc("count"))
-        .all()
-    )
+    totals = _collect_usage(db, start_date, end_date, model, document_type, by_document=True)
+    results = sorted(totals.items(), key=lambda item: item[1][0], reverse=True)
 
     return [
         {
-            "document_type": r.document_type or "-",
-            "department": MESSAGES["INFO"]["DEFAULT_DEPARTMENT_LABEL"] if r.department == "default" else (r.department or MESSAGES["INFO"]["DEFAULT_DEPARTMENT_LABEL"]),
-            "doctor": MESSAGES["INFO"]["DEFAULT_DOCTOR_LABEL"] if r.doctor == "default" else (r.doctor or MESSAGES["INFO"]["DEFAULT_DOCTOR_LABEL"]),
-            "count": r.count,
-            "input_tokens": r.input_tokens or 0,
-            "output_tokens": r.output_tokens or 0,
+            "document_type": doc_type or "-",
+            "department": MESSAGES["INFO"]["DEFAULT_DEPARTMENT_LABEL"] if department in ("default", "") else department,
+            "doctor": MESSAGES["INFO"]["DEFAULT_DOCTOR_LABEL"] if doctor in ("default", "") else doctor,
+            "count": int(values[0]),
+            "input_tokens": int(values[1]),
+            "output_tokens": int(values[2]),
+            "cache_read_input_tokens": int(values[3]),
+            "cache_creation_input_tokens": int(values[4]),
         }
-        for r in results
+        for (doc_type, department, doctor), values in results
     ]
 
 
-def get_usage_records(
+LATENCY_PERCENTILES = (50, 90, 99)
+
+
+@dataclass
+class _LatencyTotals:
+    """処理時間の件数・合計・最小・最大と累積ヒストグラム（最小・最大は count が0の間は±inf）"""
+
+    count: int = 0
+    total: float = 0.0
+    minimum: float = math.inf
+    maximum: float = -math.inf
+    cumulative: list[int] = field(default_factory=lambda: [0] * len(PROCESSING_TIME_BUCKETS))
+
+    def merge(self, count, total, minimum, maximum, cumulative) -> None:
+        if not count:
+            return
+        self.count += int(count)
+        self.total += float(total or 0)
+        if minimum is not None:
+            self.minimum = min(self.minimum, float(minimum))
+        if maximum is not None:
+            self.maximum = max(self.maximum, float(maximum))
+        for i, value in enumerate(cumulative):
+            self.cumulative[i] += int(value or 0)
+
+    def percentile(self, percent: float) -> float:
+        """ヒストグラムのバケット内を線形補間して百分位数を推定（最小・最大の範囲に収める）"""
+        rank = self.count * percent / 100
+        edges = [*PROCESSING_TIME_BUCKETS, self.maximum]
+        counts = [*self.cumulative, self.count]
+        lower, below = self.minimum, 0
+        for upper, cumulative in zip(edges, counts):
+            upper = min(upper, self.maximum)
+            if cumulative >= rank and cumulative > below:
+                fraction = (rank - below) / (cumulative - below)
+                value = lower + (upper - lower) * fraction
+                return round(min(max(value, self.minimum), self.maximum), 2)
+            lower, below = max(upper, self.minimum), cumulative
+        return round(self.maximum, 2)
+
+    def histogram(self) -> list[dict]:
+        """バケットごとの件数（le が None のバケットは最大の境界値を超えたもの）"""
+        buckets = []
+        below = 0
+        for bound, cumulative in zip(PROCESSING_TIME_BUCKETS, self.cumulative):
+            buckets.append({"le": float(bound), "count": cumulative - below})
+            below = cumulative
+        buckets.append({"le": None, "count": self.count - below})
+        return buckets
+
+
+def _collect_latency(
+    db: Session,
+    start_date: datetime,
+    end_date: datetime,
+    model: str | None,
+    document_type: str | None,
+) -> dict[tuple[str, str], _LatencyTotals]:
+    """期間内の処理時間を (モデル, 文書タイプ) ごとに集計テーブルと端数の生データから合算"""
+    plan = _plan_rollup_query(start_date, end_date)
+    totals: dict[tuple[str, str], _LatencyTotals] = {}
+
+    def merge(rows) -> None:
+        for row_model, row_document_type, count, total, minimum, maximum, *cumulative in rows:
+            key = (row_model or "", row_document_type or "")
+            totals.setdefault(key, _LatencyTotals()).merge(
+                count, total, minimum, maximum, cumulative
+            )
+
+    processing_time = SummaryUsage.processing_time
+    for lo, hi, inclusive in plan.raw_ranges:
+        query = db.query(
+            SummaryUsage.model,
+            SummaryUsage.document_type,
+            func.count(processing_time),
+            func.sum(processing_time),
+            func.min(processing_time),
+            func.max(processing_time),
+            *(
+                func.sum(case((processing_time <= bound, 1), else_=0))
+                for bound in PROCESSING_TIME_BUCKETS
+            ),
+        ).filter(
+            SummaryUsage.date >= lo,
+            SummaryUsage.date <= hi if inclusive else SummaryUsage.date < hi,
+            processing_time.is_not(None),
+        )
+        if model:
+            query = query.filter(SummaryUsage.model == model)
+        if document_type:
+            query = query.filter(SummaryUsage.document_type == document_type)
+        merge(query.group_by(SummaryUsage.model, SummaryUsage.document_type).all())
+
+    sources: list[_RollupSource] = [
+        (HourlyUsageRollup, HourlyUsageRollup.bucket_start, lo, hi)
+        for lo, hi in plan.hourly_ranges
+    ]
+    if plan.daily_range:
+        sources.append((DailyUsageRollup, DailyUsageRollup.bucket_date, *plan.daily_range))
+    for entity, bucket, lo, hi in sources:
+        query = db.query(
+            entity.model,
+            entity.document_type,
+            func.sum(entity.processing_time_count),
+            func.sum(entity.processing_time_sum),
+            func.min(entity.processing_time_min),
+            func.max(entity.processing_time_max),
+            *(func.sum(getattr(entity, column)) for column in HISTOGRAM_COLUMNS),
+        ).filter(bucket >= lo, bucket < hi)
+        if model:
+            query = query.filter(entity.model == model)
+        if document_type:
+            query = query.filter(entity.document_type == document_type)
+        merge(query.group_by(entity.model, entity.document_type).all())
+
+    return {key: value for key, value in totals.items() if value.count}
+
+
+def get_latency_statistics(
     db: Session,
     start_date: datetime | None = None,
     end_date: datetime | None = None,
     model: str | None = None,
     document_type: str | None = None,
-    limit: int = 100,
-    offset: int = 0,
-) -> list[SummaryUsage]:
-    """使用統計レコードを取得"""
+) -> list[dict]:
+    """モデル・文書タイプ別の処理時間の百分位数とヒストグラムを取得
+
+    百分位数は集計テーブルのヒストグラム（PROCESSING_TIME_BUCKETS）から推定するため、
+    バケット幅の範囲で誤差がある。
+    """
+    start_date, end_date = _apply_default_period(start_date, end_date)
+
+    totals = _collect_latency(db, start_date, end_date, model, document_type)
+    results = sorted(totals.items(), key=lambda item: item[1].count, reverse=True)
+
+    return [
+        {
+            "model": row_model or "-",
+            "document_type": row_document_type or "-",
+            "count": latency.count,
+            "average": round(latency.total / latency.count, 2),
+            "min": round(latency.minimum, 2),
+            "max": round(latency.maximum, 2),
+            **{f"p{percent}": latency.percentile(percent) for percent in LATENCY_PERCENTILES},
+            "histogram": latency.histogram(),
+        }
+        for (row_model, row_document_type), latency in results
+    ]
+
+
+def encode_records_cursor(record: SummaryUsage) -> str:
+    """レコードの (日時, ID) を次ページ取得用のカーソル文字列に変換"""
+    payload = json.dumps([record.date.isoformat(), record.id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_records_cursor(cursor: str) -> tuple[datetime, int]:
+    """カーソル文字列を (日時, ID) に戻す。不正な値は ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        date_text, record_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(date_text), int(record_id)
+    except Exception as e:
+        raise ValueError(MESSAGES["ERROR"]["INVALID_CURSOR"]) from e
+
+
+def _filtered_records_query(
+    db: Session,
+    start_date: datetime | None,
+    end_date: datetime | None,
+    model: str | None,
+    document_type: str | None,
+):
     start_date, end_date = _apply_default_period(start_date, end_date)
 
     query = db.query(SummaryUsage)
@@ -129,5 +414,110 @@ def get_usage_records(
         query = query.filter(SummaryUsage.model == model)
     if document_type:
         query = query.filter(SummaryUsage.document_type == document_type)
+    return query
+
+
+def get_usage_records(
+    db: Session,
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+    model: str | None = None,
+    document_type: str | None = None,
+    limit: int = 100,
+    offset: int = 0,
+    cursor: tuple[datetime, int] | None = None,
+) -> list[SummaryUsage]:
+    """使用統計レコードを新しい順に取得
+
+    cursor を指定した場合は (日時, ID) がそれより前のレコードから取得する（offset は無視）。
+    """
+    query = _filtered_records_query(db, start_date, end_date, model, document_type)
+    if cursor is not None:
+        cursor_date, cursor_id = cursor
+        query = query.filter(
+            or_(
+                SummaryUsage.date < cursor_date,
+                and_(SummaryUsage.date == cursor_date, SummaryUsage.id < cursor_id),
+            )
+        )
+        offset = 0
+
+    return (
+        query.order_by(SummaryUsage.date.desc(), SummaryUsage.id.desc())
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+
+
+EXPORT_COLUMNS = (
+    "id",
+    "date",
+    "app_type",
+    "document_type",
+    "model",
+    "department",
+    "doctor",
+    "input_tokens",
+    "output_tokens",
+    "cache_read_input_tokens",
+    "cache_creation_input_tokens",
+    "processing_time",
+)
+
+
+def _export_values(record: SummaryUsage) -> list:
+    values = [getattr(record, column) for column in EXPORT_COLUMNS]
+    values[1] = record.date.isoformat() if record.date is not None else None
+    return values
+
+
+def iter_usage_export(
+    export_format: str,
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+    model: str | None = None,
+    document_type: str | None = None,
+    batch_size: int = 1000,
+) -> Iterator[str]:
+    """使用統計レコードを古い順に CSV / NDJSON の断片として返す
+
+    サーバーサイドカーソル（yield_per）で batch_size 件ずつ読み込み、件数によらずメモリ使用量を一定に保つ。
+    ストリーミング中に使うためセッションは自前で開く。
+    """
+    with get_db_session() as db:
+        query = (
+            _filtered_records_query(db, start_date, end_date, model, document_type)
+            .order_by(SummaryUsage.date, SummaryUsage.id)
+            .yield_per(batch_size)
+        )
+
+        buffer = io.StringIO()
+        if export_format == "csv":
+            writer = csv.writer(buffer, lineterminator="\n")
+            writer.writerow(EXPORT_COLUMNS)
+
+            def write(record: SummaryUsage) -> None:
+                writer.writerow(_export_values(record))
+        else:
+
+            def write(record: SummaryUsage) -> None:
+                buffer.write(
+                    json.dumps(
+                        dict(zip(EXPORT_COLUMNS, _export_values(record))),
+                        ensure_ascii=False,
+                    )
+                )
+                buffer.write("\n")
 
-    return query.order_by(SummaryUsage.date.desc()).offset(offset).limit(limit).all()
+        pending = 0
+        for record in query:
+            write(record)
+            pending += 1
+            if pending >= batch_size:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+        if buffer.tell():
+            yield buffer.getvalue()
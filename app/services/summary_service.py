@@ -1,20 +1,35 @@
+import asyncio
 import logging
 import time
+from collections.abc import AsyncIterator
 from typing import AsyncGenerator
 
 from app.core.config import get_settings
 from app.core.constants import MESSAGES, get_message
+from app.core.metrics import GENERATION_FAILURES, MODEL_SWITCHES, observe_generation
 from app.external.api_factory import (
-    generate_summary_with_provider,
-    generate_summary_stream_with_provider,
+    generate_summary_stream_with_provider_async,
+    generate_summary_with_provider_async,
 )
 from app.schemas.summary import SummaryResponse
+from app.services.generation_context import GenerationContext, load_generation_context
 from app.services.model_selector import determine_model, get_provider_and_model
-from app.services.sse_helpers import sse_event, stream_with_heartbeat
-from app.services.usage_service import check_daily_limit, save_usage
+from app.services.result_cache import CachedResult, get_result_cache, result_cache_key
+from app.services.single_flight import get_single_flight
+from app.services.sse_helpers import (
+    sse_event,
+    stream_deltas_with_heartbeat,
+    stream_with_heartbeat,
+)
+from app.services.usage_service import release_daily_quota, save_usage
 from app.utils.audit_logger import log_audit_event
 from app.utils.input_sanitizer import sanitize_medical_text, validate_medical_input
-from app.utils.text_processor import format_output_summary, parse_output_summary
+from app.utils.timing import StageTimer
+from app.utils.text_processor import (
+    IncrementalSectionParser,
+    format_output_summary,
+    parse_output_summary,
+)
 
 settings = get_settings()
 
@@ -37,6 +52,83 @@ def _error_response(
     )
 
 
+def _finish_timings(timer: StageTimer, request_started: float) -> dict[str, float]:
+    """リクエスト全体の所要時間を加え、処理段階ごとの所要時間（ミリ秒）を返す"""
+    timer.add("total", time.perf_counter() - request_started)
+    return timer.as_dict()
+
+
+def _request_key(
+    document_type: str,
+    model: str,
+    context: GenerationContext,
+    *texts: str,
+) -> str:
+    """同一リクエストの判定に用いるキー（生成結果キャッシュと実行中の生成への合流で共用）"""
+    return result_cache_key(document_type, model, context.prompt, *texts)
+
+
+async def _release_quota(context: GenerationContext) -> None:
+    """使用量を保存しなかった日次利用枠の予約を取り消す（DB更新のためイベントループ外で実行）"""
+    if context.reservation is not None and not context.reservation.settled:
+        await asyncio.to_thread(release_daily_quota, context.reservation)
+
+
+async def _get_cached_result(key: str, timer: StageTimer) -> CachedResult | None:
+    if not settings.result_cache_enabled:
+        return None
+    with timer.stage("result_cache"):
+        return await asyncio.to_thread(get_result_cache().get, key)
+
+
+async def _put_cached_result(
+    key: str, output_summary: str, parsed_summary: dict[str, str], timer: StageTimer
+) -> None:
+    if not settings.result_cache_enabled:
+        return
+    with timer.stage("result_cache"):
+        await asyncio.to_thread(
+            get_result_cache().put, key, CachedResult(output_summary, parsed_summary)
+        )
+
+
+def _cached_response(
+    cached: CachedResult,
+    model: str,
+    model_switched: bool,
+    timer: StageTimer,
+    request_started: float,
+    user_ip: str | None,
+    document_type: str,
+) -> SummaryResponse:
+    """キャッシュした生成結果の応答（トークンは消費していないため0）"""
+    processing_time = time.perf_counter() - request_started
+    timings = _finish_timings(timer, request_started)
+    log_audit_event(
+        event_type=get_message("AUDIT", "DOCUMENT_GENERATION_SUCCESS"),
+        user_ip=user_ip,
+        document_type=document_type,
+        model=model,
+        input_tokens=0,
+        output_tokens=0,
+        processing_time=processing_time,
+        timings=timings,
+        cached=True,
+    )
+    return SummaryResponse(
+        success=True,
+        output_summary=cached.output_summary,
+        parsed_summary=cached.parsed_summary,
+        input_tokens=0,
+        output_tokens=0,
+        processing_time=processing_time,
+        model_used=model,
+        model_switched=model_switched,
+        timings=timings,
+        cached=True,
+    )
+
+
 def validate_input(medical_text: str) -> tuple[bool, str | None]:
     """テキスト入力検証（長さチェックとプロンプトインジェクション検出）"""
     if not medical_text or not medical_text.strip():
@@ -58,7 +150,33 @@ def validate_input(medical_text: str) -> tuple[bool, str | None]:
     return True, None
 
 
-def execute_summary_generation(
+def _sanitize_and_validate(
+    timer: StageTimer,
+    medical_text: str,
+    additional_info: str,
+    current_prescription: str,
+    previous_summary: str,
+    evaluation_feedback: str,
+) -> tuple[tuple[str, str, str, str, str], bool, str | None]:
+    """サニタイズ後の (カルテ, 追加情報, 処方, 前回文書, 評価フィードバック) と検証結果を返す
+
+    長い入力の検証を含むため、asyncio.to_thread で呼び出す。
+    """
+    with timer.stage("sanitize"):
+        texts = (
+            sanitize_medical_text(medical_text),
+            sanitize_medical_text(additional_info or ""),
+            sanitize_medical_text(current_prescription or ""),
+            sanitize_medical_text(previous_summary or ""),
+            sanitize_medical_text(evaluation_feedback or ""),
+        )
+
+    with timer.stage("validate_input"):
+        is_valid, error_msg = validate_input(texts[0])
+    return texts, is_valid, error_msg
+
+
+async def execute_summary_generation(
     medical_text: str,
     additional_info: str,
     current_prescription: str,
@@ -73,6 +191,8 @@ def execute_summary_generation(
     evaluation_feedback: str = "",
 ) -> SummaryResponse:
     """文書生成を実行"""
+    request_started = time.perf_counter()
+
     # 監査ログ: 開始
     log_audit_event(
         event_type=get_message("AUDIT", "DOCUMENT_GENERATION_START"),
@@ -83,135 +203,201 @@ def execute_summary_generation(
         doctor=doctor,
     )
 
-    # 日次利用制限チェック
-    limit_error = check_daily_limit()
-    if limit_error:
-        return _error_response(limit_error, model)
-
-    # サニタイゼーション適用
-    medical_text = sanitize_medical_text(medical_text)
-    additional_info = sanitize_medical_text(additional_info or "")
-    current_prescription = sanitize_medical_text(current_prescription or "")
-    previous_summary = sanitize_medical_text(previous_summary or "")
-    evaluation_feedback = sanitize_medical_text(evaluation_feedback or "")
+    # プロンプトの解決と日次利用枠の予約を1回のDBセッションで実行
+    load_started = time.perf_counter()
+    context = await asyncio.to_thread(
+        load_generation_context,
+        department,
+        document_type,
+        doctor,
+        _estimate_input_tokens(
+            medical_text,
+            additional_info,
+            current_prescription,
+            previous_summary,
+            evaluation_feedback,
+        ),
+    )
+    timer = context.timer
+    timer.add("load_context", time.perf_counter() - load_started)
+    if context.daily_limit_error:
+        return _error_response(context.daily_limit_error, model)
 
-    # 入力検証
-    is_valid, error_msg = validate_input(medical_text)
-    if not is_valid:
-        log_audit_event(
-            event_type=get_message("AUDIT", "DOCUMENT_GENERATION_FAILURE"),
-            user_ip=user_ip,
-            document_type=document_type,
-            model=model,
-            success=False,
-            error_message=error_msg or MESSAGES["ERROR"]["INPUT_ERROR"],
+    try:
+        # サニタイゼーションと入力検証
+        texts, is_valid, error_msg = await asyncio.to_thread(
+            _sanitize_and_validate,
+            timer,
+            medical_text,
+            additional_info,
+            current_prescription,
+            previous_summary,
+            evaluation_feedback,
         )
-        return _error_response(error_msg or MESSAGES["ERROR"]["INPUT_ERROR"], model)
+        (
+            medical_text,
+            additional_info,
+            current_prescription,
+            previous_summary,
+            evaluation_feedback,
+        ) = texts
+        if not is_valid:
+            log_audit_event(
+                event_type=get_message("AUDIT", "DOCUMENT_GENERATION_FAILURE"),
+                user_ip=user_ip,
+                document_type=document_type,
+                model=model,
+                success=False,
+                error_message=error_msg or MESSAGES["ERROR"]["INPUT_ERROR"],
+            )
+            return _error_response(error_msg or MESSAGES["ERROR"]["INPUT_ERROR"], model)
+
+        # モデル決定
+        total_length = len(medical_text) + len(additional_info or "")
+        try:
+            with timer.stage("determine_model"):
+                final_model, model_switched = determine_model(
+                    model,
+                    total_length,
+                    department,
+                    document_type,
+                    doctor,
+                    model_explicitly_selected,
+                    context,
+                )
+        except ValueError as e:
+            log_audit_event(
+                event_type=get_message("AUDIT", "DOCUMENT_GENERATION_FAILURE"),
+                user_ip=user_ip,
+                document_type=document_type,
+                model=model,
+                success=False,
+                error_message=type(e).__name__,
+            )
+            return _error_response(str(e), model)
 
-    # モデル決定
-    total_length = len(medical_text) + len(additional_info or "")
-    try:
-        final_model, model_switched = determine_model(
-            model,
-            total_length,
-            department,
+        if model_switched:
+            MODEL_SWITCHES.inc(from_model=model, to_model=final_model)
+
+        # プロバイダーとモデル名を取得
+        try:
+            provider, model_name = get_provider_and_model(final_model)
+        except ValueError as e:
+            log_audit_event(
+                event_type=get_message("AUDIT", "DOCUMENT_GENERATION_FAILURE"),
+                user_ip=user_ip,
+                document_type=document_type,
+                model=final_model,
+                success=False,
+                error_message=type(e).__name__,
+            )
+            return _error_response(str(e), final_model, model_switched)
+
+        request_key = _request_key(
             document_type,
-            doctor,
-            model_explicitly_selected,
-        )
-    except ValueError as e:
-        log_audit_event(
-            event_type=get_message("AUDIT", "DOCUMENT_GENERATION_FAILURE"),
-            user_ip=user_ip,
-            document_type=document_type,
-            model=model,
-            success=False,
-            error_message=type(e).__name__,
+            final_model,
+            context,
+            medical_text,
+            additional_info,
+            current_prescription,
+            referral_purpose,
+            previous_summary,
+            evaluation_feedback,
         )
-        return _error_response(str(e), model)
+        cached = await _get_cached_result(request_key, timer)
+        if cached is not None:
+            return _cached_response(
+                cached, final_model, model_switched, timer, request_started, user_ip, document_type
+            )
 
-    # プロバイダーとモデル名を取得
-    try:
-        provider, model_name = get_provider_and_model(final_model)
-    except ValueError as e:
-        log_audit_event(
-            event_type=get_message("AUDIT", "DOCUMENT_GENERATION_FAILURE"),
-            user_ip=user_ip,
-            document_type=document_type,
-            model=final_model,
-            success=False,
-            error_message=type(e).__name__,
-        )
-        return _error_response(str(e), final_model, model_switched)
+        start_time = time.time()
+        try:
+            output_summary, input_tokens, output_tokens = await generate_summary_with_provider_async(
+                provider=provider,
+                medical_text=medical_text,
+                additional_info=additional_info,
+                current_prescription=current_prescription,
+                department=department,
+                document_type=document_type,
+                doctor=doctor,
+                model_name=model_name,
+                referral_purpose=referral_purpose,
+                previous_summary=previous_summary,
+                evaluation_feedback=evaluation_feedback,
+                context=context,
+            )
+        except Exception as e:
+            # 例外詳細はサーバーログのみに記録（外部APIの例外文字列に入力断片が含まれる可能性があるため）
+            logger.error("文書生成API呼び出しエラー", exc_info=True)
+            timer.add("generation", time.time() - start_time)
+            GENERATION_FAILURES.inc(kind="summary", model=final_model)
+            log_audit_event(
+                event_type=get_message("AUDIT", "DOCUMENT_GENERATION_FAILURE"),
+                user_ip=user_ip,
+                document_type=document_type,
+                model=final_model,
+                success=False,
+                error_message=type(e).__name__,
+                timings=_finish_timings(timer, request_started),
+            )
+            return _error_response(
+                MESSAGES["ERROR"]["API_ERROR"], final_model, model_switched
+            )
 
-    start_time = time.time()
-    try:
-        output_summary, input_tokens, output_tokens = generate_summary_with_provider(
-            provider=provider,
-            medical_text=medical_text,
-            additional_info=additional_info,
-            current_prescription=current_prescription,
-            department=department,
-            document_type=document_type,
-            doctor=doctor,
-            model_name=model_name,
-            referral_purpose=referral_purpose,
-            previous_summary=previous_summary,
-            evaluation_feedback=evaluation_feedback,
-        )
-    except Exception as e:
-        # 例外詳細はサーバーログのみに記録（外部APIの例外文字列に入力断片が含まれる可能性があるため）
-        logger.error("文書生成API呼び出しエラー", exc_info=True)
+        processing_time = time.time() - start_time
+        timer.add("generation", processing_time)
+        observe_generation("summary", final_model, processing_time, input_tokens, output_tokens)
+
+        with timer.stage("format_output"):
+            formatted_summary = format_output_summary(output_summary)
+            parsed_summary = parse_output_summary(formatted_summary)
+
+        with timer.stage("save_usage"):
+            await asyncio.to_thread(
+                save_usage,
+                department=department,
+                doctor=doctor,
+                document_type=document_type,
+                model=final_model,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                processing_time=processing_time,
+                reservation=context.reservation,
+                cache_read_input_tokens=context.cache_usage.read_tokens,
+                cache_creation_input_tokens=context.cache_usage.creation_tokens,
+            )
+
+        await _put_cached_result(request_key, formatted_summary, parsed_summary, timer)
+
+        timings = _finish_timings(timer, request_started)
         log_audit_event(
-            event_type=get_message("AUDIT", "DOCUMENT_GENERATION_FAILURE"),
+            event_type=get_message("AUDIT", "DOCUMENT_GENERATION_SUCCESS"),
             user_ip=user_ip,
             document_type=document_type,
             model=final_model,
-            success=False,
-            error_message=type(e).__name__,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            processing_time=processing_time,
+            timings=timings,
         )
-        return _error_response(
-            MESSAGES["ERROR"]["API_ERROR"], final_model, model_switched
-        )
-
-    processing_time = time.time() - start_time
 
-    formatted_summary = format_output_summary(output_summary)
-    parsed_summary = parse_output_summary(formatted_summary)
-
-    save_usage(
-        department=department,
-        doctor=doctor,
-        document_type=document_type,
-        model=final_model,
-        input_tokens=input_tokens,
-        output_tokens=output_tokens,
-        processing_time=processing_time,
-    )
-
-    log_audit_event(
-        event_type=get_message("AUDIT", "DOCUMENT_GENERATION_SUCCESS"),
-        user_ip=user_ip,
-        document_type=document_type,
-        model=final_model,
-        input_tokens=input_tokens,
-        output_tokens=output_tokens,
-        processing_time=processing_time,
-    )
-
-    return SummaryResponse(
-        success=True,
-        output_summary=formatted_summary,
-        parsed_summary=parsed_summary,
-        input_tokens=input_tokens,
-        output_tokens=output_tokens,
-        processing_time=processing_time,
-        model_used=final_model,
-        model_switched=model_switched,
-    )
+        return SummaryResponse(
+            success=True,
+            output_summary=formatted_summary,
+            parsed_summary=parsed_summary,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            processing_time=processing_time,
+            model_used=final_model,
+            model_switched=model_switched,
+            timings=timings,
+        )
+    finally:
+        # 使用量を保存せずに終了した場合は予約を取り消す
+        await _release_quota(context)
 
 
-def _run_sync_generation(
+async def _run_generation(
     provider: str,
     medical_text: str,
     additional_info: str,
@@ -223,9 +409,10 @@ def _run_sync_generation(
     referral_purpose: str = "",
     previous_summary: str = "",
     evaluation_feedback: str = "",
+    context: GenerationContext | None = None,
 ) -> tuple[str, int, int]:
-    """同期ストリーミングジェネレータをスレッドプールで実行"""
-    stream = generate_summary_stream_with_provider(
+    """非同期ストリームを最後まで受信して全文と使用量を返す"""
+    stream = generate_summary_stream_with_provider_async(
         provider=provider,
         medical_text=medical_text,
         additional_info=additional_info,
@@ -237,10 +424,11 @@ def _run_sync_generation(
         referral_purpose=referral_purpose,
         previous_summary=previous_summary,
         evaluation_feedback=evaluation_feedback,
+        context=context,
     )
     chunks = []
     metadata = {}
-    for item in stream:
+    async for item in stream:
         if isinstance(item, dict):
             metadata = item
         else:
@@ -252,6 +440,159 @@ def _run_sync_generation(
     )
 
 
+def _estimate_input_tokens(*texts: str | None) -> int:
+    """日次利用枠の予約に用いる入力トークン数の見込み（入力文字数の合計）"""
+    return sum(len(text or "") for text in texts)
+
+
+def _section_events(sections: list[tuple[str, str]]) -> list[str]:
+    """完了したセクションをsectionイベントに変換"""
+    return [
+        sse_event("section", {"name": name, "content": content})
+        for name, content in sections
+    ]
+
+
+async def _stream_generation_events(
+    provider: str,
+    model_name: str,
+    final_model: str,
+    model_switched: bool,
+    medical_text: str,
+    additional_info: str,
+    current_prescription: str,
+    department: str,
+    doctor: str,
+    document_type: str,
+    referral_purpose: str,
+    previous_summary: str,
+    evaluation_feedback: str,
+    context: GenerationContext,
+    request_key: str,
+    request_started: float,
+    user_ip: str | None,
+) -> AsyncGenerator[str, None]:
+    """プロバイダーを呼び出し、progress/delta/section から complete までのSSEイベントを返す
+
+    使用量の保存・生成結果キャッシュへの登録・成功の監査ログもここで行う。
+    """
+    timer = context.timer
+    start_time = time.time()
+
+    stream_args = (
+        provider,
+        medical_text,
+        additional_info,
+        current_prescription,
+        department,
+        document_type,
+        doctor,
+        model_name,
+        referral_purpose,
+        previous_summary,
+        evaluation_feedback,
+        context,
+    )
+
+    def _count_failure() -> None:
+        GENERATION_FAILURES.inc(kind="summary", model=final_model)
+
+    section_parser: IncrementalSectionParser | None = None
+    if settings.sse_stream_deltas:
+        # プロバイダーの差分をdeltaイベントとして到着順に送信し、完了したセクションはsectionイベントで通知
+        section_parser = parser = IncrementalSectionParser()
+        events = stream_deltas_with_heartbeat(
+            gen_func=generate_summary_stream_with_provider_async,
+            gen_args=stream_args,
+            start_message=MESSAGES["STATUS"]["DOCUMENT_GENERATION_START"],
+            running_status="generating",
+            running_message=MESSAGES["STATUS"]["DOCUMENT_GENERATING"],
+            elapsed_message_template=MESSAGES["STATUS"]["DOCUMENT_GENERATING_ELAPSED"],
+            on_delta=lambda text: _section_events(parser.feed(text)),
+            on_error=_count_failure,
+        )
+    else:
+        events = stream_with_heartbeat(
+            func=_run_generation,
+            func_args=stream_args,
+            start_message=MESSAGES["STATUS"]["DOCUMENT_GENERATION_START"],
+            running_status="generating",
+            running_message=MESSAGES["STATUS"]["DOCUMENT_GENERATING"],
+            elapsed_message_template=MESSAGES["STATUS"]["DOCUMENT_GENERATING_ELAPSED"],
+            on_error=_count_failure,
+        )
+
+    async for item in events:
+        if isinstance(item, str):
+            yield item
+        else:
+            full_text, input_tokens, output_tokens = item
+            processing_time = time.time() - start_time
+            if section_parser is not None:
+                # 最後のセクションは後続の見出しで完了しないため、ストリーム終了時に通知
+                for event in _section_events(section_parser.flush()):
+                    yield event
+            timer.add("generation", processing_time)
+            observe_generation(
+                "summary",
+                final_model,
+                processing_time,
+                input_tokens,
+                output_tokens,
+                timer.seconds("first_token"),
+            )
+
+            with timer.stage("format_output"):
+                formatted_summary = format_output_summary(full_text)
+                parsed_summary = parse_output_summary(formatted_summary)
+
+            with timer.stage("save_usage"):
+                await asyncio.to_thread(
+                    save_usage,
+                    department=department,
+                    doctor=doctor,
+                    document_type=document_type,
+                    model=final_model,
+                    input_tokens=input_tokens,
+                    output_tokens=output_tokens,
+                    processing_time=processing_time,
+                    reservation=context.reservation,
+                    cache_read_input_tokens=context.cache_usage.read_tokens,
+                    cache_creation_input_tokens=context.cache_usage.creation_tokens,
+                )
+
+            await _put_cached_result(request_key, formatted_summary, parsed_summary, timer)
+
+            # 監査ログ: 成功
+            timings = _finish_timings(timer, request_started)
+            log_audit_event(
+                event_type=get_message("AUDIT", "DOCUMENT_GENERATION_SUCCESS"),
+                user_ip=user_ip,
+                document_type=document_type,
+                model=final_model,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                processing_time=processing_time,
+                timings=timings,
+            )
+
+            yield sse_event(
+                "complete",
+                {
+                    "success": True,
+                    "output_summary": formatted_summary,
+                    "parsed_summary": parsed_summary,
+                    "input_tokens": input_tokens,
+                    "output_tokens": output_tokens,
+                    "processing_time": processing_time,
+                    "model_used": final_model,
+                    "model_switched": model_switched,
+                    "timings": timings,
+                    "cached": False,
+                },
+            )
+
+
 async def execute_summary_generation_stream(
     medical_text: str,
     additional_info: str,
@@ -267,6 +608,8 @@ async def execute_summary_generation_stream(
     evaluation_feedback: str = "",
 ) -> AsyncGenerator[str, None]:
     """SSEストリーミングで文書生成を実行"""
+    request_started = time.perf_counter()
+
     # 監査ログ: 開始
     log_audit_event(
         event_type=get_message("AUDIT", "DOCUMENT_GENERATION_START"),
@@ -277,139 +620,174 @@ async def execute_summary_generation_stream(
         doctor=doctor,
     )
 
-    # 日次利用制限チェック
-    limit_error = check_daily_limit()
-    if limit_error:
-        yield sse_event("error", {"success": False, "error_message": limit_error})
-        return
-
-    # サニタイゼーション適用
-    medical_text = sanitize_medical_text(medical_text)
-    additional_info = sanitize_medical_text(additional_info or "")
-    current_prescription = sanitize_medical_text(current_prescription or "")
-    previous_summary = sanitize_medical_text(previous_summary or "")
-    evaluation_feedback = sanitize_medical_text(evaluation_feedback or "")
-
-    # 入力検証
-    is_valid, error_msg = validate_input(medical_text)
-    if not is_valid:
-        log_audit_event(
-            event_type=get_message("AUDIT", "DOCUMENT_GENERATION_FAILURE"),
-            user_ip=user_ip,
-            document_type=document_type,
-            model=model,
-            success=False,
-            error_message=error_msg or MESSAGES["ERROR"]["INPUT_ERROR"],
-        )
+    # プロンプトの解決と日次利用枠の予約を1回のDBセッションで実行
+    load_started = time.perf_counter()
+    context = await asyncio.to_thread(
+        load_generation_context,
+        department,
+        document_type,
+        doctor,
+        _estimate_input_tokens(
+            medical_text,
+            additional_info,
+            current_prescription,
+            previous_summary,
+            evaluation_feedback,
+        ),
+    )
+    timer = context.timer
+    timer.add("load_context", time.perf_counter() - load_started)
+    if context.daily_limit_error:
         yield sse_event(
-            "error",
-            {
-                "success": False,
-                "error_message": error_msg or MESSAGES["ERROR"]["INPUT_ERROR"],
-            },
+            "error", {"success": False, "error_message": context.daily_limit_error}
         )
         return
 
-    # モデル決定
-    total_length = len(medical_text) + len(additional_info or "")
+    reservation_handed_off = False
     try:
-        final_model, model_switched = determine_model(
-            model,
-            total_length,
-            department,
-            document_type,
-            doctor,
-            model_explicitly_selected,
-        )
-    except ValueError as e:
-        log_audit_event(
-            event_type=get_message("AUDIT", "DOCUMENT_GENERATION_FAILURE"),
-            user_ip=user_ip,
-            document_type=document_type,
-            model=model,
-            success=False,
-            error_message=type(e).__name__,
-        )
-        yield sse_event("error", {"success": False, "error_message": str(e)})
-        return
-
-    # プロバイダーとモデル名を取得
-    try:
-        provider, model_name = get_provider_and_model(final_model)
-    except ValueError as e:
-        log_audit_event(
-            event_type=get_message("AUDIT", "DOCUMENT_GENERATION_FAILURE"),
-            user_ip=user_ip,
-            document_type=document_type,
-            model=final_model,
-            success=False,
-            error_message=type(e).__name__,
+        # サニタイゼーションと入力検証
+        texts, is_valid, error_msg = await asyncio.to_thread(
+            _sanitize_and_validate,
+            timer,
+            medical_text,
+            additional_info,
+            current_prescription,
+            previous_summary,
+            evaluation_feedback,
         )
-        yield sse_event("error", {"success": False, "error_message": str(e)})
-        return
-
-    start_time = time.time()
-
-    async for item in stream_with_heartbeat(
-        sync_func=_run_sync_generation,
-        sync_func_args=(
-            provider,
+        (
             medical_text,
             additional_info,
             current_prescription,
-            department,
-            document_type,
-            doctor,
-            model_name,
-            referral_purpose,
             previous_summary,
             evaluation_feedback,
-        ),
-        start_message=MESSAGES["STATUS"]["DOCUMENT_GENERATION_START"],
-        running_status="generating",
-        running_message=MESSAGES["STATUS"]["DOCUMENT_GENERATING"],
-        elapsed_message_template=MESSAGES["STATUS"]["DOCUMENT_GENERATING_ELAPSED"],
-    ):
-        if isinstance(item, str):
-            yield item
-        else:
-            full_text, input_tokens, output_tokens = item
-            processing_time = time.time() - start_time
-
-            formatted_summary = format_output_summary(full_text)
-            parsed_summary = parse_output_summary(formatted_summary)
-
-            save_usage(
-                department=department,
-                doctor=doctor,
+        ) = texts
+        if not is_valid:
+            log_audit_event(
+                event_type=get_message("AUDIT", "DOCUMENT_GENERATION_FAILURE"),
+                user_ip=user_ip,
                 document_type=document_type,
-                model=final_model,
-                input_tokens=input_tokens,
-                output_tokens=output_tokens,
-                processing_time=processing_time,
+                model=model,
+                success=False,
+                error_message=error_msg or MESSAGES["ERROR"]["INPUT_ERROR"],
+            )
+            yield sse_event(
+                "error",
+                {
+                    "success": False,
+                    "error_message": error_msg or MESSAGES["ERROR"]["INPUT_ERROR"],
+                },
+            )
+            return
+
+        # モデル決定
+        total_length = len(medical_text) + len(additional_info or "")
+        try:
+            with timer.stage("determine_model"):
+                final_model, model_switched = determine_model(
+                    model,
+                    total_length,
+                    department,
+                    document_type,
+                    doctor,
+                    model_explicitly_selected,
+                    context,
+                )
+        except ValueError as e:
+            log_audit_event(
+                event_type=get_message("AUDIT", "DOCUMENT_GENERATION_FAILURE"),
+                user_ip=user_ip,
+                document_type=document_type,
+                model=model,
+                success=False,
+                error_message=type(e).__name__,
             )
+            yield sse_event("error", {"success": False, "error_message": str(e)})
+            return
 
-            # 監査ログ: 成功
+        if model_switched:
+            MODEL_SWITCHES.inc(from_model=model, to_model=final_model)
+
+        # プロバイダーとモデル名を取得
+        try:
+            provider, model_name = get_provider_and_model(final_model)
+        except ValueError as e:
             log_audit_event(
-                event_type=get_message("AUDIT", "DOCUMENT_GENERATION_SUCCESS"),
+                event_type=get_message("AUDIT", "DOCUMENT_GENERATION_FAILURE"),
                 user_ip=user_ip,
                 document_type=document_type,
                 model=final_model,
-                input_tokens=input_tokens,
-                output_tokens=output_tokens,
-                processing_time=processing_time,
+                success=False,
+                error_message=type(e).__name__,
             )
+            yield sse_event("error", {"success": False, "error_message": str(e)})
+            return
 
-            yield sse_event(
-                "complete",
-                {
-                    "success": True,
-                    "output_summary": formatted_summary,
-                    "parsed_summary": parsed_summary,
-                    "input_tokens": input_tokens,
-                    "output_tokens": output_tokens,
-                    "processing_time": processing_time,
-                    "model_used": final_model,
-                    "model_switched": model_switched,
-                },
+        request_key = _request_key(
+            document_type,
+            final_model,
+            context,
+            medical_text,
+            additional_info,
+            current_prescription,
+            referral_purpose,
+            previous_summary,
+            evaluation_feedback,
+        )
+        cached = await _get_cached_result(request_key, timer)
+        if cached is not None:
+            response = _cached_response(
+                cached, final_model, model_switched, timer, request_started, user_ip, document_type
             )
+            yield sse_event("complete", response.model_dump(exclude={"error_message"}))
+            return
+
+        async def produce() -> AsyncIterator[str]:
+            # 合流時は最初の接続から独立したタスクで実行されるため、予約の確定・取り消しもここで行う
+            try:
+                async for event in _stream_generation_events(
+                    provider,
+                    model_name,
+                    final_model,
+                    model_switched,
+                    medical_text,
+                    additional_info,
+                    current_prescription,
+                    department,
+                    doctor,
+                    document_type,
+                    referral_purpose,
+                    previous_summary,
+                    evaluation_feedback,
+                    context,
+                    request_key,
+                    request_started,
+                    user_ip,
+                ):
+                    yield event
+            finally:
+                await _release_quota(context)
+
+        if settings.single_flight_enabled:
+            # 同じリクエストの生成が実行中なら新たに呼び出さず、そのイベント列を受け取る。
+            # 使用統計は最初の接続の診療科・医師で記録するため、合流は同じ診療科・医師に限る
+            flight_key = "\0".join((request_key, department, doctor))
+            events, joined = get_single_flight().stream(flight_key, produce)
+            # 生成を開始した場合、予約は producer が確定・取り消す
+            reservation_handed_off = not joined
+            if joined:
+                log_audit_event(
+                    event_type=get_message("AUDIT", "DOCUMENT_GENERATION_JOINED"),
+                    user_ip=user_ip,
+                    document_type=document_type,
+                    model=final_model,
+                )
+        else:
+            events = produce()
+
+        async for event in events:
+            yield event
+    finally:
+        # エラー終了やクライアント切断で使用量を保存しなかった場合は予約を取り消す
+        if not reservation_handed_off:
+            await _release_quota(context)
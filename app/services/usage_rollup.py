@@ -0,0 +1,244 @@
+from collections.abc import Iterable
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import case, delete
+from sqlalchemy.orm import Session
+
+from app.core.database import dialect_insert
+from app.models.usage import (
+    PROCESSING_TIME_BUCKETS,
+    DailyUsageRollup,
+    HourlyUsageRollup,
+    SummaryUsage,
+)
+from app.services.usage_writer import UsageRecord
+
+JST = ZoneInfo("Asia/Tokyo")
+
+HISTOGRAM_COLUMNS = tuple(f"processing_time_le_{bound}" for bound in PROCESSING_TIME_BUCKETS)
+
+# (記録日時, モデル, 文書タイプ, 診療科, 医師, 入力トークン, 出力トークン,
+#  キャッシュ読み取りトークン, キャッシュ書き込みトークン, 処理時間)
+UsageSample = tuple[
+    datetime | None, str | None, str | None, str | None, str | None,
+    int | None, int | None, int | None, int | None, float | None,
+]
+
+
+def to_jst(value: datetime) -> datetime:
+    """JSTの日時に変換（タイムゾーンなしはJSTとみなす）"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=JST)
+    return value.astimezone(JST)
+
+
+class _RollupTotals:
+    """1バケット分の集計値"""
+
+    __slots__ = (
+        "request_count",
+        "input_tokens",
+        "output_tokens",
+        "cache_read_input_tokens",
+        "cache_creation_input_tokens",
+        "processing_time_count",
+        "processing_time_sum",
+        "processing_time_min",
+        "processing_time_max",
+        "histogram",
+    )
+
+    def __init__(self) -> None:
+        self.request_count = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cache_read_input_tokens = 0
+        self.cache_creation_input_tokens = 0
+        self.processing_time_count = 0
+        self.processing_time_sum = 0.0
+        self.processing_time_min: float | None = None
+        self.processing_time_max: float | None = None
+        self.histogram = [0] * len(PROCESSING_TIME_BUCKETS)
+
+    def add(
+        self,
+        input_tokens: int | None,
+        output_tokens: int | None,
+        cache_read_input_tokens: int | None,
+        cache_creation_input_tokens: int | None,
+        processing_time: float | None,
+    ) -> None:
+        self.request_count += 1
+        self.input_tokens += input_tokens or 0
+        self.output_tokens += output_tokens or 0
+        self.cache_read_input_tokens += cache_read_input_tokens or 0
+        self.cache_creation_input_tokens += cache_creation_input_tokens or 0
+        if processing_time is None:
+            return
+        self.processing_time_count += 1
+        self.processing_time_sum += processing_time
+        if self.processing_time_min is None or processing_time < self.processing_time_min:
+            self.processing_time_min = processing_time
+        if self.processing_time_max is None or processing_time > self.processing_time_max:
+            self.processing_time_max = processing_time
+        for i, bound in enumerate(PROCESSING_TIME_BUCKETS):
+            if processing_time <= bound:
+                self.histogram[i] += 1
+
+    def as_row(self) -> dict[str, int | float | None]:
+        return {
+            "request_count": self.request_count,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cache_read_input_tokens": self.cache_read_input_tokens,
+            "cache_creation_input_tokens": self.cache_creation_input_tokens,
+            "processing_time_count": self.processing_time_count,
+            "processing_time_sum": self.processing_time_sum,
+            "processing_time_min": self.processing_time_min,
+            "processing_time_max": self.processing_time_max,
+            **dict(zip(HISTOGRAM_COLUMNS, self.histogram)),
+        }
+
+
+def _rollup_totals(
+    samples: Iterable[UsageSample],
+) -> tuple[dict[tuple, _RollupTotals], dict[tuple, _RollupTotals]]:
+    """使用量を (時間, ディメンション) と (日付, ディメンション) ごとに集計"""
+    hourly: dict[tuple, _RollupTotals] = {}
+    daily: dict[tuple, _RollupTotals] = {}
+    for (
+        recorded_at,
+        model,
+        document_type,
+        department,
+        doctor,
+        input_tokens,
+        output_tokens,
+        cache_read_input_tokens,
+        cache_creation_input_tokens,
+        processing_time,
+    ) in samples:
+        if recorded_at is None:
+            continue
+        local = to_jst(recorded_at)
+        dims = (model or "", document_type or "", department or "", doctor or "")
+        hour = local.replace(minute=0, second=0, microsecond=0)
+        for buckets, key in ((hourly, (hour, *dims)), (daily, (local.date(), *dims))):
+            totals = buckets.get(key)
+            if totals is None:
+                totals = buckets[key] = _RollupTotals()
+            totals.add(
+                input_tokens,
+                output_tokens,
+                cache_read_input_tokens,
+                cache_creation_input_tokens,
+                processing_time,
+            )
+    return hourly, daily
+
+
+def _merge_min(current, incoming):
+    return case(
+        (current.is_(None), incoming),
+        (incoming.is_(None), current),
+        (incoming < current, incoming),
+        else_=current,
+    )
+
+
+def _merge_max(current, incoming):
+    return case(
+        (current.is_(None), incoming),
+        (incoming.is_(None), current),
+        (incoming > current, incoming),
+        else_=current,
+    )
+
+
+def _upsert_rollups(
+    db: Session,
+    entity: type[HourlyUsageRollup] | type[DailyUsageRollup],
+    bucket_column: str,
+    totals: dict[tuple, _RollupTotals],
+) -> None:
+    if not totals:
+        return
+    insert = dialect_insert(db, entity)
+    excluded = insert.excluded
+    additive = (
+        "request_count",
+        "input_tokens",
+        "output_tokens",
+        "cache_read_input_tokens",
+        "cache_creation_input_tokens",
+        "processing_time_count",
+        "processing_time_sum",
+        *HISTOGRAM_COLUMNS,
+    )
+    set_ = {name: getattr(entity, name) + getattr(excluded, name) for name in additive}
+    set_["processing_time_min"] = _merge_min(
+        entity.processing_time_min, excluded.processing_time_min
+    )
+    set_["processing_time_max"] = _merge_max(
+        entity.processing_time_max, excluded.processing_time_max
+    )
+    statement = insert.on_conflict_do_update(
+        index_elements=[bucket_column, "model", "document_type", "department", "doctor"],
+        set_=set_,
+    )
+    # キーの順序をそろえて同時更新時のデッドロックを避ける
+    rows = [
+        {
+            bucket_column: key[0],
+            "model": key[1],
+            "document_type": key[2],
+            "department": key[3],
+            "doctor": key[4],
+            **value.as_row(),
+        }
+        for key, value in sorted(totals.items(), key=lambda item: item[0])
+    ]
+    db.execute(statement, rows)
+
+
+def add_usage_to_rollups(db: Session, records: Iterable[UsageRecord]) -> None:
+    """保存した使用量を時間別・日別の集計テーブルに加算（コミットは呼び出し元）"""
+    hourly, daily = _rollup_totals(
+        (
+            r.recorded_at,
+            r.model,
+            r.document_type,
+            r.department,
+            r.doctor,
+            r.input_tokens,
+            r.output_tokens,
+            r.cache_read_input_tokens,
+            r.cache_creation_input_tokens,
+            r.processing_time,
+        )
+        for r in records
+    )
+    _upsert_rollups(db, HourlyUsageRollup, "bucket_start", hourly)
+    _upsert_rollups(db, DailyUsageRollup, "bucket_date", daily)
+
+
+def rebuild_usage_rollups(db: Session, batch_size: int = 5000) -> None:
+    """summary_usage から集計テーブルを作り直す（コミットは呼び出し元）"""
+    db.execute(delete(HourlyUsageRollup))
+    db.execute(delete(DailyUsageRollup))
+    samples = db.query(
+        SummaryUsage.date,
+        SummaryUsage.model,
+        SummaryUsage.document_type,
+        SummaryUsage.department,
+        SummaryUsage.doctor,
+        SummaryUsage.input_tokens,
+        SummaryUsage.output_tokens,
+        SummaryUsage.cache_read_input_tokens,
+        SummaryUsage.cache_creation_input_tokens,
+        SummaryUsage.processing_time,
+    ).yield_per(batch_size)
+    hourly, daily = _rollup_totals(tuple(row) for row in samples)
+    _upsert_rollups(db, HourlyUsageRollup, "bucket_start", hourly)
+    _upsert_rollups(db, DailyUsageRollup, "bucket_date", daily)
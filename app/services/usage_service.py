@@ -1,29 +1,125 @@
 import logging
-from datetime import datetime
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import lru_cache
 from zoneinfo import ZoneInfo
 
-from sqlalchemy import func
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
 
-from app.core.config import get_settings
+from app.core.config import Settings, get_settings
 from app.core.constants import get_message
-from app.core.database import get_db_session
-from app.models.usage import SummaryUsage
+from app.core.database import dialect_insert, get_db_session
+from app.models.usage import DailyUsageCounter, SummaryUsage
 from app.schemas.usage import DailyUsageSummary
+from app.services.usage_rollup import add_usage_to_rollups
+from app.services.usage_writer import UsageRecord, UsageWriter
 
 JST = ZoneInfo("Asia/Tokyo")
 
 
-def get_daily_usage() -> DailyUsageSummary:
-    """当日の使用量をDBから取得"""
-    today_start = datetime.now(JST).replace(hour=0, minute=0, second=0, microsecond=0)
-    with get_db_session() as db:
-        result = db.query(
-            func.count(SummaryUsage.id),
-            func.coalesce(func.sum(SummaryUsage.input_tokens), 0),
-            func.coalesce(func.sum(SummaryUsage.output_tokens), 0),
-        ).filter(
-            SummaryUsage.date >= today_start,
-        ).first()
+@dataclass
+class QuotaReservation:
+    """生成開始時に日次カウンタへ計上した見込み使用量（save_usage で実績に補正する）"""
+
+    usage_date: date
+    input_tokens: int
+    output_tokens: int
+    settled: bool = False
+
+
+class DailyUsageView:
+    """日次カウンタのプロセス内ビュー（TTL内は制限判定でDBを参照しない）"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._usage_date: date | None = None
+        self._usage: DailyUsageSummary | None = None
+        self._fetched_at = 0.0
+
+    def get(self, usage_date: date, ttl_seconds: float) -> DailyUsageSummary | None:
+        with self._lock:
+            if self._usage is None or self._usage_date != usage_date:
+                return None
+            if time.monotonic() - self._fetched_at >= ttl_seconds:
+                return None
+            return self._usage
+
+    def update(self, usage_date: date, usage: DailyUsageSummary) -> None:
+        with self._lock:
+            self._usage_date = usage_date
+            self._usage = usage
+            self._fetched_at = time.monotonic()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._usage_date = None
+            self._usage = None
+
+
+@lru_cache
+def get_daily_usage_view() -> DailyUsageView:
+    """プロセス共有の日次カウンタビューを取得"""
+    return DailyUsageView()
+
+
+def _today() -> date:
+    return datetime.now(JST).date()
+
+
+def _limit_error(usage: DailyUsageSummary, s: Settings) -> str | None:
+    """使用量が日次制限に達していればエラーメッセージを返す"""
+    if usage.request_count >= s.daily_request_limit:
+        return get_message("ERROR", "DAILY_REQUEST_LIMIT_EXCEEDED", limit=str(s.daily_request_limit))
+    if usage.total_input_tokens >= s.daily_input_token_limit:
+        return get_message("ERROR", "DAILY_INPUT_TOKEN_LIMIT_EXCEEDED", limit=str(s.daily_input_token_limit))
+    if usage.total_output_tokens >= s.daily_output_token_limit:
+        return get_message("ERROR", "DAILY_OUTPUT_TOKEN_LIMIT_EXCEEDED", limit=str(s.daily_output_token_limit))
+    return None
+
+
+def _counter_insert(db: Session):
+    return dialect_insert(db, DailyUsageCounter)
+
+
+def _add_to_counter(
+    db: Session, usage_date: date, requests: int, input_tokens: int, output_tokens: int
+) -> None:
+    """日次カウンタに加算（行がなければ作成する UPSERT）"""
+    insert = _counter_insert(db)
+    db.execute(
+        insert.values(
+            usage_date=usage_date,
+            request_count=requests,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+        ).on_conflict_do_update(
+            index_elements=[DailyUsageCounter.usage_date],
+            set_={
+                "request_count": DailyUsageCounter.request_count + insert.excluded.request_count,
+                "input_tokens": DailyUsageCounter.input_tokens + insert.excluded.input_tokens,
+                "output_tokens": DailyUsageCounter.output_tokens + insert.excluded.output_tokens,
+            },
+        )
+    )
+    get_daily_usage_view().clear()
+
+
+def get_daily_usage(db: Session | None = None) -> DailyUsageSummary:
+    """当日の使用量を日次カウンタから取得（db 未指定時は新しいセッションを使用）"""
+    if db is None:
+        with get_db_session() as session:
+            return get_daily_usage(session)
+
+    result = db.query(
+        DailyUsageCounter.request_count,
+        DailyUsageCounter.input_tokens,
+        DailyUsageCounter.output_tokens,
+    ).filter(
+        DailyUsageCounter.usage_date == _today(),
+    ).first()
     if result is None:
         return DailyUsageSummary(request_count=0, total_input_tokens=0, total_output_tokens=0)
     return DailyUsageSummary(
@@ -33,23 +129,152 @@ def get_daily_usage() -> DailyUsageSummary:
     )
 
 
-def check_daily_limit() -> str | None:
+def check_daily_limit(db: Session | None = None) -> str | None:
     """日次制限を確認し、超過していればエラーメッセージを返す。問題なければNone"""
     try:
         s = get_settings()
-        usage = get_daily_usage()
-        if usage.request_count >= s.daily_request_limit:
-            return get_message("ERROR", "DAILY_REQUEST_LIMIT_EXCEEDED", limit=str(s.daily_request_limit))
-        if usage.total_input_tokens >= s.daily_input_token_limit:
-            return get_message("ERROR", "DAILY_INPUT_TOKEN_LIMIT_EXCEEDED", limit=str(s.daily_input_token_limit))
-        if usage.total_output_tokens >= s.daily_output_token_limit:
-            return get_message("ERROR", "DAILY_OUTPUT_TOKEN_LIMIT_EXCEEDED", limit=str(s.daily_output_token_limit))
-        return None
+        usage_date = _today()
+        view = get_daily_usage_view()
+        usage = view.get(usage_date, s.daily_quota_cache_ttl_seconds)
+        if usage is None:
+            usage = get_daily_usage(db)
+            view.update(usage_date, usage)
+        return _limit_error(usage, s)
     except Exception as e:
         logging.error("日次利用制限チェックに失敗しました: %s", str(e), exc_info=True)
         return None  # フェイルオープン: エラー時は実行を許可
 
 
+def reserve_daily_quota(
+    db: Session, estimated_input_tokens: int
+) -> tuple[QuotaReservation | None, str | None]:
+    """日次制限を確認し、制限内なら見込み使用量を日次カウンタに予約する
+
+    制限判定と加算を1つの条件付き UPDATE で行うため、同時リクエストでも制限を超えて予約しない。
+    戻り値は (予約, エラーメッセージ)。
+    """
+    s = get_settings()
+    usage_date = _today()
+    view = get_daily_usage_view()
+
+    # 制限超過が確定している間はDBにアクセスせず拒否
+    cached = view.get(usage_date, s.daily_quota_cache_ttl_seconds)
+    if cached is not None:
+        error = _limit_error(cached, s)
+        if error:
+            return None, error
+
+    estimated_output_tokens = s.daily_quota_reserved_output_tokens
+    # 当日の行を用意してから条件付きで加算（INSERT 時点では制限を判定できないため2文に分ける）
+    db.execute(
+        _counter_insert(db)
+        .values(usage_date=usage_date, request_count=0, input_tokens=0, output_tokens=0)
+        .on_conflict_do_nothing(index_elements=[DailyUsageCounter.usage_date])
+    )
+    row = db.execute(
+        update(DailyUsageCounter)
+        .where(
+            DailyUsageCounter.usage_date == usage_date,
+            DailyUsageCounter.request_count < s.daily_request_limit,
+            DailyUsageCounter.input_tokens < s.daily_input_token_limit,
+            DailyUsageCounter.output_tokens < s.daily_output_token_limit,
+        )
+        .values(
+            request_count=DailyUsageCounter.request_count + 1,
+            input_tokens=DailyUsageCounter.input_tokens + estimated_input_tokens,
+            output_tokens=DailyUsageCounter.output_tokens + estimated_output_tokens,
+        )
+        .returning(
+            DailyUsageCounter.request_count,
+            DailyUsageCounter.input_tokens,
+            DailyUsageCounter.output_tokens,
+        )
+        .execution_options(synchronize_session=False)
+    ).first()
+
+    if row is None:
+        usage = get_daily_usage(db)
+        view.update(usage_date, usage)
+        return None, _limit_error(usage, s)
+
+    view.update(
+        usage_date,
+        DailyUsageSummary(
+            request_count=row[0], total_input_tokens=row[1], total_output_tokens=row[2]
+        ),
+    )
+    reservation = QuotaReservation(
+        usage_date=usage_date,
+        input_tokens=estimated_input_tokens,
+        output_tokens=estimated_output_tokens,
+    )
+    return reservation, None
+
+
+def release_daily_quota(reservation: QuotaReservation | None) -> None:
+    """使用量を保存しなかった予約を日次カウンタから取り消す"""
+    if reservation is None or reservation.settled:
+        return
+    try:
+        with get_db_session() as db:
+            _add_to_counter(
+                db,
+                reservation.usage_date,
+                -1,
+                -reservation.input_tokens,
+                -reservation.output_tokens,
+            )
+        reservation.settled = True
+    except Exception as e:
+        logging.error("日次利用枠の予約取り消しに失敗しました: %s", str(e), exc_info=True)
+
+
+def _write_usage_batch(records: list[UsageRecord]) -> None:
+    """使用量を複数行INSERTで保存し、日次カウンタと集計テーブルへの加算とあわせて1回のコミットで反映"""
+    with get_db_session() as db:
+        db.execute(
+            insert(SummaryUsage),
+            [
+                {
+                    "date": record.recorded_at,
+                    "department": record.department,
+                    "doctor": record.doctor,
+                    "document_type": record.document_type,
+                    "model": record.model,
+                    "input_tokens": record.input_tokens,
+                    "output_tokens": record.output_tokens,
+                    "cache_read_input_tokens": record.cache_read_input_tokens,
+                    "cache_creation_input_tokens": record.cache_creation_input_tokens,
+                    "app_type": "dischargesummary",
+                    "processing_time": record.processing_time,
+                }
+                for record in records
+            ],
+        )
+        deltas: dict[date, list[int]] = {}
+        for record in records:
+            total = deltas.setdefault(record.usage_date, [0, 0, 0])
+            total[0] += record.request_delta
+            total[1] += record.input_delta
+            total[2] += record.output_delta
+        for usage_date, (requests, input_tokens, output_tokens) in sorted(deltas.items()):
+            _add_to_counter(db, usage_date, requests, input_tokens, output_tokens)
+        add_usage_to_rollups(db, records)
+
+
+@lru_cache
+def get_usage_writer() -> UsageWriter:
+    """プロセス共有の使用量ライタを取得（start するまでは save_usage が同期書き込みする）"""
+    s = get_settings()
+    return UsageWriter(
+        _write_usage_batch,
+        batch_size=s.usage_write_batch_size,
+        flush_interval_seconds=s.usage_write_interval_seconds,
+        max_queue_size=s.usage_write_queue_size,
+        spool_path=s.usage_spool_path,
+    )
+
+
 def save_usage(
     department: str,
     doctor: str,
@@ -58,22 +283,47 @@ def save_usage(
     input_tokens: int,
     output_tokens: int,
     processing_time: float,
+    reservation: QuotaReservation | None = None,
+    cache_read_input_tokens: int = 0,
+    cache_creation_input_tokens: int = 0,
 ) -> None:
-    """使用統計を保存"""
+    """使用統計を記録し、日次カウンタを実績で更新（予約があれば見込みとの差分のみ加算）
+
+    日次制限の入力トークンには input_tokens のみを計上し、キャッシュのトークン数は含めない。
+
+    使用量ライタの稼働中はキューに追加して即座に戻り、書き込みはバックグラウンドで行う。
+    """
     try:
-        with get_db_session() as db:
-            usage = SummaryUsage(
-                date=datetime.now(JST),
-                department=department,
-                doctor=doctor,
-                document_type=document_type,
-                model=model,
-                input_tokens=input_tokens,
-                output_tokens=output_tokens,
-                app_type="dischargesummary",
-                processing_time=processing_time,
-            )
-            db.add(usage)
+        if reservation is not None and not reservation.settled:
+            usage_date = reservation.usage_date
+            request_delta = 0
+            input_delta = input_tokens - reservation.input_tokens
+            output_delta = output_tokens - reservation.output_tokens
+        else:
+            usage_date = _today()
+            request_delta = 1
+            input_delta = input_tokens
+            output_delta = output_tokens
+        record = UsageRecord(
+            recorded_at=datetime.now(JST),
+            department=department,
+            doctor=doctor,
+            document_type=document_type,
+            model=model,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            processing_time=processing_time,
+            usage_date=usage_date,
+            request_delta=request_delta,
+            input_delta=input_delta,
+            output_delta=output_delta,
+            cache_read_input_tokens=cache_read_input_tokens,
+            cache_creation_input_tokens=cache_creation_input_tokens,
+        )
+        writer = get_usage_writer()
+        if writer.submit(record) or writer.write([record]):
+            if reservation is not None:
+                reservation.settled = True
     except Exception as e:
         # ログに記録するがエラーは無視
         logging.error(get_message("ERROR", "USAGE_SAVE_FAILED", error=str(e)), exc_info=True)
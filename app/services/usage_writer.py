@@ -0,0 +1,242 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from datetime import date, datetime
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class UsageRecord:
+    """summary_usage への1行と、日次カウンタへの加算量"""
+
+    recorded_at: datetime
+    department: str
+    doctor: str
+    document_type: str
+    model: str
+    input_tokens: int
+    output_tokens: int
+    processing_time: float
+    usage_date: date
+    request_delta: int
+    input_delta: int
+    output_delta: int
+    # 既定値はキャッシュ列の追加前にスプールした行を読み込むため
+    cache_read_input_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data["recorded_at"] = self.recorded_at.isoformat()
+        data["usage_date"] = self.usage_date.isoformat()
+        return json.dumps(data, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, line: str) -> "UsageRecord":
+        data = json.loads(line)
+        data["recorded_at"] = datetime.fromisoformat(data["recorded_at"])
+        data["usage_date"] = date.fromisoformat(data["usage_date"])
+        return cls(**data)
+
+
+class UsageWriter:
+    """使用量をキューに溜め、バックグラウンドスレッドでまとめて書き込むライタ
+
+    件数が batch_size に達するか、最初の1件から flush_interval_seconds 経過した時点で
+    write_batch を1回呼び出す。書き込みに失敗したバッチは spool_path にプロセスIDを付けた
+    ファイル（JSON Lines）へ退避し、起動時と次回の書き込み成功後に再投入する。
+
+    ファイルはワーカーごとに分け、各ワーカーは自分のファイルだけを追記・再投入する。
+    終了したワーカーが残したファイルは、起動時に自プロセスの名前へ rename して引き取る
+    （rename は原子的なため、同じファイルを複数のワーカーが再投入しない）。
+    """
+
+    def __init__(
+        self,
+        write_batch: Callable[[list[UsageRecord]], None],
+        batch_size: int,
+        flush_interval_seconds: float,
+        max_queue_size: int,
+        spool_path: str,
+    ) -> None:
+        self._write_batch = write_batch
+        self._batch_size = max(1, batch_size)
+        self._flush_interval_seconds = flush_interval_seconds
+        self.spool_path = spool_path
+        # None は停止時にスレッドの待機を解くための番兵
+        self._queue: queue.Queue[UsageRecord | None] = queue.Queue(max_queue_size)
+        self._spool_lock = threading.Lock()
+        # 起動時に引き取った、終了したワーカーのスプールファイル
+        self._adopted_spools: list[str] = []
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def process_spool_path(self) -> str:
+        """このプロセスが退避に使うスプールファイル"""
+        return f"{self.spool_path}.{os.getpid()}"
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """書き込みスレッドを開始（開始済みなら何もしない）"""
+        if self.running:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="usage-writer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """キューに残った使用量を書き込んでからスレッドを停止"""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stopping.set()
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(timeout)
+        self._thread = None
+        # タイムアウトで取り残した分は呼び出し元のスレッドで書き込む
+        remaining = self._drain()
+        if remaining:
+            self.write(remaining)
+
+    def submit(self, record: UsageRecord) -> bool:
+        """キューに追加。停止中またはキューが満杯の場合は False（呼び出し元で同期書き込みする）"""
+        if not self.running or self._stopping.is_set():
+            return False
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            return False
+        return True
+
+    def write(self, records: list[UsageRecord]) -> bool:
+        """バッチを書き込み、失敗時はスプールファイルへ退避。いずれもできなければ False"""
+        try:
+            self._write_batch(records)
+        except Exception as e:
+            logger.error("使用量の書き込みに失敗したためスプールへ退避します: %s", str(e), exc_info=True)
+            return self._spool(records)
+        self.replay_spool()
+        return True
+
+    def replay_spool(self) -> None:
+        """このプロセスのスプールファイルと引き取ったファイルを書き込み、成功したら削除"""
+        with self._spool_lock:
+            for path in [*self._adopted_spools, self.process_spool_path]:
+                if not os.path.exists(path):
+                    continue
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        records = [UsageRecord.from_json(line) for line in f if line.strip()]
+                    if records:
+                        self._write_batch(records)
+                    os.remove(path)
+                except Exception:
+                    logger.warning("スプールした使用量の再投入に失敗しました", exc_info=True)
+                    return
+                if path in self._adopted_spools:
+                    self._adopted_spools.remove(path)
+                logger.info("スプールした使用量 %d 件を書き込みました", len(records))
+
+    def adopt_orphaned_spools(self) -> None:
+        """終了したワーカーのスプールファイル（と旧形式の共有ファイル）を自プロセスの名前へ rename して引き取る"""
+        directory, base = os.path.split(os.path.abspath(self.spool_path))
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return
+        pid = os.getpid()
+        with self._spool_lock:
+            for name in names:
+                if name != base:
+                    if not name.startswith(f"{base}."):
+                        continue
+                    owner = name[len(base) + 1:].split(".", 1)[0]
+                    if not owner.isdigit() or int(owner) == pid or _process_alive(int(owner)):
+                        continue
+                target = f"{self.process_spool_path}.{uuid.uuid4().hex}"
+                try:
+                    os.rename(os.path.join(directory, name), target)
+                except FileNotFoundError:
+                    # 他のワーカーが先に引き取った
+                    continue
+                except OSError:
+                    logger.warning("スプールファイルの引き取りに失敗しました", exc_info=True)
+                    continue
+                self._adopted_spools.append(target)
+
+    def _spool(self, records: list[UsageRecord]) -> bool:
+        try:
+            with self._spool_lock, open(self.process_spool_path, "a", encoding="utf-8") as f:
+                f.writelines(record.to_json() + "\n" for record in records)
+        except Exception as e:
+            logger.error("使用量のスプールに失敗しました: %s", str(e), exc_info=True)
+            return False
+        return True
+
+    def _drain(self) -> list[UsageRecord]:
+        records = []
+        while True:
+            try:
+                record = self._queue.get_nowait()
+            except queue.Empty:
+                return records
+            if record is not None:
+                records.append(record)
+
+    def _next_batch(self) -> list[UsageRecord]:
+        try:
+            first = self._queue.get(timeout=self._flush_interval_seconds)
+        except queue.Empty:
+            return []
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self._flush_interval_seconds
+        while len(batch) < self._batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if self._stopping.is_set() or remaining <= 0:
+                    record = self._queue.get_nowait()
+                else:
+                    record = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if record is None:
+                break
+            batch.append(record)
+        return batch
+
+    def _run(self) -> None:
+        self.adopt_orphaned_spools()
+        self.replay_spool()
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self.write(batch)
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # 別ユーザーのプロセスとして存在する
+        pass
+    return True
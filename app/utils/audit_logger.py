@@ -1,13 +1,176 @@
 import json
 import logging
+import queue
+import sys
+import threading
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from typing import Any
 from zoneinfo import ZoneInfo
 
+from app.core.metrics import (
+    AUDIT_LOG_ENQUEUED,
+    AUDIT_LOG_OVERFLOWED,
+    AUDIT_LOG_QUEUE_DEPTH,
+    AUDIT_LOG_QUEUE_MAX_DEPTH,
+    REGISTRY,
+)
 
 JST = ZoneInfo("Asia/Tokyo")
 audit_logger = logging.getLogger("audit")
 
+AUDIT_LOG_FORMAT = "%(levelname)s:\t%(name)s - %(message)s"
+
+
+class AuditMessage:
+    """監査ログのメッセージ（JSONへの変換はハンドラでのフォーマット時まで遅延する）"""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: dict[str, Any]) -> None:
+        self.data = data
+
+    def __str__(self) -> str:
+        return json.dumps(
+            self.data, ensure_ascii=False, separators=(",", ":"), default=str
+        )
+
+
+class _DeferredFlushMixin:
+    """1件ごとに flush せず、キューが空になった時点でまとめて flush する"""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.stream.write(self.format(record) + self.terminator)  # type: ignore[attr-defined]
+        except Exception:
+            self.handleError(record)  # type: ignore[attr-defined]
+
+
+class _DeferredFlushStreamHandler(_DeferredFlushMixin, logging.StreamHandler):
+    pass
+
+
+class _DeferredFlushFileHandler(_DeferredFlushMixin, logging.FileHandler):
+    pass
+
+
+class AuditQueueHandler(QueueHandler):
+    """監査ログをキューへ渡すハンドラ
+
+    フォーマット（JSON変換）は QueueListener のスレッドで行う。
+    キューが満杯の場合は呼び出し元のスレッドで出力し、件数を記録する。
+    """
+
+    def __init__(self, log_queue: queue.Queue, target: logging.Handler) -> None:
+        super().__init__(log_queue)
+        # QueueHandler.queue は put のみを持つ型のため、滞留数の参照用に型付きで保持する
+        self.log_queue = log_queue
+        self._target = target
+        self._stats_lock = threading.Lock()
+        self.enqueued = 0
+        self.overflowed = 0
+        self.max_queued = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.log_queue.put_nowait(record)
+        except queue.Full:
+            with self._stats_lock:
+                self.overflowed += 1
+            self._target.handle(record)
+            self._target.flush()
+            return
+        queued = self.log_queue.qsize()
+        with self._stats_lock:
+            self.enqueued += 1
+            if queued > self.max_queued:
+                self.max_queued = queued
+
+
+class _AuditQueueListener(QueueListener):
+    """キューが空になるたびに出力先を flush する QueueListener"""
+
+    def __init__(self, log_queue: queue.Queue, *handlers: logging.Handler, **kwargs: Any) -> None:
+        super().__init__(log_queue, *handlers, **kwargs)
+        self.log_queue = log_queue
+
+    def handle(self, record: logging.LogRecord) -> None:
+        super().handle(record)
+        if self.log_queue.empty():
+            for handler in self.handlers:
+                handler.flush()
+
+
+_listener: _AuditQueueListener | None = None
+_queue_handler: AuditQueueHandler | None = None
+
+
+def start_audit_listener(max_queue_size: int, log_path: str | None = None) -> None:
+    """監査ログの出力をバックグラウンドスレッドに移す（開始済みなら何もしない）
+
+    log_path 未指定時は従来どおり標準エラー出力へ書き込む。
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    target: logging.Handler
+    if log_path:
+        target = _DeferredFlushFileHandler(log_path, encoding="utf-8")
+    else:
+        target = _DeferredFlushStreamHandler(sys.stderr)
+    target.setFormatter(logging.Formatter(AUDIT_LOG_FORMAT))
+
+    log_queue: queue.Queue = queue.Queue(max_queue_size)
+    _queue_handler = AuditQueueHandler(log_queue, target)
+    _listener = _AuditQueueListener(log_queue, target, respect_handler_level=False)
+    _listener.start()
+
+    audit_logger.addHandler(_queue_handler)
+    audit_logger.propagate = False
+
+
+def stop_audit_listener() -> None:
+    """キューに残った監査ログを出力してからバックグラウンドスレッドを停止"""
+    global _listener, _queue_handler
+    if _listener is None or _queue_handler is None:
+        return
+
+    audit_logger.removeHandler(_queue_handler)
+    audit_logger.propagate = True
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+    _queue_handler = None
+
+
+def get_audit_log_stats() -> dict[str, int]:
+    """監査ログキューの滞留数・最大滞留数・投入数・あふれ件数を返す"""
+    handler = _queue_handler
+    if handler is None:
+        return {"queued": 0, "max_queued": 0, "enqueued": 0, "overflowed": 0}
+    return {
+        "queued": handler.log_queue.qsize(),
+        "max_queued": handler.max_queued,
+        "enqueued": handler.enqueued,
+        "overflowed": handler.overflowed,
+    }
+
+
+def _collect_audit_log_metrics() -> None:
+    stats = get_audit_log_stats()
+    AUDIT_LOG_QUEUE_DEPTH.set(stats["queued"])
+    AUDIT_LOG_QUEUE_MAX_DEPTH.set(stats["max_queued"])
+    AUDIT_LOG_ENQUEUED.set_total(stats["enqueued"])
+    AUDIT_LOG_OVERFLOWED.set_total(stats["overflowed"])
+
+
+REGISTRY.add_collector(_collect_audit_log_metrics)
+
 
 def log_audit_event(
     event_type: str,
@@ -39,4 +202,4 @@ def log_audit_event(
 
     log_data.update(kwargs)
 
-    audit_logger.info(json.dumps(log_data, ensure_ascii=False))
+    audit_logger.info(AuditMessage(log_data))
@@ -1,32 +1,200 @@
+import random
 import re
+from itertools import accumulate
 from typing import Tuple
 
 
-# プロンプトインジェクション攻撃のパターン
-PROMPT_INJECTION_PATTERNS = [
+# プロンプトインジェクション攻撃のパターンと、その一致に必ず含まれるキーワード
+# キーワードはパターンの一致箇所の先頭から INJECTION_KEYWORD_MAX_OFFSET 文字以内に現れること
+PROMPT_INJECTION_RULES: list[tuple[str, tuple[str, ...]]] = [
     # システムプロンプト上書き指示（英語）
-    r"ignore\s+(previous|all|above|earlier)\s+(instruction|command|prompt|rule)",
-    r"disregard\s+(previous|all|above|earlier)\s+(instruction|command|prompt|rule)",
-    r"forget\s+(previous|all|above|earlier)\s+(instruction|command|prompt|rule)",
+    (r"ignore\s+(previous|all|above|earlier)\s+(instruction|command|prompt|rule)", ("ignore",)),
+    (r"disregard\s+(previous|all|above|earlier)\s+(instruction|command|prompt|rule)", ("disregard",)),
+    (r"forget\s+(previous|all|above|earlier)\s+(instruction|command|prompt|rule)", ("forget",)),
     # システムプロンプト上書き指示（日本語）
-    r"(以前|これまで|上記|全て)の(指示|命令|プロンプト|ルール)を(無視|忘れ|破棄)",
-    r"新しい(指示|命令|プロンプト|ルール)に従[いっ]?て",
+    (
+        r"(以前|これまで|上記|全て)の(指示|命令|プロンプト|ルール)を(無視|忘れ|破棄)",
+        ("無視", "忘れ", "破棄"),
+    ),
+    (r"新しい(指示|命令|プロンプト|ルール)に従[いっ]?て", ("新しい",)),
     # ロールプレイング攻撃
-    r"you\s+are\s+now\s+",
-    r"act\s+as\s+(a|an)\s+",
-    r"pretend\s+(to\s+be|you\s+are)",
-    r"(あなた|君)は(今から|これから).*として(振る舞|行動)",
+    (r"you\s+are\s+now\s+", ("you",)),
+    (r"act\s+as\s+(a|an)\s+", ("act",)),
+    (r"pretend\s+(to\s+be|you\s+are)", ("pretend",)),
+    (r"(あなた|君)は(今から|これから).*として(振る舞|行動)", ("今から", "これから")),
     # システムへの直接命令
-    r"(tell|show|give|provide)\s+me\s+(the|your)\s+(system|instruction|prompt)",
-    r"reveal\s+(your|the)\s+(system|instruction|prompt)",
-    r"(システム|指示|プロンプト)を(教え|見せ|表示)",
+    (
+        r"(tell|show|give|provide)\s+me\s+(the|your)\s+(system|instruction|prompt)",
+        ("tell", "show", "give", "provide"),
+    ),
+    (r"reveal\s+(your|the)\s+(system|instruction|prompt)", ("reveal",)),
+    (r"(システム|指示|プロンプト)を(教え|見せ|表示)", ("教え", "見せ", "表示")),
     # プロンプト境界の混乱
-    r"<\|im_(start|end)\|>",
-    r"\[INST\]|\[/INST\]",
-    r"<system>|</system>",
-    r"### (System|User|Assistant):",
+    (r"<\|im_(start|end)\|>", ("<|im_",)),
+    (r"\[INST\]|\[/INST\]", ("[inst]", "[/inst]")),
+    (r"<system>|</system>", ("<system>", "</system>")),
+    (r"### (System|User|Assistant):", ("### ",)),
 ]
 
+PROMPT_INJECTION_PATTERNS = [pattern for pattern, _ in PROMPT_INJECTION_RULES]
+
+INJECTION_KEYWORD_MAX_OFFSET = 16
+
+# IGNORECASE では ASCII 英字に一致するが、小文字化しても ASCII にならない文字
+_CASEFOLD_ONLY_CHARS = ("ı", "ſ")
+
+_INJECTION_FLAGS = re.IGNORECASE | re.MULTILINE
+_COMPILED_INJECTION_PATTERNS = [
+    re.compile(pattern, _INJECTION_FLAGS) for pattern in PROMPT_INJECTION_PATTERNS
+]
+
+
+def _scan_injection_patterns(text_lower: str) -> list[str]:
+    """キーワードで候補を絞り込み、該当パターンのみ正規表現で確認する
+
+    キーワードの有無は str.find（C実装の部分文字列検索）で調べ、キーワードを含む
+    パターンだけを最初の出現位置の近傍から正規表現で確認する。
+    結果は PROMPT_INJECTION_PATTERNS の順序。
+    """
+    exhaustive = any(c in text_lower for c in _CASEFOLD_ONLY_CHARS)
+
+    matched_patterns = []
+    for (pattern, keywords), compiled in zip(
+        PROMPT_INJECTION_RULES, _COMPILED_INJECTION_PATTERNS
+    ):
+        if exhaustive:
+            start = 0
+        else:
+            positions = [p for p in map(text_lower.find, keywords) if p >= 0]
+            if not positions:
+                continue
+            # 最初のキーワードより前から始まる一致はないため、その近傍から確認
+            start = max(0, min(positions) - INJECTION_KEYWORD_MAX_OFFSET)
+
+        if compiled.search(text_lower, start):
+            matched_patterns.append(pattern)
+
+    return matched_patterns
+
+
+# 異常な繰り返しとみなす最小単位長と連続回数（旧正規表現 (.{20,}?)\1{9,} と同じ条件）
+REPEATED_UNIT_MIN_LENGTH = 20
+REPEATED_MIN_COUNT = 10
+
+# ローリングハッシュの法と基数（基数はプロセスごとに乱択し、衝突を狙った入力を防ぐ）
+_HASH_MOD = (1 << 61) - 1
+_HASH_BASE = random.randrange(1 << 20, _HASH_MOD - 1)
+
+
+def _has_repeated_line_segment(
+    line: str, min_unit: int, min_count: int
+) -> bool:
+    """改行を含まない文字列に長さ min_unit 以上の単位の min_count 回連続があるか判定（min_count >= 3）
+
+    周期 p ごとに p の倍数位置のブロックを比較し、隣接ブロックの一致を起点に
+    周期 p の連続区間を伸長して長さが min_count * p に達するかを調べる。
+    連続区間は p 境界にそろったブロックを min_count - 2 組以上含むため、
+    8 ブロックおきの検査で取りこぼさない（min_count = 10 の場合）。
+    """
+    m = len(line)
+    max_unit = m // min_count
+    if max_unit < min_unit:
+        return False
+
+    mod = _HASH_MOD
+    prefix = list(
+        accumulate(map(ord, line), lambda h, c: (h * _HASH_BASE + c) % mod, initial=0)
+    )
+    powers = list(
+        accumulate(range(max_unit), lambda h, _: h * _HASH_BASE % mod, initial=1)
+    )
+
+    def substring_hash(start: int, length: int) -> int:
+        return (prefix[start + length] - prefix[start] * powers[length]) % mod
+
+    def common_prefix(a: int, b: int, limit: int) -> int:
+        """line[a:] と line[b:] の共通接頭辞長（limit 以下）"""
+        lo, hi = 0, limit
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if substring_hash(a, mid) == substring_hash(b, mid):
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+    def common_suffix(a: int, b: int, limit: int) -> int:
+        """line[:a] と line[:b] の共通接尾辞長（limit 以下）"""
+        lo, hi = 0, limit
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if substring_hash(a - mid, mid) == substring_hash(b - mid, mid):
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+    step = min_count - 2
+    for p in range(min_unit, max_unit + 1):
+        power = powers[p]
+        scale = 1 + power
+        double = 2 * p
+        # ブロック [x, x+p) と [x+p, x+2p) のハッシュが一致する位置
+        candidates = [
+            x
+            for x in range(0, m - double + 1, step * p)
+            if not (prefix[x + p] * scale - prefix[x] * power - prefix[x + double]) % mod
+        ]
+        for x in candidates:
+            # 一致するブロックを左右に伸長
+            left = x
+            right = x + 2 * p
+            while (
+                right + p <= m
+                and (right - left) < min_count * p
+                and substring_hash(right, p) == substring_hash(right - p, p)
+            ):
+                right += p
+            while (
+                left - p >= 0
+                and (right - left) < min_count * p
+                and substring_hash(left - p, p) == substring_hash(left, p)
+            ):
+                left -= p
+
+            # ブロック境界を越えた部分一致を伸長
+            if right - left < min_count * p:
+                right += common_prefix(right - p, right, min(p - 1, m - right))
+                left -= common_suffix(left, left + p, min(p - 1, left))
+
+            if right - left >= min_count * p:
+                # ハッシュ衝突に備えて実文字列で確認
+                span = (min_count - 1) * p
+                if line[left:left + span] == line[left + p:left + p + span]:
+                    return True
+
+    return False
+
+
+def has_repeated_pattern(text: str) -> bool:
+    r"""
+    同じ文字列（20文字以上）が10回以上連続する箇所があるか判定
+
+    正規表現 (.{20,}?)\1{9,} と同じ判定を、バックトラッキングなしで O(n log n) で行う。
+    正規表現の "." と同様に改行をまたぐ繰り返しは対象外。
+    """
+    min_length = REPEATED_UNIT_MIN_LENGTH * REPEATED_MIN_COUNT
+    if len(text) < min_length:
+        return False
+
+    return any(
+        len(line) >= min_length
+        and _has_repeated_line_segment(
+            line, REPEATED_UNIT_MIN_LENGTH, REPEATED_MIN_COUNT
+        )
+        for line in text.split("\n")
+    )
+
 
 def detect_prompt_injection(text: str) -> Tuple[bool, list[str]]:
     """
@@ -38,47 +206,53 @@ def detect_prompt_injection(text: str) -> Tuple[bool, list[str]]:
     if not text:
         return False, []
 
-    matched_patterns = []
-    text_lower = text.lower()
-
-    for pattern in PROMPT_INJECTION_PATTERNS:
-        if re.search(pattern, text_lower, re.IGNORECASE | re.MULTILINE):
-            matched_patterns.append(pattern)
+    matched_patterns = _scan_injection_patterns(text.lower())
 
     # 異常な繰り返しパターンの検出（同じ文字列が10回以上連続）
-    repeated_pattern = re.search(r"(.{20,}?)\1{9,}", text)
-    if repeated_pattern:
+    if has_repeated_pattern(text):
         matched_patterns.append("repeated_pattern_detected")
 
     return len(matched_patterns) > 0, matched_patterns
 
 
+_SCRIPT_TAG_PATTERN = re.compile(r"<script[^>]*>.*?</script>", re.DOTALL | re.IGNORECASE)
+_STYLE_TAG_PATTERN = re.compile(r"<style[^>]*>.*?</style>", re.DOTALL | re.IGNORECASE)
+_IFRAME_TAG_PATTERN = re.compile(r"<iframe[^>]*>.*?</iframe>", re.DOTALL | re.IGNORECASE)
+_EVENT_HANDLER_PATTERN = re.compile(r'\son\w+\s*=\s*["\'][^"\']*["\']', re.IGNORECASE)
+_CONTROL_CHAR_PATTERN = re.compile(r"[\x00-\x08\x0B-\x0C\x0E-\x1F\x7F]")
+
+# 除去対象はいずれも "<"、"="、制御文字のどれかを含む
+_SANITIZE_TRIGGER_PATTERN = re.compile(r"[<=\x00-\x08\x0B-\x0C\x0E-\x1F\x7F]")
+_DANGEROUS_TAG_OPEN_PATTERN = re.compile(r"<(?:script|style|iframe)", re.IGNORECASE)
+
+
 def sanitize_medical_text(text: str) -> str:
     """
     医療テキストのサニタイゼーション
 
     XSS対策とプロンプトインジェクション軽減のため入力を整形
     医療情報の可読性を保ちつつ危険なパターンを除去
+    除去対象がない場合は入力と同じオブジェクトを返す（コピーしない）
     """
     if not text:
         return text
 
-    # スクリプトタグの完全除去
-    text = re.sub(
-        r"<script[^>]*>.*?</script>", "", text, flags=re.DOTALL | re.IGNORECASE
-    )
-    text = re.sub(r"<style[^>]*>.*?</style>", "", text, flags=re.DOTALL | re.IGNORECASE)
-    text = re.sub(
-        r"<iframe[^>]*>.*?</iframe>", "", text, flags=re.DOTALL | re.IGNORECASE
-    )
+    # 1回の走査で除去対象の手がかりがなければ各パターンの適用を省略
+    if _SANITIZE_TRIGGER_PATTERN.search(text) is None:
+        return text
+
+    # スクリプトタグの完全除去（除去後の文字列に次のパターンを適用する順序を維持）
+    if "<" in text and _DANGEROUS_TAG_OPEN_PATTERN.search(text):
+        text = _SCRIPT_TAG_PATTERN.sub("", text)
+        text = _STYLE_TAG_PATTERN.sub("", text)
+        text = _IFRAME_TAG_PATTERN.sub("", text)
 
     # イベントハンドラ属性の除去
-    text = re.sub(r'\son\w+\s*=\s*["\'][^"\']*["\']', "", text, flags=re.IGNORECASE)
+    if "=" in text and ('"' in text or "'" in text):
+        text = _EVENT_HANDLER_PATTERN.sub("", text)
 
     # 制御文字の除去（改行とタブは保持）
-    text = re.sub(r"[\x00-\x08\x0B-\x0C\x0E-\x1F\x7F]", "", text)
-
-    return text
+    return _CONTROL_CHAR_PATTERN.sub("", text)
 
 
 def validate_medical_input(
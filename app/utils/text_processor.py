@@ -1,4 +1,5 @@
 import re
+from functools import lru_cache
 
 from app.core.constants import DEFAULT_SECTION_NAMES, SECTION_DETECTION_PATTERNS
 
@@ -29,55 +30,150 @@ def format_output_summary(summary_text: str) -> str:
     return processed_text
 
 
-def parse_output_summary(summary_text: str) -> dict[str, str]:
-    """AI出力をセクションごとに分割してパース"""
-    sections = {section: "" for section in DEFAULT_SECTION_NAMES}
-    lines = summary_text.split('\n')
-    current_section = None
+@lru_cache(maxsize=8)
+def _compile_section_header_pattern(
+    section_names: tuple[str, ...],
+    aliases: tuple[tuple[str, str], ...],
+    detection_patterns: tuple[str, ...],
+) -> tuple[re.Pattern[str], dict[int, tuple[str, int | None]]]:
+    """セクション見出しの判定を1本の正規表現にまとめる
+
+    (セクション名, 検出パターン) の組を従来の探索順に並べた選択として連結する。
+    正規表現の選択は先頭から順に試されるため、最初に一致する組は従来と同じになる。
+    戻り値の辞書は「組全体のグループ番号 → (セクション名, 本文グループ番号)」。
+    """
+    alias_map = dict(aliases)
+    alternatives = []
+    group_info: dict[int, tuple[str, int | None]] = {}
+    group_index = 1
+    for section in section_names:
+        for pattern in detection_patterns:
+            formatted = pattern.format(section=re.escape(section))
+            inner_groups = re.compile(formatted).groups
+            alternatives.append(f"({formatted})")
+            group_info[group_index] = (
+                alias_map.get(section, section),
+                group_index + 1 if inner_groups else None,
+            )
+            group_index += 1 + inner_groups
+
+    return re.compile("|".join(alternatives)), group_info
+
+
+def _section_header_pattern() -> tuple[re.Pattern[str], dict[int, tuple[str, int | None]]]:
+    """現在のセクション名・エイリアスに対応する見出し判定パターン（変更時のみ再構築）"""
+    section_names = tuple(dict.fromkeys(DEFAULT_SECTION_NAMES)) + tuple(section_aliases)
+    return _compile_section_header_pattern(
+        section_names,
+        tuple(section_aliases.items()),
+        tuple(SECTION_DETECTION_PATTERNS),
+    )
 
-    all_section_names = list(sections.keys()) + list(section_aliases.keys())
 
-    for line in lines:
-        line = line.strip()
+def detect_section_header(line: str) -> tuple[str, str] | None:
+    """前後の空白を除いた行がセクション見出しなら (セクション名, 同じ行の本文) を返す"""
+    pattern, group_info = _section_header_pattern()
+    match = pattern.match(line)
+    if match is None:
+        return None
+
+    assert match.lastindex is not None
+    section, content_group = group_info[match.lastindex]
+    remaining_content = (
+        (match.group(content_group) or "").strip() if content_group else ""
+    )
+    return section, remaining_content
+
+
+class IncrementalSectionParser:
+    """ストリーミング中のチャンクから出力を逐次整形してセクションに分割する
+
+    チャンクは改行までバッファし、確定した行だけを format_output_summary と同じ規則で
+    整形して見出しを判定する。見出しがチャンク境界で分割されても行の確定まで判定しない。
+    finish() の結果は全文に format_output_summary → parse_output_summary を適用した結果と一致する。
+    """
+
+    def __init__(self) -> None:
+        # 文字列の逐次連結は長い出力で二乗時間になるため行のリストに集めて最後に結合
+        self._section_lines: dict[str, list[str]] = {
+            section: [] for section in DEFAULT_SECTION_NAMES
+        }
+        self._current_section: str | None = None
+        self._pending: list[str] = []
+        # 空のセクションはクライアント側の初期状態と同じため通知しない
+        self._emitted: dict[str, str] = dict.fromkeys(DEFAULT_SECTION_NAMES, "")
+
+    def feed(self, chunk: str) -> list[tuple[str, str]]:
+        """チャンクを追加し、この追加で完了したセクションの (セクション名, 内容) を返す
+
+        次の見出しが現れた時点で直前のセクションを完了とみなす。
+        同じセクションが再び現れて内容が変わった場合は再度返す。
+        """
+        if "\n" not in chunk:
+            self._pending.append(chunk)
+            return []
+
+        self._pending.append(chunk)
+        lines = "".join(self._pending).split("\n")
+        self._pending = [lines.pop()]
+
+        completed = []
+        for line in lines:
+            closed_section = self._add_line(format_output_summary(line).strip())
+            if closed_section is not None:
+                completed.extend(self._emit(closed_section))
+        return completed
+
+    def finish(self) -> dict[str, str]:
+        """残りのバッファを処理し、全セクションの内容を返す"""
+        self._add_line(format_output_summary("".join(self._pending)).strip())
+        self._pending = []
+        return self.sections()
+
+    def flush(self) -> list[tuple[str, str]]:
+        """finish() を行い、未通知の内容が残るセクションの (セクション名, 内容) を返す
+
+        最後のセクションは後続の見出しで完了しないため、ストリーム終了時に呼び出す。
+        """
+        self.finish()
+        return [item for section in DEFAULT_SECTION_NAMES for item in self._emit(section)]
+
+    def sections(self) -> dict[str, str]:
+        """現時点の各セクションの内容"""
+        return {
+            k: "\n".join(self._section_lines.get(k, [])) for k in DEFAULT_SECTION_NAMES
+        }
+
+    def _add_line(self, line: str) -> str | None:
+        """前後の空白を除いた1行を取り込み、見出しで閉じたセクション名を返す"""
         if not line:
-            continue
-
-        found_section = False
-        detected_section = None
-        remaining_content = ""
-
-        for section in all_section_names:
-            patterns = [
-                pattern.format(section=re.escape(section)) for pattern in SECTION_DETECTION_PATTERNS
-            ]
-
-            for pattern in patterns:
-                match = re.match(pattern, line)
-                if match:
-                    if section in section_aliases:
-                        detected_section = section_aliases[section]
-                    else:
-                        detected_section = section
-
-                    if match.groups():
-                        remaining_content = match.group(1).strip()
-                    else:
-                        remaining_content = ""
-
-                    found_section = True
-                    break
-
-            if found_section:
-                break
-
-        if found_section:
-            current_section = detected_section
-            if remaining_content and current_section:
-                sections[current_section] = remaining_content
-        elif current_section and line:
-            if sections[current_section]:
-                sections[current_section] += "\n" + line
-            else:
-                sections[current_section] = line
-
-    return {k: sections.get(k, "") for k in DEFAULT_SECTION_NAMES}
+            return None
+
+        header = detect_section_header(line)
+        if header:
+            section, remaining_content = header
+            closed_section = self._current_section
+            self._current_section = section
+            if remaining_content:
+                self._section_lines[section] = [remaining_content]
+            return closed_section if closed_section != section else None
+
+        if self._current_section:
+            self._section_lines[self._current_section].append(line)
+        return None
+
+    def _emit(self, section: str) -> list[tuple[str, str]]:
+        """前回通知から内容が変わったセクションのみ通知対象にする"""
+        content = "\n".join(self._section_lines.get(section, []))
+        if self._emitted.get(section) == content:
+            return []
+        self._emitted[section] = content
+        return [(section, content)]
+
+
+def parse_output_summary(summary_text: str) -> dict[str, str]:
+    """AI出力をセクションごとに分割してパース"""
+    parser = IncrementalSectionParser()
+    for line in summary_text.split('\n'):
+        parser._add_line(line.strip())
+    return parser.sections()
@@ -0,0 +1,39 @@
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """1リクエスト内の処理段階ごとの所要時間を記録する
+
+    同じ段階名を複数回計測した場合は合算する。スレッド（asyncio.to_thread）からも記録できる。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stages: dict[str, float] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        """段階の所要時間（秒）を加算"""
+        with self._lock:
+            self._stages[name] = self._stages.get(name, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """with ブロックの実行時間を段階の所要時間として記録（例外時も記録する）"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def seconds(self, name: str) -> float | None:
+        """段階の所要時間（秒）。未記録なら None"""
+        with self._lock:
+            return self._stages.get(name)
+
+    def as_dict(self) -> dict[str, float]:
+        """段階名とミリ秒（小数1桁）の辞書を記録順に返す"""
+        with self._lock:
+            return {name: round(seconds * 1000, 1) for name, seconds in self._stages.items()}
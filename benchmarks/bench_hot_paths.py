@@ -0,0 +1,227 @@
+"""リクエストごとに実行されるテキスト処理のマイクロベンチマーク
+
+format_output_summary, parse_output_summary, sanitize_medical_text,
+detect_prompt_injection, validate_medical_input を固定の合成コーパスで計測し、
+1回あたりの実行時間（ns/op）と最大確保メモリ（tracemalloc のピーク）を表示する。
+
+--save-baseline で結果を保存し、--baseline で保存済みの結果と比較する。
+実行時間または確保メモリが threshold を超えて増えたケースがあれば終了コード1。
+実行時間はマシンに依存するため、基準値は比較に使うのと同じマシンで保存すること。
+
+実行方法:
+    python -m benchmarks.bench_hot_paths --save-baseline benchmarks/hot_paths_baseline.json
+    python -m benchmarks.bench_hot_paths --baseline benchmarks/hot_paths_baseline.json
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+
+from app.core.constants import DEFAULT_SECTION_NAMES
+from app.utils.input_sanitizer import (
+    detect_prompt_injection,
+    sanitize_medical_text,
+    validate_medical_input,
+)
+from app.utils.text_processor import format_output_summary, parse_output_summary
+
+KARTE_SENTENCES = [
+    "患者は発熱と咳嗽を主訴に来院した。",
+    "胸部X線で右下肺野に浸潤影を認め、抗菌薬投与を開始した。",
+    "経過良好にて内服継続とし、外来で経過観察の方針とする。\n",
+    "既往歴: 高血圧症、2型糖尿病。\tアレルギー歴なし。",
+    "HbA1c=7.2%、K=4.1。収縮期血圧<140を目標とする。\n",
+]
+BODY_LINES = [
+    "アムロジピン錠5mg 1日1回 朝食後",
+    "メトホルミン塩酸塩錠250mg 1日2回 朝夕食後",
+    "定期的な血圧測定と HbA1c のフォローをお願いします。",
+    "特記すべき副作用なし。",
+]
+
+
+def _karte(length: int, rng: random.Random) -> str:
+    parts: list[str] = []
+    total = 0
+    while total < length:
+        sentence = rng.choice(KARTE_SENTENCES)
+        parts.append(sentence)
+        total += len(sentence)
+    return "".join(parts)[:length]
+
+
+def _json_karte(entries: int, rng: random.Random) -> str:
+    """電子カルテから出力した形式（日付ごとのSOAP）のJSON"""
+    records = [
+        {
+            "date": f"2026-{1 + i // 28 % 12:02d}-{1 + i % 28:02d}",
+            "department": "内科",
+            "soap": {
+                "S": _karte(80, rng),
+                "O": _karte(120, rng),
+                "A": _karte(60, rng),
+                "P": _karte(80, rng),
+            },
+        }
+        for i in range(entries)
+    ]
+    return json.dumps(records, ensure_ascii=False, indent=2)
+
+
+def _output_with_sections(repeats: int, rng: random.Random) -> str:
+    """見出しの表記ゆれ（【】、コロン、Markdown）を含む多セクションの出力"""
+    lines = []
+    for i in range(repeats):
+        for name in DEFAULT_SECTION_NAMES:
+            header = rng.choice([f"【{name}】", f"{name}:", f"## {name}", f"**{name}**"])
+            lines.append(header)
+            lines.extend(rng.choices(BODY_LINES, k=3))
+        lines.append(f"- 補足{i}")
+    return "\n".join(lines)
+
+
+def _adversarial_repeated(length: int) -> str:
+    """同じ文字列の連続が検出閾値（10回）にわずかに届かない繰り返し"""
+    unit = "所見なし。" * 9 + "特記事項なし。\n"
+    return (unit * (length // len(unit) + 1))[:length]
+
+
+def build_corpora() -> dict[str, str]:
+    rng = random.Random(0)
+    return {
+        "karte_short": _karte(2_000, rng),
+        "karte_300k": _karte(300_000, rng),
+        "karte_json": _json_karte(300, rng),
+        "output_sections": _output_with_sections(40, rng),
+        "adversarial_repeated": _adversarial_repeated(300_000),
+    }
+
+
+# (関数名, 関数, 対象コーパス)
+CASES: list[tuple[str, Callable[[str], object], list[str]]] = [
+    ("format_output_summary", format_output_summary, ["karte_short", "output_sections"]),
+    ("parse_output_summary", parse_output_summary, ["karte_short", "output_sections"]),
+    (
+        "sanitize_medical_text",
+        sanitize_medical_text,
+        ["karte_short", "karte_300k", "karte_json", "adversarial_repeated"],
+    ),
+    (
+        "detect_prompt_injection",
+        detect_prompt_injection,
+        ["karte_short", "karte_300k", "karte_json", "adversarial_repeated"],
+    ),
+    (
+        "validate_medical_input",
+        validate_medical_input,
+        ["karte_short", "karte_300k", "karte_json", "adversarial_repeated"],
+    ),
+]
+
+
+def measure_time(func: Callable[[str], object], text: str, repeat: int, min_seconds: float) -> float:
+    """min_seconds 以上かかる回数を1サンプルとし、repeat サンプル中の最短の ns/op"""
+    loops = 1
+    while True:
+        start = time.perf_counter_ns()
+        for _ in range(loops):
+            func(text)
+        elapsed = time.perf_counter_ns() - start
+        if elapsed >= min_seconds * 1e9:
+            break
+        loops *= 2
+    best = elapsed / loops
+    for _ in range(repeat - 1):
+        start = time.perf_counter_ns()
+        for _ in range(loops):
+            func(text)
+        best = min(best, (time.perf_counter_ns() - start) / loops)
+    return best
+
+
+def measure_allocations(func: Callable[[str], object], text: str) -> int:
+    """1回の呼び出しで確保したメモリのピーク（バイト）"""
+    func(text)  # 正規表現のコンパイルなど初回のみの確保を除く
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        func(text)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - baseline
+
+
+def run(case_filter: str | None, repeat: int, min_seconds: float) -> dict[str, dict[str, float]]:
+    corpora = build_corpora()
+    results: dict[str, dict[str, float]] = {}
+    print(f"{'case':<50}{'length':>9}{'ns/op':>16}{'peak alloc (B)':>16}")
+    for name, func, corpus_names in CASES:
+        for corpus_name in corpus_names:
+            key = f"{name}[{corpus_name}]"
+            if case_filter and case_filter not in key:
+                continue
+            text = corpora[corpus_name]
+            ns_per_op = measure_time(func, text, repeat, min_seconds)
+            peak_bytes = measure_allocations(func, text)
+            results[key] = {"ns_per_op": round(ns_per_op, 1), "peak_bytes": peak_bytes}
+            print(f"{key:<50}{len(text):>9}{ns_per_op:>16,.0f}{peak_bytes:>16,}")
+    return results
+
+
+def compare(
+    results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]], threshold: float
+) -> list[str]:
+    """基準値から threshold を超えて増えた指標を返す"""
+    regressions = []
+    print(f"\n{'case':<50}{'ns/op':>10}{'alloc':>10}")
+    for key, current in results.items():
+        before = baseline.get(key)
+        if before is None:
+            continue
+        changes = []
+        for metric in ("ns_per_op", "peak_bytes"):
+            old, new = before[metric], current[metric]
+            change = (new - old) / old if old else 0.0
+            changes.append(change)
+            # 数百バイト程度の確保量の揺れは比較しない
+            if change > threshold and not (metric == "peak_bytes" and new - old < 1024):
+                regressions.append(f"{key} {metric}: {old:,.0f} -> {new:,.0f} ({change:+.1%})")
+        print(f"{key:<50}{changes[0]:>+10.1%}{changes[1]:>+10.1%}")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", help="ケース名に含まれる文字列で絞り込み")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="1サンプルの最短計測時間")
+    parser.add_argument("--baseline", type=Path, help="比較する基準値のJSONファイル")
+    parser.add_argument("--save-baseline", type=Path, help="結果を基準値として保存するJSONファイル")
+    parser.add_argument(
+        "--threshold", type=float, default=0.25, help="悪化とみなす増加率（既定 0.25 = 25%%）"
+    )
+    args = parser.parse_args(argv)
+
+    results = run(args.filter, args.repeat, args.min_seconds)
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("\n基準値より悪化したケース:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
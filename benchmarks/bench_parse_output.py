@@ -0,0 +1,104 @@
+"""parse_output_summary のマイクロベンチマーク
+
+旧実装（行 × セクション名 × 検出パターンごとに re.escape と re.match）と
+見出し判定を1本の正規表現にまとめた現行実装の実行時間を比較し、
+出力が一致することを確認する。
+
+実行方法:
+    python -m benchmarks.bench_parse_output
+"""
+
+import random
+import re
+import time
+from collections.abc import Callable
+
+from app.core.constants import DEFAULT_SECTION_NAMES, SECTION_DETECTION_PATTERNS
+from app.utils.text_processor import parse_output_summary, section_aliases
+
+LINE_COUNTS = [20, 500, 5_000]
+BODY_LINES = [
+    "アムロジピン錠5mg 1日1回 朝食後",
+    "メトホルミン塩酸塩錠250mg 1日2回 朝夕食後",
+    "定期的な血圧測定と HbA1c のフォローをお願いします。",
+    "特記すべき副作用なし。",
+]
+HEADERS = ["【現在の処方】", "備考:", "■その他", "補足：", "[メモ]"]
+
+
+def legacy_parse_output_summary(summary_text: str) -> dict[str, str]:
+    """旧実装"""
+    sections = {section: "" for section in DEFAULT_SECTION_NAMES}
+    current_section = None
+    all_section_names = list(sections.keys()) + list(section_aliases.keys())
+
+    for line in summary_text.split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+
+        found_section = False
+        detected_section = None
+        remaining_content = ""
+        for section in all_section_names:
+            patterns = [
+                pattern.format(section=re.escape(section))
+                for pattern in SECTION_DETECTION_PATTERNS
+            ]
+            for pattern in patterns:
+                match = re.match(pattern, line)
+                if match:
+                    detected_section = section_aliases.get(section, section)
+                    remaining_content = match.group(1).strip() if match.groups() else ""
+                    found_section = True
+                    break
+            if found_section:
+                break
+
+        if found_section:
+            current_section = detected_section
+            if remaining_content and current_section:
+                sections[current_section] = remaining_content
+        elif current_section and line:
+            if sections[current_section]:
+                sections[current_section] += "\n" + line
+            else:
+                sections[current_section] = line
+
+    return {k: sections.get(k, "") for k in DEFAULT_SECTION_NAMES}
+
+
+def multi_section_output(line_count: int, rng: random.Random) -> str:
+    """見出しと本文が交互に現れる長い出力"""
+    lines = []
+    for i in range(line_count):
+        lines.append(rng.choice(HEADERS) if i % 10 == 0 else rng.choice(BODY_LINES))
+    return "\n".join(lines)
+
+
+def measure(func: Callable[[str], object], text: str, repeat: int) -> float:
+    """repeat 回実行した中で最短の実行時間（秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    rng = random.Random(0)
+    print(f"{'lines':>8}{'chars':>10}{'legacy (ms)':>14}{'current (ms)':>14}{'speedup':>10}")
+    for line_count in LINE_COUNTS:
+        text = multi_section_output(line_count, rng)
+        assert parse_output_summary(text) == legacy_parse_output_summary(text)
+        legacy = measure(legacy_parse_output_summary, text, 5)
+        current = measure(parse_output_summary, text, 5)
+        print(
+            f"{line_count:>8}{len(text):>10}{legacy * 1000:>14.3f}"
+            f"{current * 1000:>14.3f}{legacy / current:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""繰り返しパターン検出のマイクロベンチマーク
+
+旧実装の正規表現 (.{20,}?)\\1{9,} と has_repeated_pattern の実行時間を
+入力長ごとに比較する。正規表現は入力長に対して超線形に遅くなるため、
+LEGACY_MAX_LENGTH を超える入力では計測しない。
+
+実行方法:
+    python -m benchmarks.bench_repeated_pattern
+"""
+
+import random
+import re
+import time
+from collections.abc import Callable
+
+from app.utils.input_sanitizer import has_repeated_pattern
+
+LEGACY_PATTERN = re.compile(r"(.{20,}?)\1{9,}")
+LEGACY_MAX_LENGTH = 20_000
+LENGTHS = [1_000, 5_000, 20_000, 100_000, 300_000]
+KARTE_CHARS = "患者は発熱と咳嗽を主訴に来院した血圧脈拍体温酸素飽和度投与継続経過良好 0123456789"
+
+
+def karte_single_line(length: int, rng: random.Random) -> str:
+    """改行を含まない長いカルテ風テキスト（正規表現の最悪ケース）"""
+    return "".join(rng.choice(KARTE_CHARS) for _ in range(length))
+
+
+def fibonacci_word(length: int, _rng: random.Random) -> str:
+    """平方（同じ文字列の2回連続）を多数含むが10回連続は含まない文字列"""
+    previous, current = "a", "ab"
+    while len(current) < length:
+        previous, current = current, current + previous
+    return current[:length]
+
+
+def nine_repeats(length: int, rng: random.Random) -> str:
+    """検出閾値の直前（9回連続）の繰り返しを並べた文字列"""
+    blocks = []
+    while sum(len(b) for b in blocks) < length:
+        unit = "".join(rng.choice(KARTE_CHARS) for _ in range(rng.randint(20, 200)))
+        blocks.append(unit * 9 + "。")
+    return "".join(blocks)[:length]
+
+
+CORPORA: dict[str, Callable[[int, random.Random], str]] = {
+    "karte_single_line": karte_single_line,
+    "fibonacci_word": fibonacci_word,
+    "nine_repeats": nine_repeats,
+}
+
+
+def measure(func: Callable[[str], object], text: str, repeat: int) -> float:
+    """repeat 回実行した中で最短の実行時間（秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    rng = random.Random(0)
+    print(f"{'corpus':<20}{'length':>10}{'legacy (ms)':>14}{'linear (ms)':>14}")
+    for name, build in CORPORA.items():
+        for length in LENGTHS:
+            text = build(length, rng)
+            repeat = 3 if length <= LEGACY_MAX_LENGTH else 1
+            legacy = (
+                f"{measure(LEGACY_PATTERN.search, text, repeat) * 1000:.1f}"
+                if length <= LEGACY_MAX_LENGTH
+                else "-"
+            )
+            linear = measure(has_repeated_pattern, text, repeat) * 1000
+            print(f"{name:<20}{length:>10}{legacy:>14}{linear:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+"""生成・評価エンドポイントの負荷試験
+
+起動済みのサーバー（疑似LLM: FAKE_LLM_ENABLED=true を推奨）に対して
+/api/summary/generate, /api/summary/generate-stream, /api/evaluation/evaluate-stream を
+指定した同時接続数で呼び出し、次の値を計測する。
+
+- スループット（成功件数/秒）と応答時間の p50/p99
+- 最初の delta イベントまでの時間（TTFT。delta を送らない評価は complete まで）
+- SSEハートビートの遅れ（直前のイベントからの間隔 − ハートビート間隔）
+- サーバープロセスの常駐メモリ増分の接続あたりの値（--server-pid 指定時、Linux のみ）
+
+結果は JSON に保存し、--baseline で以前の結果と比較できる（悪化があれば終了コード1）。
+
+実行方法:
+    FAKE_LLM_ENABLED=true DAILY_REQUEST_LIMIT=1000000 uvicorn app.main:app --workers 2
+    python -m benchmarks.load_test --base-url http://127.0.0.1:8000 \\
+        --concurrency 20 --requests 200 --output load_results.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from app.core.constants import DEFAULT_DOCUMENT_TYPE, DEFAULT_SECTION_NAMES
+
+ENDPOINTS = {
+    "generate": "/api/summary/generate",
+    "generate-stream": "/api/summary/generate-stream",
+    "evaluate-stream": "/api/evaluation/evaluate-stream",
+}
+DEFAULT_SIZES = [1_000, 30_000, 300_000]
+CSRF_TOKEN_PATTERN = re.compile(r'window\.CSRF_TOKEN = "([^"]+)"')
+
+KARTE_SECTIONS = {
+    "主訴": ["発熱と咳嗽。", "右膝の疼痛。", "視力低下を自覚。"],
+    "現病歴": [
+        "3日前より38℃台の発熱と湿性咳嗽が出現し、近医で抗菌薬を処方されたが改善しないため当院を受診した。",
+        "胸部X線で右下肺野に浸潤影を認め、CRP 12.3 mg/dL と炎症反応の上昇を認めた。",
+        "入院後セフトリアキソン 2g/日を開始し、第4病日には解熱した。",
+        "HbA1c 7.2%、空腹時血糖 142 mg/dL。食事療法と内服で経過観察中。",
+    ],
+    "既往歴": ["高血圧症（2015年〜）。", "2型糖尿病（2018年〜）。", "虫垂炎術後（1990年）。"],
+    "処方": [
+        "アムロジピン錠5mg 1回1錠 1日1回 朝食後。",
+        "メトホルミン塩酸塩錠250mg 1回2錠 1日2回 朝夕食後。",
+        "アセトアミノフェン錠200mg 1回2錠 疼痛時。",
+    ],
+    "経過": [
+        "血圧 132/78 mmHg、脈拍 72/分、SpO2 97%（室内気）。",
+        "経過良好にて内服継続とし、外来で経過観察の方針とする。",
+        "本人・家族へ病状を説明し、同意を得た。",
+    ],
+}
+
+
+def build_karte(length: int, rng: random.Random) -> str:
+    """見出し付きの日本語カルテ風テキストを length 文字で生成"""
+    parts: list[str] = []
+    total = 0
+    while total < length:
+        for heading, sentences in KARTE_SECTIONS.items():
+            text = f"【{heading}】\n" + "".join(rng.choices(sentences, k=rng.randint(2, 6))) + "\n"
+            parts.append(text)
+            total += len(text)
+    return "".join(parts)[:length]
+
+
+def build_summary(rng: random.Random) -> str:
+    """評価対象の出力（既定のセクション見出し付き）を生成"""
+    lines = []
+    for name in DEFAULT_SECTION_NAMES:
+        sentences = rng.choices(KARTE_SECTIONS["経過"] + KARTE_SECTIONS["処方"], k=3)
+        lines.append(f"{name}:\n{''.join(sentences)}\n")
+    return "".join(lines)
+
+
+def build_payload(endpoint: str, length: int, rng: random.Random) -> dict[str, Any]:
+    karte = build_karte(length, rng)
+    if endpoint == "evaluate-stream":
+        return {
+            "document_type": DEFAULT_DOCUMENT_TYPE,
+            "input_text": karte,
+            "output_summary": build_summary(rng),
+        }
+    return {
+        "medical_text": karte,
+        "department": "default",
+        "doctor": "default",
+        "document_type": DEFAULT_DOCUMENT_TYPE,
+    }
+
+
+def percentile(values: list[float], percent: float) -> float | None:
+    """線形補間による百分位数（値がなければ None）"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * percent / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def _distribution(values: list[float], scale: float = 1.0) -> dict[str, float | None]:
+    def _scaled(value: float | None) -> float | None:
+        return None if value is None else round(value * scale, 3)
+
+    return {
+        "count": len(values),
+        "p50": _scaled(percentile(values, 50)),
+        "p99": _scaled(percentile(values, 99)),
+        "max": _scaled(max(values) if values else None),
+    }
+
+
+@dataclass
+class RequestResult:
+    """1リクエストの計測結果"""
+
+    latency: float
+    success: bool
+    ttft: float | None = None
+    heartbeat_delays: list[float] = field(default_factory=list)
+    error: str | None = None
+
+
+async def _iter_sse(response: httpx.Response):
+    """(受信時刻, イベント名, データ) を順に返す"""
+    event = "message"
+    data_lines: list[str] = []
+    async for line in response.aiter_lines():
+        if line == "":
+            if data_lines:
+                yield time.perf_counter(), event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+
+
+async def run_stream_request(
+    client: httpx.AsyncClient, path: str, payload: dict[str, Any], heartbeat_interval: float
+) -> RequestResult:
+    started = time.perf_counter()
+    ttft = None
+    heartbeat_delays: list[float] = []
+    progress_count = 0
+    last_event_at = started
+    async with client.stream("POST", path, json=payload) as response:
+        if response.status_code != 200:
+            await response.aread()
+            return RequestResult(
+                time.perf_counter() - started, False, error=f"HTTP {response.status_code}"
+            )
+        async for received_at, event, data in _iter_sse(response):
+            if event == "progress":
+                progress_count += 1
+                # 開始・実行中の2件の後に届く progress がハートビート
+                if progress_count > 2:
+                    heartbeat_delays.append(received_at - last_event_at - heartbeat_interval)
+            elif event == "delta" and ttft is None:
+                ttft = received_at - started
+            elif event == "complete":
+                return RequestResult(
+                    received_at - started,
+                    bool(data.get("success", True)),
+                    ttft if ttft is not None else received_at - started,
+                    heartbeat_delays,
+                    data.get("error_message"),
+                )
+            elif event == "error":
+                return RequestResult(
+                    received_at - started, False, ttft, heartbeat_delays, data.get("error_message")
+                )
+            last_event_at = received_at
+    return RequestResult(time.perf_counter() - started, False, ttft, heartbeat_delays, "stream closed")
+
+
+async def run_request(client: httpx.AsyncClient, path: str, payload: dict[str, Any]) -> RequestResult:
+    started = time.perf_counter()
+    response = await client.post(path, json=payload)
+    latency = time.perf_counter() - started
+    if response.status_code != 200:
+        return RequestResult(latency, False, error=f"HTTP {response.status_code}")
+    body = response.json()
+    return RequestResult(latency, bool(body.get("success")), error=body.get("error_message"))
+
+
+def read_rss_bytes(pids: list[int]) -> int | None:
+    """指定プロセスの常駐メモリ合計（/proc が読めなければ None）"""
+    total = 0
+    try:
+        for pid in pids:
+            for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    total += int(line.split()[1]) * 1024
+                    break
+    except (OSError, ValueError):
+        return None
+    return total
+
+
+class MemorySampler:
+    """負荷中のサーバープロセスの常駐メモリを定期的に記録し、最大値を保持する"""
+
+    def __init__(self, pids: list[int], interval: float = 0.2):
+        self.pids = pids
+        self.interval = interval
+        self.baseline = read_rss_bytes(pids) if pids else None
+        self.peak = self.baseline
+        self._task: asyncio.Task | None = None
+
+    async def _run(self) -> None:
+        while True:
+            rss = read_rss_bytes(self.pids)
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self.baseline is not None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def summary(self, concurrency: int) -> dict[str, float] | None:
+        if self.baseline is None or self.peak is None:
+            return None
+        return {
+            "baseline_mb": round(self.baseline / 2**20, 1),
+            "peak_mb": round(self.peak / 2**20, 1),
+            "per_connection_kb": round((self.peak - self.baseline) / concurrency / 1024, 1),
+        }
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    endpoint: str,
+    size: int,
+    args: argparse.Namespace,
+) -> dict[str, Any]:
+    """1つのエンドポイント・入力長の組み合わせを concurrency 並列で requests 件実行"""
+    rng = random.Random(f"{args.seed}:{endpoint}:{size}")
+    payloads = [build_payload(endpoint, size, rng) for _ in range(min(args.requests, 10))]
+    path = ENDPOINTS[endpoint]
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for i in range(args.requests):
+        queue.put_nowait(i)
+    results: list[RequestResult] = []
+
+    async def worker() -> None:
+        while True:
+            try:
+                i = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            payload = payloads[i % len(payloads)]
+            try:
+                if endpoint == "generate":
+                    result = await run_request(client, path, payload)
+                else:
+                    result = await run_stream_request(client, path, payload, args.heartbeat_interval)
+            except httpx.HTTPError as e:
+                result = RequestResult(0.0, False, error=type(e).__name__)
+            results.append(result)
+
+    sampler = MemorySampler(args.server_pid)
+    sampler.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    duration = time.perf_counter() - started
+    await sampler.stop()
+
+    succeeded = [r for r in results if r.success]
+    errors: dict[str, int] = {}
+    for r in results:
+        if not r.success:
+            key = r.error or "unknown"
+            errors[key] = errors.get(key, 0) + 1
+    return {
+        "endpoint": endpoint,
+        "size": size,
+        "concurrency": args.concurrency,
+        "requests": len(results),
+        "succeeded": len(succeeded),
+        "failed": len(results) - len(succeeded),
+        "errors": errors,
+        "duration_seconds": round(duration, 3),
+        "throughput_rps": round(len(succeeded) / duration, 3) if duration else 0.0,
+        "latency_ms": _distribution([r.latency for r in succeeded], 1000),
+        "ttft_ms": _distribution([r.ttft for r in succeeded if r.ttft is not None], 1000),
+        "heartbeat_delay_ms": _distribution(
+            [d for r in results for d in r.heartbeat_delays], 1000
+        ),
+        "memory": sampler.summary(args.concurrency),
+    }
+
+
+async def fetch_csrf_token(client: httpx.AsyncClient) -> str:
+    """トップページに埋め込まれたCSRFトークンを取得"""
+    response = await client.get("/")
+    response.raise_for_status()
+    match = CSRF_TOKEN_PATTERN.search(response.text)
+    if not match:
+        raise RuntimeError("トップページからCSRFトークンを取得できませんでした")
+    return match.group(1)
+
+
+# 比較する指標と、値が大きいほど良いかどうか
+COMPARED_METRICS = [
+    ("throughput_rps", None, True),
+    ("latency_ms", "p50", False),
+    ("latency_ms", "p99", False),
+    ("ttft_ms", "p99", False),
+]
+
+
+def compare_results(
+    current: list[dict[str, Any]], baseline: list[dict[str, Any]], threshold: float
+) -> list[str]:
+    """前回の結果と比較して表示し、threshold を超えて悪化した指標を返す"""
+    previous = {(r["endpoint"], r["size"], r["concurrency"]): r for r in baseline}
+    regressions = []
+    print(f"\n{'scenario':<32}{'metric':<18}{'baseline':>12}{'current':>12}{'change':>9}")
+    for result in current:
+        key = (result["endpoint"], result["size"], result["concurrency"])
+        before = previous.get(key)
+        if before is None:
+            continue
+        for metric, stat, higher_is_better in COMPARED_METRICS:
+            old = before[metric] if stat is None else before[metric][stat]
+            new = result[metric] if stat is None else result[metric][stat]
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            label = f"{key[0]} {key[1]} x{key[2]}"
+            name = metric if stat is None else f"{metric}.{stat}"
+            print(f"{label:<32}{name:<18}{old:>12.1f}{new:>12.1f}{change:>+8.1%}")
+            if (-change if higher_is_better else change) > threshold:
+                regressions.append(f"{label} {name}: {old:.1f} -> {new:.1f}")
+    return regressions
+
+
+def print_result(result: dict[str, Any]) -> None:
+    memory = result["memory"]
+    print(
+        f"{result['endpoint']:<17}{result['size']:>8}{result['succeeded']:>6}/{result['requests']:<6}"
+        f"{result['throughput_rps']:>9.2f}"
+        f"{result['latency_ms']['p50'] or 0:>10.0f}{result['latency_ms']['p99'] or 0:>10.0f}"
+        f"{result['ttft_ms']['p50'] or 0:>10.0f}{result['ttft_ms']['p99'] or 0:>10.0f}"
+        f"{result['heartbeat_delay_ms']['max'] or 0:>10.0f}"
+        f"{memory['per_connection_kb'] if memory else 0:>11.1f}"
+    )
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument(
+        "--endpoint", action="append", choices=list(ENDPOINTS),
+        help="対象エンドポイント（複数指定可、既定はすべて）",
+    )
+    parser.add_argument(
+        "--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+        help="カルテの文字数（カンマ区切り）",
+    )
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=100, help="シナリオごとのリクエスト数")
+    parser.add_argument("--heartbeat-interval", type=float, default=5.0)
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument(
+        "--server-pid", type=int, action="append", default=[],
+        help="メモリを計測するサーバープロセスのPID（ワーカーごとに複数指定可）",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="結果を保存するJSONファイル")
+    parser.add_argument("--baseline", type=Path, help="比較する以前の結果のJSONファイル")
+    parser.add_argument(
+        "--regression-threshold", type=float, default=0.1,
+        help="悪化とみなす変化率（既定 0.1 = 10%%）",
+    )
+    return parser.parse_args(argv)
+
+
+async def run(args: argparse.Namespace) -> list[dict[str, Any]]:
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        base_url=args.base_url, timeout=args.timeout, limits=limits
+    ) as client:
+        client.headers["X-CSRF-Token"] = await fetch_csrf_token(client)
+        print(
+            f"{'endpoint':<17}{'size':>8}{'ok/total':>13}{'rps':>9}{'p50 ms':>10}{'p99 ms':>10}"
+            f"{'ttft p50':>10}{'ttft p99':>10}{'hb max':>10}{'kb/conn':>11}"
+        )
+        results = []
+        for endpoint in args.endpoint or list(ENDPOINTS):
+            for size in sizes:
+                result = await run_scenario(client, endpoint, size, args)
+                print_result(result)
+                results.append(result)
+        return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    results = asyncio.run(run(args))
+    if args.output:
+        report = {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "base_url": args.base_url,
+            "results": results,
+        }
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))["results"]
+        regressions = compare_results(results, baseline, args.regression_threshold)
+        if regressions:
+            print("\n悪化した指標:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,7 +8,9 @@ import type {
     DoctorsResponse,
     SelectedModelResponse,
     SSECompleteEvent,
+    SSEDeltaEvent,
     SSEErrorEvent,
+    SSESectionEvent,
     SSEEvaluationCompleteEvent
 } from './types';
 
@@ -20,6 +22,7 @@ interface AppState {
     form: FormData;
     result: GenerationResult;
     isGenerating: boolean;
+    isStreaming: boolean;
     elapsedTime: number;
     timerInterval: ReturnType<typeof setInterval> | null;
     showCopySuccess: boolean;
@@ -97,6 +100,7 @@ export function appState(): AppState {
 
         // UI state
         isGenerating: false,
+        isStreaming: false,
         elapsedTime: 0,
         timerInterval: null,
         showCopySuccess: false,
@@ -209,6 +213,7 @@ export function appState(): AppState {
             }
 
             this.isGenerating = true;
+            this.isStreaming = false;
             this.error = null;
             this.startTimer();
 
@@ -239,6 +244,7 @@ export function appState(): AppState {
             } finally {
                 this.stopTimer();
                 this.isGenerating = false;
+                this.isStreaming = false;
             }
         },
 
@@ -299,6 +305,32 @@ export function appState(): AppState {
                 case 'progress':
                     // ハートビート - UIのステータス表示を更新可能
                     break;
+                case 'delta':
+                    // 最初の差分受信時に出力画面へ切り替え、以降は全文タブに追記
+                    if (!this.isStreaming) {
+                        this.isStreaming = true;
+                        this.result = {
+                            outputSummary: '',
+                            parsedSummary: {},
+                            processingTime: null,
+                            modelUsed: '',
+                            modelSwitched: false
+                        };
+                        this.evaluationResult = { result: '', processingTime: null };
+                        this.activeTab = 0;
+                        this.currentScreen = 'output';
+                    }
+                    this.result.outputSummary += (parsed as SSEDeltaEvent).text;
+                    break;
+                case 'section': {
+                    // 完了したセクションからタブに反映（completeで全体を上書き）
+                    const sectionData = parsed as SSESectionEvent;
+                    this.result.parsedSummary = {
+                        ...this.result.parsedSummary,
+                        [sectionData.name]: sectionData.content
+                    };
+                    break;
+                }
                 case 'complete':
                     if ((parsed as SSECompleteEvent).success) {
                         const completeData = parsed as SSECompleteEvent;
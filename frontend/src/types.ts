@@ -37,6 +37,7 @@ export interface SummaryResponse {
     model_used?: string;
     model_switched?: boolean;
     error_message?: string;
+    cached?: boolean;
 }
 
 export interface EvaluationResponse {
@@ -64,6 +65,16 @@ export interface SSECompleteEvent {
     processing_time: number;
     model_used: string;
     model_switched: boolean;
+    cached?: boolean;
+}
+
+export interface SSEDeltaEvent {
+    text: string;
+}
+
+export interface SSESectionEvent {
+    name: string;
+    content: string;
 }
 
 export interface SSEErrorEvent {
@@ -1,4 +1,8 @@
+import json
+from contextlib import contextmanager
 from datetime import datetime
+from unittest.mock import patch
+
 from fastapi import status
 
 
@@ -76,3 +80,89 @@ def test_get_records_respects_limit(client, sample_usage_records):
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
     assert len(data) <= 10
+
+
+def test_get_records_returns_next_cursor(client, sample_usage_records):
+    """使用統計レコード取得 - limit件取得した場合は次ページのカーソルを返す"""
+    response = client.get("/api/statistics/records?limit=1")
+    assert response.status_code == status.HTTP_200_OK
+    first = response.json()
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = client.get(f"/api/statistics/records?limit=1&cursor={cursor}")
+    assert response.status_code == status.HTTP_200_OK
+    second = response.json()
+    assert second[0]["id"] != first[0]["id"]
+
+    response = client.get(
+        f"/api/statistics/records?limit=1&cursor={response.headers['X-Next-Cursor']}"
+    )
+    assert response.json() == []
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_get_records_invalid_cursor(client, sample_usage_records):
+    """使用統計レコード取得 - 不正なカーソルは400"""
+    response = client.get("/api/statistics/records?cursor=invalid")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_export_records_csv(client, test_db, sample_usage_records):
+    """使用統計レコードのCSVエクスポート"""
+    @contextmanager
+    def get_db_session():
+        yield test_db
+
+    with patch("app.services.statistics_service.get_db_session", get_db_session):
+        response = client.get("/api/statistics/records/export?format=csv")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "attachment" in response.headers["content-disposition"]
+    lines = response.text.strip().splitlines()
+    assert lines[0].startswith("id,date,")
+    assert len(lines) == 3
+
+
+def test_export_records_ndjson(client, test_db, sample_usage_records):
+    """使用統計レコードのNDJSONエクスポート"""
+    @contextmanager
+    def get_db_session():
+        yield test_db
+
+    with patch("app.services.statistics_service.get_db_session", get_db_session):
+        response = client.get("/api/statistics/records/export?format=ndjson&model=Claude")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["model"] for r in records] == ["Claude"]
+
+
+def test_export_records_invalid_format(client, test_db):
+    """未対応の形式は422"""
+    response = client.get("/api/statistics/records/export?format=xml")
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_get_latency(client, sample_usage_records):
+    """処理時間の百分位数とヒストグラムの取得"""
+    response = client.get("/api/statistics/latency")
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert {(d["model"], d["document_type"]) for d in data} == {
+        ("Claude", "他院への紹介"),
+        ("Gemini", "返書"),
+    }
+    claude = next(d for d in data if d["model"] == "Claude")
+    assert claude["count"] == 1
+    assert claude["p50"] == claude["p99"] == 2.5
+    assert claude["histogram"][0] == {"le": 10.0, "count": 1}
+    assert claude["histogram"][-1] == {"le": None, "count": 0}
+
+
+def test_get_latency_with_filter(client, sample_usage_records):
+    """文書タイプでフィルタした処理時間の取得"""
+    response = client.get("/api/statistics/latency?document_type=返書")
+    assert response.status_code == status.HTTP_200_OK
+    assert [d["model"] for d in response.json()] == ["Gemini"]
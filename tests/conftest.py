@@ -45,6 +45,61 @@ def override_settings(monkeypatch):
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(scope="function", autouse=True)
+def reset_client_pool():
+    """テスト間でLLMクライアントプールを共有しない"""
+    from app.external.client_pool import get_client_pool
+
+    get_client_pool().clear()
+    yield
+    get_client_pool().clear()
+
+
+@pytest.fixture(scope="function", autouse=True)
+def reset_prompt_cache():
+    """テスト間で解決済みプロンプトのキャッシュを共有しない"""
+    from app.services.prompt_cache import get_prompt_cache
+
+    get_prompt_cache().invalidate()
+    yield
+    get_prompt_cache().invalidate()
+
+
+@pytest.fixture(scope="function", autouse=True)
+def reset_result_cache():
+    """テスト間で生成結果キャッシュと実行中の生成の登録を共有しない"""
+    from app.services.result_cache import get_result_cache
+    from app.services.single_flight import get_single_flight
+
+    get_result_cache.cache_clear()
+    get_single_flight.cache_clear()
+    yield
+    get_result_cache.cache_clear()
+    get_single_flight.cache_clear()
+
+
+@pytest.fixture(scope="function", autouse=True)
+def reset_daily_usage_view():
+    """テスト間で日次カウンタのキャッシュを共有しない"""
+    from app.services.usage_service import get_daily_usage_view
+
+    get_daily_usage_view().clear()
+    yield
+    get_daily_usage_view().clear()
+
+
+@pytest.fixture(scope="function", autouse=True)
+def isolate_usage_writer(tmp_path):
+    """使用量ライタのスプール先をテストごとの一時ディレクトリにする"""
+    from app.services.usage_service import get_usage_writer
+
+    get_usage_writer.cache_clear()
+    get_usage_writer().spool_path = str(tmp_path / "usage_spool.jsonl")
+    yield
+    get_usage_writer().stop()
+    get_usage_writer.cache_clear()
+
+
 @pytest.fixture(scope="function")
 def test_db():
     """テスト用のインメモリSQLiteデータベース"""
@@ -105,6 +160,8 @@ def sample_prompts(test_db):
 @pytest.fixture
 def sample_usage_records(test_db):
     """テスト用のサンプル使用統計"""
+    from app.services.usage_rollup import rebuild_usage_rollups
+
     jst = ZoneInfo("Asia/Tokyo")
     records = [
         SummaryUsage(
@@ -131,6 +188,8 @@ def sample_usage_records(test_db):
     for record in records:
         test_db.add(record)
     test_db.commit()
+    rebuild_usage_rollups(test_db)
+    test_db.commit()
     for record in records:
         test_db.refresh(record)
     return records
@@ -0,0 +1,238 @@
+"""メトリクス（/metrics）のテスト"""
+
+import json
+import os
+import time
+from typing import Any
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.orm import sessionmaker
+
+from app.core import database
+from app.core.database import DB_POOL_TIMEOUTS, DB_POOL_WAIT, get_db_session
+from app.core.metrics import (
+    GENERATION_DURATION,
+    GENERATION_TOKENS,
+    HTTP_REQUESTS,
+    SSE_STREAMS_IN_FLIGHT,
+    MetricsMiddleware,
+    MetricsRegistry,
+    observe_generation,
+)
+
+
+def _sample_value(metric, **labels) -> Any:
+    key = [str(labels[name]) for name in metric.labelnames]
+    return next((value for k, value in metric.samples() if k == key), None)
+
+
+class TestMetricsRegistry:
+    """MetricsRegistry の出力のテスト"""
+
+    def test_render_counter_gauge_histogram(self):
+        """カウンタ・ゲージ・ヒストグラムを Prometheus テキスト形式で出力"""
+        registry = MetricsRegistry()
+        counter = registry.counter("requests_total", "リクエスト数", ("path",))
+        gauge = registry.gauge("in_flight", "処理中")
+        histogram = registry.histogram("latency_seconds", "処理時間", buckets=(1, 5))
+        counter.inc(path="/a")
+        counter.inc(2, path="/a")
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+        histogram.observe(0.5)
+        histogram.observe(3)
+        histogram.observe(10)
+
+        text = registry.render()
+
+        assert "# TYPE requests_total counter" in text
+        assert 'requests_total{path="/a"} 3' in text
+        assert "in_flight 1" in text
+        assert 'latency_seconds_bucket{le="1"} 1' in text
+        assert 'latency_seconds_bucket{le="5"} 2' in text
+        assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+        assert "latency_seconds_sum 13.5" in text
+        assert "latency_seconds_count 3" in text
+
+    def test_label_values_are_escaped(self):
+        """ラベル値の引用符・改行をエスケープ"""
+        registry = MetricsRegistry()
+        registry.counter("c", "c", ("model",)).inc(model='a"b\nc')
+
+        assert 'c{model="a\\"b\\nc"} 1' in registry.render()
+
+    def test_duplicate_name_is_rejected(self):
+        """同じ名前のメトリクスは登録できない"""
+        registry = MetricsRegistry()
+        registry.counter("c", "c")
+        with pytest.raises(ValueError):
+            registry.gauge("c", "c")
+
+    def test_collector_runs_before_render(self):
+        """登録した収集関数は出力前に呼び出される"""
+        registry = MetricsRegistry()
+        gauge = registry.gauge("pool_size", "プールサイズ")
+        registry.add_collector(lambda: gauge.set(7))
+
+        assert "pool_size 7" in registry.render()
+
+    def test_counter_set_total(self):
+        """収集関数から累計値を反映したカウンタは counter 型で出力する"""
+        registry = MetricsRegistry()
+        counter = registry.counter("pool_hits_total", "ヒット数")
+        registry.add_collector(lambda: counter.set_total(5))
+
+        text = registry.render()
+
+        assert "# TYPE pool_hits_total counter" in text
+        assert "pool_hits_total 5" in text
+
+    def test_multiprocess_merges_workers(self, tmp_path):
+        """他ワーカーのスナップショットを合算し、古いスナップショットのゲージは除外"""
+        registry = MetricsRegistry()
+        counter = registry.counter("requests_total", "リクエスト数")
+        gauge = registry.gauge("in_flight", "処理中")
+        histogram = registry.histogram("latency_seconds", "処理時間", buckets=(1,))
+        counter.inc(2)
+        gauge.set(1)
+        histogram.observe(0.5)
+
+        other = registry.snapshot()
+        (tmp_path / "metrics_1.json").write_text(json.dumps(other))
+        (tmp_path / "metrics_2.json").write_text(json.dumps(other))
+        stale = time.time() - 120
+        os.utime(tmp_path / "metrics_2.json", (stale, stale))
+
+        text = registry.render(str(tmp_path), stale_seconds=30)
+
+        assert "requests_total 6" in text
+        assert "in_flight 2" in text
+        assert 'latency_seconds_bucket{le="1"} 3' in text
+        assert (tmp_path / f"metrics_{os.getpid()}.json").exists()
+
+
+class TestApplicationMetrics:
+    """アプリケーションのメトリクス記録のテスト"""
+
+    def test_observe_generation(self):
+        """生成AI API呼び出しの時間とトークン数を記録"""
+        before = _sample_value(
+            GENERATION_TOKENS, kind="summary", model="Claude", direction="input"
+        ) or 0
+
+        observe_generation("summary", "Claude", 2.0, 1000, 500)
+
+        assert _sample_value(
+            GENERATION_TOKENS, kind="summary", model="Claude", direction="input"
+        ) == before + 1000
+        assert _sample_value(GENERATION_DURATION, kind="summary", model="Claude")[2] >= 1
+
+    def test_metrics_endpoint_counts_requests_by_route(self, client, monkeypatch):
+        """リクエストはルートのテンプレートごとに集計され、/metrics で出力される"""
+        monkeypatch.setenv("METRICS_AUTH_TOKEN", "metrics-secret")
+        before = _sample_value(
+            HTTP_REQUESTS, method="GET", path="/prompts/edit/{prompt_id}", status="200"
+        ) or 0
+
+        client.get("/prompts/edit/1")
+        client.get("/prompts/edit/2")
+        response = client.get("/metrics", headers={"Authorization": "Bearer metrics-secret"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert _sample_value(
+            HTTP_REQUESTS, method="GET", path="/prompts/edit/{prompt_id}", status="200"
+        ) == before + 2
+        assert "# TYPE http_request_duration_seconds histogram" in response.text
+        assert "db_pool_checked_out" in response.text
+
+    async def test_sse_stream_is_counted_while_streaming(self):
+        """SSE応答の送信中は sse_streams_in_flight に計上し、完了後に戻す"""
+        observed = []
+
+        class Route:
+            path_format = "/api/test/stream"
+
+        async def app(scope, receive, send):
+            scope["route"] = Route()
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [(b"content-type", b"text/event-stream; charset=utf-8")],
+                }
+            )
+            observed.append(_sample_value(SSE_STREAMS_IN_FLIGHT, path="/api/test/stream"))
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+        async def receive():
+            return {"type": "http.request"}
+
+        async def send(message):
+            pass
+
+        await MetricsMiddleware(app)(
+            {"type": "http", "method": "POST", "path": "/api/test/stream"}, receive, send
+        )
+
+        assert observed == [1]
+        assert _sample_value(SSE_STREAMS_IN_FLIGHT, path="/api/test/stream") == 0
+        assert _sample_value(
+            HTTP_REQUESTS, method="POST", path="/api/test/stream", status="200"
+        ) >= 1
+
+
+class TestDatabasePoolMetrics:
+    """DBコネクションプールの取得待ちのテスト"""
+
+    def test_records_wait_and_timeout(self, tmp_path, monkeypatch):
+        """クエリ時の接続取得の待ち時間と取得タイムアウトを記録し、クエリしないセッションは接続を取得しない"""
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'pool.db'}",
+            poolclass=database._TimedQueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.05,
+        )
+        monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=engine))
+        waits_before = (_sample_value(DB_POOL_WAIT) or [[], 0.0, 0])[2]
+        timeouts_before = _sample_value(DB_POOL_TIMEOUTS) or 0
+
+        with get_db_session():
+            pass
+        assert (_sample_value(DB_POOL_WAIT) or [[], 0.0, 0])[2] == waits_before
+
+        with get_db_session() as db:
+            db.execute(text("SELECT 1"))
+            with pytest.raises(sa_exc.TimeoutError):
+                with get_db_session() as other:
+                    other.execute(text("SELECT 1"))
+
+        assert _sample_value(DB_POOL_WAIT)[2] == waits_before + 2
+        assert _sample_value(DB_POOL_TIMEOUTS) == timeouts_before + 1
+        engine.dispose()
+
+
+class TestMetricsAuthentication:
+    """/metrics のトークン認証のテスト"""
+
+    def test_disabled_when_token_not_set(self, client, monkeypatch):
+        """METRICS_AUTH_TOKEN 未設定時は /metrics を無効とし 404 を返す"""
+        monkeypatch.delenv("METRICS_AUTH_TOKEN", raising=False)
+
+        assert client.get("/metrics").status_code == 404
+        assert client.get("/metrics", headers={"Authorization": "Bearer "}).status_code == 404
+
+    def test_requires_token_when_set(self, client, monkeypatch):
+        """METRICS_AUTH_TOKEN 設定時は Bearer トークンが一致する場合のみ応答する"""
+        monkeypatch.setenv("METRICS_AUTH_TOKEN", "metrics-secret")
+
+        assert client.get("/metrics").status_code == 401
+        wrong = client.get("/metrics", headers={"Authorization": "Bearer wrong"})
+        assert wrong.status_code == 403
+        ok = client.get("/metrics", headers={"Authorization": "Bearer metrics-secret"})
+        assert ok.status_code == 200
+        assert "# TYPE http_requests_total counter" in ok.text
@@ -9,6 +9,8 @@ from app.core.constants import (
     REFINEMENT_INSTRUCTION,
 )
 from app.external.base_api import BaseAPIClient
+from app.services.generation_context import GenerationContext
+from app.services.prompt_cache import ResolvedPrompt
 from app.utils.exceptions import APIError
 
 
@@ -50,13 +52,13 @@ class TestBaseAPIClientInitialization:
 class TestCreateSummaryPrompt:
     """create_summary_prompt メソッドのテスト"""
 
-    @patch("app.external.base_api.get_prompt")
+    @patch("app.external.base_api.resolve_prompt")
     @patch("app.external.base_api.get_db_session")
-    def test_create_summary_prompt_minimal(self, mock_db_session, mock_get_prompt):
+    def test_create_summary_prompt_minimal(self, mock_db_session, mock_resolve_prompt):
         """プロンプト生成 - 最小パラメータ"""
         mock_db = MagicMock()
         mock_db_session.return_value.__enter__.return_value = mock_db
-        mock_get_prompt.return_value = None
+        mock_resolve_prompt.return_value = None
 
         client = MockAPIClient()
         system_prompt, user_prompt = client.create_summary_prompt(medical_text="患者情報")
@@ -66,13 +68,13 @@ class TestCreateSummaryPrompt:
         assert "<カルテ情報>" in user_prompt
         assert "患者情報" in user_prompt
 
-    @patch("app.external.base_api.get_prompt")
+    @patch("app.external.base_api.resolve_prompt")
     @patch("app.external.base_api.get_db_session")
-    def test_create_summary_prompt_all_params(self, mock_db_session, mock_get_prompt):
+    def test_create_summary_prompt_all_params(self, mock_db_session, mock_resolve_prompt):
         """プロンプト生成 - 全パラメータ"""
         mock_db = MagicMock()
         mock_db_session.return_value.__enter__.return_value = mock_db
-        mock_get_prompt.return_value = None
+        mock_resolve_prompt.return_value = None
 
         client = MockAPIClient()
         _, user_prompt = client.create_summary_prompt(
@@ -91,15 +93,15 @@ class TestCreateSummaryPrompt:
         assert "<追加情報>" in user_prompt
         assert "追加情報テキスト" in user_prompt
 
-    @patch("app.external.base_api.get_prompt")
+    @patch("app.external.base_api.resolve_prompt")
     @patch("app.external.base_api.get_db_session")
     def test_create_summary_prompt_empty_optional_fields(
-        self, mock_db_session, mock_get_prompt
+        self, mock_db_session, mock_resolve_prompt
     ):
         """プロンプト生成 - 空のオプションフィールド"""
         mock_db = MagicMock()
         mock_db_session.return_value.__enter__.return_value = mock_db
-        mock_get_prompt.return_value = None
+        mock_resolve_prompt.return_value = None
 
         client = MockAPIClient()
         _, user_prompt = client.create_summary_prompt(medical_text="データ")
@@ -111,15 +113,15 @@ class TestCreateSummaryPrompt:
         assert "<追加情報>" not in user_prompt
         assert "<前回の生成結果>" not in user_prompt
 
-    @patch("app.external.base_api.get_prompt")
+    @patch("app.external.base_api.resolve_prompt")
     @patch("app.external.base_api.get_db_session")
     def test_create_summary_prompt_whitespace_optional_fields(
-        self, mock_db_session, mock_get_prompt
+        self, mock_db_session, mock_resolve_prompt
     ):
         """プロンプト生成 - 空白のみのオプションフィールド"""
         mock_db = MagicMock()
         mock_db_session.return_value.__enter__.return_value = mock_db
-        mock_get_prompt.return_value = None
+        mock_resolve_prompt.return_value = None
 
         client = MockAPIClient()
         _, user_prompt = client.create_summary_prompt(
@@ -132,15 +134,15 @@ class TestCreateSummaryPrompt:
         assert "<現在の処方>" not in user_prompt
         assert "<追加情報>" not in user_prompt
 
-    @patch("app.external.base_api.get_prompt")
+    @patch("app.external.base_api.resolve_prompt")
     @patch("app.external.base_api.get_db_session")
     def test_create_summary_prompt_json_medical_text(
-        self, mock_db_session, mock_get_prompt
+        self, mock_db_session, mock_resolve_prompt
     ):
         """プロンプト生成 - JSON形式のカルテ情報"""
         mock_db = MagicMock()
         mock_db_session.return_value.__enter__.return_value = mock_db
-        mock_get_prompt.return_value = None
+        mock_resolve_prompt.return_value = None
 
         client = MockAPIClient()
         json_text = '{"記載日": "2026-07-01", "SOAP": "経過良好"}'
@@ -149,30 +151,30 @@ class TestCreateSummaryPrompt:
         assert KARTE_JSON_INSTRUCTION in system_prompt
         assert json_text in user_prompt
 
-    @patch("app.external.base_api.get_prompt")
+    @patch("app.external.base_api.resolve_prompt")
     @patch("app.external.base_api.get_db_session")
     def test_create_summary_prompt_non_json_medical_text(
-        self, mock_db_session, mock_get_prompt
+        self, mock_db_session, mock_resolve_prompt
     ):
         """プロンプト生成 - 非JSON形式ではJSON指示を含まない"""
         mock_db = MagicMock()
         mock_db_session.return_value.__enter__.return_value = mock_db
-        mock_get_prompt.return_value = None
+        mock_resolve_prompt.return_value = None
 
         client = MockAPIClient()
         system_prompt, _ = client.create_summary_prompt(medical_text="通常のカルテ文章")
 
         assert KARTE_JSON_INSTRUCTION not in system_prompt
 
-    @patch("app.external.base_api.get_prompt")
+    @patch("app.external.base_api.resolve_prompt")
     @patch("app.external.base_api.get_db_session")
     def test_create_summary_prompt_refinement(
-        self, mock_db_session, mock_get_prompt
+        self, mock_db_session, mock_resolve_prompt
     ):
         """プロンプト生成 - 評価結果を反映した再生成"""
         mock_db = MagicMock()
         mock_db_session.return_value.__enter__.return_value = mock_db
-        mock_get_prompt.return_value = None
+        mock_resolve_prompt.return_value = None
 
         client = MockAPIClient()
         system_prompt, user_prompt = client.create_summary_prompt(
@@ -187,15 +189,15 @@ class TestCreateSummaryPrompt:
         assert "<評価結果>" in user_prompt
         assert "指摘事項あり" in user_prompt
 
-    @patch("app.external.base_api.get_prompt")
+    @patch("app.external.base_api.resolve_prompt")
     @patch("app.external.base_api.get_db_session")
     def test_create_summary_prompt_refinement_requires_both_fields(
-        self, mock_db_session, mock_get_prompt
+        self, mock_db_session, mock_resolve_prompt
     ):
         """プロンプト生成 - 前回出力のみでは再生成セクションを含まない"""
         mock_db = MagicMock()
         mock_db_session.return_value.__enter__.return_value = mock_db
-        mock_get_prompt.return_value = None
+        mock_resolve_prompt.return_value = None
 
         client = MockAPIClient()
         system_prompt, user_prompt = client.create_summary_prompt(
@@ -206,9 +208,9 @@ class TestCreateSummaryPrompt:
         assert REFINEMENT_INSTRUCTION not in system_prompt
         assert "<前回の生成結果>" not in user_prompt
 
-    @patch("app.external.base_api.get_prompt")
+    @patch("app.external.base_api.resolve_prompt")
     @patch("app.external.base_api.get_db_session")
-    def test_create_summary_prompt_with_custom_prompt(self, mock_db_session, mock_get_prompt):
+    def test_create_summary_prompt_with_custom_prompt(self, mock_db_session, mock_resolve_prompt):
         """プロンプト生成 - カスタムプロンプト使用"""
         mock_db = MagicMock()
         mock_db_session.return_value.__enter__.return_value = mock_db
@@ -216,7 +218,7 @@ class TestCreateSummaryPrompt:
         mock_prompt = MagicMock()
         mock_prompt.content = "カスタムプロンプトテンプレート"
         mock_prompt.selected_model = "gemini-1.5-pro-002"
-        mock_get_prompt.return_value = mock_prompt
+        mock_resolve_prompt.return_value = mock_prompt
 
         client = MockAPIClient()
         system_prompt, user_prompt = client.create_summary_prompt(
@@ -231,22 +233,22 @@ class TestCreateSummaryPrompt:
         assert "データ" in user_prompt
 
         # get_prompt が呼ばれたことを確認
-        assert mock_get_prompt.called
-        call_args = mock_get_prompt.call_args[0]
+        assert mock_resolve_prompt.called
+        call_args = mock_resolve_prompt.call_args[0]
         # 第1引数はdbセッション、第2-4引数はdepartment, document_type, doctor
         assert call_args[1] == "眼科"
         assert call_args[2] == "他院への紹介"
         assert call_args[3] == "橋本義弘"
 
-    @patch("app.external.base_api.get_prompt")
+    @patch("app.external.base_api.resolve_prompt")
     @patch("app.external.base_api.get_db_session")
     def test_create_summary_prompt_fallback_to_default(
-        self, mock_db_session, mock_get_prompt
+        self, mock_db_session, mock_resolve_prompt
     ):
         """プロンプト生成 - デフォルトプロンプトへのフォールバック"""
         mock_db = MagicMock()
         mock_db_session.return_value.__enter__.return_value = mock_db
-        mock_get_prompt.return_value = None
+        mock_resolve_prompt.return_value = None
 
         client = MockAPIClient()
         system_prompt, user_prompt = client.create_summary_prompt(medical_text="テスト", department="眼科", document_type="他院への紹介")
@@ -256,22 +258,22 @@ class TestCreateSummaryPrompt:
         assert "<カルテ情報>" in user_prompt
         assert "テスト" in user_prompt
 
-    @patch("app.external.base_api.get_prompt")
+    @patch("app.external.base_api.resolve_prompt")
     @patch("app.external.base_api.get_db_session")
     def test_create_summary_prompt_default_document_type(
-        self, mock_db_session, mock_get_prompt
+        self, mock_db_session, mock_resolve_prompt
     ):
         """プロンプト生成 - デフォルト文書タイプ使用"""
         mock_db = MagicMock()
         mock_db_session.return_value.__enter__.return_value = mock_db
-        mock_get_prompt.return_value = None
+        mock_resolve_prompt.return_value = None
 
         client = MockAPIClient()
         _, user_prompt = client.create_summary_prompt(medical_text="データ")
 
         # get_promptが呼ばれ、DEFAULT_DOCUMENT_TYPEで呼ばれることを確認
-        assert mock_get_prompt.called
-        call_args = mock_get_prompt.call_args[0]
+        assert mock_resolve_prompt.called
+        call_args = mock_resolve_prompt.call_args[0]
         assert call_args[1] == "default"
         assert call_args[2] == DEFAULT_DOCUMENT_TYPE
         assert call_args[3] == "default"
@@ -280,6 +282,78 @@ class TestCreateSummaryPrompt:
         assert "データ" in user_prompt
 
 
+class TestGenerationContext:
+    """GenerationContext を渡した場合のテスト"""
+
+    @patch("app.external.base_api.get_db_session")
+    def test_create_summary_prompt_uses_context_prompt(self, mock_db_session):
+        """context のプロンプトを使用しDBにアクセスしない"""
+        context = GenerationContext(
+            prompt=ResolvedPrompt(content="眼科用プロンプト", selected_model=None)
+        )
+
+        client = MockAPIClient()
+        system_prompt, _ = client.create_summary_prompt(
+            medical_text="患者情報", context=context
+        )
+
+        assert system_prompt.startswith("眼科用プロンプト")
+        mock_db_session.assert_not_called()
+
+    @patch("app.external.base_api.get_db_session")
+    def test_create_summary_prompt_context_without_prompt(self, mock_db_session):
+        """context にプロンプトがなければデフォルトプロンプトを使用"""
+        client = MockAPIClient()
+        system_prompt, _ = client.create_summary_prompt(
+            medical_text="患者情報", context=GenerationContext()
+        )
+
+        assert "以下のカルテ情報を要約してください" in system_prompt
+        mock_db_session.assert_not_called()
+
+    @patch("app.external.base_api.get_db_session")
+    def test_get_model_name_uses_context(self, mock_db_session):
+        """context の選択モデル、未設定ならデフォルトモデルを返す"""
+        client = MockAPIClient(default_model="default-model")
+        context = GenerationContext(
+            prompt=ResolvedPrompt(content="プロンプト", selected_model="gemini-model")
+        )
+
+        assert client.get_model_name("眼科", "返書", "default", context) == "gemini-model"
+        assert client.get_model_name("眼科", "返書", "default", GenerationContext()) == (
+            "default-model"
+        )
+        mock_db_session.assert_not_called()
+
+    @patch("app.external.base_api.get_db_session")
+    async def test_generate_summary_async_without_db_access(self, mock_db_session):
+        """context を渡した非同期生成はDBにアクセスしない"""
+        client = MockAPIClient()
+
+        result = await client.generate_summary_async(
+            medical_text="患者情報", context=GenerationContext()
+        )
+
+        assert result == ("生成されたテキスト", 1000, 500)
+        mock_db_session.assert_not_called()
+
+    @patch("app.external.base_api.get_db_session")
+    async def test_stream_records_stage_timings(self, mock_db_session):
+        """context の timer にクライアント初期化・プロンプト構築・最初のテキスト受信までの時間を記録"""
+        client = MockAPIClient()
+        context = GenerationContext()
+
+        items = [
+            item
+            async for item in client.generate_summary_stream_async(
+                medical_text="患者情報", context=context
+            )
+        ]
+
+        assert items[0] == "生成されたテキスト"
+        assert set(context.timer.as_dict()) == {"client_init", "build_prompt", "first_token"}
+
+
 class TestGetModelName:
     """get_model_name メソッドのテスト"""
 
@@ -364,13 +438,13 @@ class TestGetModelName:
 class TestGenerateSummary:
     """generate_summary メソッドのテスト"""
 
-    @patch("app.external.base_api.get_prompt")
+    @patch("app.external.base_api.resolve_prompt")
     @patch("app.external.base_api.get_db_session")
-    def test_generate_summary_success(self, mock_db_session, mock_get_prompt):
+    def test_generate_summary_success(self, mock_db_session, mock_resolve_prompt):
         """文書生成 - 正常系"""
         mock_db = MagicMock()
         mock_db_session.return_value.__enter__.return_value = mock_db
-        mock_get_prompt.return_value = None
+        mock_resolve_prompt.return_value = None
 
         client = MockAPIClient()
         result = client.generate_summary(medical_text="患者情報", additional_info="追加情報",
@@ -380,13 +454,13 @@ class TestGenerateSummary:
         assert result == ("生成されたテキスト", 1000, 500)
         assert client.initialized is True
 
-    @patch("app.external.base_api.get_prompt")
+    @patch("app.external.base_api.resolve_prompt")
     @patch("app.external.base_api.get_db_session")
-    def test_generate_summary_with_model_name(self, mock_db_session, mock_get_prompt):
+    def test_generate_summary_with_model_name(self, mock_db_session, mock_resolve_prompt):
         """文書生成 - model_name 指定"""
         mock_db = MagicMock()
         mock_db_session.return_value.__enter__.return_value = mock_db
-        mock_get_prompt.return_value = None
+        mock_resolve_prompt.return_value = None
 
         client = MockAPIClient()
         result = client.generate_summary(
@@ -396,9 +470,9 @@ class TestGenerateSummary:
 
         assert result == ("生成されたテキスト", 1000, 500)
 
-    @patch("app.external.base_api.get_prompt")
+    @patch("app.external.base_api.resolve_prompt")
     @patch("app.external.base_api.get_db_session")
-    def test_generate_summary_without_model_name(self, mock_db_session, mock_get_prompt):
+    def test_generate_summary_without_model_name(self, mock_db_session, mock_resolve_prompt):
         """文書生成 - model_name なし（デフォルト使用）"""
         mock_db = MagicMock()
         mock_db_session.return_value.__enter__.return_value = mock_db
@@ -406,7 +480,7 @@ class TestGenerateSummary:
         mock_prompt = MagicMock()
         mock_prompt.content = "プロンプト"
         mock_prompt.selected_model = "gemini-1.5-pro-002"
-        mock_get_prompt.return_value = mock_prompt
+        mock_resolve_prompt.return_value = mock_prompt
 
         client = MockAPIClient(default_model="default-model")
         result = client.generate_summary(
@@ -432,10 +506,10 @@ class TestGenerateSummary:
 
         assert "初期化エラー" in str(exc_info.value)
 
-    @patch("app.external.base_api.get_prompt")
+    @patch("app.external.base_api.resolve_prompt")
     @patch("app.external.base_api.get_db_session")
     def test_generate_summary_generate_content_failure(
-        self, mock_db_session, mock_get_prompt
+        self, mock_db_session, mock_resolve_prompt
     ):
         """文書生成 - コンテンツ生成失敗"""
 
@@ -445,7 +519,7 @@ class TestGenerateSummary:
 
         mock_db = MagicMock()
         mock_db_session.return_value.__enter__.return_value = mock_db
-        mock_get_prompt.return_value = None
+        mock_resolve_prompt.return_value = None
 
         client = FailingGenerateClient()
 
@@ -455,10 +529,10 @@ class TestGenerateSummary:
         assert "FailingGenerateClient" in str(exc_info.value)
         assert "生成エラー" in str(exc_info.value)
 
-    @patch("app.external.base_api.get_prompt")
+    @patch("app.external.base_api.resolve_prompt")
     @patch("app.external.base_api.get_db_session")
     def test_generate_summary_api_error_propagation(
-        self, mock_db_session, mock_get_prompt
+        self, mock_db_session, mock_resolve_prompt
     ):
         """文書生成 - APIError の伝播"""
 
@@ -468,7 +542,7 @@ class TestGenerateSummary:
 
         mock_db = MagicMock()
         mock_db_session.return_value.__enter__.return_value = mock_db
-        mock_get_prompt.return_value = None
+        mock_resolve_prompt.return_value = None
 
         client = APIErrorClient()
 
@@ -478,13 +552,13 @@ class TestGenerateSummary:
         # APIError はそのまま伝播される
         assert "API呼び出しエラー" in str(exc_info.value)
 
-    @patch("app.external.base_api.get_prompt")
+    @patch("app.external.base_api.resolve_prompt")
     @patch("app.external.base_api.get_db_session")
-    def test_generate_summary_minimal_params(self, mock_db_session, mock_get_prompt):
+    def test_generate_summary_minimal_params(self, mock_db_session, mock_resolve_prompt):
         """文書生成 - 最小パラメータ"""
         mock_db = MagicMock()
         mock_db_session.return_value.__enter__.return_value = mock_db
-        mock_get_prompt.return_value = None
+        mock_resolve_prompt.return_value = None
 
         client = MockAPIClient()
         result = client.generate_summary(medical_text="最小データ")
@@ -493,6 +567,63 @@ class TestGenerateSummary:
         assert client.initialized is True
 
 
+class TestGenerateSummaryAsync:
+    """generate_summary_async / generate_summary_stream_async のテスト"""
+
+    @patch("app.external.base_api.resolve_prompt")
+    @patch("app.external.base_api.get_db_session")
+    async def test_generate_summary_async_falls_back_to_sync_content(
+        self, mock_db_session, mock_resolve_prompt
+    ):
+        """非同期版が未実装のクライアントは同期版をスレッドで実行する"""
+        mock_db_session.return_value.__enter__.return_value = MagicMock()
+        mock_resolve_prompt.return_value = None
+
+        client = MockAPIClient()
+        result = await client.generate_summary_async(medical_text="患者情報")
+
+        assert result == ("生成されたテキスト", 1000, 500)
+        assert client.initialized is True
+
+    @patch("app.external.base_api.resolve_prompt")
+    @patch("app.external.base_api.get_db_session")
+    async def test_generate_summary_stream_async_default(
+        self, mock_db_session, mock_resolve_prompt
+    ):
+        """デフォルトのストリームは全文と使用量を1回ずつ返す"""
+        mock_db_session.return_value.__enter__.return_value = MagicMock()
+        mock_resolve_prompt.return_value = None
+
+        client = MockAPIClient()
+        items = [
+            item
+            async for item in client.generate_summary_stream_async(medical_text="患者情報")
+        ]
+
+        assert items == ["生成されたテキスト", {"input_tokens": 1000, "output_tokens": 500}]
+
+    @patch("app.external.base_api.resolve_prompt")
+    @patch("app.external.base_api.get_db_session")
+    async def test_generate_summary_async_wraps_errors(
+        self, mock_db_session, mock_resolve_prompt
+    ):
+        """APIError 以外の例外はクライアント名付きの APIError に変換される"""
+
+        class FailingGenerateClient(MockAPIClient):
+            def _generate_content(self, _prompt: str, _model_name: str, _system_prompt: str = "") -> tuple:
+                raise Exception("生成エラー")
+
+        mock_db_session.return_value.__enter__.return_value = MagicMock()
+        mock_resolve_prompt.return_value = None
+
+        client = FailingGenerateClient()
+
+        with pytest.raises(APIError) as exc_info:
+            await client.generate_summary_async(medical_text="データ")
+
+        assert "FailingGenerateClient" in str(exc_info.value)
+
+
 class TestBaseAPIClientAbstractMethods:
     """BaseAPIClient 抽象メソッドのテスト"""
 
@@ -525,15 +656,15 @@ class TestBaseAPIClientAbstractMethods:
 class TestBaseAPIClientEdgeCases:
     """BaseAPIClient のエッジケース"""
 
-    @patch("app.external.base_api.get_prompt")
+    @patch("app.external.base_api.resolve_prompt")
     @patch("app.external.base_api.get_db_session")
     def test_create_summary_prompt_very_long_medical_text(
-        self, mock_db_session, mock_get_prompt
+        self, mock_db_session, mock_resolve_prompt
     ):
         """プロンプト生成 - 非常に長いカルテ情報"""
         mock_db = MagicMock()
         mock_db_session.return_value.__enter__.return_value = mock_db
-        mock_get_prompt.return_value = None
+        mock_resolve_prompt.return_value = None
 
         long_text = "あ" * 100000
         client = MockAPIClient()
@@ -542,15 +673,15 @@ class TestBaseAPIClientEdgeCases:
         assert "以下のカルテ情報を要約してください" in system_prompt
         assert long_text in user_prompt
 
-    @patch("app.external.base_api.get_prompt")
+    @patch("app.external.base_api.resolve_prompt")
     @patch("app.external.base_api.get_db_session")
     def test_create_summary_prompt_special_characters(
-        self, mock_db_session, mock_get_prompt
+        self, mock_db_session, mock_resolve_prompt
     ):
         """プロンプト生成 - 特殊文字を含むテキスト"""
         mock_db = MagicMock()
         mock_db_session.return_value.__enter__.return_value = mock_db
-        mock_get_prompt.return_value = None
+        mock_resolve_prompt.return_value = None
 
         special_text = "特殊文字: \n\t\r\n!@#$%^&*(){}[]<>?/\\|`~"
         client = MockAPIClient()
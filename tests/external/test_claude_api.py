@@ -1,13 +1,20 @@
 """ClaudeAPIClient のテスト"""
 
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from anthropic import omit
 from anthropic.types import TextBlock
 
-from app.core.constants import CLAUDE_GENERATION_TEMPERATURE, MESSAGES
+from app.core.constants import (
+    CLAUDE_GENERATION_TEMPERATURE,
+    GROUNDING_INSTRUCTION,
+    KARTE_JSON_INSTRUCTION,
+    MESSAGES,
+    REFINEMENT_INSTRUCTION,
+)
 from app.external.claude_api import ClaudeAPIClient
+from app.services.generation_context import GenerationContext
 from app.utils.exceptions import APIError
 
 
@@ -18,9 +25,15 @@ def create_mock_settings(**kwargs):
     mock.aws_secret_access_key = kwargs.get("aws_secret_access_key", "test_secret_key")
     mock.aws_region = kwargs.get("aws_region", "ap-northeast-1")
     mock.anthropic_model = kwargs.get("anthropic_model", "claude-3-5-sonnet-20241022")
+    mock.anthropic_prompt_cache_enabled = kwargs.get("anthropic_prompt_cache_enabled", True)
     return mock
 
 
+def cached_system(text):
+    """キャッシュ区切りを付けたシステムプロンプトのコンテンツブロック"""
+    return [{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}]
+
+
 class TestClaudeAPIClientInitialization:
     """ClaudeAPIClient 初期化のテスト"""
 
@@ -225,7 +238,7 @@ class TestClaudeAPIClientGenerateContent:
         )
 
         _, kwargs = mock_client.messages.create.call_args
-        assert kwargs["system"] == "システムプロンプト"
+        assert kwargs["system"] == cached_system("システムプロンプト")
 
     @patch("app.external.claude_api.get_settings")
     def test_generate_content_truncated_output(self, mock_get_settings):
@@ -376,22 +389,292 @@ class TestClaudeAPIClientGenerateContent:
         assert "Claude" in str(exc_info.value)
 
 
+def create_mock_stream(texts, stop_reason="end_turn", input_tokens=100, output_tokens=50):
+    """messages.stream() が返すコンテキストマネージャのモックを作成"""
+    final_message = MagicMock()
+    final_message.content = [TextBlock(type="text", text="".join(texts))]
+    final_message.stop_reason = stop_reason
+    final_message.usage.input_tokens = input_tokens
+    final_message.usage.output_tokens = output_tokens
+
+    stream = MagicMock()
+    stream.text_stream = iter(texts)
+    stream.get_final_message.return_value = final_message
+
+    manager = MagicMock()
+    manager.__enter__.return_value = stream
+    manager.__exit__.return_value = False
+    return manager
+
+
+class TestClaudeAPIClientGenerateContentStream:
+    """ClaudeAPIClient _generate_content_stream メソッドのテスト"""
+
+    @patch("app.external.claude_api.get_settings")
+    def test_stream_yields_deltas_then_usage(self, mock_get_settings):
+        """テキスト差分を順に返し、最後に使用量を返す"""
+        mock_get_settings.return_value = create_mock_settings()
+        mock_client = MagicMock()
+        mock_client.messages.stream.return_value = create_mock_stream(["現在の", "処方"])
+
+        client = ClaudeAPIClient()
+        client.client = mock_client
+
+        items = list(client._generate_content_stream("プロンプト", "test-model", "システム"))
+
+        assert items == ["現在の", "処方", {"input_tokens": 100, "output_tokens": 50}]
+        mock_client.messages.stream.assert_called_once_with(
+            model="test-model",
+            max_tokens=6000,
+            temperature=CLAUDE_GENERATION_TEMPERATURE,
+            system=cached_system("システム"),
+            messages=[{"role": "user", "content": "プロンプト"}],
+        )
+
+    @patch("app.external.claude_api.get_settings")
+    def test_stream_without_system_prompt_omits_system(self, mock_get_settings):
+        """システムプロンプトが空の場合は system を送らない"""
+        mock_get_settings.return_value = create_mock_settings()
+        mock_client = MagicMock()
+        mock_client.messages.stream.return_value = create_mock_stream(["本文"])
+
+        client = ClaudeAPIClient()
+        client.client = mock_client
+        list(client._generate_content_stream("プロンプト", "test-model"))
+
+        _, kwargs = mock_client.messages.stream.call_args
+        assert kwargs["system"] is omit
+
+    @patch("app.external.claude_api.get_settings")
+    def test_stream_truncated_output_appends_warning(self, mock_get_settings):
+        """max_tokens 到達時は警告を最後のチャンクとして返す"""
+        mock_get_settings.return_value = create_mock_settings()
+        mock_client = MagicMock()
+        mock_client.messages.stream.return_value = create_mock_stream(
+            ["途中"], stop_reason="max_tokens"
+        )
+
+        client = ClaudeAPIClient()
+        client.client = mock_client
+        items = list(client._generate_content_stream("プロンプト", "test-model"))
+
+        assert items[1] == "\n\n" + MESSAGES["WARNING"]["OUTPUT_TRUNCATED"]
+        assert isinstance(items[-1], dict)
+
+    @patch("app.external.claude_api.get_settings")
+    def test_stream_api_error(self, mock_get_settings):
+        """ストリーム中の例外は APIError に変換される"""
+        mock_get_settings.return_value = create_mock_settings()
+        mock_client = MagicMock()
+        mock_client.messages.stream.side_effect = Exception("接続断")
+
+        client = ClaudeAPIClient()
+        client.client = mock_client
+
+        with pytest.raises(APIError) as exc_info:
+            list(client._generate_content_stream("プロンプト", "test-model"))
+
+        assert "Amazon Bedrock Claude API呼び出しエラー" in str(exc_info.value)
+
+    @patch("app.external.claude_api.get_settings")
+    def test_stream_client_not_initialized(self, mock_get_settings):
+        """クライアント未初期化"""
+        mock_get_settings.return_value = create_mock_settings()
+
+        client = ClaudeAPIClient()
+
+        with pytest.raises(APIError):
+            list(client._generate_content_stream("プロンプト", "test-model"))
+
+
+def create_mock_async_stream(texts, stop_reason="end_turn", input_tokens=100, output_tokens=50):
+    """AsyncAnthropicBedrock の messages.stream() が返す非同期コンテキストマネージャのモックを作成"""
+    final_message = MagicMock()
+    final_message.content = [TextBlock(type="text", text="".join(texts))]
+    final_message.stop_reason = stop_reason
+    final_message.usage.input_tokens = input_tokens
+    final_message.usage.output_tokens = output_tokens
+
+    async def text_stream():
+        for text in texts:
+            yield text
+
+    stream = MagicMock()
+    stream.text_stream = text_stream()
+    stream.get_final_message = AsyncMock(return_value=final_message)
+
+    manager = MagicMock()
+    manager.__aenter__ = AsyncMock(return_value=stream)
+    manager.__aexit__ = AsyncMock(return_value=False)
+    return manager
+
+
+class TestClaudeAPIClientGenerateContentAsync:
+    """ClaudeAPIClient の非同期生成メソッドのテスト"""
+
+    @patch("app.external.claude_api.get_settings")
+    async def test_generate_content_async_success(self, mock_get_settings):
+        """AsyncAnthropicBedrock で生成し、同期版と同じ形式で返す"""
+        mock_get_settings.return_value = create_mock_settings()
+        mock_response = MagicMock()
+        mock_response.content = [TextBlock(type="text", text="生成されたサマリー")]
+        mock_response.stop_reason = "end_turn"
+        mock_response.usage.input_tokens = 1000
+        mock_response.usage.output_tokens = 500
+        mock_async_client = MagicMock()
+        mock_async_client.messages.create = AsyncMock(return_value=mock_response)
+
+        client = ClaudeAPIClient()
+        client.async_client = mock_async_client
+
+        result = await client._generate_content_async("プロンプト", "test-model", "システム")
+
+        assert result == ("生成されたサマリー", 1000, 500)
+        mock_async_client.messages.create.assert_awaited_once_with(
+            model="test-model",
+            max_tokens=6000,
+            temperature=CLAUDE_GENERATION_TEMPERATURE,
+            system=cached_system("システム"),
+            messages=[{"role": "user", "content": "プロンプト"}],
+        )
+
+    @patch("app.external.claude_api.get_settings")
+    async def test_generate_content_async_api_error(self, mock_get_settings):
+        """API例外は APIError に変換される"""
+        mock_get_settings.return_value = create_mock_settings()
+        mock_async_client = MagicMock()
+        mock_async_client.messages.create = AsyncMock(side_effect=Exception("接続断"))
+
+        client = ClaudeAPIClient()
+        client.async_client = mock_async_client
+
+        with pytest.raises(APIError) as exc_info:
+            await client._generate_content_async("プロンプト", "test-model")
+
+        assert "Amazon Bedrock Claude API呼び出しエラー" in str(exc_info.value)
+
+    @patch("app.external.claude_api.get_settings")
+    async def test_generate_content_async_client_not_initialized(self, mock_get_settings):
+        """非同期クライアント未初期化"""
+        mock_get_settings.return_value = create_mock_settings()
+
+        client = ClaudeAPIClient()
+
+        with pytest.raises(APIError):
+            await client._generate_content_async("プロンプト", "test-model")
+
+    @patch("app.external.claude_api.get_settings")
+    async def test_stream_async_yields_deltas_then_usage(self, mock_get_settings):
+        """非同期ストリームでテキスト差分を順に返し、最後に使用量を返す"""
+        mock_get_settings.return_value = create_mock_settings()
+        mock_async_client = MagicMock()
+        mock_async_client.messages.stream.return_value = create_mock_async_stream(
+            ["途中", "まで"], stop_reason="max_tokens"
+        )
+
+        client = ClaudeAPIClient()
+        client.async_client = mock_async_client
+
+        items = [
+            item
+            async for item in client._generate_content_stream_async("プロンプト", "test-model")
+        ]
+
+        assert items == [
+            "途中",
+            "まで",
+            "\n\n" + MESSAGES["WARNING"]["OUTPUT_TRUNCATED"],
+            {"input_tokens": 100, "output_tokens": 50},
+        ]
+        _, kwargs = mock_async_client.messages.stream.call_args
+        assert kwargs["system"] is omit
+
+    @patch("app.external.claude_api.get_settings")
+    async def test_stream_async_api_error(self, mock_get_settings):
+        """非同期ストリーム中の例外は APIError に変換される"""
+        mock_get_settings.return_value = create_mock_settings()
+        mock_async_client = MagicMock()
+        mock_async_client.messages.stream.side_effect = Exception("接続断")
+
+        client = ClaudeAPIClient()
+        client.async_client = mock_async_client
+
+        with pytest.raises(APIError):
+            async for _ in client._generate_content_stream_async("プロンプト", "test-model"):
+                pass
+
+
+class TestClaudeAPIClientPromptCache:
+    """プロンプトキャッシュのテスト"""
+
+    @patch("app.external.claude_api.get_settings")
+    def test_conditional_instructions_follow_cache_breakpoint(self, mock_get_settings):
+        """JSON・再生成の指示はキャッシュ区切りの後ろの別ブロックにする"""
+        mock_get_settings.return_value = create_mock_settings()
+        client = ClaudeAPIClient()
+        static = f"テンプレート\n\n{GROUNDING_INSTRUCTION}"
+        system_prompt = "\n\n".join([static, KARTE_JSON_INSTRUCTION, REFINEMENT_INSTRUCTION])
+
+        params = client._request_params("プロンプト", "test-model", system_prompt)
+
+        assert params["system"] == [
+            *cached_system(static),
+            {"type": "text", "text": KARTE_JSON_INSTRUCTION},
+            {"type": "text", "text": REFINEMENT_INSTRUCTION},
+        ]
+
+    @patch("app.external.claude_api.get_settings")
+    def test_disabled_sends_plain_system_prompt(self, mock_get_settings):
+        """無効時はシステムプロンプトを文字列のまま送る"""
+        mock_get_settings.return_value = create_mock_settings(anthropic_prompt_cache_enabled=False)
+        client = ClaudeAPIClient()
+
+        params = client._request_params("プロンプト", "test-model", "システム")
+
+        assert params["system"] == "システム"
+
+    @patch("app.external.claude_api.get_settings")
+    async def test_cache_tokens_recorded_in_context(self, mock_get_settings):
+        """キャッシュの読み取り・書き込みトークン数を context に記録する"""
+        mock_get_settings.return_value = create_mock_settings()
+        mock_response = MagicMock()
+        mock_response.content = [TextBlock(type="text", text="生成されたサマリー")]
+        mock_response.stop_reason = "end_turn"
+        mock_response.usage.input_tokens = 300
+        mock_response.usage.output_tokens = 100
+        mock_response.usage.cache_read_input_tokens = 2048
+        mock_response.usage.cache_creation_input_tokens = None
+        mock_async_client = MagicMock()
+        mock_async_client.messages.create = AsyncMock(return_value=mock_response)
+        context = GenerationContext()
+
+        client = ClaudeAPIClient()
+        with patch.object(client, "initialize"):
+            client.async_client = mock_async_client
+            result = await client.generate_summary_async(
+                "カルテ", model_name="test-model", context=context
+            )
+
+        assert result == ("生成されたサマリー", 300, 100)
+        assert (context.cache_usage.read_tokens, context.cache_usage.creation_tokens) == (2048, 0)
+
+
 class TestClaudeAPIClientIntegration:
     """ClaudeAPIClient 統合テスト"""
 
     @patch("app.external.claude_api.AnthropicBedrock")
-    @patch("app.external.base_api.get_prompt")
+    @patch("app.external.base_api.resolve_prompt")
     @patch("app.external.base_api.get_db_session")
     @patch("app.external.claude_api.get_settings")
     def test_full_generate_summary_flow(
-        self, mock_get_settings, mock_db_session, mock_get_prompt, mock_anthropic_bedrock
+        self, mock_get_settings, mock_db_session, mock_resolve_prompt, mock_anthropic_bedrock
     ):
         """完全な文書生成フロー"""
         mock_get_settings.return_value = create_mock_settings()
 
         mock_db = MagicMock()
         mock_db_session.return_value.__enter__.return_value = mock_db
-        mock_get_prompt.return_value = None
+        mock_resolve_prompt.return_value = None
 
         mock_bedrock_client = MagicMock()
         mock_response = MagicMock()
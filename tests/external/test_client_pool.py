@@ -0,0 +1,232 @@
+"""ClientPool のテスト"""
+
+import threading
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.core.metrics import REGISTRY
+from app.external.claude_api import ClaudeAPIClient
+from app.external.client_pool import ClientPool
+from app.external.gemini_api import GeminiAPIClient
+
+
+class TestClientPool:
+    """ClientPool 単体のテスト"""
+
+    def test_get_or_create_reuses_client(self):
+        """同一キーでは factory を1回だけ呼び出して同じクライアントを返す"""
+        pool = ClientPool(refresh_interval_seconds=0)
+        factory = MagicMock(side_effect=lambda: object())
+
+        first = pool.get_or_create(("claude", "ap-northeast-1"), factory)
+        second = pool.get_or_create(("claude", "ap-northeast-1"), factory)
+
+        assert first is second
+        factory.assert_called_once()
+        assert pool.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+    def test_get_or_create_separates_keys(self):
+        """キーが異なれば別クライアントを生成する"""
+        pool = ClientPool(refresh_interval_seconds=0)
+
+        tokyo = pool.get_or_create(("claude", "ap-northeast-1"), object)
+        virginia = pool.get_or_create(("claude", "us-east-1"), object)
+
+        assert tokyo is not virginia
+        assert pool.stats() == {"hits": 0, "misses": 2, "size": 2}
+
+    def test_factory_error_is_not_cached(self):
+        """factory の例外は伝播し、次回呼び出しで再生成される"""
+        pool = ClientPool(refresh_interval_seconds=0)
+        factory = MagicMock(side_effect=[RuntimeError("初期化失敗"), "client"])
+
+        try:
+            pool.get_or_create("key", factory)
+        except RuntimeError:
+            pass
+
+        assert pool.get_or_create("key", factory) == "client"
+        assert factory.call_count == 2
+
+    def test_concurrent_get_or_create_creates_once(self):
+        """並行アクセスでもクライアントは1つだけ生成される"""
+        pool = ClientPool(refresh_interval_seconds=0)
+        factory = MagicMock(side_effect=lambda: object())
+        results = []
+
+        def worker():
+            results.append(pool.get_or_create("key", factory))
+
+        threads = [threading.Thread(target=worker) for _ in range(16)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        factory.assert_called_once()
+        assert all(r is results[0] for r in results)
+        assert pool.stats()["hits"] == 15
+
+    def test_slow_factory_does_not_block_other_keys(self):
+        """生成に時間のかかるキーがあっても、他のキーの取得と認証情報の更新は待たされない"""
+        pool = ClientPool(refresh_interval_seconds=0)
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_factory():
+            started.set()
+            release.wait(5)
+            return "slow"
+
+        slow = threading.Thread(target=pool.get_or_create, args=("slow", slow_factory))
+        slow.start()
+        assert started.wait(5)
+
+        assert pool.get_or_create("fast", lambda: "fast") == "fast"
+        pool.refresh_credentials()
+        assert pool.stats()["size"] == 1
+
+        release.set()
+        slow.join(5)
+        assert pool.get_or_create("slow", MagicMock()) == "slow"
+
+    def test_clear_closes_clients_and_resets_stats(self):
+        """clear でクライアントを閉じ統計をリセットする"""
+        pool = ClientPool(refresh_interval_seconds=0)
+        client = MagicMock()
+        pool.get_or_create("key", lambda: client)
+
+        pool.clear()
+
+        client.close.assert_called_once()
+        assert pool.stats() == {"hits": 0, "misses": 0, "size": 0}
+
+    def test_clear_skips_coroutine_close(self):
+        """clear は非同期クライアントのコルーチン close を呼ばない"""
+        pool = ClientPool(refresh_interval_seconds=0)
+        client = MagicMock()
+        client.close = AsyncMock()
+        pool.get_or_create("key", lambda: client)
+
+        pool.clear()
+
+        client.close.assert_not_called()
+        assert pool.stats()["size"] == 0
+
+    async def test_aclear_closes_sync_and_async_clients(self):
+        """aclear は同期・非同期いずれの close も実行する"""
+        pool = ClientPool(refresh_interval_seconds=0)
+        sync_client = MagicMock()
+        async_client = MagicMock()
+        async_client.close = AsyncMock()
+        pool.get_or_create("sync", lambda: sync_client)
+        pool.get_or_create("async", lambda: async_client)
+
+        await pool.aclear()
+
+        sync_client.close.assert_called_once()
+        async_client.close.assert_awaited_once()
+        assert pool.stats() == {"hits": 0, "misses": 0, "size": 0}
+
+    def test_refresh_credentials_calls_refreshers(self):
+        """refresh_credentials で登録済みの更新関数が呼ばれる"""
+        pool = ClientPool(refresh_interval_seconds=0)
+        refresher = MagicMock()
+        pool.get_or_create("key", object, refresher)
+
+        pool.refresh_credentials()
+
+        refresher.assert_called_once()
+
+    def test_refresh_credentials_continues_on_error(self):
+        """更新関数が失敗しても他の更新関数は実行される"""
+        pool = ClientPool(refresh_interval_seconds=0)
+        failing = MagicMock(side_effect=RuntimeError("更新失敗"))
+        succeeding = MagicMock()
+        pool.get_or_create("a", object, failing)
+        pool.get_or_create("b", object, succeeding)
+
+        pool.refresh_credentials()
+
+        succeeding.assert_called_once()
+
+    def test_clear_stops_refresh_thread(self):
+        """clear で認証情報の更新スレッドを停止し、再登録時は新たに起動する"""
+        pool = ClientPool(refresh_interval_seconds=3600)
+        pool.get_or_create("a", object, MagicMock())
+        first_thread = pool._refresh_thread
+        assert first_thread is not None and first_thread.is_alive()
+
+        pool.clear()
+
+        assert not first_thread.is_alive()
+        pool.get_or_create("b", object, MagicMock())
+        second_thread = pool._refresh_thread
+        assert second_thread is not None and second_thread.is_alive()
+        pool.clear()
+        assert not second_thread.is_alive()
+
+    async def test_aclear_stops_refresh_thread(self):
+        """aclear でも認証情報の更新スレッドを停止する"""
+        pool = ClientPool(refresh_interval_seconds=3600)
+        pool.get_or_create("a", object, MagicMock())
+        thread = pool._refresh_thread
+        assert thread is not None
+
+        await pool.aclear()
+
+        assert not thread.is_alive()
+
+    def test_stats_are_exported_as_metrics(self):
+        """ヒット/ミス数をカウンタ、保持件数をゲージとして /metrics に出力する"""
+        pool = ClientPool(refresh_interval_seconds=0)
+        pool.get_or_create("key", object)
+        pool.get_or_create("key", object)
+
+        with patch("app.external.client_pool.get_client_pool", return_value=pool):
+            text = REGISTRY.render()
+
+        assert "llm_client_pool_hits_total 1" in text
+        assert "llm_client_pool_misses_total 1" in text
+        assert "llm_client_pool_size 1" in text
+
+
+class TestProviderClientsUsePool:
+    """各プロバイダークライアントがプールを利用することの確認"""
+
+    @patch("app.external.claude_api.AsyncAnthropicBedrock")
+    @patch("app.external.claude_api.AnthropicBedrock")
+    def test_claude_initialize_reuses_bedrock_client(self, mock_bedrock, mock_async_bedrock):
+        """ClaudeAPIClient は同期・非同期クライアントを1回だけ生成して共有する"""
+        client1 = ClaudeAPIClient()
+        client2 = ClaudeAPIClient()
+        client1.initialize()
+        client2.initialize()
+
+        assert client1 is not client2
+        assert client1.client is client2.client
+        assert client1.async_client is client2.async_client
+        mock_bedrock.assert_called_once()
+        mock_async_bedrock.assert_called_once()
+
+    @patch("app.external.gemini_api.genai.Client")
+    @patch("app.external.gemini_api.service_account.Credentials.from_service_account_info")
+    @patch("app.external.gemini_api.get_settings")
+    def test_gemini_initialize_parses_credentials_once(
+        self, mock_get_settings, mock_from_info, mock_genai_client
+    ):
+        """GeminiAPIClient は認証情報JSONのパースとクライアント生成を1回だけ行う"""
+        settings = MagicMock()
+        settings.gemini_model = "gemini-test"
+        settings.google_project_id = "test-project"
+        settings.google_location = "global"
+        settings.google_credentials_json = '{"type": "service_account"}'
+        mock_get_settings.return_value = settings
+
+        client1 = GeminiAPIClient()
+        client2 = GeminiAPIClient()
+        client1.initialize()
+        client2.initialize()
+
+        assert client1.client is client2.client
+        mock_from_info.assert_called_once()
+        mock_genai_client.assert_called_once()
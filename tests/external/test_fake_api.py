@@ -0,0 +1,102 @@
+from unittest.mock import patch
+
+import pytest
+
+from app.core.config import Settings
+from app.core.constants import DEFAULT_SECTION_NAMES, MESSAGES
+from app.external.api_factory import APIProvider, create_client
+from app.external.fake_api import FakeAPIClient, should_inject_error
+from app.utils.exceptions import APIError
+from app.utils.text_processor import parse_output_summary
+
+
+def _fake_client(**overrides) -> FakeAPIClient:
+    """待ち時間なしの設定で FakeAPIClient を作成"""
+    values = {
+        "fake_llm_first_token_seconds": 0.0,
+        "fake_llm_tokens_per_second": 0.0,
+        "fake_llm_output_tokens": 120,
+        "fake_llm_chunk_tokens": 7,
+        "fake_llm_error_rate": 0.0,
+        **overrides,
+    }
+    with patch("app.external.fake_api.get_settings", return_value=Settings(**values)):
+        return FakeAPIClient()
+
+
+class TestShouldInjectError:
+    """should_inject_error のテスト"""
+
+    def test_zero_rate_never_fails(self):
+        """エラー率0では失敗させない"""
+        assert not any(should_inject_error(n, 0.0) for n in range(1, 1001))
+
+    @pytest.mark.parametrize("rate", [0.01, 0.05, 0.25, 1.0])
+    def test_failures_match_rate(self, rate):
+        """累計の失敗件数はリクエスト数 × エラー率に一致する"""
+        failures = [n for n in range(1, 1001) if should_inject_error(n, rate)]
+
+        assert len(failures) == int(1000 * rate)
+
+
+class TestFakeAPIClient:
+    """FakeAPIClient のテスト"""
+
+    def test_create_client(self):
+        """create_client で fake プロバイダーを作成できる"""
+        client = create_client(APIProvider.FAKE)
+
+        assert isinstance(client, FakeAPIClient)
+        assert client.initialize() is True
+
+    def test_generate_content_has_sections(self):
+        """出力は既定のセクション見出しを持ち、出力トークン数は文字数"""
+        client = _fake_client()
+
+        text, input_tokens, output_tokens = client._generate_content("カルテ", "fake", "指示")
+
+        sections = parse_output_summary(text)
+        assert all(sections.get(name) for name in DEFAULT_SECTION_NAMES)
+        assert input_tokens == len("カルテ") + len("指示")
+        assert output_tokens == len(text)
+
+    async def test_stream_async_yields_chunks_and_usage(self):
+        """非同期ストリームはチャンクごとに返し、最後に使用量を返す"""
+        client = _fake_client()
+
+        items = [item async for item in client._generate_content_stream_async("カルテ", "fake")]
+
+        *chunks, usage = items
+        assert len(chunks) > 1
+        texts = [c for c in chunks if isinstance(c, str)]
+        assert len(texts) == len(chunks)
+        assert all(0 < len(c) <= 7 for c in texts)
+        assert usage == {"input_tokens": 3, "output_tokens": len("".join(texts))}
+
+    def test_stream_matches_non_stream(self):
+        """同期ストリームの連結結果は非ストリームの出力と同じ"""
+        client = _fake_client()
+
+        text, _, _ = client._generate_content("カルテ", "fake")
+        streamed = [c for c in client._generate_content_stream("カルテ", "fake") if isinstance(c, str)]
+
+        assert "".join(streamed) == text
+
+    async def test_injected_error_raises_api_error(self):
+        """エラー率1ではすべてのリクエストが APIError になる"""
+        client = _fake_client(fake_llm_error_rate=1.0)
+
+        with pytest.raises(APIError, match=MESSAGES["ERROR"]["FAKE_LLM_INJECTED_ERROR"]):
+            await client._generate_content_async("カルテ", "fake")
+
+    def test_schedule_delays(self):
+        """最初のチャンクは初回トークン待ち、以降はトークン速度に応じた間隔"""
+        client = _fake_client(
+            fake_llm_first_token_seconds=0.5,
+            fake_llm_tokens_per_second=70.0,
+        )
+
+        delays = [delay for delay, _ in client._schedule()]
+
+        assert delays[0] == 0.5
+        assert all(delay == pytest.approx(0.1) for delay in delays[1:])
@@ -1,10 +1,12 @@
 import json
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from google.genai import errors as genai_errors
 
-from app.core.constants import MESSAGES
+from app.core.constants import CACHED_KARTE_SYSTEM_INSTRUCTION, MESSAGES
 from app.external.gemini_api import GeminiAPIClient
+from app.external.gemini_context_cache import GeminiContextCache
 from app.utils.exceptions import APIError
 
 
@@ -17,6 +19,8 @@ def create_mock_settings(**kwargs):
     mock.google_credentials_json = kwargs.get("google_credentials_json", None)
     mock.gemini_thinking_level = kwargs.get("gemini_thinking_level", "HIGH")
     mock.gemini_evaluation_model = kwargs.get("gemini_evaluation_model", "gemini-eval")
+    mock.gemini_context_cache_enabled = kwargs.get("gemini_context_cache_enabled", True)
+    mock.gemini_context_cache_min_chars = kwargs.get("gemini_context_cache_min_chars", 30000)
     return mock
 
 
@@ -389,15 +393,97 @@ class TestGeminiAPIClientGenerateContent:
         assert config is not None
 
 
+class TestGeminiAPIClientGenerateContentAsync:
+    """GeminiAPIClient の非同期生成メソッドのテスト"""
+
+    @patch("app.external.gemini_api.get_settings")
+    async def test_generate_content_async_success(self, mock_get_settings):
+        """client.aio で生成し、同期版と同じ形式で返す"""
+        mock_get_settings.return_value = create_mock_settings()
+        mock_response = MagicMock()
+        mock_response.text = "生成されたサマリー"
+        mock_response.usage_metadata.prompt_token_count = 2000
+        mock_response.usage_metadata.candidates_token_count = 1000
+        mock_client = MagicMock()
+        mock_client.aio.models.generate_content = AsyncMock(return_value=mock_response)
+
+        client = GeminiAPIClient()
+        client.client = mock_client
+
+        result = await client._generate_content_async("テストプロンプト", "gemini-test", "システム")
+
+        assert result == ("生成されたサマリー", 2000, 1000)
+        call_args = mock_client.aio.models.generate_content.call_args
+        assert call_args[1]["model"] == "gemini-test"
+        assert call_args[1]["config"].system_instruction == "システム"
+        mock_client.models.generate_content.assert_not_called()
+
+    @patch("app.external.gemini_api.get_settings")
+    async def test_generate_content_async_api_error(self, mock_get_settings):
+        """API例外は APIError に変換される"""
+        mock_get_settings.return_value = create_mock_settings()
+        mock_client = MagicMock()
+        mock_client.aio.models.generate_content = AsyncMock(side_effect=Exception("API障害"))
+
+        client = GeminiAPIClient()
+        client.client = mock_client
+
+        with pytest.raises(APIError):
+            await client._generate_content_async("プロンプト", "gemini-test")
+
+    @patch("app.external.gemini_api.get_settings")
+    async def test_stream_async_yields_chunks_then_usage(self, mock_get_settings):
+        """非同期ストリームでチャンクを順に返し、最後に使用量を返す"""
+        mock_get_settings.return_value = create_mock_settings()
+
+        def make_chunk(text, prompt_tokens=None, candidates_tokens=None):
+            chunk = MagicMock()
+            chunk.text = text
+            chunk.usage_metadata.prompt_token_count = prompt_tokens
+            chunk.usage_metadata.candidates_token_count = candidates_tokens
+            return chunk
+
+        async def response_stream():
+            yield make_chunk("現病歴")
+            yield make_chunk("")
+            yield make_chunk("です", prompt_tokens=300, candidates_tokens=20)
+
+        mock_client = MagicMock()
+        mock_client.aio.models.generate_content_stream = AsyncMock(
+            return_value=response_stream()
+        )
+
+        client = GeminiAPIClient()
+        client.client = mock_client
+
+        items = [
+            item
+            async for item in client._generate_content_stream_async("プロンプト", "gemini-test")
+        ]
+
+        assert items == ["現病歴", "です", {"input_tokens": 300, "output_tokens": 20}]
+
+    @patch("app.external.gemini_api.get_settings")
+    async def test_stream_async_client_not_initialized(self, mock_get_settings):
+        """クライアント未初期化"""
+        mock_get_settings.return_value = create_mock_settings()
+
+        client = GeminiAPIClient()
+
+        with pytest.raises(APIError):
+            async for _ in client._generate_content_stream_async("プロンプト", "gemini-test"):
+                pass
+
+
 class TestGeminiAPIClientIntegration:
     """GeminiAPIClient 統合テスト"""
 
     @patch("app.external.gemini_api.genai.Client")
-    @patch("app.external.base_api.get_prompt")
+    @patch("app.external.base_api.resolve_prompt")
     @patch("app.external.base_api.get_db_session")
     @patch("app.external.gemini_api.get_settings")
     def test_full_generate_summary_flow(
-        self, mock_get_settings, mock_db_session, mock_get_prompt, mock_genai_client
+        self, mock_get_settings, mock_db_session, mock_resolve_prompt, mock_genai_client
     ):
         """完全な文書生成フロー"""
         mock_get_settings.return_value = create_mock_settings(
@@ -410,7 +496,7 @@ class TestGeminiAPIClientIntegration:
 
         mock_db = MagicMock()
         mock_db_session.return_value.__enter__.return_value = mock_db
-        mock_get_prompt.return_value = None
+        mock_resolve_prompt.return_value = None
 
         mock_client_instance = MagicMock()
         mock_response = MagicMock()
@@ -761,3 +847,212 @@ class TestGeminiAPIClientNetworkErrors:
             client.initialize()
 
         assert "GOOGLE_PROJECT_ID" in str(exc_info.value)
+
+
+class TestGeminiAPIClientContextCache:
+    """長いカルテ本文のコンテキストキャッシュのテスト"""
+
+    KARTE = "<カルテ情報>\n" + "発熱と咳嗽あり。" * 10 + "\n</カルテ情報>"
+    PROMPT = KARTE + "\n\n<追加情報>\n特になし\n</追加情報>"
+
+    @staticmethod
+    def _response(text="生成結果", prompt_tokens: int | None = 5000, cached_tokens: int | None = 4500):
+        response = MagicMock()
+        response.text = text
+        response.usage_metadata.prompt_token_count = prompt_tokens
+        response.usage_metadata.candidates_token_count = 100
+        response.usage_metadata.cached_content_token_count = cached_tokens
+        return response
+
+    @staticmethod
+    def _client(mock_get_settings, **settings):
+        mock_get_settings.return_value = create_mock_settings(
+            **{"gemini_context_cache_min_chars": 50, **settings}
+        )
+        mock_client = MagicMock()
+        cached = MagicMock()
+        cached.name = "cachedContents/1"
+        cached.usage_metadata.total_token_count = 4500
+        mock_client.caches.create.return_value = cached
+        mock_client.aio.caches.create = AsyncMock(return_value=cached)
+        client = GeminiAPIClient()
+        client.client = mock_client
+        return client, mock_client
+
+    @pytest.fixture(autouse=True)
+    def context_cache(self):
+        cache = GeminiContextCache(ttl_seconds=1800, max_entries=10)
+        with patch("app.external.gemini_api.get_gemini_context_cache", return_value=cache):
+            yield cache
+
+    @patch("app.external.gemini_api.get_settings")
+    def test_generate_uses_cached_karte(self, mock_get_settings):
+        """カルテ本文はキャッシュに載せ、残りとシステムプロンプトだけを送る"""
+        client, mock_client = self._client(mock_get_settings)
+        mock_client.models.generate_content.return_value = self._response()
+
+        result = client._generate_content(self.PROMPT, "gemini-test", "システム")
+
+        assert result == ("生成結果", 500, 100)
+        create_config = mock_client.caches.create.call_args[1]["config"]
+        assert create_config.contents[0].parts[0].text == self.KARTE
+        assert create_config.system_instruction == CACHED_KARTE_SYSTEM_INSTRUCTION
+        call_args = mock_client.models.generate_content.call_args[1]
+        assert call_args["contents"] == "<指示>\nシステム\n</指示>\n\n<追加情報>\n特になし\n</追加情報>"
+        assert call_args["config"].cached_content == "cachedContents/1"
+        assert call_args["config"].system_instruction is None
+        assert (client.cache_usage.read_tokens, client.cache_usage.creation_tokens) == (4500, 4500)
+
+    @patch("app.external.gemini_api.get_settings")
+    def test_cache_shared_across_steps(self, mock_get_settings):
+        """同じカルテ本文の生成・評価・再生成はシステムプロンプトが異なっても1つのキャッシュを使う"""
+        client, mock_client = self._client(mock_get_settings)
+        mock_client.models.generate_content.return_value = self._response()
+        body = self.KARTE.removeprefix("<カルテ情報>\n").removesuffix("\n</カルテ情報>")
+        evaluation = f"<カルテ記載>\n{body}\n</カルテ記載>\n\n<生成された出力>\n要約\n</生成された出力>"
+
+        client._generate_content(self.PROMPT, "gemini-test", "生成")
+        client._generate_content(evaluation, "gemini-test", "評価")
+        client._generate_content(self.PROMPT + "\n\n<評価結果>\n指摘\n</評価結果>", "gemini-test", "再生成")
+
+        mock_client.caches.create.assert_called_once()
+        create_config = mock_client.caches.create.call_args[1]["config"]
+        assert create_config.contents[0].parts[0].text == self.KARTE
+        evaluation_call = mock_client.models.generate_content.call_args_list[1][1]
+        assert evaluation_call["contents"] == "<指示>\n評価\n</指示>\n\n<生成された出力>\n要約\n</生成された出力>"
+        assert evaluation_call["config"].cached_content == "cachedContents/1"
+        assert client.cache_usage.creation_tokens == 4500
+        assert client.cache_usage.read_tokens == 13500
+
+    @patch("app.external.gemini_api.get_settings")
+    def test_first_request_is_sent_without_cache(self, mock_get_settings, context_cache):
+        """min_uses に達するまではキャッシュを作成せず、そのまま送る"""
+        context_cache.min_uses = 2
+        client, mock_client = self._client(mock_get_settings)
+        mock_client.models.generate_content.return_value = self._response(cached_tokens=None)
+
+        client._generate_content(self.PROMPT, "gemini-test", "システム")
+
+        mock_client.caches.create.assert_not_called()
+        call_args = mock_client.models.generate_content.call_args[1]
+        assert call_args["contents"] == self.PROMPT
+        assert call_args["config"].system_instruction == "システム"
+
+    @pytest.mark.parametrize(
+        "settings, prompt",
+        [
+            ({"gemini_context_cache_enabled": False}, PROMPT),
+            ({"gemini_context_cache_min_chars": 10000}, PROMPT),
+            ({}, "<追加情報>\n特になし\n</追加情報>"),
+            ({}, KARTE),
+        ],
+    )
+    @patch("app.external.gemini_api.get_settings")
+    def test_not_cached(self, mock_get_settings, settings, prompt):
+        """無効時・短いカルテ・カルテ本文がない・カルテ本文だけのプロンプトはそのまま送る"""
+        client, mock_client = self._client(mock_get_settings, **settings)
+        mock_client.models.generate_content.return_value = self._response(cached_tokens=None)
+
+        result = client._generate_content(prompt, "gemini-test", "システム")
+
+        assert result == ("生成結果", 5000, 100)
+        mock_client.caches.create.assert_not_called()
+        call_args = mock_client.models.generate_content.call_args[1]
+        assert call_args["contents"] == prompt
+        assert call_args["config"].system_instruction == "システム"
+
+    @patch("app.external.gemini_api.get_settings")
+    def test_stale_cache_falls_back(self, mock_get_settings, context_cache):
+        """失効したキャッシュを参照した場合は手元のエントリを破棄してキャッシュなしで再送する"""
+        client, mock_client = self._client(mock_get_settings)
+        stale = genai_errors.ClientError(404, {"error": {"message": "not found"}})
+        mock_client.models.generate_content.side_effect = [stale, self._response(cached_tokens=None)]
+
+        result = client._generate_content(self.PROMPT, "gemini-test", "システム")
+
+        assert result == ("生成結果", 5000, 100)
+        assert mock_client.models.generate_content.call_args[1]["contents"] == self.PROMPT
+        assert context_cache.size() == 0
+
+    @patch("app.external.gemini_api.get_settings")
+    def test_cached_content_400_falls_back(self, mock_get_settings, context_cache):
+        """cached_content を指す 400 は失効とみなしてキャッシュなしで再送する"""
+        client, mock_client = self._client(mock_get_settings)
+        stale = genai_errors.ClientError(
+            400, {"error": {"message": "Cached content cachedContents/1 is expired.", "status": "INVALID_ARGUMENT"}}
+        )
+        mock_client.models.generate_content.side_effect = [stale, self._response(cached_tokens=None)]
+
+        result = client._generate_content(self.PROMPT, "gemini-test", "システム")
+
+        assert result == ("生成結果", 5000, 100)
+        assert context_cache.size() == 0
+
+    @patch("app.external.gemini_api.get_settings")
+    def test_plain_400_keeps_cache(self, mock_get_settings, context_cache):
+        """キャッシュと無関係な 400 はキャッシュを残し、再送せず APIError にする"""
+        client, mock_client = self._client(mock_get_settings)
+        invalid = genai_errors.ClientError(
+            400, {"error": {"message": "The input token count exceeds the maximum.", "status": "INVALID_ARGUMENT"}}
+        )
+        mock_client.models.generate_content.side_effect = invalid
+
+        with pytest.raises(APIError):
+            client._generate_content(self.PROMPT, "gemini-test", "システム")
+
+        mock_client.models.generate_content.assert_called_once()
+        assert context_cache.size() == 1
+
+    @patch("app.external.gemini_api.get_settings")
+    def test_other_errors_are_not_retried(self, mock_get_settings):
+        """キャッシュと無関係なエラーは再送せず APIError にする"""
+        client, mock_client = self._client(mock_get_settings)
+        mock_client.models.generate_content.side_effect = Exception("API障害")
+
+        with pytest.raises(APIError):
+            client._generate_content(self.PROMPT, "gemini-test", "システム")
+
+        mock_client.models.generate_content.assert_called_once()
+
+    @patch("app.external.gemini_api.get_settings")
+    async def test_stream_async_uses_cached_karte(self, mock_get_settings):
+        """非同期ストリームでもキャッシュを使い、使用量からキャッシュ読み取り分を除く"""
+        client, mock_client = self._client(mock_get_settings)
+
+        async def response_stream():
+            yield self._response(text="現病歴", prompt_tokens=None, cached_tokens=None)
+            yield self._response(text="です")
+
+        mock_client.aio.models.generate_content_stream = AsyncMock(return_value=response_stream())
+
+        items = [
+            item
+            async for item in client._generate_content_stream_async(self.PROMPT, "gemini-test", "システム")
+        ]
+
+        assert items == ["現病歴", "です", {"input_tokens": 500, "output_tokens": 100}]
+        mock_client.aio.caches.create.assert_awaited_once()
+        call_args = mock_client.aio.models.generate_content_stream.call_args[1]
+        assert call_args["config"].cached_content == "cachedContents/1"
+        assert client.cache_usage.read_tokens == 4500
+
+    @patch("app.external.gemini_api.get_settings")
+    def test_stream_stale_cache_falls_back(self, mock_get_settings, context_cache):
+        """同期ストリームで最初のチャンクまでにキャッシュ参照が失敗したら再送する"""
+        client, mock_client = self._client(mock_get_settings)
+        stale = genai_errors.ClientError(404, {"error": {"message": "not found"}})
+
+        def failing_stream():
+            raise stale
+            yield
+
+        mock_client.models.generate_content_stream.side_effect = [
+            failing_stream(),
+            iter([self._response(text="本文", cached_tokens=None)]),
+        ]
+
+        items = list(client._generate_content_stream(self.PROMPT, "gemini-test", "システム"))
+
+        assert items == ["本文", {"input_tokens": 5000, "output_tokens": 100}]
+        assert mock_client.models.generate_content_stream.call_args[1]["contents"] == self.PROMPT
+        assert context_cache.size() == 0
@@ -0,0 +1,215 @@
+import asyncio
+import threading
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.core.constants import CACHED_KARTE_SYSTEM_INSTRUCTION
+from app.external.gemini_context_cache import GeminiContextCache
+from app.services.generation_context import CacheTokenUsage
+
+
+def _client(names=("cachedContents/1", "cachedContents/2", "cachedContents/3")):
+    """caches.create が順に names のキャッシュを返すクライアントのモック"""
+    client = MagicMock()
+    created = []
+    for name in names:
+        cached = MagicMock()
+        cached.name = name
+        cached.usage_metadata.total_token_count = 5000
+        created.append(cached)
+    client.caches.create.side_effect = created
+    client.aio.caches.create = AsyncMock(side_effect=list(created))
+    return client
+
+
+class TestGeminiContextCache:
+    """GeminiContextCache のテスト"""
+
+    def test_reuses_entry_for_same_text(self):
+        """同じモデル・本文では作成は1回で、作成トークン数も1回だけ記録する"""
+        cache = GeminiContextCache(ttl_seconds=1800, max_entries=10)
+        client = _client()
+        usage = CacheTokenUsage()
+
+        first = cache.get_or_create(client, "gemini-test", "カルテ", usage)
+        second = cache.get_or_create(client, "gemini-test", "カルテ", usage)
+
+        assert first == second == "cachedContents/1"
+        client.caches.create.assert_called_once()
+        config = client.caches.create.call_args[1]["config"]
+        assert config.ttl == "1800s"
+        assert config.contents[0].parts[0].text == "カルテ"
+        # 全ステップ共通のカルテ内の指示を無視する制約はキャッシュ側のシステム指示に登録する
+        assert config.system_instruction == CACHED_KARTE_SYSTEM_INSTRUCTION
+        assert usage.creation_tokens == 5000
+        assert usage.read_tokens == 0
+
+    def test_key_includes_model(self):
+        """モデルが異なれば別のエントリ"""
+        cache = GeminiContextCache(ttl_seconds=1800, max_entries=10)
+        client = _client()
+
+        first = cache.get_or_create(client, "gemini-a", "カルテ", CacheTokenUsage())
+        second = cache.get_or_create(client, "gemini-b", "カルテ", CacheTokenUsage())
+
+        assert first != second
+        assert cache.size() == 2
+
+    def test_created_on_min_uses(self):
+        """min_uses 回目に送られた時点で作成し、それまではキャッシュを使わない"""
+        cache = GeminiContextCache(ttl_seconds=1800, max_entries=10, min_uses=2)
+        client = _client()
+
+        first = cache.get_or_create(client, "gemini-test", "カルテ", CacheTokenUsage())
+        client.caches.create.assert_not_called()
+        second = cache.get_or_create(client, "gemini-test", "カルテ", CacheTokenUsage())
+        third = cache.get_or_create(client, "gemini-test", "カルテ", CacheTokenUsage())
+
+        assert first is None
+        assert second == third == "cachedContents/1"
+        client.caches.create.assert_called_once()
+
+    def test_use_count_expires_with_ttl(self):
+        """TTL より前に送られた回数は数えない"""
+        cache = GeminiContextCache(ttl_seconds=1800, max_entries=10, min_uses=2)
+        client = _client()
+
+        with patch("app.external.gemini_context_cache.time.monotonic", return_value=0.0):
+            cache.get_or_create(client, "gemini-test", "カルテ", CacheTokenUsage())
+        with patch("app.external.gemini_context_cache.time.monotonic", return_value=1800.0):
+            name = cache.get_or_create(client, "gemini-test", "カルテ", CacheTokenUsage())
+
+        assert name is None
+        client.caches.create.assert_not_called()
+
+    def test_expired_entry_is_recreated(self):
+        """手元の有効期限を過ぎたエントリは作り直す"""
+        cache = GeminiContextCache(ttl_seconds=1800, max_entries=10)
+        client = _client()
+
+        with patch("app.external.gemini_context_cache.time.monotonic", return_value=0.0):
+            cache.get_or_create(client, "gemini-test", "カルテ", CacheTokenUsage())
+        with patch("app.external.gemini_context_cache.time.monotonic", return_value=1800.0):
+            name = cache.get_or_create(client, "gemini-test", "カルテ", CacheTokenUsage())
+
+        assert name == "cachedContents/2"
+        client.caches.delete.assert_not_called()
+
+    def test_evicts_least_recently_used(self):
+        """上限を超えたら最も古く使われたエントリを Vertex 側からも削除する"""
+        cache = GeminiContextCache(ttl_seconds=1800, max_entries=2)
+        client = _client()
+
+        cache.get_or_create(client, "gemini-test", "カルテA", CacheTokenUsage())
+        cache.get_or_create(client, "gemini-test", "カルテB", CacheTokenUsage())
+        cache.get_or_create(client, "gemini-test", "カルテA", CacheTokenUsage())
+        cache.get_or_create(client, "gemini-test", "カルテC", CacheTokenUsage())
+
+        client.caches.delete.assert_called_once_with(name="cachedContents/2")
+        assert cache.size() == 2
+
+    def test_create_failure_is_retried_after_short_interval(self):
+        """作成に失敗した本文はしばらく再作成せず、TTL より短い間隔で再試行する"""
+        cache = GeminiContextCache(ttl_seconds=1800, max_entries=10)
+        client = MagicMock()
+        client.caches.create.side_effect = Exception("too few tokens")
+
+        with patch("app.external.gemini_context_cache.time.monotonic", return_value=0.0):
+            first = cache.get_or_create(client, "gemini-test", "カルテ", CacheTokenUsage())
+            second = cache.get_or_create(client, "gemini-test", "カルテ", CacheTokenUsage())
+        assert first is None and second is None
+        client.caches.create.assert_called_once()
+
+        with patch("app.external.gemini_context_cache.time.monotonic", return_value=60.0):
+            cache.get_or_create(client, "gemini-test", "カルテ", CacheTokenUsage())
+        assert client.caches.create.call_count == 2
+
+    def test_concurrent_first_requests_create_once(self):
+        """同じキーの作成中に来た呼び出しは作成結果を待ち、Vertex 側には1回だけ作成する"""
+        cache = GeminiContextCache(ttl_seconds=1800, max_entries=10)
+        client = _client()
+        started = threading.Event()
+        release = threading.Event()
+        create = client.caches.create.side_effect
+
+        def slow_create(**kwargs):
+            started.set()
+            release.wait(5)
+            return next(create)
+
+        client.caches.create.side_effect = slow_create
+        names = []
+
+        def request():
+            names.append(cache.get_or_create(client, "gemini-test", "カルテ", CacheTokenUsage()))
+
+        threads = [threading.Thread(target=request) for _ in range(3)]
+        threads[0].start()
+        assert started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert names == ["cachedContents/1"] * 3
+        client.caches.create.assert_called_once()
+        client.caches.delete.assert_not_called()
+        assert cache.size() == 1
+
+    async def test_concurrent_async_requests_create_once(self):
+        """非同期版でも同じキーの作成は1回にまとめる"""
+        cache = GeminiContextCache(ttl_seconds=1800, max_entries=10)
+        client = _client()
+        release = asyncio.Event()
+        created = client.aio.caches.create.side_effect
+
+        async def slow_create(**kwargs):
+            await release.wait()
+            return next(created)
+
+        client.aio.caches.create = AsyncMock(side_effect=slow_create)
+        tasks = [
+            asyncio.create_task(
+                cache.get_or_create_async(client, "gemini-test", "カルテ", CacheTokenUsage())
+            )
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await asyncio.gather(*tasks) == ["cachedContents/1"] * 3
+        client.aio.caches.create.assert_awaited_once()
+        client.caches.delete.assert_not_called()
+
+    def test_evict_and_clear_delete_remote(self):
+        """evict / clear は Vertex 側のキャッシュも削除し、invalidate は手元のみ破棄する"""
+        cache = GeminiContextCache(ttl_seconds=1800, max_entries=10)
+        client = _client()
+        cache.get_or_create(client, "gemini-test", "カルテA", CacheTokenUsage())
+        cache.get_or_create(client, "gemini-test", "カルテB", CacheTokenUsage())
+        cache.get_or_create(client, "gemini-test", "カルテC", CacheTokenUsage())
+
+        cache.invalidate("gemini-test", "カルテC")
+        client.caches.delete.assert_not_called()
+
+        cache.evict("gemini-test", "カルテA")
+        client.caches.delete.assert_called_once_with(name="cachedContents/1")
+
+        cache.clear()
+        assert client.caches.delete.call_count == 2
+        client.caches.delete.assert_called_with(name="cachedContents/2")
+        assert cache.size() == 0
+
+    async def test_get_or_create_async(self):
+        """非同期版は client.aio で作成し、同期版とエントリを共有する"""
+        cache = GeminiContextCache(ttl_seconds=1800, max_entries=10)
+        client = _client()
+        usage = CacheTokenUsage()
+
+        first = await cache.get_or_create_async(client, "gemini-test", "カルテ", usage)
+        second = cache.get_or_create(client, "gemini-test", "カルテ", usage)
+
+        assert first == second == "cachedContents/1"
+        client.aio.caches.create.assert_awaited_once()
+        client.caches.create.assert_not_called()
+        assert usage.creation_tokens == 5000
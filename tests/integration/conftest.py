@@ -89,6 +89,9 @@ def integration_client(integration_db, monkeypatch):
         patch("app.services.evaluation_service.settings", test_settings),
         patch("app.services.usage_service.get_db_session", override_get_db_session),
         patch("app.services.model_selector.get_db_session", override_get_db_session),
+        patch(
+            "app.services.generation_context.get_db_session", override_get_db_session
+        ),
         patch(
             "app.services.evaluation_service.get_db_session", override_get_db_session
         ),
@@ -1,6 +1,6 @@
 """統合テスト: エラーハンドリング（AI API障害・ストリーミングエラー）"""
 
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 from fastapi import status
 
@@ -26,7 +26,7 @@ class TestSyncAPIErrors:
     ):
         """同期生成でAI APIが例外を投げるとsuccess=Falseレスポンスが返る"""
         with patch(
-            "app.services.summary_service.generate_summary_with_provider",
+            "app.services.summary_service.generate_summary_with_provider_async",
             side_effect=Exception("Bedrock接続エラー"),
         ):
             response = integration_client.post(
@@ -61,7 +61,7 @@ class TestSyncAPIErrors:
 
         mock_instance = MagicMock()
         mock_instance.initialize.return_value = None
-        mock_instance._generate_content.side_effect = Exception("Gemini API障害")
+        mock_instance._generate_content_async = AsyncMock(side_effect=Exception("Gemini API障害"))
         mock_cls = MagicMock(return_value=mock_instance)
 
         with patch("app.services.evaluation_service.create_client", mock_cls):
@@ -110,7 +110,7 @@ class TestStreamingErrors:
     ):
         """ストリーミング生成でAI APIが例外を投げるとerror SSEイベントが返る"""
         with patch(
-            "app.services.summary_service.generate_summary_stream_with_provider",
+            "app.services.summary_service.generate_summary_stream_with_provider_async",
             side_effect=Exception("ストリーミングエラー"),
         ):
             response = integration_client.post(
@@ -144,7 +144,7 @@ class TestStreamingErrors:
 
         mock_instance = MagicMock()
         mock_instance.initialize.return_value = None
-        mock_instance._generate_content.side_effect = Exception("評価APIエラー")
+        mock_instance._generate_content_async = AsyncMock(side_effect=Exception("評価APIエラー"))
         mock_cls = MagicMock(return_value=mock_instance)
 
         with patch("app.services.evaluation_service.create_client", mock_cls):
@@ -171,11 +171,11 @@ class TestStreamingErrors:
     ):
         """AI APIが空のレスポンスを返した場合でも正常にcompleteイベントが返る"""
 
-        def empty_stream():
+        async def empty_stream():
             yield {"input_tokens": 0, "output_tokens": 0}
 
         with patch(
-            "app.services.summary_service.generate_summary_stream_with_provider",
+            "app.services.summary_service.generate_summary_stream_with_provider_async",
             return_value=empty_stream(),
         ):
             response = integration_client.post(
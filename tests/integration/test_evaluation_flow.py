@@ -1,6 +1,6 @@
 """統合テスト: 評価フロー（API層→Service層→DB）"""
 
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 from fastapi import status
 
@@ -18,7 +18,7 @@ def _make_mock_gemini_cls(evaluation_text: str = "評価結果: 適切な要約
     """評価用APIクライアントのモックを生成"""
     mock_instance = MagicMock()
     mock_instance.initialize.return_value = None
-    mock_instance._generate_content.return_value = (evaluation_text, 500, 200)
+    mock_instance._generate_content_async = AsyncMock(return_value=(evaluation_text, 500, 200))
     mock_cls = MagicMock(return_value=mock_instance)
     return mock_cls
 
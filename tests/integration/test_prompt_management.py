@@ -179,7 +179,7 @@ class TestHierarchicalPromptResolution:
             return "生成テキスト", 100, 50
 
         with patch(
-            "app.services.summary_service.generate_summary_with_provider",
+            "app.services.summary_service.generate_summary_with_provider_async",
             side_effect=capture_generate,
         ):
             response = integration_client.post(
@@ -111,7 +111,7 @@ class TestCSRFProtection:
     ):
         """有効なCSRFトークンを持つリクエストは許可される"""
         with patch(
-            "app.services.summary_service.generate_summary_with_provider",
+            "app.services.summary_service.generate_summary_with_provider_async",
             return_value=("生成テキスト", 100, 50),
         ):
             response = integration_client.post(
@@ -144,7 +144,7 @@ class TestSecurityHeaders:
     ):
         """POSTレスポンスにもセキュリティヘッダーが付与される"""
         with patch(
-            "app.services.summary_service.generate_summary_with_provider",
+            "app.services.summary_service.generate_summary_with_provider_async",
             return_value=("テキスト", 100, 50),
         ):
             response = integration_client.post(
@@ -186,7 +186,7 @@ class TestXSSProtection:
             return "生成テキスト", 100, 50
 
         with patch(
-            "app.services.summary_service.generate_summary_with_provider",
+            "app.services.summary_service.generate_summary_with_provider_async",
             side_effect=capture_generate,
         ):
             response = integration_client.post(
@@ -219,7 +219,7 @@ class TestXSSProtection:
             return "生成テキスト", 100, 50
 
         with patch(
-            "app.services.summary_service.generate_summary_with_provider",
+            "app.services.summary_service.generate_summary_with_provider_async",
             side_effect=capture_generate,
         ):
             integration_client.post(
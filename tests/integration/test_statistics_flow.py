@@ -6,6 +6,7 @@ from unittest.mock import patch
 from fastapi import status
 
 from app.models.usage import SummaryUsage
+from app.services.usage_rollup import rebuild_usage_rollups
 
 JST = ZoneInfo("Asia/Tokyo")
 
@@ -31,6 +32,8 @@ def _add_usage(db_session, model: str, department: str, days_ago: int = 0, count
             app_type="dischargesummary",
         ))
     db_session.commit()
+    rebuild_usage_rollups(db_session)
+    db_session.commit()
 
 
 class TestStatisticsAfterGeneration:
@@ -39,7 +42,7 @@ class TestStatisticsAfterGeneration:
     ):
         """文書生成後に統計サマリが正しく更新される"""
         with patch(
-            "app.services.summary_service.generate_summary_with_provider",
+            "app.services.summary_service.generate_summary_with_provider_async",
             return_value=("生成テキスト", 1200, 600),
         ):
             integration_client.post(
@@ -65,7 +68,7 @@ class TestStatisticsAfterGeneration:
         """複数回の生成結果が統計に累積される"""
         for _ in range(3):
             with patch(
-                "app.services.summary_service.generate_summary_with_provider",
+                "app.services.summary_service.generate_summary_with_provider_async",
                 return_value=("テキスト", 500, 200),
             ):
                 integration_client.post(
@@ -5,7 +5,7 @@ from unittest.mock import patch
 
 from fastapi import status
 
-from app.models.usage import SummaryUsage
+from app.models.usage import DailyUsageCounter, SummaryUsage
 from tests.integration.conftest import make_test_settings, parse_sse_events
 
 JST = ZoneInfo("Asia/Tokyo")
@@ -16,13 +16,36 @@ VALID_MEDICAL_TEXT = (
 )
 
 
+def _seed_daily_usage(db_session, requests: int, department: str = "default") -> None:
+    """本日の使用履歴と日次カウンタを requests 件分登録する"""
+    for _ in range(requests):
+        db_session.add(SummaryUsage(
+            date=datetime.now(JST),
+            department=department,
+            doctor="default",
+            document_type="退院時サマリ",
+            model="Claude",
+            input_tokens=100,
+            output_tokens=50,
+            processing_time=1.0,
+            app_type="dischargesummary",
+        ))
+    db_session.add(DailyUsageCounter(
+        usage_date=datetime.now(JST).date(),
+        request_count=requests,
+        input_tokens=100 * requests,
+        output_tokens=50 * requests,
+    ))
+    db_session.commit()
+
+
 class TestSyncSummaryGeneration:
     def test_success_returns_response_and_saves_usage(
         self, integration_client, db_session, csrf_headers
     ):
         """正常系: 同期生成でレスポンスが返り、使用量がDBに記録される"""
         with patch(
-            "app.services.summary_service.generate_summary_with_provider",
+            "app.services.summary_service.generate_summary_with_provider_async",
             return_value=("現病歴: 糖尿病\n入院経過: 改善", 1000, 500),
         ):
             response = integration_client.post(
@@ -102,19 +125,7 @@ class TestSyncSummaryGeneration:
         """日次リクエスト制限超過時はエラーレスポンスを返す"""
         low_limit_settings = make_test_settings(daily_request_limit=2)
 
-        for _ in range(2):
-            db_session.add(SummaryUsage(
-                date=datetime.now(JST),
-                department="内科",
-                doctor="default",
-                document_type="退院時サマリ",
-                model="Claude",
-                input_tokens=100,
-                output_tokens=50,
-                processing_time=1.0,
-                app_type="dischargesummary",
-            ))
-        db_session.commit()
+        _seed_daily_usage(db_session, requests=2, department="内科")
 
         with patch(
             "app.services.usage_service.get_settings",
@@ -140,7 +151,7 @@ class TestSyncSummaryGeneration:
         with (
             patch("app.services.model_selector.settings", low_threshold_settings),
             patch(
-                "app.services.summary_service.generate_summary_with_provider",
+                "app.services.summary_service.generate_summary_with_provider_async",
                 return_value=("生成結果テキスト", 5000, 1000),
             ),
         ):
@@ -180,7 +191,7 @@ class TestSyncSummaryGeneration:
             return "生成テキスト", 100, 50
 
         with patch(
-            "app.services.summary_service.generate_summary_with_provider",
+            "app.services.summary_service.generate_summary_with_provider_async",
             side_effect=capture_generate,
         ):
             response = integration_client.post(
@@ -215,7 +226,7 @@ class TestSyncSummaryGeneration:
             return "生成テキスト", 100, 50
 
         with patch(
-            "app.services.summary_service.generate_summary_with_provider",
+            "app.services.summary_service.generate_summary_with_provider_async",
             side_effect=capture_generate,
         ):
             response = integration_client.post(
@@ -238,13 +249,13 @@ class TestStreamingSummaryGeneration:
         self, integration_client, csrf_headers
     ):
         """ストリーミング生成でprogress→completeのSSEイベントが返る"""
-        def mock_stream_generator():
+        async def mock_stream_generator():
             yield "現病歴: 糖尿病\n"
             yield "入院経過: 改善\n"
             yield {"input_tokens": 1000, "output_tokens": 500}
 
         with patch(
-            "app.services.summary_service.generate_summary_stream_with_provider",
+            "app.services.summary_service.generate_summary_stream_with_provider_async",
             return_value=mock_stream_generator(),
         ):
             response = integration_client.post(
@@ -277,18 +288,7 @@ class TestStreamingSummaryGeneration:
         """日次制限超過時はSSE errorイベントが返る"""
         low_limit_settings = make_test_settings(daily_request_limit=1)
 
-        db_session.add(SummaryUsage(
-            date=datetime.now(JST),
-            department="default",
-            doctor="default",
-            document_type="退院時サマリ",
-            model="Claude",
-            input_tokens=100,
-            output_tokens=50,
-            processing_time=1.0,
-            app_type="dischargesummary",
-        ))
-        db_session.commit()
+        _seed_daily_usage(db_session, requests=1)
 
         with patch(
             "app.services.usage_service.get_settings",
@@ -1,4 +1,5 @@
-from unittest.mock import MagicMock, patch
+import threading
+from unittest.mock import AsyncMock, MagicMock, patch
 
 from app.core.constants import EVALUATION_GROUNDING_INSTRUCTION, MESSAGES, ModelType
 from app.services.evaluation_service import (
@@ -90,6 +91,7 @@ class TestValidateAndGetPrompt:
         mock_settings.max_input_tokens = 100000
         mock_settings.evaluation_model = ModelType.GEMINI.value
         mock_settings.gemini_model = None
+        mock_settings.fake_llm_enabled = False
 
         prompt, error = _validate_and_get_prompt("正常な出力内容です", "退院時サマリ")
 
@@ -102,6 +104,7 @@ class TestValidateAndGetPrompt:
         mock_settings.max_input_tokens = 100000
         mock_settings.evaluation_model = ModelType.CLAUDE.value
         mock_settings.anthropic_model = None
+        mock_settings.fake_llm_enabled = False
 
         prompt, error = _validate_and_get_prompt("正常な出力内容です", "退院時サマリ")
 
@@ -177,7 +180,7 @@ class TestExecuteEvaluation:
         mock_prompt = MagicMock()
         mock_prompt.content = "評価プロンプト"
         mock_client = MagicMock()
-        mock_client._generate_content.return_value = ("評価結果テキスト", 200, 80)
+        mock_client._generate_content_async = AsyncMock(return_value=("評価結果テキスト", 200, 80))
         mock_settings = MagicMock()
         mock_settings.evaluation_model = ModelType.GEMINI.value
         mock_settings.gemini_model = "gemini-1.5-pro"
@@ -203,7 +206,7 @@ class TestExecuteEvaluation:
             ),
         }
 
-    def test_success(self):
+    async def test_success(self):
         """正常系: EvaluationResponse が success=True で返る"""
         from app.services.evaluation_service import execute_evaluation
 
@@ -216,7 +219,7 @@ class TestExecuteEvaluation:
             patches["settings"],
             patches["create_client"],
         ):
-            result = execute_evaluation(
+            result = await execute_evaluation(
                 document_type="退院時サマリ",
                 input_text="カルテ情報" * 10,
                 current_prescription="薬剤A",
@@ -229,7 +232,49 @@ class TestExecuteEvaluation:
         assert result.input_tokens == 200
         assert result.output_tokens == 80
 
-    def test_daily_limit_error(self):
+    async def test_blocking_calls_run_off_event_loop(self):
+        """日次制限・検証とプロンプト取得・クライアント初期化はイベントループ外のスレッドで実行する"""
+        from app.services.evaluation_service import execute_evaluation
+
+        loop_thread = threading.get_ident()
+        called_from: dict[str, int] = {}
+
+        def record(name, result):
+            def call(*args, **kwargs):
+                called_from[name] = threading.get_ident()
+                return result
+
+            return call
+
+        patches = self._success_patches()
+        with (
+            patches["log_audit_event"],
+            patch(
+                "app.services.evaluation_service.check_daily_limit",
+                side_effect=record("check_daily_limit", None),
+            ),
+            patches["sanitize"],
+            patch(
+                "app.services.evaluation_service._validate_and_get_prompt",
+                side_effect=record("validate_and_get", ("評価プロンプト", None)),
+            ),
+            patches["settings"],
+            patches["create_client"] as mock_create_client,
+        ):
+            mock_create_client.return_value.initialize.side_effect = record("initialize", None)
+            result = await execute_evaluation(
+                document_type="退院時サマリ",
+                input_text="カルテ情報",
+                current_prescription="",
+                additional_info="",
+                output_summary="サマリ出力内容",
+            )
+
+        assert result.success is True
+        assert set(called_from) == {"check_daily_limit", "validate_and_get", "initialize"}
+        assert loop_thread not in called_from.values()
+
+    async def test_daily_limit_error(self):
         """日次制限超過: success=False でエラーメッセージが返る"""
         from app.services.evaluation_service import execute_evaluation
 
@@ -240,7 +285,7 @@ class TestExecuteEvaluation:
                 return_value="日次制限エラー",
             ),
         ):
-            result = execute_evaluation(
+            result = await execute_evaluation(
                 document_type="退院時サマリ",
                 input_text="テキスト",
                 current_prescription="",
@@ -251,7 +296,7 @@ class TestExecuteEvaluation:
         assert result.success is False
         assert result.error_message == "日次制限エラー"
 
-    def test_validate_and_get_prompt_error(self):
+    async def test_validate_and_get_prompt_error(self):
         """プロンプト検証失敗: success=False でエラーメッセージが返る"""
         from app.services.evaluation_service import execute_evaluation
 
@@ -269,7 +314,7 @@ class TestExecuteEvaluation:
                 return_value=(None, "プロンプト未登録"),
             ),
         ):
-            result = execute_evaluation(
+            result = await execute_evaluation(
                 document_type="退院時サマリ",
                 input_text="カルテ情報" * 10,
                 current_prescription="",
@@ -280,13 +325,13 @@ class TestExecuteEvaluation:
         assert result.success is False
         assert result.error_message == "プロンプト未登録"
 
-    def test_api_error_returns_error_response(self):
+    async def test_api_error_returns_error_response(self):
         """APIError 例外: success=False で返る"""
         from app.utils.exceptions import APIError
         from app.services.evaluation_service import execute_evaluation
 
         mock_client = MagicMock()
-        mock_client._generate_content.side_effect = APIError("Gemini APIエラー")
+        mock_client._generate_content_async = AsyncMock(side_effect=APIError("Gemini APIエラー"))
         mock_settings = MagicMock()
         mock_settings.evaluation_model = ModelType.GEMINI.value
         mock_settings.gemini_model = "gemini-1.5-pro"
@@ -310,7 +355,7 @@ class TestExecuteEvaluation:
                 return_value=mock_client,
             ),
         ):
-            result = execute_evaluation(
+            result = await execute_evaluation(
                 document_type="退院時サマリ",
                 input_text="カルテ情報" * 10,
                 current_prescription="",
@@ -323,12 +368,12 @@ class TestExecuteEvaluation:
         # 例外詳細はクライアントに返さない
         assert "Gemini APIエラー" not in result.error_message
 
-    def test_generic_exception_returns_error_response(self):
+    async def test_generic_exception_returns_error_response(self):
         """一般例外: success=False で返る"""
         from app.services.evaluation_service import execute_evaluation
 
         mock_client = MagicMock()
-        mock_client._generate_content.side_effect = Exception("予期せぬエラー")
+        mock_client._generate_content_async = AsyncMock(side_effect=Exception("予期せぬエラー"))
         mock_settings = MagicMock()
         mock_settings.evaluation_model = ModelType.GEMINI.value
         mock_settings.gemini_model = "gemini-1.5-pro"
@@ -352,7 +397,7 @@ class TestExecuteEvaluation:
                 return_value=mock_client,
             ),
         ):
-            result = execute_evaluation(
+            result = await execute_evaluation(
                 document_type="退院時サマリ",
                 input_text="カルテ情報" * 10,
                 current_prescription="",
@@ -365,6 +410,35 @@ class TestExecuteEvaluation:
         # 例外詳細はクライアントに返さない
         assert "予期せぬエラー" not in result.error_message
 
+    async def test_failure_is_labelled_with_resolved_model(self):
+        """失敗メトリクスは実際に呼び出したモデル名でラベル付けする（疑似LLMを実モデルと混ぜない）"""
+        from app.services.evaluation_service import execute_evaluation
+
+        patches = self._success_patches()
+        with (
+            patches["log_audit_event"],
+            patches["check_daily_limit"],
+            patches["sanitize"],
+            patches["validate_and_get"],
+            patches["settings"] as mock_settings,
+            patches["create_client"] as mock_create_client,
+            patch("app.services.evaluation_service.GENERATION_FAILURES") as mock_failures,
+        ):
+            mock_settings.fake_llm_enabled = True
+            mock_create_client.return_value._generate_content_async = AsyncMock(
+                side_effect=Exception("疑似LLMエラー")
+            )
+            result = await execute_evaluation(
+                document_type="退院時サマリ",
+                input_text="カルテ情報" * 10,
+                current_prescription="",
+                additional_info="",
+                output_summary="サマリ",
+            )
+
+        assert result.success is False
+        mock_failures.inc.assert_called_once_with(kind="evaluation", model="fake-evaluation")
+
 
 class TestExecuteEvaluationStream:
     """execute_evaluation_stream SSEフローのテスト"""
@@ -0,0 +1,103 @@
+"""GenerationContext のテスト"""
+
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+from app.services.generation_context import GenerationContext, load_generation_context
+from app.services.prompt_cache import ResolvedPrompt
+
+
+def _session_factory(db):
+    """テスト用DBセッションを返す get_db_session の代替と呼び出し回数の記録"""
+    calls = MagicMock()
+
+    @contextmanager
+    def get_db_session():
+        calls()
+        yield db
+        db.commit()
+
+    return get_db_session, calls
+
+
+class TestGenerationContext:
+    """GenerationContext の値のテスト"""
+
+    def test_selected_model_from_prompt(self):
+        """プロンプトの選択モデルを返す"""
+        context = GenerationContext(
+            prompt=ResolvedPrompt(content="プロンプト", selected_model="Gemini")
+        )
+        assert context.selected_model == "Gemini"
+
+    def test_selected_model_empty(self):
+        """プロンプトがない、または選択モデルが空ならNone"""
+        assert GenerationContext().selected_model is None
+        empty = GenerationContext(prompt=ResolvedPrompt(content="プロンプト", selected_model=""))
+        assert empty.selected_model is None
+
+
+class TestLoadGenerationContext:
+    """load_generation_context 関数のテスト"""
+
+    def test_resolves_prompt_and_reserves_in_one_session(self, test_db, sample_prompts):
+        """プロンプトの解決と日次利用枠の予約を1回のセッションで行う"""
+        get_db_session, calls = _session_factory(test_db)
+
+        with patch("app.services.generation_context.get_db_session", get_db_session):
+            context = load_generation_context("眼科", "他院への紹介", "橋本義弘", 1200)
+
+        calls.assert_called_once()
+        assert context.prompt == ResolvedPrompt(
+            content="眼科用プロンプト", selected_model="Claude"
+        )
+        assert context.daily_limit_error is None
+        assert context.reservation is not None
+        assert context.reservation.input_tokens == 1200
+
+    def test_daily_limit_error(self, test_db):
+        """日次制限超過時はエラーメッセージを保持する"""
+        get_db_session, _ = _session_factory(test_db)
+
+        with (
+            patch("app.services.generation_context.get_db_session", get_db_session),
+            patch(
+                "app.services.generation_context.reserve_daily_quota",
+                return_value=(None, "日次制限エラー"),
+            ) as mock_reserve,
+        ):
+            context = load_generation_context("眼科", "他院への紹介", "橋本義弘", 1200)
+
+        mock_reserve.assert_called_once_with(test_db, 1200)
+        assert context.daily_limit_error == "日次制限エラー"
+        assert context.prompt is None
+
+    def test_prompt_error_falls_back(self, test_db):
+        """プロンプト解決に失敗してもプロンプトなしで日次制限は確認する"""
+        get_db_session, _ = _session_factory(test_db)
+
+        with (
+            patch("app.services.generation_context.get_db_session", get_db_session),
+            patch(
+                "app.services.generation_context.resolve_prompt",
+                side_effect=RuntimeError("DB error"),
+            ),
+            patch(
+                "app.services.generation_context.reserve_daily_quota",
+                return_value=(None, None),
+            ) as mock_reserve,
+        ):
+            context = load_generation_context("眼科", "他院への紹介", "橋本義弘")
+
+        assert context == GenerationContext()
+        mock_reserve.assert_called_once()
+
+    def test_session_error_fails_open(self):
+        """セッション取得に失敗した場合は制限なし・プロンプトなし"""
+        with patch(
+            "app.services.generation_context.get_db_session",
+            side_effect=RuntimeError("接続失敗"),
+        ):
+            context = load_generation_context("眼科", "他院への紹介", "橋本義弘")
+
+        assert context == GenerationContext()
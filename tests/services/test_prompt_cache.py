@@ -0,0 +1,104 @@
+"""PromptCache のテスト"""
+
+import threading
+from unittest.mock import MagicMock, patch
+
+from app.services.prompt_cache import PromptCache, ResolvedPrompt
+
+PROMPT = ResolvedPrompt(content="眼科用プロンプト", selected_model="Claude")
+
+
+class TestPromptCache:
+    """PromptCache 単体のテスト"""
+
+    def test_get_or_load_reuses_value(self):
+        """同一キーでは loader を1回だけ呼び出す"""
+        cache = PromptCache(check_interval_seconds=60)
+        loader = MagicMock(return_value=PROMPT)
+        version_loader = MagicMock(return_value=(1,))
+
+        first = cache.get_or_load("key", loader, version_loader)
+        second = cache.get_or_load("key", loader, version_loader)
+
+        assert first is second is PROMPT
+        loader.assert_called_once()
+        version_loader.assert_called_once()
+        assert cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+    def test_missing_prompt_is_cached(self):
+        """プロンプトが存在しない結果(None)もキャッシュする"""
+        cache = PromptCache(check_interval_seconds=60)
+        loader = MagicMock(return_value=None)
+
+        assert cache.get_or_load("key", loader, lambda: (0,)) is None
+        assert cache.get_or_load("key", loader, lambda: (0,)) is None
+        loader.assert_called_once()
+
+    def test_invalidate_forces_reload(self):
+        """invalidate 後は loader とバージョン確認を再実行する"""
+        cache = PromptCache(check_interval_seconds=60)
+        loader = MagicMock(return_value=PROMPT)
+        version_loader = MagicMock(return_value=(1,))
+        cache.get_or_load("key", loader, version_loader)
+
+        cache.invalidate()
+        cache.get_or_load("key", loader, version_loader)
+
+        assert loader.call_count == 2
+        assert version_loader.call_count == 2
+
+    def test_version_change_clears_entries(self):
+        """確認間隔経過後にバージョンが変わっていれば再読み込みする"""
+        cache = PromptCache(check_interval_seconds=0)
+        loader = MagicMock(side_effect=[PROMPT, None])
+        versions = iter([(1,), (1,), (2,)])
+
+        def version_loader():
+            return next(versions)
+
+        assert cache.get_or_load("key", loader, version_loader) is PROMPT
+        assert cache.get_or_load("key", loader, version_loader) is PROMPT
+        assert cache.get_or_load("key", loader, version_loader) is None
+        assert loader.call_count == 2
+
+    @patch("app.services.prompt_cache.time.monotonic")
+    def test_version_not_checked_within_interval(self, mock_monotonic):
+        """確認間隔内はバージョンを確認しない"""
+        cache = PromptCache(check_interval_seconds=5)
+        version_loader = MagicMock(return_value=(1,))
+
+        for now in (100.0, 102.0, 104.9):
+            mock_monotonic.return_value = now
+            cache.get_or_load("key", lambda: PROMPT, version_loader)
+        assert version_loader.call_count == 1
+
+        mock_monotonic.return_value = 105.0
+        cache.get_or_load("key", lambda: PROMPT, version_loader)
+        assert version_loader.call_count == 2
+
+    def test_value_loaded_before_invalidate_is_not_stored(self):
+        """読み込み中に invalidate された場合、古い値はキャッシュに残さない"""
+        cache = PromptCache(check_interval_seconds=60)
+
+        def stale_loader():
+            cache.invalidate()
+            return PROMPT
+
+        assert cache.get_or_load("key", stale_loader, lambda: (1,)) is PROMPT
+        assert cache.stats()["size"] == 0
+
+    def test_concurrent_access(self):
+        """並行アクセスでも同じ値を返す"""
+        cache = PromptCache(check_interval_seconds=60)
+        results = []
+
+        def worker():
+            results.append(cache.get_or_load("key", lambda: PROMPT, lambda: (1,)))
+
+        threads = [threading.Thread(target=worker) for _ in range(16)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert all(r is PROMPT for r in results)
@@ -1,4 +1,8 @@
+from unittest.mock import patch
+
+from app.models.prompt import Prompt
 from app.services import prompt_service
+from app.services.prompt_cache import PromptCache, ResolvedPrompt
 
 
 def test_get_all_prompts_empty(test_db):
@@ -151,3 +155,96 @@ def test_get_prompt_hierarchical_fallback_none(test_db):
         doctor="存在しない医師",
     )
     assert prompt is None
+
+
+def test_resolve_prompt_returns_content_and_model(test_db, sample_prompts):
+    """解決済みプロンプト - 内容と選択モデルを返す"""
+    resolved = prompt_service.resolve_prompt(
+        test_db,
+        department="眼科",
+        document_type="他院への紹介",
+        doctor="橋本義弘",
+    )
+    assert resolved == ResolvedPrompt(content="眼科用プロンプト", selected_model="Claude")
+
+
+def test_resolve_prompt_uses_cache(test_db, sample_prompts):
+    """解決済みプロンプト - 2回目以降は階層検索を実行しない"""
+    with patch.object(
+        prompt_service, "get_prompt", wraps=prompt_service.get_prompt
+    ) as mock_get_prompt:
+        for _ in range(3):
+            prompt_service.resolve_prompt(test_db, "眼科", "他院への紹介", "橋本義弘")
+        assert prompt_service.get_selected_model(
+            test_db, "眼科", "他院への紹介", "橋本義弘"
+        ) == "Claude"
+
+    mock_get_prompt.assert_called_once()
+
+
+def test_resolve_prompt_invalidated_on_update_commit(test_db, sample_prompts):
+    """解決済みプロンプト - 作成/更新のコミットでキャッシュを破棄"""
+    prompt_service.resolve_prompt(test_db, "眼科", "他院への紹介", "橋本義弘")
+
+    prompt_service.create_or_update_prompt(
+        test_db,
+        department="眼科",
+        document_type="他院への紹介",
+        doctor="橋本義弘",
+        content="更新されたプロンプト",
+        selected_model="Gemini",
+    )
+    # コミット前は更新前の値を返す
+    before = prompt_service.resolve_prompt(test_db, "眼科", "他院への紹介", "橋本義弘")
+    assert before is not None
+    assert before.content == "眼科用プロンプト"
+    test_db.commit()
+
+    resolved = prompt_service.resolve_prompt(test_db, "眼科", "他院への紹介", "橋本義弘")
+    assert resolved == ResolvedPrompt(content="更新されたプロンプト", selected_model="Gemini")
+
+
+def test_resolve_prompt_invalidated_on_delete_commit(test_db, sample_prompts):
+    """解決済みプロンプト - 削除のコミットで上位階層へのフォールバックに切り替わる"""
+    prompt_service.resolve_prompt(test_db, "眼科", "他院への紹介", "橋本義弘")
+
+    prompt_service.delete_prompt(test_db, sample_prompts[1].id)
+    test_db.commit()
+
+    resolved = prompt_service.resolve_prompt(test_db, "眼科", "他院への紹介", "橋本義弘")
+    assert resolved is not None
+    assert resolved.content == "デフォルトプロンプト"
+
+
+def test_resolve_prompt_detects_change_from_other_worker(test_db, sample_prompts):
+    """解決済みプロンプト - 他ワーカーでの変更をバージョン確認で検知"""
+    cache = PromptCache(check_interval_seconds=0)
+    with patch("app.services.prompt_service.get_prompt_cache", return_value=cache):
+        before = prompt_service.resolve_prompt(test_db, "内科", "他院への紹介", "default")
+        assert before is not None
+        assert before.content == "デフォルトプロンプト"
+
+        # キャッシュ破棄のイベントを経由しない変更（他ワーカーからの更新を想定）
+        test_db.add(
+            Prompt(
+                department="内科",
+                doctor="default",
+                document_type="他院への紹介",
+                content="内科デフォルトプロンプト",
+            )
+        )
+        test_db.commit()
+
+        after = prompt_service.resolve_prompt(test_db, "内科", "他院への紹介", "default")
+        assert after is not None
+        assert after.content == "内科デフォルトプロンプト"
+
+
+def test_get_prompt_version_changes_on_update(test_db, sample_prompts):
+    """バージョン - 内容の更新で変化する"""
+    before = prompt_service.get_prompt_version(test_db)
+
+    sample_prompts[0].content = "変更後"
+    test_db.commit()
+
+    assert prompt_service.get_prompt_version(test_db) != before
@@ -0,0 +1,163 @@
+"""GenerationResultCache のテスト"""
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from cryptography.fernet import Fernet
+
+from app.models.generation_result import GenerationResultCacheEntry
+from app.services.prompt_cache import ResolvedPrompt
+from app.services.result_cache import CachedResult, GenerationResultCache, result_cache_key
+
+RESULT = CachedResult(output_summary="【備考】\n特記なし", parsed_summary={"備考": "特記なし"})
+PROMPT = ResolvedPrompt(content="眼科用プロンプト", selected_model="Claude")
+
+
+def _key(**overrides) -> str:
+    values: dict[str, Any] = dict(
+        document_type="他院への紹介",
+        model="Claude",
+        prompt=PROMPT,
+        medical_text="カルテ",
+        additional_info="",
+        current_prescription="",
+        referral_purpose="",
+        previous_summary="",
+        evaluation_feedback="",
+    )
+    values.update(overrides)
+    return result_cache_key(**values)
+
+
+class TestResultCacheKey:
+    """result_cache_key のテスト"""
+
+    def test_same_request_same_key(self):
+        """前後の空白だけが異なるリクエストは同じキー"""
+        assert _key() == _key(medical_text="  カルテ\n", additional_info=" ")
+
+    @pytest.mark.parametrize(
+        "overrides",
+        [
+            {"document_type": "返書"},
+            {"model": "Gemini_Pro"},
+            {"prompt": ResolvedPrompt(content="更新後のプロンプト", selected_model="Claude")},
+            {"prompt": None},
+            {"medical_text": "別のカルテ"},
+            {"current_prescription": "アムロジピン5mg"},
+            {"referral_purpose": "精査依頼"},
+            {"previous_summary": "前回", "evaluation_feedback": "評価"},
+        ],
+    )
+    def test_key_changes(self, overrides):
+        """入力・プロンプト・モデル・文書タイプのいずれかが異なれば別のキー"""
+        assert _key(**overrides) != _key()
+
+    def test_fields_are_not_ambiguous(self):
+        """項目の境界をまたいで同じ連結になる入力も区別する"""
+        assert _key(medical_text="ab", additional_info="c") != _key(
+            medical_text="a", additional_info="bc"
+        )
+
+
+class TestGenerationResultCache:
+    """プロセス内LRUのテスト"""
+
+    def test_put_and_get(self):
+        cache = GenerationResultCache(ttl_seconds=60, max_entries=10)
+
+        assert cache.get("key") is None
+        cache.put("key", RESULT)
+
+        assert cache.get("key") == RESULT
+        assert cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+    def test_expired_entry_is_missed(self):
+        cache = GenerationResultCache(ttl_seconds=60, max_entries=10)
+        with patch("app.services.result_cache.time.monotonic", return_value=0.0):
+            cache.put("key", RESULT)
+        with patch("app.services.result_cache.time.monotonic", return_value=60.0):
+            assert cache.get("key") is None
+        assert cache.stats()["size"] == 0
+
+    def test_evicts_least_recently_used(self):
+        cache = GenerationResultCache(ttl_seconds=60, max_entries=2)
+        cache.put("a", RESULT)
+        cache.put("b", RESULT)
+        cache.get("a")
+        cache.put("c", RESULT)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == RESULT
+        assert cache.get("c") == RESULT
+
+
+class TestGenerationResultCacheDatabase:
+    """DB保存（暗号化）のテスト"""
+
+    @pytest.fixture
+    def cache_db(self, test_db):
+        @contextmanager
+        def get_db_session():
+            yield test_db
+            test_db.commit()
+
+        with patch("app.services.result_cache.get_db_session", get_db_session):
+            yield test_db
+
+    def test_shared_through_database(self, cache_db):
+        """別プロセス（別インスタンス）の保存結果をDBから読み込む"""
+        fernet = Fernet(Fernet.generate_key())
+        GenerationResultCache(60, 10, fernet).put("key", RESULT)
+
+        other = GenerationResultCache(60, 10, fernet)
+
+        assert other.get("key") == RESULT
+        assert other.stats()["size"] == 1
+
+    def test_payload_is_encrypted(self, cache_db):
+        """DBには生成結果を平文で保存しない"""
+        fernet = Fernet(Fernet.generate_key())
+        GenerationResultCache(60, 10, fernet).put("key", RESULT)
+
+        row = cache_db.query(GenerationResultCacheEntry).one()
+        assert "特記なし".encode() not in row.payload
+        assert row.cache_key == "key"
+
+    def test_other_key_cannot_decrypt(self, cache_db):
+        """暗号化キーが異なるエントリは参照しない"""
+        GenerationResultCache(60, 10, Fernet(Fernet.generate_key())).put("key", RESULT)
+
+        other = GenerationResultCache(60, 10, Fernet(Fernet.generate_key()))
+
+        assert other.get("key") is None
+
+    def test_expired_rows_are_ignored_and_purged(self, cache_db):
+        """期限切れの行は参照せず、次の保存時に削除する"""
+        fernet = Fernet(Fernet.generate_key())
+        cache_db.add(
+            GenerationResultCacheEntry(
+                cache_key="old",
+                payload=fernet.encrypt(b"{}"),
+                expires_at=datetime.now(timezone.utc) - timedelta(seconds=1),
+            )
+        )
+        cache_db.commit()
+        cache = GenerationResultCache(60, 10, fernet)
+
+        assert cache.get("old") is None
+        cache.put("new", RESULT)
+
+        cache_db.expire_all()
+        assert [row.cache_key for row in cache_db.query(GenerationResultCacheEntry)] == ["new"]
+
+    def test_put_overwrites_existing_row(self, cache_db):
+        fernet = Fernet(Fernet.generate_key())
+        GenerationResultCache(60, 10, fernet).put("key", RESULT)
+        updated = CachedResult(output_summary="更新", parsed_summary={})
+        GenerationResultCache(60, 10, fernet).put("key", updated)
+
+        assert GenerationResultCache(60, 10, fernet).get("key") == updated
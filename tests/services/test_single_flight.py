@@ -0,0 +1,135 @@
+"""SingleFlight のテスト"""
+
+import asyncio
+
+from app.services.single_flight import SingleFlight
+
+
+async def _collect(events):
+    return [event async for event in events]
+
+
+class TestSingleFlight:
+    """SingleFlight 単体のテスト"""
+
+    async def test_concurrent_callers_share_one_producer(self):
+        """実行中の同じキーには合流し、producer は1回だけ呼ばれる"""
+        flight = SingleFlight()
+        release = asyncio.Event()
+        calls = []
+
+        async def produce():
+            calls.append(1)
+            yield "progress"
+            await release.wait()
+            yield "complete"
+
+        first, first_joined = flight.stream("key", produce)
+        second, second_joined = flight.stream("key", produce)
+        assert (first_joined, second_joined) == (False, True)
+        assert flight.in_flight() == 1
+
+        tasks = [asyncio.create_task(_collect(first)), asyncio.create_task(_collect(second))]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks)
+
+        assert results == [["progress", "complete"], ["progress", "complete"]]
+        assert len(calls) == 1
+        assert flight.in_flight() == 0
+
+    async def test_late_joiner_receives_earlier_events(self):
+        """途中から合流した呼び出し元にも送信済みのイベントを先頭から返す"""
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def produce():
+            yield "progress"
+            yield "delta"
+            await release.wait()
+            yield "complete"
+
+        first, _ = flight.stream("key", produce)
+        first_events = first.__aiter__()
+        assert await anext(first_events) == "progress"
+        assert await anext(first_events) == "delta"
+
+        late, joined = flight.stream("key", produce)
+        release.set()
+
+        assert joined is True
+        assert await _collect(late) == ["progress", "delta", "complete"]
+
+    async def test_generation_continues_after_leader_disconnects(self):
+        """最初の呼び出し元が切断しても生成は続き、合流した呼び出し元が完了を受け取る"""
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def produce():
+            yield "progress"
+            await release.wait()
+            yield "complete"
+
+        leader, _ = flight.stream("key", produce)
+        assert await anext(leader) == "progress"
+        await leader.aclose()
+
+        retry, joined = flight.stream("key", produce)
+        release.set()
+
+        assert joined is True
+        assert await _collect(retry) == ["progress", "complete"]
+
+    async def test_finished_key_starts_new_generation(self):
+        """完了したキーは登録を外し、次の呼び出しで新たに生成する"""
+        flight = SingleFlight()
+        calls = []
+
+        async def produce():
+            calls.append(1)
+            yield "complete"
+
+        first, _ = flight.stream("key", produce)
+        await _collect(first)
+        second, joined = flight.stream("key", produce)
+
+        assert joined is False
+        assert await _collect(second) == ["complete"]
+        assert len(calls) == 2
+
+    async def test_producer_error_ends_streams(self):
+        """producer の例外時は記録済みのイベントまでで終了し、登録を外す"""
+        flight = SingleFlight()
+
+        async def produce():
+            yield "progress"
+            raise RuntimeError("失敗")
+
+        events, _ = flight.stream("key", produce)
+
+        assert await _collect(events) == ["progress"]
+        assert flight.in_flight() == 0
+
+    async def test_drain_waits_then_cancels_producers(self):
+        """drain() は完了を待ち、期限を過ぎた producer は取り消して終了処理を実行させる"""
+        flight = SingleFlight()
+        never = asyncio.Event()
+        finished = []
+
+        async def quick():
+            yield "complete"
+
+        async def stuck():
+            try:
+                yield "progress"
+                await never.wait()
+            finally:
+                finished.append("stuck")
+
+        flight.stream("quick", quick)
+        flight.stream("stuck", stuck)
+
+        await flight.drain(timeout=0.05)
+
+        assert finished == ["stuck"]
+        assert flight.in_flight() == 0
@@ -1,9 +1,14 @@
+import asyncio
 import json
 
 import pytest
 
 from app.core.constants import MESSAGES
-from app.services.sse_helpers import sse_event, stream_with_heartbeat
+from app.services.sse_helpers import (
+    sse_event,
+    stream_deltas_with_heartbeat,
+    stream_with_heartbeat,
+)
 
 
 class TestSseEvent:
@@ -52,13 +57,13 @@ class TestStreamWithHeartbeat:
     async def test_stream_with_heartbeat_success(self):
         """ハートビート付きストリーミング - 正常系"""
 
-        def sync_task(a: int, b: int) -> tuple[str, int, int]:
+        async def task(a: int, b: int) -> tuple[str, int, int]:
             return "結果", a, b
 
         items = []
         async for item in stream_with_heartbeat(
-            sync_func=sync_task,
-            sync_func_args=(100, 50),
+            func=task,
+            func_args=(100, 50),
             start_message="開始",
             running_status="processing",
             running_message="処理中",
@@ -79,13 +84,13 @@ class TestStreamWithHeartbeat:
     async def test_stream_with_heartbeat_error(self):
         """ハートビート付きストリーミング - エラー"""
 
-        def sync_task() -> tuple[str, int, int]:
+        async def task() -> tuple[str, int, int]:
             raise ValueError("テストエラー")
 
         items = []
         async for item in stream_with_heartbeat(
-            sync_func=sync_task,
-            sync_func_args=(),
+            func=task,
+            func_args=(),
             start_message="開始",
             running_status="processing",
             running_message="処理中",
@@ -100,3 +105,141 @@ class TestStreamWithHeartbeat:
         # 例外詳細はクライアントに返さず定型メッセージのみ
         assert MESSAGES["ERROR"]["API_ERROR"] in error_items[0]
         assert "テストエラー" not in error_items[0]
+
+    @pytest.mark.asyncio
+    async def test_stream_with_heartbeat_calls_on_error(self):
+        """処理が失敗した場合のみ on_error を1回呼び出す"""
+
+        async def task() -> tuple[str, int, int]:
+            raise ValueError("テストエラー")
+
+        failures: list[None] = []
+        async for _ in stream_with_heartbeat(
+            func=task,
+            func_args=(),
+            start_message="開始",
+            running_status="processing",
+            running_message="処理中",
+            elapsed_message_template="処理中... {elapsed}秒",
+            on_error=lambda: failures.append(None),
+        ):
+            pass
+
+        assert len(failures) == 1
+
+
+class TestStreamDeltasWithHeartbeat:
+    """stream_deltas_with_heartbeat 関数のテスト"""
+
+    async def _collect(self, **kwargs):
+        items = []
+        async for item in stream_deltas_with_heartbeat(
+            start_message="開始",
+            running_status="processing",
+            running_message="処理中",
+            elapsed_message_template="処理中... {elapsed}秒",
+            **kwargs,
+        ):
+            items.append(item)
+        return items
+
+    async def test_deltas_are_sent_in_order(self):
+        """チャンクごとに delta イベントを送信し、最後に全文と使用量を返す"""
+
+        async def gen(prefix: str):
+            yield f"{prefix}1"
+            yield f"{prefix}2"
+            yield {"input_tokens": 100, "output_tokens": 50}
+
+        items = await self._collect(gen_func=gen, gen_args=("チャンク",))
+
+        deltas = [i for i in items if isinstance(i, str) and "event: delta" in i]
+        assert len(deltas) == 2
+        assert json.loads(deltas[0].split("data: ")[1])["text"] == "チャンク1"
+        assert json.loads(deltas[1].split("data: ")[1])["text"] == "チャンク2"
+        assert items[-1] == ("チャンク1チャンク2", 100, 50)
+
+    async def test_on_delta_events_follow_delta(self):
+        """on_delta が返したイベントは対応する delta の直後に送信される"""
+
+        async def gen():
+            yield "一"
+            yield "二"
+
+        items = await self._collect(
+            gen_func=gen,
+            gen_args=(),
+            on_delta=lambda text: [f"extra:{text}"] if text == "一" else [],
+        )
+
+        index = items.index("extra:一")
+        assert "event: delta" in items[index - 1]
+        assert "extra:二" not in items
+        assert items[-1] == ("一二", 0, 0)
+
+    async def test_missing_metadata_defaults_to_zero(self):
+        """使用量メタデータがない場合はトークン数0"""
+
+        async def gen():
+            yield "本文"
+
+        items = await self._collect(gen_func=gen, gen_args=())
+
+        assert items[-1] == ("本文", 0, 0)
+
+    async def test_error_after_partial_output(self):
+        """途中で例外が発生した場合は定型エラーイベントで終了"""
+
+        async def gen():
+            yield "途中まで"
+            raise ValueError("テストエラー")
+
+        items = await self._collect(gen_func=gen, gen_args=())
+
+        assert "event: delta" in items[2]
+        assert "event: error" in items[-1]
+        assert MESSAGES["ERROR"]["API_ERROR"] in items[-1]
+        assert "テストエラー" not in items[-1]
+        assert not any(isinstance(i, tuple) for i in items)
+
+    async def test_on_error_called_only_on_failure(self):
+        """ストリームが例外で失敗したときだけ on_error を呼び出す"""
+
+        async def failing():
+            yield "途中まで"
+            raise ValueError("テストエラー")
+
+        async def succeeding():
+            yield "本文"
+
+        failures: list[None] = []
+        await self._collect(
+            gen_func=failing, gen_args=(), on_error=lambda: failures.append(None)
+        )
+        await self._collect(
+            gen_func=succeeding, gen_args=(), on_error=lambda: failures.append(None)
+        )
+
+        assert len(failures) == 1
+
+    async def test_heartbeat_while_waiting_for_first_chunk(self):
+        """最初のチャンクを待つ間はハートビートを送信"""
+        async def gen():
+            await asyncio.sleep(0.05)
+            yield "本文"
+
+        items = []
+        async for item in stream_deltas_with_heartbeat(
+            gen_func=gen,
+            gen_args=(),
+            start_message="開始",
+            running_status="processing",
+            running_message="処理中",
+            elapsed_message_template="処理中... {elapsed}秒",
+            heartbeat_interval=0.01,  # type: ignore[arg-type]
+        ):
+            items.append(item)
+
+        progress = [i for i in items if isinstance(i, str) and "event: progress" in i]
+        assert len(progress) >= 3
+        assert items[-1] == ("本文", 0, 0)
@@ -1,6 +1,13 @@
+import csv
+import io
+import json
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from unittest.mock import patch
 from zoneinfo import ZoneInfo
 
+import pytest
+
 from app.models.usage import SummaryUsage
 from app.services import statistics_service
 
@@ -215,3 +222,108 @@ class TestGetAggregatedRecords:
         results = statistics_service.get_aggregated_records(test_db, model="Claude")
         assert results[0]["input_tokens"] == 1000
         assert results[0]["output_tokens"] == 500
+
+
+def _add_records_with_shared_dates(test_db, count: int) -> list[SummaryUsage]:
+    """同じ日時を持つレコードを含む使用量を登録"""
+    base = datetime.now(JST) - timedelta(hours=1)
+    records = [
+        SummaryUsage(
+            date=base + timedelta(minutes=i // 3),
+            department="眼科",
+            doctor="default",
+            document_type="他院への紹介",
+            model="Claude",
+            input_tokens=100 + i,
+            output_tokens=50,
+            processing_time=1.0,
+        )
+        for i in range(count)
+    ]
+    test_db.add_all(records)
+    test_db.commit()
+    return records
+
+
+class TestKeysetPagination:
+    """カーソルによる get_usage_records のページ送りのテスト"""
+
+    def test_cursor_walks_all_records_once(self, test_db):
+        """同じ日時のレコードがあっても重複・欠落なく全件をたどれる"""
+        records = _add_records_with_shared_dates(test_db, 10)
+
+        seen = []
+        cursor = None
+        while True:
+            page = statistics_service.get_usage_records(test_db, limit=4, cursor=cursor)
+            seen.extend(r.id for r in page)
+            if len(page) < 4:
+                break
+            cursor = statistics_service.decode_records_cursor(
+                statistics_service.encode_records_cursor(page[-1])
+            )
+
+        assert sorted(seen) == sorted(r.id for r in records)
+        assert len(seen) == len(set(seen))
+
+    def test_cursor_order_matches_offset_order(self, test_db):
+        """カーソルで取得した順序は全件取得時の順序と一致する"""
+        _add_records_with_shared_dates(test_db, 7)
+        all_ids = [r.id for r in statistics_service.get_usage_records(test_db)]
+
+        first = statistics_service.get_usage_records(test_db, limit=3)
+        cursor = statistics_service.decode_records_cursor(
+            statistics_service.encode_records_cursor(first[-1])
+        )
+        second = statistics_service.get_usage_records(test_db, limit=3, cursor=cursor)
+
+        assert [r.id for r in first + second] == all_ids[:6]
+
+    def test_invalid_cursor_raises_value_error(self):
+        """不正なカーソルは ValueError"""
+        with pytest.raises(ValueError):
+            statistics_service.decode_records_cursor("invalid-cursor")
+
+
+class TestIterUsageExport:
+    """iter_usage_export のテスト"""
+
+    @staticmethod
+    def _session(test_db):
+        @contextmanager
+        def get_db_session():
+            yield test_db
+
+        return patch("app.services.statistics_service.get_db_session", get_db_session)
+
+    def test_csv_export(self, test_db):
+        """ヘッダー行と古い順のレコードをCSVで出力する"""
+        records = _add_records_with_shared_dates(test_db, 5)
+
+        with self._session(test_db):
+            chunks = list(statistics_service.iter_usage_export("csv", batch_size=2))
+
+        rows = list(csv.reader(io.StringIO("".join(chunks))))
+        assert rows[0] == list(statistics_service.EXPORT_COLUMNS)
+        assert [int(row[0]) for row in rows[1:]] == [r.id for r in records]
+        assert len(chunks) == 3
+
+    def test_ndjson_export(self, test_db):
+        """1行1レコードのJSONで出力する"""
+        _add_records_with_shared_dates(test_db, 3)
+
+        with self._session(test_db):
+            body = "".join(statistics_service.iter_usage_export("ndjson"))
+
+        lines = [json.loads(line) for line in body.splitlines()]
+        assert len(lines) == 3
+        assert lines[0]["department"] == "眼科"
+        assert lines[0]["input_tokens"] == 100
+
+    def test_export_empty(self, test_db):
+        """レコードがなければCSVはヘッダーのみ、NDJSONは空"""
+        with self._session(test_db):
+            assert "".join(statistics_service.iter_usage_export("csv")).strip() == ",".join(
+                statistics_service.EXPORT_COLUMNS
+            )
+            assert list(statistics_service.iter_usage_export("ndjson")) == []
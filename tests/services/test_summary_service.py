@@ -1,12 +1,19 @@
+import threading
 from contextlib import ExitStack
+from datetime import date
+from types import SimpleNamespace
+from typing import Any
 from unittest.mock import MagicMock, patch
 
 import pytest
 
 from app.core.constants import MESSAGES
+from app.services.generation_context import GenerationContext
 from app.services.model_selector import determine_model, get_provider_and_model
+from app.services.prompt_cache import ResolvedPrompt
 from app.services.summary_service import validate_input
-from app.services.usage_service import save_usage
+from app.services.usage_service import QuotaReservation, get_usage_writer, save_usage
+from app.services.usage_writer import UsageRecord
 
 
 class TestValidateInput:
@@ -175,8 +182,30 @@ class TestDetermineModel:
         assert model == "Claude"
         assert switched is False
 
+    @patch("app.services.model_selector.get_db_session")
+    @patch("app.services.model_selector.settings")
+    def test_determine_model_from_context(self, mock_settings, mock_db_session):
+        """モデル決定 - context の選択モデルを使用しDBにアクセスしない"""
+        mock_settings.max_token_threshold = 40000
+        context = GenerationContext(
+            prompt=ResolvedPrompt(content="プロンプト", selected_model="Gemini")
+        )
+
+        model, switched = determine_model(
+            requested_model="Claude",
+            input_length=10000,
+            department="眼科",
+            document_type="他院への紹介",
+            doctor="橋本義弘",
+            context=context,
+        )
+
+        assert model == "Gemini"
+        assert switched is False
+        mock_db_session.assert_not_called()
+
     @patch("app.services.prompt_service.get_prompt")
-    @patch("app.core.database.get_db_session")
+    @patch("app.services.model_selector.get_db_session")
     @patch("app.services.model_selector.settings")
     def test_determine_model_from_prompt(
         self, mock_settings, mock_db_session, mock_get_prompt
@@ -215,6 +244,7 @@ class TestGetProviderAndModel:
     def test_get_provider_and_model_claude(self, mock_settings):
         """プロバイダーとモデル取得 - Claude"""
         mock_settings.anthropic_model = "claude-3-5-sonnet-20241022"
+        mock_settings.fake_llm_enabled = False
 
         provider, model = get_provider_and_model("Claude")
 
@@ -225,6 +255,7 @@ class TestGetProviderAndModel:
     def test_get_provider_and_model_gemini(self, mock_settings):
         """プロバイダーとモデル取得 - Gemini"""
         mock_settings.gemini_model = "gemini-1.5-pro-002"
+        mock_settings.fake_llm_enabled = False
 
         provider, model = get_provider_and_model("Gemini")
 
@@ -242,6 +273,7 @@ class TestGetProviderAndModel:
     def test_get_provider_and_model_claude_model_not_set(self, mock_settings):
         """プロバイダーとモデル取得 - anthropic_model未設定"""
         mock_settings.anthropic_model = None
+        mock_settings.fake_llm_enabled = False
 
         with pytest.raises(ValueError):
             get_provider_and_model("Claude")
@@ -250,10 +282,20 @@ class TestGetProviderAndModel:
     def test_get_provider_and_model_gemini_not_set(self, mock_settings):
         """プロバイダーとモデル取得 - Gemini設定がNone"""
         mock_settings.gemini_model = None
+        mock_settings.fake_llm_enabled = False
 
         with pytest.raises(ValueError):
             get_provider_and_model("Gemini")
 
+    @patch("app.services.model_selector.settings")
+    def test_get_provider_and_model_fake_enabled(self, mock_settings):
+        """疑似LLM有効時はモデル設定に関わらず fake プロバイダーに振り替える"""
+        mock_settings.fake_llm_enabled = True
+        mock_settings.anthropic_model = None
+
+        assert get_provider_and_model("Claude") == ("fake", "fake-claude")
+        assert get_provider_and_model("Gemini") == ("fake", "fake-gemini")
+
 
 class TestSaveUsage:
     """save_usage 関数のテスト"""
@@ -274,11 +316,10 @@ class TestSaveUsage:
             processing_time=2.5,
         )
 
-        # DBへの追加が呼ばれたことを確認
-        mock_db.add.assert_called_once()
-
-        # 追加されたUsageオブジェクトを検証
-        added_usage = mock_db.add.call_args[0][0]
+        # 使用量は複数行INSERTの1行として渡される
+        rows = mock_db.execute.call_args_list[0][0][1]
+        assert len(rows) == 1
+        added_usage = SimpleNamespace(**rows[0])
         assert added_usage.department == "眼科"
         assert added_usage.doctor == "橋本義弘"
         assert added_usage.document_type == "他院への紹介"
@@ -289,14 +330,12 @@ class TestSaveUsage:
         assert added_usage.processing_time == 2.5
 
     @patch("app.services.usage_service.get_db_session")
-    @patch("logging.error")
-    def test_save_usage_failure_silent(self, mock_logging_error, mock_get_db_session):
-        """使用統計保存 - 失敗時にエラーを無視"""
+    def test_save_usage_failure_silent(self, mock_get_db_session):
+        """DB書き込みの失敗時は例外を伝播させず、使用量をスプールファイルへ退避する"""
         mock_db = MagicMock()
-        mock_db.add.side_effect = Exception("DB接続エラー")
+        mock_db.execute.side_effect = Exception("DB接続エラー")
         mock_get_db_session.return_value.__enter__.return_value = mock_db
 
-        # エラーが発生しても例外は投げられない
         save_usage(
             department="default",
             doctor="default",
@@ -307,9 +346,12 @@ class TestSaveUsage:
             processing_time=3.0,
         )
 
-        # 警告メッセージが出力されることを確認
-        mock_logging_error.assert_called_once()
-        assert "使用統計の保存に失敗しました" in str(mock_logging_error.call_args)
+        with open(get_usage_writer().process_spool_path, encoding="utf-8") as f:
+            spooled = [UsageRecord.from_json(line) for line in f]
+        assert len(spooled) == 1
+        assert spooled[0].model == "Gemini"
+        assert spooled[0].request_delta == 1
+        assert spooled[0].input_delta == 2000
 
 
 class TestExecuteSummaryGeneration:
@@ -317,7 +359,10 @@ class TestExecuteSummaryGeneration:
 
     BASE_PATCHES = [
         ("app.services.summary_service.log_audit_event", {}),
-        ("app.services.summary_service.check_daily_limit", {"return_value": None}),
+        (
+            "app.services.summary_service.load_generation_context",
+            {"return_value": GenerationContext()},
+        ),
         (
             "app.services.summary_service.sanitize_medical_text",
             {"side_effect": lambda x: x},
@@ -332,7 +377,7 @@ class TestExecuteSummaryGeneration:
             {"return_value": ("claude", "claude-3-5")},
         ),
         (
-            "app.services.summary_service.generate_summary_with_provider",
+            "app.services.summary_service.generate_summary_with_provider_async",
             {"return_value": ("出力テキスト", 100, 50)},
         ),
         (
@@ -354,13 +399,13 @@ class TestExecuteSummaryGeneration:
             mocks[key] = stack.enter_context(patch(target, **kwargs))
         return mocks
 
-    def test_success(self):
+    async def test_success(self):
         """正常系: SummaryResponse が success=True で返る"""
         from app.services.summary_service import execute_summary_generation
 
         with ExitStack() as stack:
             self._apply_base_patches(stack)
-            result = execute_summary_generation(
+            result = await execute_summary_generation(
                 medical_text="カルテ情報" * 20,
                 additional_info="",
                 current_prescription="",
@@ -378,18 +423,160 @@ class TestExecuteSummaryGeneration:
         assert result.model_used == "Claude"
         assert result.model_switched is False
 
-    def test_daily_limit_error(self):
+    async def test_success_returns_stage_timings(self):
+        """正常系: 処理段階ごとの所要時間を応答と監査ログに含める"""
+        from app.services.summary_service import execute_summary_generation
+
+        with ExitStack() as stack:
+            mocks = self._apply_base_patches(stack)
+            mocks["load_generation_context"].return_value = GenerationContext()
+            result = await execute_summary_generation(
+                medical_text="カルテ情報" * 20,
+                additional_info="",
+                current_prescription="",
+                department="眼科",
+                doctor="橋本義弘",
+                document_type="他院への紹介",
+                model="Claude",
+            )
+
+        assert result.timings is not None
+        assert list(result.timings) == [
+            "load_context",
+            "sanitize",
+            "validate_input",
+            "determine_model",
+            "generation",
+            "format_output",
+            "save_usage",
+            "total",
+        ]
+        success_call = mocks["log_audit_event"].call_args_list[-1]
+        assert success_call.kwargs["timings"] == result.timings
+
+    async def test_cache_tokens_saved_with_usage(self):
+        """プロバイダーが context に記録したキャッシュのトークン数を使用統計に保存する"""
+        from app.services.summary_service import execute_summary_generation
+
+        context = GenerationContext()
+
+        async def generate(*_args, **_kwargs):
+            context.cache_usage.add(2048, 512)
+            return "出力テキスト", 100, 50
+
+        with ExitStack() as stack:
+            mocks = self._apply_base_patches(stack)
+            mocks["load_generation_context"].return_value = context
+            mocks["generate_summary_with_provider_async"].side_effect = generate
+            await execute_summary_generation(
+                medical_text="カルテ情報" * 20,
+                additional_info="",
+                current_prescription="",
+                department="眼科",
+                doctor="橋本義弘",
+                document_type="他院への紹介",
+                model="Claude",
+            )
+
+        kwargs = mocks["save_usage"].call_args.kwargs
+        assert kwargs["input_tokens"] == 100
+        assert kwargs["cache_read_input_tokens"] == 2048
+        assert kwargs["cache_creation_input_tokens"] == 512
+
+    async def test_result_cache_hit_skips_provider(self):
+        """同一リクエストの2回目はキャッシュした結果を返し、LLM呼び出しと使用量の保存を行わない"""
+        from app.services.summary_service import execute_summary_generation
+
+        request: dict[str, Any] = dict(
+            medical_text="カルテ情報" * 20,
+            additional_info="",
+            current_prescription="",
+            department="眼科",
+            doctor="橋本義弘",
+            document_type="他院への紹介",
+            model="Claude",
+        )
+        with ExitStack() as stack:
+            mocks = self._apply_base_patches(stack)
+            stack.enter_context(
+                patch("app.services.summary_service.settings.result_cache_enabled", True)
+            )
+            first = await execute_summary_generation(**request)
+            second = await execute_summary_generation(**request)
+            changed = await execute_summary_generation(**{**request, "additional_info": "追加"})
+
+        assert first.cached is False
+        assert second.cached is True
+        assert second.output_summary == "整形済み出力"
+        assert second.parsed_summary == {"section": "内容"}
+        assert (second.input_tokens, second.output_tokens) == (0, 0)
+        assert second.timings is not None
+        assert "result_cache" in second.timings
+        assert changed.cached is False
+        assert mocks["generate_summary_with_provider_async"].call_count == 2
+        assert mocks["save_usage"].call_count == 2
+        assert mocks["log_audit_event"].call_args_list[3].kwargs["cached"] is True
+
+    async def test_result_cache_disabled_by_default(self):
+        """既定では生成結果をキャッシュしない"""
+        from app.services.summary_service import execute_summary_generation
+
+        request: dict[str, Any] = dict(
+            medical_text="カルテ情報" * 20,
+            additional_info="",
+            current_prescription="",
+            department="眼科",
+            doctor="橋本義弘",
+            document_type="他院への紹介",
+            model="Claude",
+        )
+        with ExitStack() as stack:
+            mocks = self._apply_base_patches(stack)
+            await execute_summary_generation(**request)
+            second = await execute_summary_generation(**request)
+
+        assert second.cached is False
+        assert mocks["generate_summary_with_provider_async"].call_count == 2
+
+    async def test_context_passed_to_provider(self):
+        """リクエスト開始時に解決した context がモデル決定とプロバイダー呼び出しに渡る"""
+        from app.services.summary_service import execute_summary_generation
+
+        context = GenerationContext(
+            prompt=ResolvedPrompt(content="プロンプト", selected_model="Claude")
+        )
+        with ExitStack() as stack:
+            mocks = self._apply_base_patches(stack)
+            mocks["load_generation_context"].return_value = context
+            await execute_summary_generation(
+                medical_text="カルテ情報" * 20,
+                additional_info="",
+                current_prescription="",
+                department="眼科",
+                doctor="橋本義弘",
+                document_type="他院への紹介",
+                model="Claude",
+            )
+
+        mocks["load_generation_context"].assert_called_once_with(
+            "眼科", "他院への紹介", "橋本義弘", len("カルテ情報" * 20)
+        )
+        assert mocks["determine_model"].call_args.args[-1] is context
+        provider_call = mocks["generate_summary_with_provider_async"].call_args
+        assert provider_call.kwargs["context"] is context
+
+    async def test_daily_limit_error(self):
         """日次制限超過: success=False でエラーメッセージが返る"""
         from app.services.summary_service import execute_summary_generation
 
         with (
             patch("app.services.summary_service.log_audit_event"),
             patch(
-                "app.services.summary_service.check_daily_limit",
-                return_value="日次制限を超えました",
+                "app.services.summary_service.load_generation_context",
+                return_value=GenerationContext(daily_limit_error="日次制限を超えました"),
             ),
         ):
-            result = execute_summary_generation(
+            result = await execute_summary_generation(
                 medical_text="テキスト",
                 additional_info="",
                 current_prescription="",
@@ -402,13 +589,16 @@ class TestExecuteSummaryGeneration:
         assert result.success is False
         assert result.error_message == "日次制限を超えました"
 
-    def test_input_validation_error(self):
+    async def test_input_validation_error(self):
         """入力バリデーション失敗: success=False でエラーメッセージが返る"""
         from app.services.summary_service import execute_summary_generation
 
         with (
             patch("app.services.summary_service.log_audit_event"),
-            patch("app.services.summary_service.check_daily_limit", return_value=None),
+            patch(
+                "app.services.summary_service.load_generation_context",
+                return_value=GenerationContext(),
+            ),
             patch(
                 "app.services.summary_service.sanitize_medical_text",
                 side_effect=lambda x: x,
@@ -418,7 +608,7 @@ class TestExecuteSummaryGeneration:
                 return_value=(False, "入力が短すぎます"),
             ),
         ):
-            result = execute_summary_generation(
+            result = await execute_summary_generation(
                 medical_text="短い",
                 additional_info="",
                 current_prescription="",
@@ -431,13 +621,16 @@ class TestExecuteSummaryGeneration:
         assert result.success is False
         assert result.error_message == "入力が短すぎます"
 
-    def test_determine_model_value_error(self):
+    async def test_determine_model_value_error(self):
         """determine_model が ValueError: success=False で返る"""
         from app.services.summary_service import execute_summary_generation
 
         with (
             patch("app.services.summary_service.log_audit_event"),
-            patch("app.services.summary_service.check_daily_limit", return_value=None),
+            patch(
+                "app.services.summary_service.load_generation_context",
+                return_value=GenerationContext(),
+            ),
             patch(
                 "app.services.summary_service.sanitize_medical_text",
                 side_effect=lambda x: x,
@@ -450,7 +643,7 @@ class TestExecuteSummaryGeneration:
                 side_effect=ValueError("Gemini未設定"),
             ),
         ):
-            result = execute_summary_generation(
+            result = await execute_summary_generation(
                 medical_text="カルテ情報" * 20,
                 additional_info="",
                 current_prescription="",
@@ -464,13 +657,16 @@ class TestExecuteSummaryGeneration:
         assert result.error_message is not None
         assert "Gemini未設定" in result.error_message
 
-    def test_get_provider_value_error(self):
+    async def test_get_provider_value_error(self):
         """get_provider_and_model が ValueError: success=False で返る"""
         from app.services.summary_service import execute_summary_generation
 
         with (
             patch("app.services.summary_service.log_audit_event"),
-            patch("app.services.summary_service.check_daily_limit", return_value=None),
+            patch(
+                "app.services.summary_service.load_generation_context",
+                return_value=GenerationContext(),
+            ),
             patch(
                 "app.services.summary_service.sanitize_medical_text",
                 side_effect=lambda x: x,
@@ -487,7 +683,7 @@ class TestExecuteSummaryGeneration:
                 side_effect=ValueError("モデル未設定"),
             ),
         ):
-            result = execute_summary_generation(
+            result = await execute_summary_generation(
                 medical_text="カルテ情報" * 20,
                 additional_info="",
                 current_prescription="",
@@ -501,13 +697,16 @@ class TestExecuteSummaryGeneration:
         assert result.error_message is not None
         assert "モデル未設定" in result.error_message
 
-    def test_api_call_exception(self):
-        """generate_summary_with_provider が例外: success=False で返る"""
+    async def test_api_call_exception(self):
+        """generate_summary_with_provider_async が例外: success=False で返る"""
         from app.services.summary_service import execute_summary_generation
 
         with (
             patch("app.services.summary_service.log_audit_event"),
-            patch("app.services.summary_service.check_daily_limit", return_value=None),
+            patch(
+                "app.services.summary_service.load_generation_context",
+                return_value=GenerationContext(),
+            ),
             patch(
                 "app.services.summary_service.sanitize_medical_text",
                 side_effect=lambda x: x,
@@ -524,11 +723,11 @@ class TestExecuteSummaryGeneration:
                 return_value=("claude", "claude-3-5"),
             ),
             patch(
-                "app.services.summary_service.generate_summary_with_provider",
+                "app.services.summary_service.generate_summary_with_provider_async",
                 side_effect=Exception("API接続エラー"),
             ),
         ):
-            result = execute_summary_generation(
+            result = await execute_summary_generation(
                 medical_text="カルテ情報" * 20,
                 additional_info="",
                 current_prescription="",
@@ -544,6 +743,43 @@ class TestExecuteSummaryGeneration:
         assert "API接続エラー" not in result.error_message
 
 
+    async def test_usage_writes_run_off_event_loop(self):
+        """使用量の保存と予約の取り消しはイベントループ外のスレッドで実行する"""
+        from app.services.summary_service import execute_summary_generation
+
+        loop_thread = threading.get_ident()
+        called_from: list[int] = []
+
+        def record(*args, **kwargs):
+            called_from.append(threading.get_ident())
+
+        request: dict[str, Any] = dict(
+            medical_text="カルテ情報" * 20,
+            additional_info="",
+            current_prescription="",
+            department="眼科",
+            doctor="橋本義弘",
+            document_type="他院への紹介",
+            model="Claude",
+        )
+        with ExitStack() as stack:
+            mocks = self._apply_base_patches(stack)
+            mocks["save_usage"].side_effect = record
+            mocks["load_generation_context"].return_value = GenerationContext(
+                reservation=QuotaReservation(date(2026, 1, 1), 100, 50)
+            )
+            mock_release = stack.enter_context(
+                patch("app.services.summary_service.release_daily_quota", side_effect=record)
+            )
+            await execute_summary_generation(**request)
+            mocks["generate_summary_with_provider_async"].side_effect = Exception("失敗")
+            await execute_summary_generation(**request)
+
+        mocks["save_usage"].assert_called_once()
+        mock_release.assert_called()
+        assert loop_thread not in called_from
+
+
 class TestExecuteSummaryGenerationStream:
     """execute_summary_generation_stream SSEフローのテスト"""
 
@@ -562,8 +798,8 @@ class TestExecuteSummaryGenerationStream:
         with (
             patch("app.services.summary_service.log_audit_event"),
             patch(
-                "app.services.summary_service.check_daily_limit",
-                return_value="日次制限エラー",
+                "app.services.summary_service.load_generation_context",
+                return_value=GenerationContext(daily_limit_error="日次制限エラー"),
             ),
         ):
             events = await self._collect(
@@ -590,7 +826,10 @@ class TestExecuteSummaryGenerationStream:
 
         with (
             patch("app.services.summary_service.log_audit_event"),
-            patch("app.services.summary_service.check_daily_limit", return_value=None),
+            patch(
+                "app.services.summary_service.load_generation_context",
+                return_value=GenerationContext(),
+            ),
             patch(
                 "app.services.summary_service.sanitize_medical_text",
                 side_effect=lambda x: x,
@@ -621,7 +860,10 @@ class TestExecuteSummaryGenerationStream:
 
         with (
             patch("app.services.summary_service.log_audit_event"),
-            patch("app.services.summary_service.check_daily_limit", return_value=None),
+            patch(
+                "app.services.summary_service.load_generation_context",
+                return_value=GenerationContext(),
+            ),
             patch(
                 "app.services.summary_service.sanitize_medical_text",
                 side_effect=lambda x: x,
@@ -652,14 +894,18 @@ class TestExecuteSummaryGenerationStream:
         """正常系: SSE complete イベントが yield される"""
         import json
 
-        async def mock_stream_with_heartbeat(**kwargs):
+        async def mock_stream_deltas_with_heartbeat(**kwargs):
+            yield 'event: delta\ndata: {"text": "出力"}\n\n'
             yield "出力テキスト", 100, 50
 
         from app.services.summary_service import execute_summary_generation_stream
 
         with (
             patch("app.services.summary_service.log_audit_event"),
-            patch("app.services.summary_service.check_daily_limit", return_value=None),
+            patch(
+                "app.services.summary_service.load_generation_context",
+                return_value=GenerationContext(),
+            ),
             patch(
                 "app.services.summary_service.sanitize_medical_text",
                 side_effect=lambda x: x,
@@ -676,8 +922,8 @@ class TestExecuteSummaryGenerationStream:
                 return_value=("claude", "claude-3-5"),
             ),
             patch(
-                "app.services.summary_service.stream_with_heartbeat",
-                mock_stream_with_heartbeat,
+                "app.services.summary_service.stream_deltas_with_heartbeat",
+                mock_stream_deltas_with_heartbeat,
             ),
             patch(
                 "app.services.summary_service.format_output_summary",
@@ -698,6 +944,7 @@ class TestExecuteSummaryGenerationStream:
                 )
             )
 
+        assert "event: delta" in events[0]
         complete_events = [e for e in events if "event: complete" in e]
         assert len(complete_events) == 1
         data_line = [
@@ -707,3 +954,350 @@ class TestExecuteSummaryGenerationStream:
         assert payload["success"] is True
         assert payload["output_summary"] == "整形済み"
         assert payload["model_used"] == "Claude"
+        assert {"load_context", "generation", "save_usage", "total"} <= set(payload["timings"])
+
+    async def test_result_cache_hit_yields_only_complete(self):
+        """キャッシュ済みのリクエストは生成せずに cached=True の complete イベントだけを返す"""
+        import json
+
+        calls = []
+
+        async def mock_stream_deltas_with_heartbeat(**kwargs):
+            calls.append(kwargs)
+            yield 'event: delta\ndata: {"text": "出力"}\n\n'
+            yield "出力テキスト", 100, 50
+
+        from app.services.summary_service import execute_summary_generation_stream
+
+        with (
+            patch("app.services.summary_service.settings.result_cache_enabled", True),
+            patch("app.services.summary_service.log_audit_event"),
+            patch(
+                "app.services.summary_service.load_generation_context",
+                side_effect=lambda *args: GenerationContext(),
+            ),
+            patch(
+                "app.services.summary_service.validate_input", return_value=(True, None)
+            ),
+            patch(
+                "app.services.summary_service.determine_model",
+                return_value=("Claude", False),
+            ),
+            patch(
+                "app.services.summary_service.get_provider_and_model",
+                return_value=("claude", "claude-3-5"),
+            ),
+            patch(
+                "app.services.summary_service.stream_deltas_with_heartbeat",
+                mock_stream_deltas_with_heartbeat,
+            ),
+            patch(
+                "app.services.summary_service.format_output_summary",
+                return_value="整形済み",
+            ),
+            patch(
+                "app.services.summary_service.parse_output_summary",
+                return_value={"備考": "特記なし"},
+            ),
+            patch("app.services.summary_service.save_usage") as mock_save_usage,
+        ):
+            request: dict[str, Any] = dict(
+                medical_text="カルテ情報" * 20,
+                additional_info="",
+                current_prescription="",
+                department="眼科",
+                doctor="橋本義弘",
+                document_type="他院への紹介",
+                model="Claude",
+            )
+            first = await self._collect(execute_summary_generation_stream(**request))
+            second = await self._collect(execute_summary_generation_stream(**request))
+
+        assert len(calls) == 1
+        mock_save_usage.assert_called_once()
+        assert json.loads(first[-1].split("data: ")[1])["cached"] is False
+        assert len(second) == 1 and "event: complete" in second[0]
+        payload = json.loads(second[0].split("data: ")[1])
+        assert payload["cached"] is True
+        assert payload["output_summary"] == "整形済み"
+        assert payload["parsed_summary"] == {"備考": "特記なし"}
+        assert payload["model_used"] == "Claude"
+
+    async def test_concurrent_identical_requests_share_generation(self):
+        """同じリクエストが実行中なら合流し、プロバイダー呼び出しと使用量の保存は1回"""
+        import asyncio
+
+        release = asyncio.Event()
+        calls = []
+
+        async def mock_stream_deltas_with_heartbeat(**kwargs):
+            calls.append(kwargs)
+            yield 'event: progress\ndata: {"status": "starting"}\n\n'
+            await release.wait()
+            yield 'event: delta\ndata: {"text": "出力"}\n\n'
+            yield "出力テキスト", 100, 50
+
+        from app.services.summary_service import execute_summary_generation_stream
+
+        with (
+            patch("app.services.summary_service.log_audit_event") as mock_audit,
+            patch(
+                "app.services.summary_service.load_generation_context",
+                side_effect=lambda *args: GenerationContext(),
+            ),
+            patch(
+                "app.services.summary_service.validate_input", return_value=(True, None)
+            ),
+            patch(
+                "app.services.summary_service.determine_model",
+                return_value=("Claude", False),
+            ),
+            patch(
+                "app.services.summary_service.get_provider_and_model",
+                return_value=("claude", "claude-3-5"),
+            ),
+            patch(
+                "app.services.summary_service.stream_deltas_with_heartbeat",
+                mock_stream_deltas_with_heartbeat,
+            ),
+            patch(
+                "app.services.summary_service.format_output_summary",
+                return_value="整形済み",
+            ),
+            patch("app.services.summary_service.parse_output_summary", return_value={}),
+            patch("app.services.summary_service.save_usage") as mock_save_usage,
+            patch("app.services.summary_service.release_daily_quota"),
+            patch("app.services.summary_service.settings.single_flight_enabled", True),
+        ):
+            request: dict[str, Any] = dict(
+                medical_text="カルテ情報" * 20,
+                additional_info="",
+                current_prescription="",
+                department="眼科",
+                doctor="橋本義弘",
+                document_type="他院への紹介",
+                model="Claude",
+            )
+            first = asyncio.create_task(
+                self._collect(execute_summary_generation_stream(**request))
+            )
+            await asyncio.sleep(0.01)
+            second = asyncio.create_task(
+                self._collect(execute_summary_generation_stream(**request))
+            )
+            await asyncio.sleep(0.01)
+            release.set()
+            first_events, second_events = await asyncio.gather(first, second)
+
+        assert len(calls) == 1
+        mock_save_usage.assert_called_once()
+        assert first_events == second_events
+        assert [e.split("\n")[0] for e in first_events] == [
+            "event: progress",
+            "event: delta",
+            "event: complete",
+        ]
+        joined = [
+            c for c in mock_audit.call_args_list
+            if c.kwargs["event_type"] == MESSAGES["AUDIT"]["DOCUMENT_GENERATION_JOINED"]
+        ]
+        assert len(joined) == 1
+
+    async def test_joined_generation_owns_leader_reservation(self):
+        """最初の接続が切れても予約は生成側が確定し、合流した接続は自分の予約だけを取り消す"""
+        import asyncio
+
+        release = asyncio.Event()
+        reservations = [QuotaReservation(date(2026, 1, 1), tokens, 50) for tokens in (100, 200, 300)]
+        released = []
+
+        async def mock_stream_deltas_with_heartbeat(**kwargs):
+            yield 'event: progress\ndata: {"status": "starting"}\n\n'
+            await release.wait()
+            yield "出力テキスト", 100, 50
+
+        def settle(*args, reservation: QuotaReservation, **kwargs):
+            reservation.settled = True
+
+        def record_release(reservation):
+            released.append(reservation)
+            reservation.settled = True
+
+        from app.services.summary_service import execute_summary_generation_stream
+
+        with (
+            patch("app.services.summary_service.log_audit_event"),
+            patch(
+                "app.services.summary_service.load_generation_context",
+                side_effect=[GenerationContext(reservation=r) for r in reservations],
+            ),
+            patch(
+                "app.services.summary_service.validate_input", return_value=(True, None)
+            ),
+            patch(
+                "app.services.summary_service.determine_model",
+                return_value=("Claude", False),
+            ),
+            patch(
+                "app.services.summary_service.get_provider_and_model",
+                return_value=("claude", "claude-3-5"),
+            ),
+            patch(
+                "app.services.summary_service.stream_deltas_with_heartbeat",
+                mock_stream_deltas_with_heartbeat,
+            ),
+            patch(
+                "app.services.summary_service.format_output_summary",
+                return_value="整形済み",
+            ),
+            patch("app.services.summary_service.parse_output_summary", return_value={}),
+            patch(
+                "app.services.summary_service.save_usage", side_effect=settle
+            ) as mock_save_usage,
+            patch(
+                "app.services.summary_service.release_daily_quota", side_effect=record_release
+            ),
+            patch("app.services.summary_service.settings.single_flight_enabled", True),
+        ):
+            request: dict[str, Any] = dict(
+                medical_text="カルテ情報" * 20,
+                additional_info="",
+                current_prescription="",
+                department="眼科",
+                doctor="橋本義弘",
+                document_type="他院への紹介",
+                model="Claude",
+            )
+            leader = asyncio.create_task(
+                self._collect(execute_summary_generation_stream(**request))
+            )
+            await asyncio.sleep(0.01)
+            joiner = asyncio.create_task(
+                self._collect(execute_summary_generation_stream(**request))
+            )
+            other_doctor = asyncio.create_task(
+                self._collect(execute_summary_generation_stream(**{**request, "doctor": "別の医師"}))
+            )
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            await asyncio.sleep(0.01)
+            release.set()
+            await asyncio.gather(joiner, other_doctor)
+
+        saved = [c.kwargs["reservation"] for c in mock_save_usage.call_args_list]
+        assert sorted(map(reservations.index, saved)) == [0, 2]
+        assert released == [reservations[1]]
+
+    async def test_stream_emits_section_events(self):
+        """差分の取り込みで完了したセクションが section イベントとして送信される"""
+        import json
+
+        async def mock_stream_deltas_with_heartbeat(**kwargs):
+            for text in ["現在の処方: アムロ", "ジピン5mg\n備", "考: 特記なし\n"]:
+                yield f"delta:{text}"
+                for event in kwargs["on_delta"](text):
+                    yield event
+            yield "現在の処方: アムロジピン5mg\n備考: 特記なし\n", 100, 50
+
+        from app.services.summary_service import execute_summary_generation_stream
+
+        with (
+            patch("app.services.summary_service.log_audit_event"),
+            patch(
+                "app.services.summary_service.load_generation_context",
+                return_value=GenerationContext(),
+            ),
+            patch(
+                "app.services.summary_service.validate_input", return_value=(True, None)
+            ),
+            patch(
+                "app.services.summary_service.determine_model",
+                return_value=("Claude", False),
+            ),
+            patch(
+                "app.services.summary_service.get_provider_and_model",
+                return_value=("claude", "claude-3-5"),
+            ),
+            patch(
+                "app.services.summary_service.stream_deltas_with_heartbeat",
+                mock_stream_deltas_with_heartbeat,
+            ),
+            patch("app.services.summary_service.save_usage"),
+        ):
+            events = await self._collect(
+                execute_summary_generation_stream(
+                    medical_text="カルテ情報" * 20,
+                    additional_info="",
+                    current_prescription="",
+                    department="眼科",
+                    doctor="橋本義弘",
+                    document_type="他院への紹介",
+                    model="Claude",
+                )
+            )
+
+        section_events = [e for e in events if "event: section" in e]
+        assert len(section_events) == 2
+        # 見出し「備考」の受信で完了した「現在の処方」は次の delta の直後に送信される
+        assert events.index(section_events[0]) == events.index("delta:考: 特記なし\n") + 1
+        payload = json.loads(section_events[0].split("data: ")[1])
+        assert payload == {"name": "現在の処方", "content": "アムロジピン5mg"}
+        # 最後のセクションはストリーム終了時、complete の前に送信される
+        complete = [e for e in events if "event: complete" in e][0]
+        assert events.index(section_events[1]) < events.index(complete)
+        payload = json.loads(section_events[1].split("data: ")[1])
+        assert payload == {"name": "備考", "content": "特記なし"}
+        assert json.loads(complete.split("data: ")[1])["parsed_summary"] == {
+            "現在の処方": "アムロジピン5mg",
+            "備考": "特記なし",
+        }
+
+    async def test_stream_deltas_disabled_uses_buffered_generation(self):
+        """sse_stream_deltas=False: 全文をまとめて受け取る従来の経路を使用"""
+
+        async def mock_stream_with_heartbeat(**kwargs):
+            assert kwargs["func"].__name__ == "_run_generation"
+            yield "出力テキスト", 100, 50
+
+        from app.services.summary_service import execute_summary_generation_stream
+
+        with (
+            patch("app.services.summary_service.settings") as mock_settings,
+            patch("app.services.summary_service.log_audit_event"),
+            patch(
+                "app.services.summary_service.load_generation_context",
+                return_value=GenerationContext(),
+            ),
+            patch(
+                "app.services.summary_service.validate_input", return_value=(True, None)
+            ),
+            patch(
+                "app.services.summary_service.determine_model",
+                return_value=("Claude", False),
+            ),
+            patch(
+                "app.services.summary_service.get_provider_and_model",
+                return_value=("claude", "claude-3-5"),
+            ),
+            patch(
+                "app.services.summary_service.stream_with_heartbeat",
+                mock_stream_with_heartbeat,
+            ),
+            patch("app.services.summary_service.save_usage"),
+        ):
+            mock_settings.sse_stream_deltas = False
+            mock_settings.result_cache_enabled = False
+            events = await self._collect(
+                execute_summary_generation_stream(
+                    medical_text="カルテ情報" * 20,
+                    additional_info="",
+                    current_prescription="",
+                    department="眼科",
+                    doctor="橋本義弘",
+                    document_type="他院への紹介",
+                    model="Claude",
+                )
+            )
+
+        assert not any("event: delta" in e for e in events)
+        assert any("event: complete" in e for e in events)
@@ -0,0 +1,302 @@
+"""使用統計の集計テーブルのテスト"""
+
+import random
+from datetime import date, datetime, timedelta
+from typing import cast
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.models.usage import (
+    PROCESSING_TIME_BUCKETS,
+    DailyUsageRollup,
+    HourlyUsageRollup,
+    SummaryUsage,
+)
+from app.services import statistics_service
+from app.services.statistics_service import _LatencyTotals, _plan_rollup_query
+from app.services.usage_rollup import add_usage_to_rollups, rebuild_usage_rollups
+from app.services.usage_writer import UsageRecord
+
+JST = ZoneInfo("Asia/Tokyo")
+
+
+def _usage_record(
+    recorded_at: datetime, processing_time: float, model: str = "Claude", cache_read: int = 0
+) -> UsageRecord:
+    return UsageRecord(
+        recorded_at=recorded_at,
+        department="眼科",
+        doctor="橋本義弘",
+        document_type="他院への紹介",
+        model=model,
+        input_tokens=1000,
+        output_tokens=500,
+        processing_time=processing_time,
+        usage_date=recorded_at.date(),
+        request_delta=1,
+        input_delta=1000,
+        output_delta=500,
+        cache_read_input_tokens=cache_read,
+    )
+
+
+class TestAddUsageToRollups:
+    """add_usage_to_rollups のテスト"""
+
+    def test_accumulates_hourly_and_daily(self, test_db):
+        """同じ時間・日付の使用量は1行に加算され、最小/最大/ヒストグラムも更新される"""
+        base = datetime(2026, 4, 1, 9, 15, tzinfo=JST)
+        add_usage_to_rollups(test_db, [_usage_record(base, 8.0)])
+        add_usage_to_rollups(
+            test_db,
+            [
+                _usage_record(base + timedelta(minutes=30), 25.0),
+                _usage_record(base + timedelta(hours=2), 150.0),
+            ],
+        )
+        test_db.commit()
+
+        hourly = test_db.query(HourlyUsageRollup).order_by(HourlyUsageRollup.bucket_start).all()
+        assert [h.request_count for h in hourly] == [2, 1]
+        first = hourly[0]
+        assert first.input_tokens == 2000
+        assert first.processing_time_sum == pytest.approx(33.0)
+        assert (first.processing_time_min, first.processing_time_max) == (8.0, 25.0)
+        assert (first.processing_time_le_10, first.processing_time_le_20, first.processing_time_le_30) == (1, 1, 2)
+
+        daily = test_db.query(DailyUsageRollup).one()
+        assert daily.bucket_date == date(2026, 4, 1)
+        assert daily.request_count == 3
+        assert daily.processing_time_max == 150.0
+        assert daily.processing_time_le_120 == 2
+        assert daily.processing_time_count == 3
+
+    def test_incremental_matches_rebuild(self, test_db):
+        """逐次加算した結果は summary_usage からの再構築と一致する"""
+        base = datetime(2026, 4, 1, 23, 40, tzinfo=JST)
+        records = [
+            _usage_record(base + timedelta(minutes=13 * i), float(5 * i), model)
+            for i, model in enumerate(["Claude", "Gemini"] * 5)
+        ]
+        for record in records:
+            add_usage_to_rollups(test_db, [record])
+            test_db.add(SummaryUsage(
+                date=record.recorded_at,
+                department=record.department,
+                doctor=record.doctor,
+                document_type=record.document_type,
+                model=record.model,
+                input_tokens=record.input_tokens,
+                output_tokens=record.output_tokens,
+                processing_time=record.processing_time,
+            ))
+        test_db.commit()
+
+        def snapshot():
+            return sorted(
+                (str(r.bucket_date), r.model, r.request_count, r.processing_time_sum,
+                 r.processing_time_min, r.processing_time_max, r.processing_time_le_30)
+                for r in test_db.query(DailyUsageRollup).all()
+            )
+
+        incremental = snapshot()
+        rebuild_usage_rollups(test_db)
+        test_db.commit()
+
+        assert snapshot() == incremental
+        assert test_db.query(HourlyUsageRollup).count() == 6
+
+
+    def test_cache_tokens_in_rollups_and_summary(self, test_db):
+        """キャッシュのトークン数は集計テーブルに加算され、期間の端数と合わせてサマリに含まれる"""
+        base = datetime(2026, 4, 1, 9, 15, tzinfo=JST)
+        records = [
+            _usage_record(base, 8.0, cache_read=2048),
+            _usage_record(base + timedelta(days=1, hours=3), 12.0, cache_read=1024),
+        ]
+        add_usage_to_rollups(test_db, records)
+        for record in records:
+            test_db.add(SummaryUsage(
+                date=record.recorded_at,
+                department=record.department,
+                doctor=record.doctor,
+                document_type=record.document_type,
+                model=record.model,
+                input_tokens=record.input_tokens,
+                output_tokens=record.output_tokens,
+                cache_read_input_tokens=record.cache_read_input_tokens,
+                processing_time=record.processing_time,
+            ))
+        test_db.commit()
+
+        assert sum(r.cache_read_input_tokens for r in test_db.query(DailyUsageRollup).all()) == 3072
+        summary = statistics_service.get_usage_summary(
+            test_db, base - timedelta(minutes=5), base + timedelta(days=2)
+        )
+        assert summary["total_cache_read_input_tokens"] == 3072
+        assert summary["total_cache_creation_input_tokens"] == 0
+        aggregated = statistics_service.get_aggregated_records(
+            test_db, base - timedelta(minutes=5), base + timedelta(days=2)
+        )
+        assert [a["cache_read_input_tokens"] for a in aggregated] == [3072]
+
+
+class TestPlanRollupQuery:
+    """_plan_rollup_query のテスト"""
+
+    def test_within_one_hour_uses_raw_only(self):
+        """1時間に満たない期間は生データのみ"""
+        start = datetime(2026, 4, 1, 9, 10, tzinfo=JST)
+        plan = _plan_rollup_query(start, start + timedelta(minutes=30))
+
+        assert plan.raw_ranges == [(start, start + timedelta(minutes=30), True)]
+        assert plan.hourly_ranges == []
+        assert plan.daily_range is None
+
+    def test_multi_day_range_is_split(self):
+        """日をまたぐ期間は端数・時間別・日別に分割される"""
+        start = datetime(2026, 4, 1, 9, 10, tzinfo=JST)
+        end = datetime(2026, 4, 4, 15, 30, tzinfo=JST)
+        plan = _plan_rollup_query(start, end)
+
+        assert plan.raw_ranges == [
+            (start, datetime(2026, 4, 1, 10, tzinfo=JST), False),
+            (datetime(2026, 4, 4, 15, tzinfo=JST), end, True),
+        ]
+        assert plan.hourly_ranges == [
+            (datetime(2026, 4, 1, 10, tzinfo=JST), datetime(2026, 4, 2, tzinfo=JST)),
+            (datetime(2026, 4, 4, tzinfo=JST), datetime(2026, 4, 4, 15, tzinfo=JST)),
+        ]
+        assert plan.daily_range == (date(2026, 4, 2), date(2026, 4, 4))
+
+    def test_naive_datetime_is_treated_as_jst(self):
+        """タイムゾーンなしの日時はJSTとして扱う"""
+        plan = _plan_rollup_query(datetime(2026, 4, 1, 0, 0), datetime(2026, 4, 3, 0, 0))
+
+        assert plan.raw_ranges[0][0] == datetime(2026, 4, 1, tzinfo=JST)
+        assert plan.daily_range == (date(2026, 4, 1), date(2026, 4, 3))
+
+
+class TestStatisticsFromRollups:
+    """集計テーブルを使った統計が生データの集計と一致することの確認"""
+
+    def test_matches_raw_aggregation(self, test_db):
+        """ランダムな使用量と期間で、サマリと文書別集計が生データから求めた値と一致する"""
+        rng = random.Random(20260401)
+        base = datetime(2026, 3, 1, tzinfo=JST)
+        rows = []
+        for _ in range(300):
+            rows.append(SummaryUsage(
+                date=base + timedelta(minutes=rng.randrange(10 * 24 * 60), seconds=rng.randrange(60)),
+                department=rng.choice(["眼科", "default", None]),
+                doctor=rng.choice(["橋本義弘", "default"]),
+                document_type=rng.choice(["他院への紹介", "返書"]),
+                model=rng.choice(["Claude", "Gemini"]),
+                input_tokens=rng.randrange(100, 5000),
+                output_tokens=rng.randrange(50, 2000),
+                processing_time=rng.choice([None, round(rng.uniform(1, 200), 2)]),
+            ))
+        test_db.add_all(rows)
+        test_db.commit()
+        rebuild_usage_rollups(test_db)
+        test_db.commit()
+
+        for _ in range(25):
+            start = base + timedelta(minutes=rng.randrange(-600, 10 * 24 * 60))
+            end = start + timedelta(minutes=rng.randrange(0, 6 * 24 * 60))
+            model = rng.choice([None, "Claude"])
+            selected = [
+                r for r in rows
+                if start <= r.date.replace(tzinfo=JST) <= end and (model is None or r.model == model)
+            ]
+            times = [r.processing_time for r in selected if r.processing_time is not None]
+
+            summary = statistics_service.get_usage_summary(test_db, start, end, model)
+            assert summary["total_count"] == len(selected)
+            assert summary["total_input_tokens"] == sum(r.input_tokens for r in selected)
+            assert summary["total_output_tokens"] == sum(r.output_tokens for r in selected)
+            expected_average = round(sum(times) / len(times), 2) if times else 0.0
+            assert summary["average_processing_time"] == pytest.approx(expected_average, abs=0.011)
+
+            aggregated = statistics_service.get_aggregated_records(test_db, start, end, model)
+            assert sum(a["count"] for a in aggregated) == len(selected)
+            assert sum(a["input_tokens"] for a in aggregated) == sum(r.input_tokens for r in selected)
+            counts = [a["count"] for a in aggregated]
+            assert counts == sorted(counts, reverse=True)
+
+    def test_latency_matches_raw_distribution(self, test_db):
+        """処理時間の件数・最小・最大・ヒストグラムは生データと一致し、百分位数は同じバケットに入る"""
+        rng = random.Random(20260402)
+        base = datetime(2026, 3, 1, tzinfo=JST)
+        rows = [
+            SummaryUsage(
+                date=base + timedelta(minutes=rng.randrange(5 * 24 * 60)),
+                document_type=rng.choice(["他院への紹介", "返書"]),
+                model=rng.choice(["Claude", "Gemini"]),
+                input_tokens=1000,
+                output_tokens=500,
+                processing_time=rng.choice([None, round(rng.lognormvariate(3, 0.8), 2)]),
+            )
+            for _ in range(400)
+        ]
+        test_db.add_all(rows)
+        test_db.commit()
+        rebuild_usage_rollups(test_db)
+        test_db.commit()
+
+        def bucket_index(value: float) -> int:
+            return next(
+                (i for i, bound in enumerate(PROCESSING_TIME_BUCKETS) if value <= bound),
+                len(PROCESSING_TIME_BUCKETS),
+            )
+
+        start = base + timedelta(hours=5, minutes=17)
+        end = base + timedelta(days=4, hours=3, minutes=41)
+        results = statistics_service.get_latency_statistics(test_db, start, end)
+
+        assert sum(r["count"] for r in results) == sum(
+            1 for r in rows
+            if start <= r.date.replace(tzinfo=JST) <= end and r.processing_time is not None
+        )
+        for result in results:
+            times = sorted(
+                cast(float, r.processing_time) for r in rows
+                if start <= r.date.replace(tzinfo=JST) <= end
+                and r.processing_time is not None
+                and (r.model, r.document_type) == (result["model"], result["document_type"])
+            )
+            assert result["count"] == len(times)
+            assert (result["min"], result["max"]) == (min(times), max(times))
+            expected_histogram = [0] * (len(PROCESSING_TIME_BUCKETS) + 1)
+            for value in times:
+                expected_histogram[bucket_index(value)] += 1
+            assert [b["count"] for b in result["histogram"]] == expected_histogram
+            for percent in (50, 90, 99):
+                exact = times[max(0, -(-len(times) * percent // 100) - 1)]
+                assert bucket_index(result[f"p{percent}"]) == bucket_index(exact)
+            assert result["p50"] <= result["p90"] <= result["p99"]
+
+
+class TestLatencyTotals:
+    """_LatencyTotals の百分位数推定のテスト"""
+
+    def test_percentile_interpolates_within_bucket(self):
+        """バケット内では件数に応じて線形補間する"""
+        latency = _LatencyTotals()
+        # 10秒以下が2件、10〜20秒が2件
+        latency.merge(4, 50.0, 4.0, 18.0, [2, 4, 4, 4, 4])
+
+        assert latency.percentile(50) == 10.0
+        assert latency.percentile(75) == 14.0
+        assert latency.percentile(100) == 18.0
+
+    def test_overflow_bucket_uses_maximum(self):
+        """最大の境界値を超えるバケットは最大値までの範囲で補間する"""
+        latency = _LatencyTotals()
+        latency.merge(2, 400.0, 150.0, 250.0, [0, 0, 0, 0, 0])
+
+        assert latency.percentile(50) == 200.0
+        assert latency.percentile(99) == pytest.approx(249.0)
+        assert [b["count"] for b in latency.histogram()] == [0, 0, 0, 0, 0, 2]
+
@@ -1,7 +1,21 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
+import pytest
+
 from app.core.constants import get_message
-from app.services.usage_service import DailyUsageSummary, check_daily_limit, get_daily_usage
+from app.models.usage import DailyUsageCounter, SummaryUsage
+from app.services.usage_service import (
+    DailyUsageSummary,
+    check_daily_limit,
+    get_daily_usage,
+    get_usage_writer,
+    release_daily_quota,
+    reserve_daily_quota,
+    save_usage,
+)
+from app.services.usage_writer import UsageRecord
 
 
 class TestGetDailyUsage:
@@ -130,8 +144,6 @@ class TestSaveUsage:
     @patch("app.services.usage_service.get_db_session")
     def test_save_usage_success(self, mock_get_db_session):
         """正常系: DBにレコードが追加される"""
-        from app.services.usage_service import save_usage
-
         mock_db = MagicMock()
         mock_get_db_session.return_value.__enter__.return_value = mock_db
 
@@ -145,8 +157,10 @@ class TestSaveUsage:
             processing_time=2.5,
         )
 
-        mock_db.add.assert_called_once()
-        added = mock_db.add.call_args[0][0]
+        # 使用量は複数行INSERTの1行として渡される
+        rows = mock_db.execute.call_args_list[0][0][1]
+        assert len(rows) == 1
+        added = SimpleNamespace(**rows[0])
         assert added.department == "眼科"
         assert added.doctor == "橋本義弘"
         assert added.document_type == "他院への紹介"
@@ -157,16 +171,12 @@ class TestSaveUsage:
         assert added.app_type == "dischargesummary"
 
     @patch("app.services.usage_service.get_db_session")
-    @patch("logging.error")
-    def test_save_usage_exception_silent(self, mock_logging_error, mock_get_db_session):
-        """例外発生時: エラーログを出力するが例外は外部に伝播しない"""
-        from app.services.usage_service import save_usage
-
+    def test_save_usage_exception_silent(self, mock_get_db_session):
+        """DB書き込みの失敗時は例外を伝播させず、使用量をスプールファイルへ退避する"""
         mock_db = MagicMock()
-        mock_db.add.side_effect = Exception("DB書き込みエラー")
+        mock_db.execute.side_effect = Exception("DB書き込みエラー")
         mock_get_db_session.return_value.__enter__.return_value = mock_db
 
-        # 例外が伝播しないことを確認
         save_usage(
             department="default",
             doctor="default",
@@ -177,4 +187,123 @@ class TestSaveUsage:
             processing_time=3.0,
         )
 
-        mock_logging_error.assert_called_once()
+        with open(get_usage_writer().process_spool_path, encoding="utf-8") as f:
+            spooled = [UsageRecord.from_json(line) for line in f]
+        assert len(spooled) == 1
+        assert spooled[0].model == "Gemini"
+        assert spooled[0].request_delta == 1
+        assert spooled[0].input_delta == 2000
+
+
+@pytest.fixture
+def quota_db(test_db):
+    """usage_service が test_db を使うようにし、日次制限を小さく設定する"""
+
+    @contextmanager
+    def get_db_session():
+        yield test_db
+        test_db.commit()
+
+    settings = MagicMock()
+    settings.daily_request_limit = 2
+    settings.daily_input_token_limit = 10000
+    settings.daily_output_token_limit = 10000
+    settings.daily_quota_cache_ttl_seconds = 60
+    settings.daily_quota_reserved_output_tokens = 3000
+
+    with (
+        patch("app.services.usage_service.get_db_session", get_db_session),
+        patch("app.services.usage_service.get_settings", return_value=settings),
+    ):
+        yield test_db
+
+
+def _counter(db) -> tuple[int, int, int]:
+    db.expire_all()
+    row = db.query(DailyUsageCounter).one()
+    return row.request_count, row.input_tokens, row.output_tokens
+
+
+class TestReserveDailyQuota:
+    """reserve_daily_quota / release_daily_quota / save_usage による日次カウンタのテスト"""
+
+    def test_reserve_adds_estimate_to_counter(self, quota_db):
+        """予約で見込み使用量が日次カウンタに加算される"""
+        reservation, error = reserve_daily_quota(quota_db, 1200)
+        quota_db.commit()
+
+        assert error is None
+        assert reservation is not None
+        assert reservation.input_tokens == 1200
+        assert reservation.output_tokens == 3000
+        assert _counter(quota_db) == (1, 1200, 3000)
+
+    def test_reserve_rejects_when_limit_reached(self, quota_db):
+        """予約済みの件数が制限に達すると以降の予約を拒否する"""
+        for _ in range(2):
+            reservation, error = reserve_daily_quota(quota_db, 100)
+            assert reservation is not None
+        quota_db.commit()
+
+        reservation, error = reserve_daily_quota(quota_db, 100)
+
+        assert reservation is None
+        assert error == get_message("ERROR", "DAILY_REQUEST_LIMIT_EXCEEDED", limit="2")
+        assert _counter(quota_db) == (2, 200, 6000)
+
+    def test_reserve_rejects_from_view_without_db(self, quota_db):
+        """制限超過が判明している間はDBにアクセスせず拒否する"""
+        for _ in range(3):
+            reserve_daily_quota(quota_db, 100)
+        quota_db.commit()
+
+        db = MagicMock()
+        reservation, error = reserve_daily_quota(db, 100)
+
+        assert reservation is None
+        assert error is not None
+        db.execute.assert_not_called()
+
+    def test_save_usage_settles_difference(self, quota_db):
+        """save_usage は予約との差分だけを加算し、予約を確定済みにする"""
+        reservation, _ = reserve_daily_quota(quota_db, 1200)
+        quota_db.commit()
+
+        save_usage("眼科", "橋本義弘", "他院への紹介", "Claude", 1000, 500, 1.0, reservation)
+
+        assert reservation is not None
+        assert reservation.settled is True
+        assert _counter(quota_db) == (1, 1000, 500)
+
+        release_daily_quota(reservation)
+        assert _counter(quota_db) == (1, 1000, 500)
+
+    def test_save_usage_without_reservation_adds_actual(self, quota_db):
+        """予約がない場合は実績をそのまま加算する"""
+        save_usage("眼科", "橋本義弘", "他院への紹介", "Claude", 1000, 500, 1.0)
+
+        assert _counter(quota_db) == (1, 1000, 500)
+        assert get_daily_usage().request_count == 1
+
+    def test_save_usage_records_cache_tokens(self, quota_db):
+        """キャッシュのトークン数は使用統計に保存し、日次カウンタには加算しない"""
+        save_usage(
+            "眼科", "橋本義弘", "他院への紹介", "Claude", 1000, 500, 1.0,
+            cache_read_input_tokens=4096, cache_creation_input_tokens=128,
+        )
+
+        record = quota_db.query(SummaryUsage).one()
+        assert (record.cache_read_input_tokens, record.cache_creation_input_tokens) == (4096, 128)
+        assert _counter(quota_db) == (1, 1000, 500)
+
+    def test_release_returns_reserved_quota(self, quota_db):
+        """使用量を保存しなかった予約は取り消される"""
+        reservation, _ = reserve_daily_quota(quota_db, 1200)
+        quota_db.commit()
+
+        release_daily_quota(reservation)
+
+        assert reservation is not None
+        assert reservation.settled is True
+        assert _counter(quota_db) == (0, 0, 0)
+        assert check_daily_limit() is None
@@ -0,0 +1,212 @@
+"""UsageWriter のテスト"""
+
+import os
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from unittest.mock import MagicMock, patch
+from zoneinfo import ZoneInfo
+
+from app.models.usage import DailyUsageCounter, SummaryUsage
+from app.services.usage_service import get_usage_writer, save_usage
+from app.services.usage_writer import UsageRecord, UsageWriter
+
+JST = ZoneInfo("Asia/Tokyo")
+
+
+def _record(model: str = "Claude") -> UsageRecord:
+    return UsageRecord(
+        recorded_at=datetime(2026, 4, 1, 9, 0, tzinfo=JST),
+        department="眼科",
+        doctor="橋本義弘",
+        document_type="他院への紹介",
+        model=model,
+        input_tokens=1000,
+        output_tokens=500,
+        processing_time=2.5,
+        usage_date=date(2026, 4, 1),
+        request_delta=1,
+        input_delta=1000,
+        output_delta=500,
+    )
+
+
+class _RecordingWriteBatch:
+    """write_batch の代替（呼び出しごとのバッチを記録し、指定件数に達したら通知）"""
+
+    def __init__(self, expected_records: int) -> None:
+        self.batches: list[list[UsageRecord]] = []
+        self.done = threading.Event()
+        self._expected_records = expected_records
+
+    def __call__(self, records: list[UsageRecord]) -> None:
+        self.batches.append(list(records))
+        if sum(len(b) for b in self.batches) >= self._expected_records:
+            self.done.set()
+
+
+class TestUsageRecord:
+    """UsageRecord のシリアライズのテスト"""
+
+    def test_json_round_trip(self):
+        """JSONに変換して復元すると同じ値になる"""
+        record = _record()
+        assert UsageRecord.from_json(record.to_json()) == record
+
+
+class TestUsageWriter:
+    """UsageWriter 単体のテスト"""
+
+    def test_submit_returns_false_when_not_started(self, tmp_path):
+        """開始前は submit が False を返し、呼び出し元に同期書き込みさせる"""
+        writer = UsageWriter(MagicMock(), 10, 60, 10, str(tmp_path / "spool.jsonl"))
+        assert writer.submit(_record()) is False
+
+    def test_flushes_when_batch_size_reached(self, tmp_path):
+        """batch_size 件溜まった時点で1回の write_batch にまとめて書き込む"""
+        write_batch = _RecordingWriteBatch(expected_records=3)
+        writer = UsageWriter(write_batch, 3, 60, 10, str(tmp_path / "spool.jsonl"))
+        writer.start()
+        try:
+            for _ in range(3):
+                assert writer.submit(_record()) is True
+            assert write_batch.done.wait(5)
+        finally:
+            writer.stop()
+
+        assert [len(b) for b in write_batch.batches] == [3]
+
+    def test_flushes_after_interval(self, tmp_path):
+        """batch_size に満たなくても flush_interval_seconds 経過で書き込む"""
+        write_batch = _RecordingWriteBatch(expected_records=1)
+        writer = UsageWriter(write_batch, 100, 0.05, 10, str(tmp_path / "spool.jsonl"))
+        writer.start()
+        try:
+            writer.submit(_record())
+            assert write_batch.done.wait(5)
+        finally:
+            writer.stop()
+
+    def test_stop_flushes_pending_records(self, tmp_path):
+        """stop でキューに残った使用量を書き込む"""
+        write_batch = _RecordingWriteBatch(expected_records=2)
+        writer = UsageWriter(write_batch, 100, 60, 10, str(tmp_path / "spool.jsonl"))
+        writer.start()
+        writer.submit(_record())
+        writer.submit(_record())
+
+        writer.stop()
+
+        assert sum(len(b) for b in write_batch.batches) == 2
+        assert writer.running is False
+
+    def test_submit_returns_false_when_queue_full(self, tmp_path):
+        """キューが満杯なら submit は False を返す"""
+        blocked = threading.Event()
+        release = threading.Event()
+
+        def write_batch(records):
+            blocked.set()
+            release.wait(5)
+
+        writer = UsageWriter(write_batch, 1, 60, 1, str(tmp_path / "spool.jsonl"))
+        writer.start()
+        try:
+            writer.submit(_record())
+            assert blocked.wait(5)
+            assert writer.submit(_record()) is True
+            assert writer.submit(_record()) is False
+        finally:
+            release.set()
+            writer.stop()
+
+    def test_failed_batch_is_spooled_and_replayed(self, tmp_path):
+        """書き込みに失敗したバッチはスプールし、次の書き込み成功後に再投入する"""
+        write_batch = MagicMock(side_effect=[RuntimeError("DB停止"), None, None])
+        writer = UsageWriter(write_batch, 10, 60, 10, str(tmp_path / "spool.jsonl"))
+
+        assert writer.write([_record("Claude")]) is True
+        assert writer.process_spool_path == f"{tmp_path / 'spool.jsonl'}.{os.getpid()}"
+        assert os.path.exists(writer.process_spool_path)
+
+        assert writer.write([_record("Gemini")]) is True
+
+        assert not os.path.exists(writer.process_spool_path)
+        replayed = write_batch.call_args_list[2][0][0]
+        assert [r.model for r in replayed] == ["Claude"]
+
+    def test_orphaned_spools_are_adopted_once(self, tmp_path):
+        """終了したワーカーと旧形式のスプールは1つのワーカーだけが引き取り、稼働中のワーカーの分は残す"""
+        spool_path = tmp_path / "spool.jsonl"
+        dead_pid, live_pid = 999_999_999, os.getppid()
+        (tmp_path / f"spool.jsonl.{dead_pid}").write_text(_record("Claude").to_json() + "\n")
+        spool_path.write_text(_record("Gemini").to_json() + "\n")
+        (tmp_path / f"spool.jsonl.{live_pid}").write_text(_record("Other").to_json() + "\n")
+        first_batch, second_batch = MagicMock(), MagicMock()
+        first = UsageWriter(first_batch, 10, 60, 10, str(spool_path))
+        second = UsageWriter(second_batch, 10, 60, 10, str(spool_path))
+
+        first.adopt_orphaned_spools()
+        second.adopt_orphaned_spools()
+        first.replay_spool()
+        second.replay_spool()
+
+        replayed = sorted(
+            record.model for call in first_batch.call_args_list for record in call[0][0]
+        )
+        assert replayed == ["Claude", "Gemini"]
+        second_batch.assert_not_called()
+        assert sorted(p.name for p in tmp_path.iterdir()) == [f"spool.jsonl.{live_pid}"]
+
+    def test_failed_replay_keeps_adopted_spool(self, tmp_path):
+        """引き取ったスプールの再投入に失敗した場合はファイルを残し、次回に再投入する"""
+        spool_path = tmp_path / "spool.jsonl"
+        spool_path.write_text(_record("Claude").to_json() + "\n")
+        write_batch = MagicMock(side_effect=[RuntimeError("DB停止"), None])
+        writer = UsageWriter(write_batch, 10, 60, 10, str(spool_path))
+
+        writer.adopt_orphaned_spools()
+        writer.replay_spool()
+        assert len(list(tmp_path.iterdir())) == 1
+
+        writer.replay_spool()
+        assert list(tmp_path.iterdir()) == []
+        assert [r.model for r in write_batch.call_args[0][0]] == ["Claude"]
+
+    def test_write_returns_false_when_spool_fails(self, tmp_path):
+        """書き込みとスプールの両方に失敗した場合は False を返す"""
+        writer = UsageWriter(
+            MagicMock(side_effect=RuntimeError("DB停止")),
+            10,
+            60,
+            10,
+            str(tmp_path / "missing" / "spool.jsonl"),
+        )
+        assert writer.write([_record()]) is False
+
+
+class TestSaveUsageWriteBehind:
+    """使用量ライタ稼働中の save_usage のテスト"""
+
+    def test_save_usage_is_written_in_batch(self, test_db):
+        """稼働中の save_usage はキューに追加され、stop 時に使用量と日次カウンタへ反映される"""
+
+        @contextmanager
+        def get_db_session():
+            yield test_db
+            test_db.commit()
+
+        with patch("app.services.usage_service.get_db_session", get_db_session):
+            writer = get_usage_writer()
+            writer.start()
+            for _ in range(3):
+                save_usage("眼科", "橋本義弘", "他院への紹介", "Claude", 1000, 500, 1.0)
+            writer.stop()
+
+        assert test_db.query(SummaryUsage).count() == 3
+        counter = test_db.query(DailyUsageCounter).one()
+        assert (counter.request_count, counter.input_tokens, counter.output_tokens) == (
+            3,
+            3000,
+            1500,
+        )
@@ -1,7 +1,17 @@
 import json
-from unittest.mock import patch
+import logging
+import queue
+from unittest.mock import MagicMock, patch
 
-from app.utils.audit_logger import log_audit_event
+from app.core.metrics import REGISTRY
+from app.utils.audit_logger import (
+    AuditMessage,
+    AuditQueueHandler,
+    get_audit_log_stats,
+    log_audit_event,
+    start_audit_listener,
+    stop_audit_listener,
+)
 
 
 class TestLogAuditEvent:
@@ -13,7 +23,7 @@ class TestLogAuditEvent:
             log_audit_event(event_type="test_event")
 
             mock_logger.info.assert_called_once()
-            logged = json.loads(mock_logger.info.call_args[0][0])
+            logged = json.loads(str(mock_logger.info.call_args[0][0]))
 
         assert "timestamp" in logged
         assert logged["event_type"] == "test_event"
@@ -23,7 +33,7 @@ class TestLogAuditEvent:
         """success=False が正しく記録される"""
         with patch("app.utils.audit_logger.audit_logger") as mock_logger:
             log_audit_event(event_type="error_event", success=False)
-            logged = json.loads(mock_logger.info.call_args[0][0])
+            logged = json.loads(str(mock_logger.info.call_args[0][0]))
 
         assert logged["success"] is False
 
@@ -31,7 +41,7 @@ class TestLogAuditEvent:
         """user_ip, document_type, model, error_message は None の場合に含まれない"""
         with patch("app.utils.audit_logger.audit_logger") as mock_logger:
             log_audit_event(event_type="test_event")
-            logged = json.loads(mock_logger.info.call_args[0][0])
+            logged = json.loads(str(mock_logger.info.call_args[0][0]))
 
         assert "user_ip" not in logged
         assert "document_type" not in logged
@@ -42,7 +52,7 @@ class TestLogAuditEvent:
         """user_ip が指定された場合に含まれる"""
         with patch("app.utils.audit_logger.audit_logger") as mock_logger:
             log_audit_event(event_type="test_event", user_ip="192.168.1.1")
-            logged = json.loads(mock_logger.info.call_args[0][0])
+            logged = json.loads(str(mock_logger.info.call_args[0][0]))
 
         assert logged["user_ip"] == "192.168.1.1"
 
@@ -50,7 +60,7 @@ class TestLogAuditEvent:
         """document_type が指定された場合に含まれる"""
         with patch("app.utils.audit_logger.audit_logger") as mock_logger:
             log_audit_event(event_type="test_event", document_type="他院への紹介")
-            logged = json.loads(mock_logger.info.call_args[0][0])
+            logged = json.loads(str(mock_logger.info.call_args[0][0]))
 
         assert logged["document_type"] == "他院への紹介"
 
@@ -58,7 +68,7 @@ class TestLogAuditEvent:
         """model が指定された場合に含まれる"""
         with patch("app.utils.audit_logger.audit_logger") as mock_logger:
             log_audit_event(event_type="test_event", model="Claude")
-            logged = json.loads(mock_logger.info.call_args[0][0])
+            logged = json.loads(str(mock_logger.info.call_args[0][0]))
 
         assert logged["model"] == "Claude"
 
@@ -66,7 +76,7 @@ class TestLogAuditEvent:
         """error_message が指定された場合に含まれる"""
         with patch("app.utils.audit_logger.audit_logger") as mock_logger:
             log_audit_event(event_type="test_event", error_message="何らかのエラー")
-            logged = json.loads(mock_logger.info.call_args[0][0])
+            logged = json.loads(str(mock_logger.info.call_args[0][0]))
 
         assert logged["error_message"] == "何らかのエラー"
 
@@ -79,7 +89,7 @@ class TestLogAuditEvent:
                 output_tokens=500,
                 processing_time=1.23,
             )
-            logged = json.loads(mock_logger.info.call_args[0][0])
+            logged = json.loads(str(mock_logger.info.call_args[0][0]))
 
         assert logged["input_tokens"] == 1000
         assert logged["output_tokens"] == 500
@@ -98,8 +108,101 @@ class TestLogAuditEvent:
         """出力が有効なJSONであること"""
         with patch("app.utils.audit_logger.audit_logger") as mock_logger:
             log_audit_event(event_type="test_event", user_ip="10.0.0.1", model="Claude")
-            raw = mock_logger.info.call_args[0][0]
+            raw = str(mock_logger.info.call_args[0][0])
 
         # 例外が出なければ有効なJSON
         parsed = json.loads(raw)
         assert isinstance(parsed, dict)
+
+
+class TestAuditMessage:
+    """AuditMessage のテスト"""
+
+    def test_str_is_compact_json(self):
+        """区切りの空白を含まないJSONに変換し、日本語はエスケープしない"""
+        message = AuditMessage({"event_type": "文書生成", "success": True})
+        assert str(message) == '{"event_type":"文書生成","success":true}'
+
+
+class TestAuditQueueHandler:
+    """AuditQueueHandler のテスト"""
+
+    def _record(self) -> logging.LogRecord:
+        return logging.LogRecord(
+            "audit", logging.INFO, __file__, 0, AuditMessage({"event_type": "x"}), None, None
+        )
+
+    def test_enqueue_does_not_format(self):
+        """キューへはフォーマット前のレコードを渡す"""
+        handler = AuditQueueHandler(queue.Queue(10), MagicMock())
+        record = self._record()
+
+        handler.handle(record)
+
+        queued = handler.log_queue.get_nowait()
+        assert queued is record
+        assert isinstance(queued.msg, AuditMessage)
+        assert handler.enqueued == 1
+
+    def test_overflow_is_emitted_synchronously(self):
+        """キューが満杯の場合は出力先へ直接書き込み、あふれ件数を記録する"""
+        target = MagicMock()
+        handler = AuditQueueHandler(queue.Queue(1), target)
+
+        handler.handle(self._record())
+        handler.handle(self._record())
+
+        target.handle.assert_called_once()
+        assert handler.enqueued == 1
+        assert handler.overflowed == 1
+        assert handler.max_queued == 1
+
+
+class TestAuditListener:
+    """start_audit_listener / stop_audit_listener のテスト"""
+
+    def test_events_are_written_on_stop(self, tmp_path):
+        """キュー経由で出力し、停止時に残りを書き込む"""
+        log_path = tmp_path / "audit.log"
+        start_audit_listener(100, str(log_path))
+        try:
+            log_audit_event(event_type="event_1", model="Claude")
+            log_audit_event(event_type="event_2", success=False)
+            assert get_audit_log_stats()["enqueued"] == 2
+        finally:
+            stop_audit_listener()
+
+        lines = log_path.read_text(encoding="utf-8").splitlines()
+        payloads = [json.loads(line.split(" - ", 1)[1]) for line in lines]
+        assert [p["event_type"] for p in payloads] == ["event_1", "event_2"]
+        assert payloads[1]["success"] is False
+
+    def test_stats_are_exported_as_metrics(self, tmp_path):
+        """滞留数・最大滞留数をゲージ、投入数・あふれ件数をカウンタとして /metrics に出力する"""
+        start_audit_listener(100, str(tmp_path / "audit.log"))
+        try:
+            log_audit_event(event_type="event_1")
+            text = REGISTRY.render()
+        finally:
+            stop_audit_listener()
+
+        # 滞留数はリスナーの処理状況により変わるため出力の有無のみ確認する
+        assert "\naudit_log_queue_depth " in text
+        assert "audit_log_queue_max_depth 1" in text
+        assert "audit_log_enqueued_total 1" in text
+        assert "audit_log_overflowed_total 0" in text
+
+    def test_stop_restores_propagation(self, tmp_path):
+        """停止後は従来どおりルートロガーへ伝播する"""
+        start_audit_listener(100, str(tmp_path / "audit.log"))
+        stop_audit_listener()
+
+        audit_logger = logging.getLogger("audit")
+        assert audit_logger.propagate is True
+        assert audit_logger.handlers == []
+        assert get_audit_log_stats() == {
+            "queued": 0,
+            "max_queued": 0,
+            "enqueued": 0,
+            "overflowed": 0,
+        }
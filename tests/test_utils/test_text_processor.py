@@ -1,4 +1,15 @@
-from app.utils.text_processor import format_output_summary, parse_output_summary
+import random
+import re
+from unittest.mock import patch
+
+from app.core.constants import DEFAULT_SECTION_NAMES, SECTION_DETECTION_PATTERNS
+from app.utils.text_processor import (
+    IncrementalSectionParser,
+    detect_section_header,
+    format_output_summary,
+    parse_output_summary,
+    section_aliases,
+)
 
 
 class TestFormatOutputSummary:
@@ -300,3 +311,170 @@ class TestParseOutputSummary:
 
         # パターンマッチで空白を吸収
         assert result["備考"] == "特記事項なし"
+
+
+def _legacy_parse_output_summary(summary_text: str) -> dict[str, str]:
+    """見出し判定を行ごとに re.match で行っていた旧実装（比較用）"""
+    sections = {section: "" for section in DEFAULT_SECTION_NAMES}
+    current_section = None
+    all_section_names = list(sections.keys()) + list(section_aliases.keys())
+
+    for line in summary_text.split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+
+        detected_section = None
+        remaining_content = ""
+        for section in all_section_names:
+            for pattern in SECTION_DETECTION_PATTERNS:
+                match = re.match(pattern.format(section=re.escape(section)), line)
+                if match:
+                    detected_section = section_aliases.get(section, section)
+                    remaining_content = match.group(1).strip() if match.groups() else ""
+                    break
+            if detected_section:
+                break
+
+        if detected_section:
+            current_section = detected_section
+            if remaining_content:
+                sections[current_section] = remaining_content
+        elif current_section:
+            if sections[current_section]:
+                sections[current_section] += "\n" + line
+            else:
+                sections[current_section] = line
+
+    return sections
+
+
+class TestDetectSectionHeader:
+    """detect_section_header 関数のテスト"""
+
+    def test_detect_bracketed_header_with_content(self):
+        """括弧付き見出しと同じ行の本文を返す"""
+        assert detect_section_header("【現在の処方】 アムロジピン5mg") == (
+            "現在の処方",
+            "アムロジピン5mg",
+        )
+
+    def test_detect_alias_header(self):
+        """エイリアスは正規のセクション名に変換される"""
+        assert detect_section_header("補足：特記事項なし") == ("備考", "特記事項なし")
+
+    def test_detect_header_only(self):
+        """見出しのみの行は本文が空文字"""
+        assert detect_section_header("備考") == ("備考", "")
+
+    def test_non_header_returns_none(self):
+        """見出しでない行は None"""
+        assert detect_section_header("アムロジピン5mg 1日1回") is None
+
+    def test_alias_change_rebuilds_pattern(self):
+        """エイリアスを追加すると見出し判定に反映される"""
+        assert detect_section_header("注意事項: 転倒注意") is None
+
+        with patch.dict(section_aliases, {"注意事項": "備考"}):
+            assert detect_section_header("注意事項: 転倒注意") == ("備考", "転倒注意")
+
+        assert detect_section_header("注意事項: 転倒注意") is None
+
+
+class TestParseOutputSummaryEquivalence:
+    """parse_output_summary が旧実装と同じ結果を返すことの確認"""
+
+    def test_random_outputs_match_legacy(self):
+        """見出し・本文・記号を混在させた出力で旧実装と一致する"""
+        rng = random.Random(0)
+        fragments = [
+            "現在の処方", "備考", "その他", "補足", "メモ", "処方",
+            "【", "】", "[", "]", "■", "●", ":", "：", " ", "　",
+            "アムロジピン5mg", "特記事項なし", "\n", "\n\n",
+        ]
+        for _ in range(2000):
+            text = "".join(rng.choice(fragments) for _ in range(rng.randint(0, 30)))
+            assert parse_output_summary(text) == _legacy_parse_output_summary(text), text
+
+    def test_long_output_matches_legacy(self):
+        """長い複数セクションの出力で旧実装と一致する"""
+        headers = ["【現在の処方】", "備考:", "補足：", "[メモ]"]
+        lines = [headers[i % 4] if i % 7 == 0 else f"本文{i}" for i in range(3000)]
+        text = "\n".join(lines)
+
+        assert parse_output_summary(text) == _legacy_parse_output_summary(text)
+
+
+class TestIncrementalSectionParser:
+    """IncrementalSectionParser クラスのテスト"""
+
+    def test_section_completes_on_next_header(self):
+        """次の見出しの行が確定した時点で直前のセクションを返す"""
+        parser = IncrementalSectionParser()
+
+        assert parser.feed("現在の処方: アムロジピン5mg\n") == []
+        assert parser.feed("メトホルミン250mg\n") == []
+        assert parser.feed("備考: 特記なし\n") == [
+            ("現在の処方", "アムロジピン5mg\nメトホルミン250mg")
+        ]
+        assert parser.finish() == {
+            "現在の処方": "アムロジピン5mg\nメトホルミン250mg",
+            "備考": "特記なし",
+        }
+
+    def test_header_split_across_chunks(self):
+        """チャンク境界で分割された見出しも行の確定後に判定する"""
+        parser = IncrementalSectionParser()
+
+        completed = []
+        for chunk in ["現在の処方: A\n【備", "考", "】 B\n"]:
+            completed.extend(parser.feed(chunk))
+
+        assert completed == [("現在の処方", "A")]
+        assert parser.finish()["備考"] == "B"
+
+    def test_chunks_are_formatted(self):
+        """セクション内容には format_output_summary と同じ整形を適用する"""
+        parser = IncrementalSectionParser()
+        parser.feed("## 現在の処方\n**アムロジピン** 5mg\n")
+
+        assert parser.feed("備考\n") == [("現在の処方", "アムロジピン5mg")]
+
+    def test_unchanged_section_is_not_repeated(self):
+        """同じ見出しが再度現れても内容が変わらなければ再通知しない"""
+        parser = IncrementalSectionParser()
+        parser.feed("現在の処方: A\n備考\n")
+
+        assert parser.feed("【現在の処方】\n備考\n") == []
+        assert parser.feed("現在の処方\nB\n備考\n") == [("現在の処方", "A\nB")]
+
+    def test_flush_returns_unsent_sections(self):
+        """flush() は終了時点で未通知の内容があるセクションだけを返す"""
+        parser = IncrementalSectionParser()
+        parser.feed("現在の処方: A\n備考: B")
+
+        assert parser.flush() == [("現在の処方", "A"), ("備考", "B")]
+
+        parser = IncrementalSectionParser()
+        assert parser.feed("現在の処方: A\n備考: B\n") == [("現在の処方", "A")]
+
+        assert parser.flush() == [("備考", "B")]
+        assert parser.flush() == []
+
+    def test_random_chunking_matches_full_parse(self):
+        """任意の位置で分割しても全文を整形・パースした結果と一致する"""
+        rng = random.Random(0)
+        fragments = [
+            "現在の処方", "備考", "補足", "メモ", "【", "】", "■", ":", "：",
+            " ", "　", "*", "#", "アムロジピン5mg", "特記事項なし", "\n", "\r\n",
+        ]
+        for _ in range(1000):
+            text = "".join(rng.choice(fragments) for _ in range(rng.randint(0, 30)))
+            parser = IncrementalSectionParser()
+            position = 0
+            while position < len(text):
+                size = rng.randint(1, 5)
+                parser.feed(text[position:position + size])
+                position += size
+
+            assert parser.finish() == parse_output_summary(format_output_summary(text)), text
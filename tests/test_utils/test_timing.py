@@ -0,0 +1,52 @@
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from app.utils.timing import StageTimer
+
+
+class TestStageTimer:
+    """StageTimer のテスト"""
+
+    def test_stage_records_milliseconds(self):
+        """with ブロックの実行時間をミリ秒で記録"""
+        timer = StageTimer()
+        with patch("app.utils.timing.time.perf_counter", side_effect=[1.0, 1.25]):
+            with timer.stage("sanitize"):
+                pass
+
+        assert timer.as_dict() == {"sanitize": 250.0}
+
+    def test_same_stage_is_accumulated(self):
+        """同じ段階名は合算し、記録順を保つ"""
+        timer = StageTimer()
+        timer.add("load_context", 0.01)
+        timer.add("generation", 2.0)
+        timer.add("load_context", 0.02)
+
+        assert list(timer.as_dict()) == ["load_context", "generation"]
+        assert timer.as_dict()["load_context"] == pytest.approx(30.0)
+
+    def test_stage_recorded_on_exception(self):
+        """例外が発生しても所要時間を記録"""
+        timer = StageTimer()
+        with pytest.raises(ValueError):
+            with timer.stage("determine_model"):
+                raise ValueError("エラー")
+
+        assert "determine_model" in timer.as_dict()
+
+    def test_add_from_threads(self):
+        """複数スレッドからの記録を取りこぼさない"""
+        timer = StageTimer()
+        threads = [
+            threading.Thread(target=lambda: [timer.add("client_init", 0.001) for _ in range(1000)])
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert timer.as_dict()["client_init"] == pytest.approx(4000.0)